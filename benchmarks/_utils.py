@@ -0,0 +1,42 @@
+import numpy
+import knncolle
+
+
+ALGORITHMS = {
+    "Annoy": knncolle.AnnoyParameters,
+    "Exhaustive": knncolle.ExhaustiveParameters,
+    "Hnsw": knncolle.HnswParameters,
+    "Kdtree": knncolle.KdtreeParameters,
+    "Kmknn": knncolle.KmknnParameters,
+    "Nndescent": knncolle.NndescentParameters,
+    "Vptree": knncolle.VptreeParameters,
+}
+
+
+def mock_data(num_obs: int, num_dims: int, seed: int = 42) -> numpy.ndarray:
+    # Mixture of Gaussians, to mimic the clustered structure of real datasets.
+    rng = numpy.random.default_rng(seed)
+    num_centers = max(1, int(numpy.sqrt(num_obs) / 4))
+    centers = rng.normal(scale=5, size=(num_centers, num_dims))
+    chosen = rng.integers(num_centers, size=num_obs)
+    return centers[chosen, :] + rng.normal(size=(num_obs, num_dims))
+
+
+def create_parameters(algorithm: str, distance: str) -> knncolle.Parameters:
+    return ALGORITHMS[algorithm](distance=distance)
+
+
+def variable_neighbors(num_obs: int, k: int, seed: int = 42) -> numpy.ndarray:
+    rng = numpy.random.default_rng(seed)
+    return rng.integers(1, 2 * k, size=num_obs).astype(numpy.uint32)
+
+
+def latency_percentile(fun, queries: numpy.ndarray, percentile: float) -> float:
+    import time
+    collected = numpy.empty(queries.shape[0], dtype=numpy.float64)
+    for i in range(queries.shape[0]):
+        current = queries[i:i + 1, :]
+        start = time.perf_counter()
+        fun(current)
+        collected[i] = time.perf_counter() - start
+    return float(numpy.percentile(collected, percentile))
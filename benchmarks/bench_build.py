@@ -0,0 +1,24 @@
+import knncolle
+
+from ._utils import ALGORITHMS, mock_data, create_parameters
+
+
+class BuildIndex:
+    params = (
+        list(ALGORITHMS.keys()),
+        [1000, 20000],
+        [5, 50],
+        ["Euclidean", "Manhattan", "Cosine"],
+    )
+    param_names = ["algorithm", "num_obs", "num_dims", "distance"]
+    timeout = 600
+
+    def setup(self, algorithm, num_obs, num_dims, distance):
+        self.data = mock_data(num_obs, num_dims)
+        self.parameters = create_parameters(algorithm, distance)
+
+    def time_build_index(self, algorithm, num_obs, num_dims, distance):
+        knncolle.build_index(self.parameters, self.data)
+
+    def peakmem_build_index(self, algorithm, num_obs, num_dims, distance):
+        knncolle.build_index(self.parameters, self.data)
@@ -0,0 +1,126 @@
+import knncolle
+
+from ._utils import ALGORITHMS, mock_data, create_parameters, variable_neighbors, latency_percentile
+
+
+class FindKnn:
+    params = (
+        list(ALGORITHMS.keys()),
+        [1000, 20000],
+        [5, 50],
+        [5, 20],
+        [1, 4],
+        [False, True],
+    )
+    param_names = ["algorithm", "num_obs", "num_dims", "num_neighbors", "num_threads", "variable_k"]
+    timeout = 600
+
+    def setup(self, algorithm, num_obs, num_dims, num_neighbors, num_threads, variable_k):
+        data = mock_data(num_obs, num_dims)
+        self.index = knncolle.build_index(create_parameters(algorithm, "Euclidean"), data)
+        if variable_k:
+            self.k = variable_neighbors(num_obs, num_neighbors)
+        else:
+            self.k = num_neighbors
+
+    def time_find_knn(self, algorithm, num_obs, num_dims, num_neighbors, num_threads, variable_k):
+        knncolle.find_knn(self.index, self.k, num_threads=num_threads)
+
+    def peakmem_find_knn(self, algorithm, num_obs, num_dims, num_neighbors, num_threads, variable_k):
+        knncolle.find_knn(self.index, self.k, num_threads=num_threads)
+
+    def time_find_distance(self, algorithm, num_obs, num_dims, num_neighbors, num_threads, variable_k):
+        knncolle.find_distance(self.index, self.k, num_threads=num_threads)
+
+    def track_find_knn_throughput(self, algorithm, num_obs, num_dims, num_neighbors, num_threads, variable_k):
+        import time
+        start = time.perf_counter()
+        knncolle.find_knn(self.index, self.k, num_threads=num_threads)
+        return num_obs / (time.perf_counter() - start)
+
+    track_find_knn_throughput.unit = "observations/second"
+
+
+class FindKnnDistances:
+    params = (
+        list(ALGORITHMS.keys()),
+        ["Euclidean", "Manhattan", "Cosine"],
+    )
+    param_names = ["algorithm", "distance"]
+    timeout = 600
+
+    def setup(self, algorithm, distance):
+        data = mock_data(10000, 20)
+        self.index = knncolle.build_index(create_parameters(algorithm, distance), data)
+
+    def time_find_knn(self, algorithm, distance):
+        knncolle.find_knn(self.index, 10)
+
+
+class QueryKnn:
+    params = (
+        list(ALGORITHMS.keys()),
+        [1000, 20000],
+        [5, 50],
+        [5, 20],
+        [1, 4],
+        [False, True],
+    )
+    param_names = ["algorithm", "num_obs", "num_dims", "num_neighbors", "num_threads", "variable_k"]
+    timeout = 600
+
+    def setup(self, algorithm, num_obs, num_dims, num_neighbors, num_threads, variable_k):
+        data = mock_data(num_obs, num_dims)
+        self.query = mock_data(num_obs, num_dims, seed=69)
+        self.index = knncolle.build_index(create_parameters(algorithm, "Euclidean"), data)
+        if variable_k:
+            self.k = variable_neighbors(num_obs, num_neighbors)
+        else:
+            self.k = num_neighbors
+
+    def time_query_knn(self, algorithm, num_obs, num_dims, num_neighbors, num_threads, variable_k):
+        knncolle.query_knn(self.index, self.query, self.k, num_threads=num_threads)
+
+    def peakmem_query_knn(self, algorithm, num_obs, num_dims, num_neighbors, num_threads, variable_k):
+        knncolle.query_knn(self.index, self.query, self.k, num_threads=num_threads)
+
+    def time_query_distance(self, algorithm, num_obs, num_dims, num_neighbors, num_threads, variable_k):
+        knncolle.query_distance(self.index, self.query, self.k, num_threads=num_threads)
+
+    def track_query_knn_throughput(self, algorithm, num_obs, num_dims, num_neighbors, num_threads, variable_k):
+        import time
+        start = time.perf_counter()
+        knncolle.query_knn(self.index, self.query, self.k, num_threads=num_threads)
+        return num_obs / (time.perf_counter() - start)
+
+    track_query_knn_throughput.unit = "queries/second"
+
+
+class QueryKnnLatency:
+    params = (
+        list(ALGORITHMS.keys()),
+        [5, 50],
+    )
+    param_names = ["algorithm", "num_dims"]
+    timeout = 600
+
+    def setup(self, algorithm, num_dims):
+        data = mock_data(20000, num_dims)
+        self.query = mock_data(500, num_dims, seed=69)
+        self.index = knncolle.build_index(create_parameters(algorithm, "Euclidean"), data)
+
+    def _search(self, query):
+        knncolle.query_knn(self.index, query, 10)
+
+    def track_latency_p50(self, algorithm, num_dims):
+        return latency_percentile(self._search, self.query, 50)
+
+    def track_latency_p90(self, algorithm, num_dims):
+        return latency_percentile(self._search, self.query, 90)
+
+    def track_latency_p99(self, algorithm, num_dims):
+        return latency_percentile(self._search, self.query, 99)
+
+    track_latency_p50.unit = "seconds"
+    track_latency_p90.unit = "seconds"
+    track_latency_p99.unit = "seconds"
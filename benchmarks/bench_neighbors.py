@@ -0,0 +1,60 @@
+import numpy
+import knncolle
+
+from ._utils import ALGORITHMS, mock_data, create_parameters
+
+
+# Annoy and HNSW do not support searches by distance.
+RANGE_ALGORITHMS = [a for a in ALGORITHMS.keys() if a not in ("Annoy", "Hnsw")]
+
+
+class FindNeighbors:
+    params = (
+        RANGE_ALGORITHMS,
+        [1000, 20000],
+        [5, 50],
+        [1, 4],
+        [False, True],
+    )
+    param_names = ["algorithm", "num_obs", "num_dims", "num_threads", "variable_threshold"]
+    timeout = 600
+
+    def setup(self, algorithm, num_obs, num_dims, num_threads, variable_threshold):
+        data = mock_data(num_obs, num_dims)
+        self.index = knncolle.build_index(create_parameters(algorithm, "Euclidean"), data)
+
+        # Choosing thresholds that capture roughly 10 neighbors per observation.
+        dist = knncolle.find_distance(self.index, 10)
+        if variable_threshold:
+            self.threshold = dist
+        else:
+            self.threshold = float(numpy.median(dist))
+
+    def time_find_neighbors(self, algorithm, num_obs, num_dims, num_threads, variable_threshold):
+        knncolle.find_neighbors(self.index, self.threshold, num_threads=num_threads)
+
+    def peakmem_find_neighbors(self, algorithm, num_obs, num_dims, num_threads, variable_threshold):
+        knncolle.find_neighbors(self.index, self.threshold, num_threads=num_threads)
+
+
+class QueryNeighbors:
+    params = (
+        RANGE_ALGORITHMS,
+        [1000, 20000],
+        [5, 50],
+        [1, 4],
+    )
+    param_names = ["algorithm", "num_obs", "num_dims", "num_threads"]
+    timeout = 600
+
+    def setup(self, algorithm, num_obs, num_dims, num_threads):
+        data = mock_data(num_obs, num_dims)
+        self.query = mock_data(num_obs, num_dims, seed=69)
+        self.index = knncolle.build_index(create_parameters(algorithm, "Euclidean"), data)
+        self.threshold = float(numpy.median(knncolle.query_distance(self.index, self.query, 10)))
+
+    def time_query_neighbors(self, algorithm, num_obs, num_dims, num_threads):
+        knncolle.query_neighbors(self.index, self.query, self.threshold, num_threads=num_threads)
+
+    def peakmem_query_neighbors(self, algorithm, num_obs, num_dims, num_threads):
+        knncolle.query_neighbors(self.index, self.query, self.threshold, num_threads=num_threads)
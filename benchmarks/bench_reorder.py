@@ -0,0 +1,48 @@
+import knncolle
+import numpy
+
+from ._utils import ALGORITHMS, mock_data, create_parameters
+
+
+class ReorderQueries:
+    """Large query sets in random order, with and without locality-aware reordering."""
+    # Exhaustive searches are omitted as they would take too long for this many queries,
+    # and their access pattern doesn't depend on the order of the queries anyway.
+    params = (
+        [a for a in ALGORITHMS.keys() if a != "Exhaustive"],
+        [False, True],
+    )
+    param_names = ["algorithm", "reorder"]
+    timeout = 600
+
+    def setup(self, algorithm, reorder):
+        data = mock_data(20000, 20)
+        self.index = knncolle.build_index(create_parameters(algorithm, "Euclidean"), data, reorder=reorder)
+        self.query = mock_data(20000, 20, seed=100)
+        self.query = self.query[numpy.random.default_rng(42).permutation(self.query.shape[0]), :]
+
+    def time_query_knn(self, algorithm, reorder):
+        knncolle.query_knn(self.index, self.query, 10, reorder=reorder)
+
+    def time_find_knn(self, algorithm, reorder):
+        knncolle.find_knn(self.index, 10, reorder=reorder)
+
+
+class ReorderLayout:
+    """Searches on indices where the stored observations are permuted by their spatial locality."""
+    params = (
+        ["Hnsw", "Annoy"],
+        [False, True],
+    )
+    param_names = ["algorithm", "reorder"]
+    timeout = 600
+
+    def setup(self, algorithm, reorder):
+        rng = numpy.random.default_rng(42)
+        data = mock_data(50000, 100)
+        data = data[rng.permutation(data.shape[0]), :]
+        self.index = knncolle.build_index(create_parameters(algorithm, "Euclidean"), data, reorder=reorder)
+        self.query = mock_data(10000, 100, seed=100)
+
+    def time_query_knn(self, algorithm, reorder):
+        knncolle.query_knn(self.index, self.query, 10, reorder=True)
@@ -0,0 +1,32 @@
+import knncolle
+import numpy
+
+from ._utils import mock_data, create_parameters
+
+
+class HeavyTailedNeighbors:
+    """Range searches where a minority of observations are much more expensive than the rest."""
+    params = (
+        ["Vptree", "Kmknn"],
+        [None, 16, 256],
+        [4],
+    )
+    param_names = ["algorithm", "chunk_size", "num_threads"]
+    timeout = 600
+
+    def setup(self, algorithm, chunk_size, num_threads):
+        data = mock_data(20000, 10)
+        # Sorting by the first dimension so that dense and sparse regions end up in different static ranges.
+        data = data[numpy.argsort(data[:, 0]), :]
+        self.index = knncolle.build_index(create_parameters(algorithm, "Euclidean"), data)
+
+        # Pareto-distributed thresholds, so that a few observations have very large neighborhoods.
+        rng = numpy.random.default_rng(42)
+        self.threshold = numpy.sort(rng.pareto(2, size=data.shape[0])) + 0.5
+        self.k = numpy.sort(rng.pareto(1.5, size=data.shape[0]) * 5).astype(numpy.uint32) + 1
+
+    def time_find_neighbors(self, algorithm, chunk_size, num_threads):
+        knncolle.find_neighbors(self.index, self.threshold, num_threads=num_threads, chunk_size=chunk_size, get_index=False)
+
+    def time_find_knn_variable(self, algorithm, chunk_size, num_threads):
+        knncolle.find_knn(self.index, self.k, num_threads=num_threads, chunk_size=chunk_size)
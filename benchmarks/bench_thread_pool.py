@@ -0,0 +1,38 @@
+import knncolle
+
+from ._utils import mock_data, create_parameters
+
+
+class SmallBatches:
+    """Many calls with a handful of queries each, where thread creation would otherwise dominate the search time."""
+    params = (
+        ["Vptree", "Hnsw"],
+        [1, 10, 100],
+        ["serial", "spawn", "pool"],
+    )
+    param_names = ["algorithm", "batch_size", "threading"]
+    timeout = 600
+
+    def setup(self, algorithm, batch_size, threading):
+        data = mock_data(20000, 20)
+        self.index = knncolle.build_index(create_parameters(algorithm, "Euclidean"), data)
+        self.batches = [mock_data(batch_size, 20, seed=i + 1) for i in range(200)]
+        if threading == "serial":
+            self.num_threads = 1
+        elif threading == "spawn":
+            self.num_threads = 4
+        else:
+            self.num_threads = knncolle.ThreadPool(4)
+
+    def time_query_knn(self, algorithm, batch_size, threading):
+        for b in self.batches:
+            knncolle.query_knn(self.index, b, 10, num_threads=self.num_threads)
+
+    def track_calls_per_second(self, algorithm, batch_size, threading):
+        import time
+        start = time.perf_counter()
+        for b in self.batches:
+            knncolle.query_knn(self.index, b, 10, num_threads=self.num_threads)
+        return len(self.batches) / (time.perf_counter() - start)
+
+    track_calls_per_second.unit = "calls/second"
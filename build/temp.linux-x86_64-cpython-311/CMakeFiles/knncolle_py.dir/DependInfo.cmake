@@ -0,0 +1,32 @@
+
+# Consider dependencies only in project.
+set(CMAKE_DEPENDS_IN_PROJECT_ONLY OFF)
+
+# The set of languages for which implicit dependencies are needed:
+set(CMAKE_DEPENDS_LANGUAGES
+  )
+
+# The set of dependency files which are needed:
+set(CMAKE_DEPENDS_DEPENDENCY_FILES
+  "/root/package/lib/src/annoy.cpp" "CMakeFiles/knncolle_py.dir/src/annoy.cpp.o" "gcc" "CMakeFiles/knncolle_py.dir/src/annoy.cpp.o.d"
+  "/root/package/lib/src/exhaustive.cpp" "CMakeFiles/knncolle_py.dir/src/exhaustive.cpp.o" "gcc" "CMakeFiles/knncolle_py.dir/src/exhaustive.cpp.o.d"
+  "/root/package/lib/src/generics.cpp" "CMakeFiles/knncolle_py.dir/src/generics.cpp.o" "gcc" "CMakeFiles/knncolle_py.dir/src/generics.cpp.o.d"
+  "/root/package/lib/src/graph.cpp" "CMakeFiles/knncolle_py.dir/src/graph.cpp.o" "gcc" "CMakeFiles/knncolle_py.dir/src/graph.cpp.o.d"
+  "/root/package/lib/src/hnsw.cpp" "CMakeFiles/knncolle_py.dir/src/hnsw.cpp.o" "gcc" "CMakeFiles/knncolle_py.dir/src/hnsw.cpp.o.d"
+  "/root/package/lib/src/init.cpp" "CMakeFiles/knncolle_py.dir/src/init.cpp.o" "gcc" "CMakeFiles/knncolle_py.dir/src/init.cpp.o.d"
+  "/root/package/lib/src/kdtree.cpp" "CMakeFiles/knncolle_py.dir/src/kdtree.cpp.o" "gcc" "CMakeFiles/knncolle_py.dir/src/kdtree.cpp.o.d"
+  "/root/package/lib/src/kmknn.cpp" "CMakeFiles/knncolle_py.dir/src/kmknn.cpp.o" "gcc" "CMakeFiles/knncolle_py.dir/src/kmknn.cpp.o.d"
+  "/root/package/lib/src/many.cpp" "CMakeFiles/knncolle_py.dir/src/many.cpp.o" "gcc" "CMakeFiles/knncolle_py.dir/src/many.cpp.o.d"
+  "/root/package/lib/src/mnn.cpp" "CMakeFiles/knncolle_py.dir/src/mnn.cpp.o" "gcc" "CMakeFiles/knncolle_py.dir/src/mnn.cpp.o.d"
+  "/root/package/lib/src/nndescent.cpp" "CMakeFiles/knncolle_py.dir/src/nndescent.cpp.o" "gcc" "CMakeFiles/knncolle_py.dir/src/nndescent.cpp.o.d"
+  "/root/package/lib/src/permuted.cpp" "CMakeFiles/knncolle_py.dir/src/permuted.cpp.o" "gcc" "CMakeFiles/knncolle_py.dir/src/permuted.cpp.o.d"
+  "/root/package/lib/src/thread_pool.cpp" "CMakeFiles/knncolle_py.dir/src/thread_pool.cpp.o" "gcc" "CMakeFiles/knncolle_py.dir/src/thread_pool.cpp.o.d"
+  "/root/package/lib/src/vptree.cpp" "CMakeFiles/knncolle_py.dir/src/vptree.cpp.o" "gcc" "CMakeFiles/knncolle_py.dir/src/vptree.cpp.o.d"
+  )
+
+# Targets to which this target links.
+set(CMAKE_TARGET_LINKED_INFO_FILES
+  )
+
+# Fortran module output directory.
+set(CMAKE_Fortran_TARGET_MODULE_DIR "")
@@ -0,0 +1,37 @@
+file(REMOVE_RECURSE
+  "/root/package/build/lib.linux-x86_64-cpython-311/knncolle/_lib_knncolle.cpython-311-x86_64-linux-gnu.so"
+  "/root/package/build/lib.linux-x86_64-cpython-311/knncolle/_lib_knncolle.pdb"
+  "CMakeFiles/knncolle_py.dir/src/annoy.cpp.o"
+  "CMakeFiles/knncolle_py.dir/src/annoy.cpp.o.d"
+  "CMakeFiles/knncolle_py.dir/src/exhaustive.cpp.o"
+  "CMakeFiles/knncolle_py.dir/src/exhaustive.cpp.o.d"
+  "CMakeFiles/knncolle_py.dir/src/generics.cpp.o"
+  "CMakeFiles/knncolle_py.dir/src/generics.cpp.o.d"
+  "CMakeFiles/knncolle_py.dir/src/graph.cpp.o"
+  "CMakeFiles/knncolle_py.dir/src/graph.cpp.o.d"
+  "CMakeFiles/knncolle_py.dir/src/hnsw.cpp.o"
+  "CMakeFiles/knncolle_py.dir/src/hnsw.cpp.o.d"
+  "CMakeFiles/knncolle_py.dir/src/init.cpp.o"
+  "CMakeFiles/knncolle_py.dir/src/init.cpp.o.d"
+  "CMakeFiles/knncolle_py.dir/src/kdtree.cpp.o"
+  "CMakeFiles/knncolle_py.dir/src/kdtree.cpp.o.d"
+  "CMakeFiles/knncolle_py.dir/src/kmknn.cpp.o"
+  "CMakeFiles/knncolle_py.dir/src/kmknn.cpp.o.d"
+  "CMakeFiles/knncolle_py.dir/src/many.cpp.o"
+  "CMakeFiles/knncolle_py.dir/src/many.cpp.o.d"
+  "CMakeFiles/knncolle_py.dir/src/mnn.cpp.o"
+  "CMakeFiles/knncolle_py.dir/src/mnn.cpp.o.d"
+  "CMakeFiles/knncolle_py.dir/src/nndescent.cpp.o"
+  "CMakeFiles/knncolle_py.dir/src/nndescent.cpp.o.d"
+  "CMakeFiles/knncolle_py.dir/src/permuted.cpp.o"
+  "CMakeFiles/knncolle_py.dir/src/permuted.cpp.o.d"
+  "CMakeFiles/knncolle_py.dir/src/thread_pool.cpp.o"
+  "CMakeFiles/knncolle_py.dir/src/thread_pool.cpp.o.d"
+  "CMakeFiles/knncolle_py.dir/src/vptree.cpp.o"
+  "CMakeFiles/knncolle_py.dir/src/vptree.cpp.o.d"
+)
+
+# Per-language clean rules from dependency scanning.
+foreach(lang CXX)
+  include(CMakeFiles/knncolle_py.dir/cmake_clean_${lang}.cmake OPTIONAL)
+endforeach()
@@ -1,31 +1,51 @@
 #include "knncolle_py.h"
+#include "cosine.hpp"
+#include "inner_product.hpp"
+#include "approximate_range.hpp"
 #include "pybind11/pybind11.h"
 
 #include <memory>
 #include <stdexcept>
 #include <cstdint>
 #include <string>
+#include <utility>
 
 #include "knncolle_annoy/knncolle_annoy.hpp"
 
-std::uintptr_t create_annoy_builder(int num_trees, double search_mult, std::string distance) {
+// Wrapping the Annoy builder to support approximate searches by distance,
+// and to refine the search results with exact distances if 'metric' is supplied.
+template<class Distance_>
+std::shared_ptr<knncolle_py::ApproximateRangeBuilder> make_annoy_builder(const knncolle_annoy::AnnoyOptions& opt, std::shared_ptr<const knncolle_py::Metric> metric) {
+    return std::make_shared<knncolle_py::ApproximateRangeBuilder>(
+        std::make_shared<knncolle_annoy::AnnoyBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance, Distance_> >(opt),
+        std::move(metric)
+    );
+}
+
+std::uintptr_t create_annoy_builder(int num_trees, double search_mult, std::string distance, bool keep_data) {
     knncolle_annoy::AnnoyOptions opt;
     opt.num_trees = num_trees;
     opt.search_mult = search_mult;
     auto tmp = std::make_unique<knncolle_py::WrappedBuilder>();
 
+    std::shared_ptr<const knncolle_py::Metric> euclidean, manhattan;
+    if (keep_data) {
+        euclidean = std::make_shared<knncolle::EuclideanDistance<knncolle_py::MatrixValue, knncolle_py::Distance> >();
+        manhattan = std::make_shared<knncolle::ManhattanDistance<knncolle_py::MatrixValue, knncolle_py::Distance> >();
+    }
+
     if (distance == "Manhattan") {
-        tmp->ptr.reset(new knncolle_annoy::AnnoyBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance, Annoy::Manhattan>(opt));
+        tmp->ptr = make_annoy_builder<Annoy::Manhattan>(opt, manhattan);
 
     } else if (distance == "Euclidean") {
-        tmp->ptr.reset(new knncolle_annoy::AnnoyBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance, Annoy::Euclidean>(opt));
+        tmp->ptr = make_annoy_builder<Annoy::Euclidean>(opt, euclidean);
 
     } else if (distance == "Cosine") {
-        tmp->ptr.reset(
-            new knncolle::L2NormalizedBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance, knncolle_py::MatrixValue>(
-                std::make_shared<knncolle_annoy::AnnoyBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance, Annoy::Euclidean> >(opt)
-            )
-        );
+        tmp->ptr.reset(new knncolle_py::CosineBuilder(make_annoy_builder<Annoy::Euclidean>(opt, euclidean)));
+
+    } else if (distance == "InnerProduct") {
+        // No copy of the data is needed for refinement, as the candidates are re-ranked by their exact inner products.
+        tmp->ptr.reset(new knncolle_py::InnerProductBuilder(make_annoy_builder<Annoy::Euclidean>(opt, NULL)));
 
     } else {
         throw std::runtime_error("unknown distance type '" + distance + "'");
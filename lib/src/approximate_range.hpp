@@ -0,0 +1,228 @@
+#ifndef KNNCOLLE_PY_APPROXIMATE_RANGE_HPP
+#define KNNCOLLE_PY_APPROXIMATE_RANGE_HPP
+
+#include "knncolle_py.h"
+
+#include "sanisizer/sanisizer.hpp"
+
+#include <algorithm>
+#include <cstddef>
+#include <memory>
+#include <utility>
+#include <vector>
+
+/*
+ * Approximate search by distance for algorithms that only support k-nearest
+ * neighbor searches, i.e., HNSW, Annoy and NN-descent. For each query, we
+ * search for an increasing number of neighbors until the furthest neighbor
+ * lies beyond the threshold, at which point all neighbors within the
+ * threshold have (most likely) been found. Doubling the number of neighbors
+ * in each round ensures that the total cost is at most twice that of the
+ * final search. The recall is determined by the accuracy of the underlying
+ * k-nearest neighbor search, and so is controlled by the usual search-effort
+ * parameters of the algorithm.
+ *
+ * If a copy of the data and an exact distance metric are supplied, k-nearest
+ * neighbor searches can also be refined by retrieving 'k * refine_factor'
+ * candidates and re-ranking them by their exact distances to the query. The
+ * refinement factor is set for the current thread by RefineScope rather than
+ * being passed to the searcher, as the searcher is usually nested inside other
+ * wrappers (e.g., for cosine distances) and may be cached across searches.
+ */
+
+namespace knncolle_py {
+
+inline thread_local Index refine_factor = 1;
+
+class RefineScope {
+public:
+    RefineScope(Index factor) {
+        refine_factor = std::max(factor, static_cast<Index>(1));
+    }
+
+    ~RefineScope() {
+        refine_factor = 1;
+    }
+
+    RefineScope(const RefineScope&) = delete;
+    RefineScope& operator=(const RefineScope&) = delete;
+};
+
+typedef knncolle::DistanceMetric<MatrixValue, Distance> Metric;
+
+class ApproximateRangeSearcher final : public knncolle::Searcher<Index, MatrixValue, Distance> {
+public:
+    ApproximateRangeSearcher(std::unique_ptr<knncolle::Searcher<Index, MatrixValue, Distance> > inner, Index num_obs, std::size_t num_dims, const MatrixValue* data, const Metric* metric) :
+        my_inner(std::move(inner)), my_obs(num_obs), my_dims(num_dims), my_data(data), my_metric(metric) {}
+
+private:
+    std::unique_ptr<knncolle::Searcher<Index, MatrixValue, Distance> > my_inner;
+    Index my_obs;
+    std::size_t my_dims;
+    const MatrixValue* my_data;
+    const Metric* my_metric;
+    std::vector<Index> my_indices;
+    std::vector<Distance> my_distances;
+    std::vector<std::pair<Distance, Index> > my_ranked;
+
+    static constexpr Index initial_k = 16;
+
+    template<class Search_>
+    Index expand(Search_ search, Index max_k, Distance threshold, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+        Index k = std::min(initial_k, max_k);
+        while (true) {
+            search(k);
+            if (k == max_k || my_distances.size() < k || my_distances.back() > threshold) {
+                break;
+            }
+            k = (max_k / 2 < k ? max_k : k * 2);
+        }
+
+        // Not assuming that the approximate search returns neighbors in order of increasing distance.
+        Index count = 0;
+        const auto num_found = my_distances.size();
+        for (std::size_t n = 0; n < num_found; ++n) {
+            if (my_distances[n] <= threshold) {
+                my_indices[count] = my_indices[n];
+                my_distances[count] = my_distances[n];
+                ++count;
+            }
+        }
+        my_indices.resize(count);
+        my_distances.resize(count);
+
+        if (output_indices) {
+            *output_indices = my_indices;
+        }
+        if (output_distances) {
+            *output_distances = my_distances;
+        }
+        return count;
+    }
+
+    bool refining() const {
+        return refine_factor > 1 && my_data != NULL;
+    }
+
+    template<class Search_>
+    void refine(Search_ search, const MatrixValue* query, Index k, Index max_k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+        const Index num_candidates = (max_k / refine_factor < k ? max_k : k * refine_factor);
+        search(num_candidates);
+
+        my_ranked.clear();
+        for (auto x : my_indices) {
+            const auto dist = my_metric->normalize(my_metric->raw(my_dims, query, my_data + static_cast<std::size_t>(x) * my_dims));
+            my_ranked.emplace_back(dist, x);
+        }
+        const auto num_kept = std::min(static_cast<std::size_t>(k), my_ranked.size());
+        std::partial_sort(my_ranked.begin(), my_ranked.begin() + num_kept, my_ranked.end());
+
+        if (output_indices) {
+            output_indices->clear();
+            for (std::size_t n = 0; n < num_kept; ++n) {
+                output_indices->push_back(my_ranked[n].second);
+            }
+        }
+        if (output_distances) {
+            output_distances->clear();
+            for (std::size_t n = 0; n < num_kept; ++n) {
+                output_distances->push_back(my_ranked[n].first);
+            }
+        }
+    }
+
+public:
+    void search(Index i, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+        if (refining()) {
+            const Index max_k = (my_obs > 0 ? my_obs - 1 : 0);
+            refine([&](Index candidates) -> void { my_inner->search(i, candidates, &my_indices, NULL); }, my_data + static_cast<std::size_t>(i) * my_dims, k, max_k, output_indices, output_distances);
+        } else {
+            my_inner->search(i, k, output_indices, output_distances);
+        }
+    }
+
+    void search(const MatrixValue* query, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+        if (refining()) {
+            refine([&](Index candidates) -> void { my_inner->search(query, candidates, &my_indices, NULL); }, query, k, my_obs, output_indices, output_distances);
+        } else {
+            my_inner->search(query, k, output_indices, output_distances);
+        }
+    }
+
+    bool can_search_all() const {
+        return true;
+    }
+
+    Index search_all(Index i, Distance threshold, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+        const Index max_k = (my_obs > 0 ? my_obs - 1 : 0);
+        return expand([&](Index k) -> void { my_inner->search(i, k, &my_indices, &my_distances); }, max_k, threshold, output_indices, output_distances);
+    }
+
+    Index search_all(const MatrixValue* query, Distance threshold, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+        return expand([&](Index k) -> void { my_inner->search(query, k, &my_indices, &my_distances); }, my_obs, threshold, output_indices, output_distances);
+    }
+};
+
+class ApproximateRangePrebuilt final : public knncolle::Prebuilt<Index, MatrixValue, Distance> {
+public:
+    ApproximateRangePrebuilt(std::unique_ptr<knncolle::Prebuilt<Index, MatrixValue, Distance> > inner, std::vector<MatrixValue> data, std::shared_ptr<const Metric> metric) :
+        my_inner(std::move(inner)), my_data(std::move(data)), my_metric(std::move(metric)) {}
+
+private:
+    std::unique_ptr<knncolle::Prebuilt<Index, MatrixValue, Distance> > my_inner;
+    std::vector<MatrixValue> my_data; // row-major copy of the data for refinement, empty if 'my_metric' is NULL.
+    std::shared_ptr<const Metric> my_metric;
+
+public:
+    Index num_observations() const {
+        return my_inner->num_observations();
+    }
+
+    std::size_t num_dimensions() const {
+        return my_inner->num_dimensions();
+    }
+
+    const knncolle::Prebuilt<Index, MatrixValue, Distance>& inner() const {
+        return *my_inner;
+    }
+
+    std::unique_ptr<knncolle::Searcher<Index, MatrixValue, Distance> > initialize() const {
+        return std::make_unique<ApproximateRangeSearcher>(
+            my_inner->initialize(),
+            my_inner->num_observations(),
+            my_inner->num_dimensions(),
+            (my_metric ? my_data.data() : NULL),
+            my_metric.get()
+        );
+    }
+};
+
+class ApproximateRangeBuilder final : public knncolle::Builder<Index, MatrixValue, Distance> {
+public:
+    ApproximateRangeBuilder(std::shared_ptr<const knncolle::Builder<Index, MatrixValue, Distance> > inner, std::shared_ptr<const Metric> metric = nullptr) :
+        my_inner(std::move(inner)), my_metric(std::move(metric)) {}
+
+private:
+    std::shared_ptr<const knncolle::Builder<Index, MatrixValue, Distance> > my_inner;
+    std::shared_ptr<const Metric> my_metric; // if supplied, a copy of the data is stored for refinement.
+
+public:
+    knncolle::Prebuilt<Index, MatrixValue, Distance>* build_raw(const Matrix& data) const {
+        std::vector<MatrixValue> copy;
+        if (my_metric) {
+            const auto nobs = data.num_observations();
+            const auto ndim = data.num_dimensions();
+            copy.resize(sanisizer::product<std::size_t>(nobs, ndim));
+            auto extractor = data.new_extractor();
+            for (Index o = 0; o < nobs; ++o) {
+                auto ptr = extractor->next();
+                std::copy_n(ptr, ndim, copy.data() + static_cast<std::size_t>(o) * ndim);
+            }
+        }
+        return new ApproximateRangePrebuilt(std::unique_ptr<knncolle::Prebuilt<Index, MatrixValue, Distance> >(my_inner->build_raw(data)), std::move(copy), my_metric);
+    }
+};
+
+}
+
+#endif
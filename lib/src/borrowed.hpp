@@ -0,0 +1,226 @@
+#ifndef KNNCOLLE_PY_BORROWED_HPP
+#define KNNCOLLE_PY_BORROWED_HPP
+
+#include "knncolle_py.h"
+
+#include "sanisizer/sanisizer.hpp"
+
+#include <cstddef>
+#include <limits>
+#include <memory>
+#include <stdexcept>
+#include <utility>
+#include <vector>
+
+/*
+ * Support for indices that reference the caller's data instead of storing
+ * their own copy, i.e., build_index() with 'copy=False'. This is currently
+ * only implemented for the exhaustive search, as the other algorithms store
+ * their data in a tree- or cluster-specific order. The exhaustive search is
+ * otherwise identical to that of knncolle::BruteforcePrebuilt.
+ */
+
+namespace knncolle_py {
+
+/*
+ * Interface for builders that can build an index from borrowed data. 'data'
+ * should contain 'nobs' observations with 'ndim' values each, in row-major
+ * layout with observations in rows, and should outlive the index.
+ */
+class Borrowable {
+public:
+    virtual ~Borrowable() = default;
+
+    virtual knncolle::Prebuilt<Index, MatrixValue, Distance>* build_borrowed(std::size_t ndim, Index nobs, const MatrixValue* data) const = 0;
+};
+
+/*
+ * Build from borrowed data with 'inner', which should be Borrowable.
+ */
+inline std::unique_ptr<knncolle::Prebuilt<Index, MatrixValue, Distance> > build_borrowed_inner(
+    const knncolle::Builder<Index, MatrixValue, Distance>& inner,
+    std::size_t ndim,
+    Index nobs,
+    const MatrixValue* data)
+{
+    auto borrower = dynamic_cast<const Borrowable*>(&inner);
+    if (borrower == NULL) {
+        throw std::runtime_error("algorithm does not support building an index without copying the data");
+    }
+    return std::unique_ptr<knncolle::Prebuilt<Index, MatrixValue, Distance> >(borrower->build_borrowed(ndim, nobs, data));
+}
+
+typedef knncolle::DistanceMetric<MatrixValue, Distance> BorrowedMetric;
+
+class BorrowedExhaustivePrebuilt;
+
+class BorrowedExhaustiveSearcher final : public knncolle::Searcher<Index, MatrixValue, Distance> {
+public:
+    BorrowedExhaustiveSearcher(const BorrowedExhaustivePrebuilt& parent) : my_parent(parent) {}
+
+private:
+    const BorrowedExhaustivePrebuilt& my_parent;
+    knncolle::NeighborQueue<Index, Distance> my_nearest;
+    std::vector<std::pair<Distance, Index> > my_all_neighbors;
+
+    void normalize(std::vector<Distance>* output_distances) const;
+
+public:
+    void search(Index i, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances);
+
+    void search(const MatrixValue* query, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances);
+
+    bool can_search_all() const {
+        return true;
+    }
+
+    Index search_all(Index i, Distance threshold, std::vector<Index>* output_indices, std::vector<Distance>* output_distances);
+
+    Index search_all(const MatrixValue* query, Distance threshold, std::vector<Index>* output_indices, std::vector<Distance>* output_distances);
+};
+
+class BorrowedExhaustivePrebuilt final : public knncolle::Prebuilt<Index, MatrixValue, Distance> {
+public:
+    BorrowedExhaustivePrebuilt(std::size_t num_dim, Index num_obs, const MatrixValue* data, std::shared_ptr<const BorrowedMetric> metric) :
+        my_dim(num_dim), my_obs(num_obs), my_data(data), my_metric(std::move(metric)) {}
+
+private:
+    std::size_t my_dim;
+    Index my_obs;
+    const MatrixValue* my_data;
+    std::shared_ptr<const BorrowedMetric> my_metric;
+
+    friend class BorrowedExhaustiveSearcher;
+
+public:
+    Index num_observations() const {
+        return my_obs;
+    }
+
+    std::size_t num_dimensions() const {
+        return my_dim;
+    }
+
+    std::unique_ptr<knncolle::Searcher<Index, MatrixValue, Distance> > initialize() const {
+        return std::make_unique<BorrowedExhaustiveSearcher>(*this);
+    }
+
+private:
+    const MatrixValue* observation(Index i) const {
+        return my_data + sanisizer::product_unsafe<std::size_t>(i, my_dim);
+    }
+
+    void search(const MatrixValue* query, knncolle::NeighborQueue<Index, Distance>& nearest) const {
+        Distance threshold_raw = std::numeric_limits<Distance>::infinity();
+        for (Index x = 0; x < my_obs; ++x) {
+            const auto dist_raw = my_metric->raw(my_dim, query, observation(x));
+            if (dist_raw <= threshold_raw) {
+                nearest.add(x, dist_raw);
+                if (nearest.is_full()) {
+                    threshold_raw = nearest.limit();
+                }
+            }
+        }
+    }
+
+    template<bool count_only_, typename Output_>
+    void search_all(const MatrixValue* query, Distance threshold, Output_& all_neighbors) const {
+        const Distance threshold_raw = my_metric->denormalize(threshold);
+        for (Index x = 0; x < my_obs; ++x) {
+            const auto dist_raw = my_metric->raw(my_dim, query, observation(x));
+            if (threshold_raw >= dist_raw) {
+                if constexpr(count_only_) {
+                    ++all_neighbors;
+                } else {
+                    all_neighbors.emplace_back(dist_raw, x);
+                }
+            }
+        }
+    }
+};
+
+inline void BorrowedExhaustiveSearcher::normalize(std::vector<Distance>* output_distances) const {
+    if (output_distances) {
+        for (auto& d : *output_distances) {
+            d = my_parent.my_metric->normalize(d);
+        }
+    }
+}
+
+inline void BorrowedExhaustiveSearcher::search(Index i, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+    my_nearest.reset(k + 1);
+    my_parent.search(my_parent.observation(i), my_nearest);
+    my_nearest.report(output_indices, output_distances, i);
+    normalize(output_distances);
+}
+
+inline void BorrowedExhaustiveSearcher::search(const MatrixValue* query, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+    if (k == 0) { // protect the NeighborQueue from k = 0.
+        if (output_indices) {
+            output_indices->clear();
+        }
+        if (output_distances) {
+            output_distances->clear();
+        }
+    } else {
+        my_nearest.reset(k);
+        my_parent.search(query, my_nearest);
+        my_nearest.report(output_indices, output_distances);
+        normalize(output_distances);
+    }
+}
+
+inline Index BorrowedExhaustiveSearcher::search_all(Index i, Distance threshold, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+    const auto query = my_parent.observation(i);
+    if (!output_indices && !output_distances) {
+        Index count = 0;
+        my_parent.search_all<true>(query, threshold, count);
+        return knncolle::count_all_neighbors_without_self(count);
+    }
+
+    my_all_neighbors.clear();
+    my_parent.search_all<false>(query, threshold, my_all_neighbors);
+    knncolle::report_all_neighbors(my_all_neighbors, output_indices, output_distances, i);
+    normalize(output_distances);
+    return knncolle::count_all_neighbors_without_self(static_cast<Index>(my_all_neighbors.size()));
+}
+
+inline Index BorrowedExhaustiveSearcher::search_all(const MatrixValue* query, Distance threshold, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+    if (!output_indices && !output_distances) {
+        Index count = 0;
+        my_parent.search_all<true>(query, threshold, count);
+        return count;
+    }
+
+    my_all_neighbors.clear();
+    my_parent.search_all<false>(query, threshold, my_all_neighbors);
+    knncolle::report_all_neighbors(my_all_neighbors, output_indices, output_distances);
+    normalize(output_distances);
+    return my_all_neighbors.size();
+}
+
+/*
+ * Builder for the exhaustive search. This uses knncolle::BruteforceBuilder
+ * when the index stores its own copy of the data.
+ */
+class ExhaustiveBuilder final : public knncolle::Builder<Index, MatrixValue, Distance>, public Borrowable {
+public:
+    ExhaustiveBuilder(std::shared_ptr<const BorrowedMetric> metric) : my_metric(metric), my_copying(std::move(metric)) {}
+
+private:
+    std::shared_ptr<const BorrowedMetric> my_metric;
+    knncolle::BruteforceBuilder<Index, MatrixValue, Distance> my_copying;
+
+public:
+    knncolle::Prebuilt<Index, MatrixValue, Distance>* build_raw(const Matrix& data) const {
+        return my_copying.build_raw(data);
+    }
+
+    knncolle::Prebuilt<Index, MatrixValue, Distance>* build_borrowed(std::size_t ndim, Index nobs, const MatrixValue* data) const {
+        return new BorrowedExhaustivePrebuilt(ndim, nobs, data, my_metric);
+    }
+};
+
+}
+
+#endif
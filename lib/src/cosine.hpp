@@ -0,0 +1,73 @@
+#ifndef KNNCOLLE_PY_COSINE_HPP
+#define KNNCOLLE_PY_COSINE_HPP
+
+#include "knncolle_py.h"
+#include "borrowed.hpp"
+
+#include <cstddef>
+#include <memory>
+
+namespace knncolle_py {
+
+/*
+ * Prebuilt index for the cosine distance, containing an inner Euclidean index
+ * of the L2-normalized observations. Unlike knncolle::L2NormalizedPrebuilt,
+ * the inner index is exposed so that it can be unwrapped for dual-tree
+ * searches. Each query is normalized in the searcher's own buffer.
+ */
+class CosinePrebuilt final : public knncolle::Prebuilt<Index, MatrixValue, Distance> {
+public:
+    CosinePrebuilt(std::shared_ptr<knncolle::Prebuilt<Index, MatrixValue, Distance> > inner) : my_inner(std::move(inner)) {}
+
+private:
+    std::shared_ptr<knncolle::Prebuilt<Index, MatrixValue, Distance> > my_inner;
+
+public:
+    Index num_observations() const {
+        return my_inner->num_observations();
+    }
+
+    std::size_t num_dimensions() const {
+        return my_inner->num_dimensions();
+    }
+
+    std::unique_ptr<knncolle::Searcher<Index, MatrixValue, Distance> > initialize() const {
+        return std::make_unique<knncolle::L2NormalizedSearcher<Index, MatrixValue, Distance, MatrixValue> >(my_inner->initialize(), my_inner->num_dimensions());
+    }
+
+    const std::shared_ptr<knncolle::Prebuilt<Index, MatrixValue, Distance> >& inner() const {
+        return my_inner;
+    }
+};
+
+class CosineBuilder final : public knncolle::Builder<Index, MatrixValue, Distance>, public Borrowable {
+public:
+    CosineBuilder(std::shared_ptr<const knncolle::Builder<Index, MatrixValue, Distance> > inner) : my_inner(std::move(inner)) {}
+
+private:
+    std::shared_ptr<const knncolle::Builder<Index, MatrixValue, Distance> > my_inner;
+
+public:
+    knncolle::Prebuilt<Index, MatrixValue, Distance>* build_raw(const Matrix& data) const {
+        knncolle::L2NormalizedMatrix<Index, MatrixValue, MatrixValue> normalized(data);
+        return new CosinePrebuilt(my_inner->build_shared(normalized));
+    }
+
+    /*
+     * Build the index from observations that are already L2-normalized.
+     */
+    knncolle::Prebuilt<Index, MatrixValue, Distance>* build_prenormalized(const Matrix& data) const {
+        return new CosinePrebuilt(my_inner->build_shared(data));
+    }
+
+    /*
+     * Build the index from borrowed observations that are already L2-normalized.
+     */
+    knncolle::Prebuilt<Index, MatrixValue, Distance>* build_borrowed(std::size_t ndim, Index nobs, const MatrixValue* data) const {
+        return new CosinePrebuilt(build_borrowed_inner(*my_inner, ndim, nobs, data));
+    }
+};
+
+}
+
+#endif
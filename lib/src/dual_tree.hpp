@@ -0,0 +1,44 @@
+#ifndef KNNCOLLE_PY_DUAL_TREE_HPP
+#define KNNCOLLE_PY_DUAL_TREE_HPP
+
+#include "knncolle_py.h"
+
+#include <cstdint>
+#include <functional>
+#include <optional>
+#include <vector>
+
+namespace knncolle_py {
+
+/*
+ * Interface for tree indices that can find the neighbors of all of their own
+ * observations in a single traversal, rather than searching for each
+ * observation separately. 'requested' is an array of length equal to the
+ * number of observations, where non-zero entries specify the observations for
+ * which neighbors should be found; if NULL, all observations are requested.
+ * 'report(i, indices, distances)' is called exactly once for each requested
+ * observation 'i', with its neighbors (excluding itself) sorted by increasing
+ * distance. This may be called from multiple threads, but never concurrently
+ * for the same 'i'.
+ */
+class DualTreeSearchable {
+public:
+    virtual ~DualTreeSearchable() = default;
+
+    typedef std::function<void(Index, const std::vector<Index>&, const std::vector<Distance>&)> Report;
+
+    /*
+     * Report the 'k' nearest neighbors of each requested observation.
+     * 'k' is guaranteed to be positive and less than the number of observations.
+     */
+    virtual void dual_tree_knn(Index k, const unsigned char* requested, int num_threads, const std::optional<std::uintptr_t>& pool, const Report& report) const = 0;
+
+    /*
+     * Report all neighbors within distance 'threshold' of each requested observation.
+     */
+    virtual void dual_tree_all(Distance threshold, const unsigned char* requested, int num_threads, const std::optional<std::uintptr_t>& pool, const Report& report) const = 0;
+};
+
+}
+
+#endif
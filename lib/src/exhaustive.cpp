@@ -1,4 +1,9 @@
 #include "knncolle_py.h"
+#include "cosine.hpp"
+#include "inner_product.hpp"
+#include "hamming.hpp"
+#include "squared.hpp"
+#include "borrowed.hpp"
 #include "pybind11/pybind11.h"
 
 #include <memory>
@@ -11,22 +16,42 @@ std::uintptr_t create_exhaustive_builder(std::string distance) {
 
     if (distance == "Manhattan") {
         tmp->ptr.reset(
-            new knncolle::BruteforceBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance>(
+            new knncolle_py::ExhaustiveBuilder(
                 std::make_shared<knncolle::ManhattanDistance<knncolle_py::MatrixValue, knncolle_py::Distance> >()
             )
         );
 
     } else if (distance == "Euclidean") {
         tmp->ptr.reset(
-            new knncolle::BruteforceBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance>(
-                std::make_shared<knncolle::EuclideanDistance<knncolle_py::MatrixValue, knncolle_py::Distance> >()
+            new knncolle_py::SquarableBuilder(
+                std::make_shared<knncolle_py::ExhaustiveBuilder>(
+                    std::make_shared<knncolle_py::SquarableEuclideanDistance>()
+                )
+            )
+        );
+
+    } else if (distance == "Hamming") {
+        tmp->ptr.reset(
+            new knncolle_py::ExhaustiveBuilder(
+                std::make_shared<knncolle_py::HammingDistance>()
             )
         );
 
     } else if (distance == "Cosine") {
         tmp->ptr.reset(
-            new knncolle::L2NormalizedBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance, knncolle_py::MatrixValue>(
-                std::make_shared<knncolle::BruteforceBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance> >(
+            new knncolle_py::CosineBuilder(
+                std::make_shared<knncolle_py::SquarableBuilder>(
+                    std::make_shared<knncolle_py::ExhaustiveBuilder>(
+                        std::make_shared<knncolle_py::SquarableEuclideanDistance>()
+                    )
+                )
+            )
+        );
+
+    } else if (distance == "InnerProduct") {
+        tmp->ptr.reset(
+            new knncolle_py::InnerProductBuilder(
+                std::make_shared<knncolle_py::ExhaustiveBuilder>(
                     std::make_shared<knncolle::EuclideanDistance<knncolle_py::MatrixValue, knncolle_py::Distance> >()
                 )
             )
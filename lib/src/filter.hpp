@@ -0,0 +1,116 @@
+#ifndef KNNCOLLE_PY_FILTER_HPP
+#define KNNCOLLE_PY_FILTER_HPP
+
+#include "knncolle_py.h"
+
+#include <algorithm>
+#include <cstddef>
+#include <cstdint>
+#include <vector>
+
+namespace knncolle_py {
+
+/*
+ * Filter on the neighbors that can be reported for each query. This consists
+ * of an optional mask that is shared across all queries, and optional lists
+ * of allowed or excluded observations for each query. Each list should be
+ * sorted and is defined by the usual compressed sparse offsets.
+ */
+struct NeighborFilter {
+    const unsigned char* shared_mask = NULL;
+    Index num_shared = 0; // number of non-zero entries in 'shared_mask'.
+
+    const std::uint64_t* allowed_offsets = NULL;
+    const Index* allowed_ids = NULL;
+
+    const std::uint64_t* excluded_offsets = NULL;
+    const Index* excluded_ids = NULL;
+
+    bool active() const {
+        return shared_mask != NULL || allowed_offsets != NULL || excluded_offsets != NULL;
+    }
+
+    bool keep(Index query, Index x) const {
+        if (shared_mask != NULL && !shared_mask[x]) {
+            return false;
+        }
+        if (allowed_offsets != NULL && !std::binary_search(allowed_ids + allowed_offsets[query], allowed_ids + allowed_offsets[query + 1], x)) {
+            return false;
+        }
+        if (excluded_offsets != NULL && std::binary_search(excluded_ids + excluded_offsets[query], excluded_ids + excluded_offsets[query + 1], x)) {
+            return false;
+        }
+        return true;
+    }
+
+    // Upper bound on the number of observations that can pass the filter for 'query'.
+    Index max_valid(Index query, Index num_obs) const {
+        Index output = num_obs;
+        if (shared_mask != NULL) {
+            output = std::min(output, num_shared);
+        }
+        if (allowed_offsets != NULL) {
+            output = std::min(output, static_cast<Index>(allowed_offsets[query + 1] - allowed_offsets[query]));
+        }
+        return output;
+    }
+};
+
+/*
+ * Find the 'k' nearest neighbors that pass the filter, by searching for an
+ * increasing number of unfiltered neighbors until enough of them pass. The
+ * initial number is scaled by the expected fraction of observations that pass
+ * the filter, to avoid multiple rounds for restrictive filters. Neighbors are
+ * stored in 'indices' and 'distances', which may be shorter than 'k' if not
+ * enough neighbors pass the filter.
+ */
+template<class Search_, class Keep_>
+void filtered_search(
+    Search_ search,
+    Keep_ keep,
+    const Index k,
+    const Index max_k,
+    const Index max_valid,
+    std::vector<Index>& indices,
+    std::vector<Distance>& distances)
+{
+    const Index target = std::min(k, max_valid);
+    if (target == 0) {
+        indices.clear();
+        distances.clear();
+        return;
+    }
+
+    Index current = max_k;
+    if (max_valid > 0) {
+        const double scaled = static_cast<double>(target) * static_cast<double>(max_k) / static_cast<double>(max_valid);
+        if (scaled < static_cast<double>(max_k)) {
+            current = std::max(target, static_cast<Index>(scaled));
+        }
+    }
+
+    while (true) {
+        search(current);
+
+        Index count = 0;
+        const Index num_found = indices.size();
+        for (Index n = 0; n < num_found && count < target; ++n) {
+            if (keep(indices[n])) {
+                indices[count] = indices[n];
+                distances[count] = distances[n];
+                ++count;
+            }
+        }
+
+        if (count == target || current == max_k || num_found < current) {
+            indices.resize(count);
+            distances.resize(count);
+            return;
+        }
+        current = (max_k / 2 < current ? max_k : current * 2);
+    }
+}
+
+}
+
+#endif
@@ -1,4 +1,13 @@
 #include "knncolle_py.h"
+#include "parallel.hpp"
+#include "locality.hpp"
+#include "cosine.hpp"
+#include "squared.hpp"
+#include "borrowed.hpp"
+#include "filter.hpp"
+#include "approximate_range.hpp"
+#include "permuted.hpp"
+#include "dual_tree.hpp"
 
 #include "pybind11/pybind11.h"
 #include "pybind11/numpy.h"
@@ -7,10 +16,15 @@
 #include "sanisizer/sanisizer.hpp"
 
 #include <algorithm>
+#include <atomic>
+#include <cmath>
 #include <cstdint>
+#include <limits>
 #include <optional>
 #include <memory>
+#include <numeric>
 #include <stdexcept>
+#include <type_traits>
 #include <vector>
 
 typedef pybind11::array_t<knncolle_py::MatrixValue, pybind11::array::c_style | pybind11::array::forcecast> DataMatrix;
@@ -19,21 +33,64 @@ void free_builder(std::uintptr_t builder_ptr) {
     delete knncolle_py::cast_builder(builder_ptr);
 }
 
-std::uintptr_t generic_build(std::uintptr_t builder_ptr, const DataMatrix& data) {
+std::uintptr_t generic_build(std::uintptr_t builder_ptr, const DataMatrix& data, const bool prenormalized, const bool copy) {
     auto buffer = data.request();
 
     // All input NumPy matrices are row-major layouts with observations in rows,
     // which is trivially transposed to give us the expected column-major layout with observations in columns.
     const auto nobs = sanisizer::cast<knncolle_py::Index>(buffer.shape[0]);
     const auto ndim = sanisizer::cast<knncolle_py::Index>(buffer.shape[1]);
+    const auto data_ptr = static_cast<const knncolle_py::MatrixValue*>(buffer.ptr);
 
     auto builder = knncolle_py::cast_builder(builder_ptr);
+    const knncolle_py::CosineBuilder* cosine = NULL;
+    if (prenormalized) {
+        cosine = dynamic_cast<const knncolle_py::CosineBuilder*>(builder->ptr.get());
+        if (cosine == NULL) {
+            throw std::runtime_error("'prenormalized' is only supported for the cosine distance");
+        }
+    }
+
+    // The index references 'data' directly if 'copy = false', so the caller is responsible for keeping it alive.
+    const knncolle_py::Borrowable* borrower = NULL;
+    if (!copy) {
+        if (!prenormalized && dynamic_cast<const knncolle_py::CosineBuilder*>(builder->ptr.get()) != NULL) {
+            throw std::runtime_error("'copy=False' requires 'prenormalized=True' for the cosine distance");
+        }
+        borrower = dynamic_cast<const knncolle_py::Borrowable*>(builder->ptr.get());
+        if (borrower == NULL) {
+            throw std::runtime_error("algorithm does not support building an index without copying the data");
+        }
+    }
+
     auto tmp = std::make_unique<knncolle_py::WrappedPrebuilt>();
-    tmp->ptr.reset(builder->ptr->build_raw(knncolle::SimpleMatrix(ndim, nobs, static_cast<const knncolle_py::MatrixValue*>(buffer.ptr))));
+    {
+        pybind11::gil_scoped_release release;
+        if (!copy) {
+            tmp->ptr.reset(borrower->build_borrowed(ndim, nobs, data_ptr));
+        } else if (prenormalized) {
+            tmp->ptr.reset(cosine->build_prenormalized(knncolle::SimpleMatrix(ndim, nobs, data_ptr)));
+        } else {
+            tmp->ptr.reset(builder->ptr->build_raw(knncolle::SimpleMatrix(ndim, nobs, data_ptr)));
+        }
+    }
 
     return reinterpret_cast<std::uintptr_t>(static_cast<void*>(tmp.release()));
 }
 
+pybind11::array_t<knncolle_py::Index> generic_locality_order(const DataMatrix& data) {
+    auto buffer = data.request();
+    const auto nobs = sanisizer::cast<knncolle_py::Index>(buffer.shape[0]);
+    const auto ndim = sanisizer::cast<knncolle_py::Index>(buffer.shape[1]);
+
+    std::vector<knncolle_py::Index> order;
+    {
+        pybind11::gil_scoped_release release;
+        order = knncolle_py::locality_order(static_cast<const knncolle_py::MatrixValue*>(buffer.ptr), nobs, ndim);
+    }
+    return pybind11::array_t<knncolle_py::Index>(order.size(), order.data());
+}
+
 void free_prebuilt(std::uintptr_t prebuilt_ptr) {
     delete knncolle_py::cast_prebuilt(prebuilt_ptr);
 }
@@ -73,26 +130,220 @@ pybind11::list format_range_output(const std::vector<std::vector<Value_> >& resu
     const auto num = results.size();
     auto output = sanisizer::create<pybind11::list>(num);
     for (I<decltype(num)> r = 0; r < num; ++r) {
-        output[r] = pybind11::array_t<Value_>(results[r].size(), results[r].data());
+        const auto& current = results[r];
+        output[r] = pybind11::array_t<Value_>(current.size(), current.data());
     }
     return output;
 }
 
+// Distances are narrowed when the requested output type is not the same as the searcher's distance type.
+template<typename Output_>
+void store_variable(std::vector<Output_>& output, std::vector<knncolle_py::Distance>& distances) {
+    output.assign(distances.begin(), distances.end());
+}
+
+inline void store_variable(std::vector<knncolle_py::Distance>& output, std::vector<knncolle_py::Distance>& distances) {
+    output.swap(distances);
+}
+
 typedef pybind11::array_t<knncolle_py::Index, pybind11::array::f_style | pybind11::array::forcecast> NeighborVector;
 
 typedef pybind11::array_t<knncolle_py::Index, pybind11::array::f_style | pybind11::array::forcecast> ChosenVector;
 
-pybind11::object generic_find_knn(
+std::vector<knncolle_py::Index> locality_task_order(const ChosenVector& locality, const knncolle_py::Index nobs, const knncolle_py::Index* subset_ptr, const knncolle_py::Index num_output) {
+    if (!sanisizer::is_equal(locality.size(), nobs)) {
+        throw std::runtime_error("length of 'locality' should be equal to the number of observations");
+    }
+    const auto locality_ptr = static_cast<const knncolle_py::Index*>(locality.request().ptr);
+    for (knncolle_py::Index i = 0; i < nobs; ++i) {
+        if (locality_ptr[i] >= nobs) {
+            throw std::runtime_error("'locality' contains out-of-range indices");
+        }
+    }
+
+    if (subset_ptr == NULL) {
+        return std::vector<knncolle_py::Index>(locality_ptr, locality_ptr + nobs);
+    } else {
+        return knncolle_py::subset_locality_order(locality_ptr, nobs, subset_ptr, num_output);
+    }
+}
+
+void square_distances(std::vector<knncolle_py::Distance>& distances) {
+    for (auto& d : distances) {
+        d *= d;
+    }
+}
+
+knncolle_py::Distance convert_threshold(knncolle_py::Distance threshold, bool squared) {
+    if (!squared) {
+        return threshold;
+    }
+    return (threshold > 0 ? std::sqrt(threshold) : threshold); // negative thresholds should still yield no neighbors.
+}
+
+typedef pybind11::array_t<unsigned char, pybind11::array::c_style | pybind11::array::forcecast> MaskVector;
+
+typedef pybind11::array_t<std::uint64_t, pybind11::array::c_style | pybind11::array::forcecast> OffsetVector;
+
+knncolle_py::NeighborFilter prepare_filter(
+    const std::optional<MaskVector>& shared_mask,
+    const std::optional<OffsetVector>& allowed_offsets,
+    const std::optional<ChosenVector>& allowed_ids,
+    const std::optional<OffsetVector>& excluded_offsets,
+    const std::optional<ChosenVector>& excluded_ids,
+    const knncolle_py::Index nobs,
+    const knncolle_py::Index num_queries)
+{
+    knncolle_py::NeighborFilter filter;
+
+    if (shared_mask.has_value()) {
+        if (!sanisizer::is_equal(shared_mask->size(), nobs)) {
+            throw std::runtime_error("length of the filter mask should be equal to the number of observations");
+        }
+        filter.shared_mask = static_cast<const unsigned char*>(shared_mask->request().ptr);
+        filter.num_shared = std::count_if(filter.shared_mask, filter.shared_mask + nobs, [](unsigned char x) -> bool { return x != 0; });
+    }
+
+    auto check_lists = [&](const std::optional<OffsetVector>& offsets, const std::optional<ChosenVector>& ids, const std::uint64_t*& out_offsets, const knncolle_py::Index*& out_ids) -> void {
+        if (!offsets.has_value() || !ids.has_value()) {
+            return;
+        }
+        if (!sanisizer::is_equal(offsets->size(), sanisizer::sum<std::size_t>(num_queries, 1))) {
+            throw std::runtime_error("number of filter lists should be equal to the number of observations or queries");
+        }
+        out_offsets = static_cast<const std::uint64_t*>(offsets->request().ptr);
+        out_ids = static_cast<const knncolle_py::Index*>(ids->request().ptr);
+        if (out_offsets[num_queries] != static_cast<std::uint64_t>(ids->size())) {
+            throw std::runtime_error("filter offsets are not consistent with the number of filter indices");
+        }
+        for (knncolle_py::Index q = 0; q < num_queries; ++q) {
+            if (out_offsets[q] > out_offsets[q + 1]) {
+                throw std::runtime_error("filter offsets should be non-decreasing");
+            }
+        }
+    };
+    check_lists(allowed_offsets, allowed_ids, filter.allowed_offsets, filter.allowed_ids);
+    check_lists(excluded_offsets, excluded_ids, filter.excluded_offsets, filter.excluded_ids);
+
+    return filter;
+}
+
+/*
+ * Whether the index underlying 'prebuilt' can report squared distances
+ * directly via SquaredScope. Otherwise, distances are squared after the search
+ * and thresholds are converted to the usual distances beforehand.
+ */
+bool is_squarable(const knncolle_py::Prebuilt& prebuilt) {
+    const knncolle_py::Prebuilt* current = &prebuilt;
+    if (auto permuted = dynamic_cast<const knncolle_py::PermutedPrebuilt*>(current)) {
+        current = &(permuted->inner());
+    }
+    if (auto cosine = dynamic_cast<const knncolle_py::CosinePrebuilt*>(current)) {
+        current = cosine->inner().get();
+    }
+    return dynamic_cast<const knncolle_py::SquarablePrebuilt*>(current) != NULL;
+}
+
+/*
+ * Run a dual-tree search on the tree underlying 'prebuilt' for the
+ * observations in 'subset_ptr' (or all observations, if NULL). 'run(tree,
+ * requested, report)' should call the search on the tree with the supplied
+ * mask of requested observations. 'store(o, indices, distances)' is then
+ * called for each output row 'o' with the sorted neighbors of its observation,
+ * possibly from multiple threads. Reordered and cosine indices are unwrapped
+ * to their inner tree, and the neighbor indices are mapped back to the
+ * original order.
+ */
+template<class Run_, class Store_>
+void dual_tree_search(const knncolle_py::Prebuilt& prebuilt, const knncolle_py::Index* subset_ptr, const knncolle_py::Index num_output, Run_ run, Store_ store) {
+    const knncolle_py::Prebuilt* current = &prebuilt;
+    const std::vector<knncolle_py::Index>* old_ids = NULL;
+    if (auto permuted = dynamic_cast<const knncolle_py::PermutedPrebuilt*>(current)) {
+        old_ids = &(permuted->old_ids());
+        current = &(permuted->inner());
+    }
+    if (auto cosine = dynamic_cast<const knncolle_py::CosinePrebuilt*>(current)) {
+        current = cosine->inner().get();
+    }
+
+    auto tree = dynamic_cast<const knncolle_py::DualTreeSearchable*>(current);
+    if (tree == NULL) {
+        throw std::runtime_error("algorithm does not support dual-tree searches");
+    }
+
+    // Mapping each observation to its output rows, as 'subset' may contain duplicates.
+    const auto nobs = prebuilt.num_observations();
+    std::vector<unsigned char> requested;
+    std::vector<std::size_t> row_offsets;
+    std::vector<knncolle_py::Index> rows;
+    if (subset_ptr != NULL) {
+        sanisizer::resize(row_offsets, sanisizer::sum<std::size_t>(nobs, 1));
+        for (knncolle_py::Index o = 0; o < num_output; ++o) {
+            ++row_offsets[subset_ptr[o] + 1];
+        }
+        std::partial_sum(row_offsets.begin(), row_offsets.end(), row_offsets.begin());
+
+        sanisizer::resize(rows, num_output);
+        std::vector<std::size_t> fill(row_offsets.begin(), row_offsets.end() - 1);
+        for (knncolle_py::Index o = 0; o < num_output; ++o) {
+            rows[fill[subset_ptr[o]]++] = o;
+        }
+
+        sanisizer::resize(requested, nobs);
+        for (knncolle_py::Index i = 0; i < nobs; ++i) {
+            const auto original = (old_ids != NULL ? (*old_ids)[i] : i);
+            requested[i] = (row_offsets[original] < row_offsets[original + 1]);
+        }
+    }
+
+    run(*tree, (subset_ptr != NULL ? requested.data() : NULL), [&](knncolle_py::Index i, const std::vector<knncolle_py::Index>& indices, const std::vector<knncolle_py::Distance>& distances) -> void {
+        const std::vector<knncolle_py::Index>* final_indices = &indices;
+        std::vector<knncolle_py::Index> remapped;
+        if (old_ids != NULL) {
+            const auto& remap = *old_ids;
+            i = remap[i];
+            remapped.reserve(indices.size());
+            for (auto x : indices) {
+                remapped.push_back(remap[x]);
+            }
+            final_indices = &remapped;
+        }
+
+        if (subset_ptr == NULL) {
+            store(i, *final_indices, distances);
+        } else {
+            for (auto r = row_offsets[i], end = row_offsets[i + 1]; r < end; ++r) {
+                store(rows[r], *final_indices, distances);
+            }
+        }
+    });
+}
+
+template<typename Output_>
+pybind11::object find_knn_internal(
     std::uintptr_t prebuilt_ptr,
     const NeighborVector& num_neighbors,
     const bool force_variable_neighbors,
     std::optional<ChosenVector> chosen,
     const int num_threads,
+    const std::optional<std::uintptr_t> pool,
+    const knncolle_py::Index chunk_size,
+    const std::optional<ChosenVector>& locality,
+    const std::optional<MaskVector>& shared_mask,
+    const std::optional<OffsetVector>& allowed_offsets,
+    const std::optional<ChosenVector>& allowed_ids,
+    const std::optional<OffsetVector>& excluded_offsets,
+    const std::optional<ChosenVector>& excluded_ids,
+    const knncolle_py::Index refine_factor,
+    const bool squared,
+    const bool dual_tree,
     const bool last_distance_only,
     bool report_index,
     bool report_distance
 ) {
     const auto& prebuilt = knncolle_py::cast_prebuilt(prebuilt_ptr)->ptr;
+    const bool squared_by_metric = squared && is_squarable(*prebuilt);
+    const bool square_after = squared && !squared_by_metric;
     const auto nobs = prebuilt->num_observations();
 
     // Checking if we have to handle subsets.
@@ -144,16 +395,16 @@ pybind11::object generic_find_knn(
 
     // Formatting all the possible output containers.
     OutputMatrix<knncolle_py::Index> const_i;
-    OutputMatrix<knncolle_py::MatrixValue> const_d;
-    pybind11::array_t<knncolle_py::MatrixValue> last_d;
+    OutputMatrix<Output_> const_d;
+    pybind11::array_t<Output_> last_d;
     knncolle_py::Index* out_i_ptr = NULL; 
-    knncolle_py::MatrixValue* out_d_ptr = NULL; 
+    Output_* out_d_ptr = NULL; 
     std::vector<std::vector<knncolle_py::Index> > var_i;
-    std::vector<std::vector<knncolle_py::MatrixValue> > var_d;
+    std::vector<std::vector<Output_> > var_d;
 
     if (last_distance_only) {
-        last_d = pybind11::array_t<knncolle_py::MatrixValue>(num_output);
-        out_d_ptr = static_cast<knncolle_py::MatrixValue*>(last_d.request().ptr);
+        last_d = pybind11::array_t<Output_>(num_output);
+        out_d_ptr = static_cast<Output_*>(last_d.request().ptr);
         report_index = false;
         report_distance = true;
 
@@ -170,40 +421,130 @@ pybind11::object generic_find_knn(
         out_d_ptr = prepare_output(const_d, report_distance, const_k, num_output);
     }
 
-    knncolle::parallelize(num_threads, num_output, [&](int, knncolle_py::Index start, knncolle_py::Index length) {
-        auto searcher = prebuilt->initialize();
-        std::vector<knncolle_py::Index> tmp_i;
-        std::vector<knncolle_py::MatrixValue> tmp_d;
+    const auto filter = prepare_filter(shared_mask, allowed_offsets, allowed_ids, excluded_offsets, excluded_ids, nobs, num_output);
+    const knncolle_py::Index max_k = (nobs > 0 ? nobs - 1 : 0);
+    std::atomic<bool> insufficient(false);
 
-        for (knncolle_py::Index o = start, end = start + length; o < end; ++o) {
-            searcher->search(
-                (subset_ptr != NULL ? subset_ptr[o] : o),
-                (is_k_variable ? variable_k[o] : const_k),
-                (report_index ? &tmp_i : NULL),
-                (report_distance ? &tmp_d : NULL)
-            );
+    if (dual_tree) {
+        // Finding the neighbors of all requested observations in a single pass,
+        // which are written directly into the output buffers.
+        if (filter.active()) {
+            throw std::runtime_error("dual-tree searches do not support filtering of neighbors");
+        }
+        const auto dual_k = (is_k_variable ? (variable_k.empty() ? 0 : *std::max_element(variable_k.begin(), variable_k.end())) : const_k);
+        if (last_distance_only) {
+            std::fill_n(out_d_ptr, num_output, 0);
+        }
 
-            if (report_index) {
-                if (is_k_variable) {
-                    var_i[o].swap(tmp_i);
-                } else {
-                    auto out_offset = sanisizer::product_unsafe<std::size_t>(o, const_k);
-                    std::copy_n(tmp_i.begin(), const_k, out_i_ptr + out_offset); 
+        pybind11::gil_scoped_release release;
+        dual_tree_search(
+            *prebuilt,
+            subset_ptr,
+            num_output,
+            [&](const knncolle_py::DualTreeSearchable& tree, const unsigned char* requested, const knncolle_py::DualTreeSearchable::Report& report) -> void {
+                if (dual_k > 0) {
+                    tree.dual_tree_knn(dual_k, requested, num_threads, pool, report);
+                }
+            },
+            [&](knncolle_py::Index o, const std::vector<knncolle_py::Index>& indices, const std::vector<knncolle_py::Distance>& distances) -> void {
+                const knncolle_py::Index num_found = indices.size();
+                const auto k = std::min(is_k_variable ? variable_k[o] : const_k, num_found);
+                auto convert = [&](knncolle_py::Distance d) -> Output_ { return (square_after ? d * d : d); };
+
+                if (report_index) {
+                    if (is_k_variable) {
+                        var_i[o].assign(indices.begin(), indices.begin() + k);
+                    } else {
+                        std::copy_n(indices.begin(), k, out_i_ptr + sanisizer::product_unsafe<std::size_t>(o, const_k));
+                    }
+                }
+
+                if (report_distance) {
+                    if (last_distance_only) {
+                        out_d_ptr[o] = (k == 0 ? 0 : convert(distances[k - 1]));
+                    } else if (is_k_variable) {
+                        var_d[o].resize(k);
+                        std::transform(distances.begin(), distances.begin() + k, var_d[o].begin(), convert);
+                    } else {
+                        std::transform(distances.begin(), distances.begin() + k, out_d_ptr + sanisizer::product_unsafe<std::size_t>(o, const_k), convert);
+                    }
                 }
             }
+        );
 
-            if (report_distance) {
-                if (last_distance_only) {
-                    out_d_ptr[o] = (tmp_d.empty() ? 0 : tmp_d.back());
-                } else if (is_k_variable) {
-                    var_d[o].swap(tmp_d);
+    } else {
+        // Processing observations in order of spatial locality, if requested.
+        std::vector<knncolle_py::Index> task_order;
+        const knncolle_py::Index* order_ptr = NULL;
+        if (locality.has_value()) {
+            task_order = locality_task_order(*locality, nobs, subset_ptr, num_output);
+            order_ptr = task_order.data();
+        }
+
+        // Releasing the GIL so that other Python threads can run during the search.
+        pybind11::gil_scoped_release release;
+        knncolle_py::parallel_search(prebuilt, num_threads, pool, num_output, chunk_size, [&](knncolle_py::Searcher& searcher, knncolle_py::Index start, knncolle_py::Index length) -> void {
+            knncolle_py::SquaredScope squared_scope(squared_by_metric);
+            knncolle_py::RefineScope refine_scope(refine_factor);
+            std::vector<knncolle_py::Index> tmp_i;
+            std::vector<knncolle_py::MatrixValue> tmp_d;
+
+            for (knncolle_py::Index p = start, end = start + length; p < end; ++p) {
+                const auto o = (order_ptr != NULL ? order_ptr[p] : p);
+                const auto current = (subset_ptr != NULL ? subset_ptr[o] : o);
+                const auto k = (is_k_variable ? variable_k[o] : const_k);
+                if (filter.active()) {
+                    knncolle_py::filtered_search(
+                        [&](knncolle_py::Index candidates) -> void { searcher.search(current, candidates, &tmp_i, &tmp_d); },
+                        [&](knncolle_py::Index x) -> bool { return filter.keep(o, x); },
+                        k,
+                        max_k,
+                        filter.max_valid(o, nobs),
+                        tmp_i,
+                        tmp_d
+                    );
+                    if (!is_k_variable && tmp_i.size() < k) {
+                        insufficient = true;
+                        continue;
+                    }
                 } else {
-                    auto out_offset = sanisizer::product_unsafe<std::size_t>(o, const_k);
-                    std::copy_n(tmp_d.begin(), const_k, out_d_ptr + out_offset); 
+                    searcher.search(
+                        current,
+                        k,
+                        (report_index ? &tmp_i : NULL),
+                        (report_distance ? &tmp_d : NULL)
+                    );
+                }
+
+                if (report_index) {
+                    if (is_k_variable) {
+                        var_i[o].swap(tmp_i);
+                    } else {
+                        auto out_offset = sanisizer::product_unsafe<std::size_t>(o, const_k);
+                        std::copy_n(tmp_i.begin(), const_k, out_i_ptr + out_offset); 
+                    }
+                }
+
+                if (report_distance) {
+                    if (square_after) {
+                        square_distances(tmp_d);
+                    }
+                    if (last_distance_only) {
+                        out_d_ptr[o] = (tmp_d.empty() ? 0 : tmp_d.back());
+                    } else if (is_k_variable) {
+                        store_variable(var_d[o], tmp_d);
+                    } else {
+                        auto out_offset = sanisizer::product_unsafe<std::size_t>(o, const_k);
+                        std::copy_n(tmp_d.begin(), const_k, out_d_ptr + out_offset); 
+                    }
                 }
             }
-        }
-    });
+        });
+    }
+
+    if (insufficient) {
+        throw std::runtime_error("not enough neighbors remaining after filtering, use a sequence for 'num_neighbors' to report fewer neighbors");
+    }
 
     if (last_distance_only) {
         return last_d;
@@ -238,17 +579,30 @@ pybind11::object generic_find_knn(
     }
 } 
 
-pybind11::object generic_query_knn(
+template<typename Output_>
+pybind11::object query_knn_internal(
     std::uintptr_t prebuilt_ptr,
     const DataMatrix& query,
     const NeighborVector& num_neighbors,
     const bool force_variable_neighbors,
     const int num_threads,
+    const std::optional<std::uintptr_t> pool,
+    const knncolle_py::Index chunk_size,
+    const bool reorder,
+    const std::optional<MaskVector>& shared_mask,
+    const std::optional<OffsetVector>& allowed_offsets,
+    const std::optional<ChosenVector>& allowed_ids,
+    const std::optional<OffsetVector>& excluded_offsets,
+    const std::optional<ChosenVector>& excluded_ids,
+    const knncolle_py::Index refine_factor,
+    const bool squared,
     const bool last_distance_only,
     bool report_index,
     bool report_distance
 ) {
     const auto& prebuilt = knncolle_py::cast_prebuilt(prebuilt_ptr)->ptr;
+    const bool squared_by_metric = squared && is_squarable(*prebuilt);
+    const bool square_after = squared && !squared_by_metric;
     const auto nobs = prebuilt->num_observations();
     const auto ndim = prebuilt->num_dimensions();
 
@@ -288,16 +642,16 @@ pybind11::object generic_query_knn(
 
     // Formatting all the possible output containers.
     OutputMatrix<knncolle_py::Index> const_i;
-    OutputMatrix<knncolle_py::MatrixValue> const_d;
-    pybind11::array_t<knncolle_py::MatrixValue> last_d;
+    OutputMatrix<Output_> const_d;
+    pybind11::array_t<Output_> last_d;
     knncolle_py::Index* out_i_ptr = NULL; 
-    knncolle_py::MatrixValue* out_d_ptr = NULL; 
+    Output_* out_d_ptr = NULL; 
     std::vector<std::vector<knncolle_py::Index> > var_i;
-    std::vector<std::vector<knncolle_py::MatrixValue> > var_d;
+    std::vector<std::vector<Output_> > var_d;
 
     if (last_distance_only) {
-        last_d = pybind11::array_t<knncolle_py::MatrixValue>(nquery);
-        out_d_ptr = static_cast<knncolle_py::MatrixValue*>(last_d.request().ptr);
+        last_d = pybind11::array_t<Output_>(nquery);
+        out_d_ptr = static_cast<Output_*>(last_d.request().ptr);
         report_index = false;
         report_distance = true;
 
@@ -314,41 +668,81 @@ pybind11::object generic_query_knn(
         out_d_ptr = prepare_output(const_d, report_distance, const_k, nquery);
     }
 
-    knncolle::parallelize(num_threads, nquery, [&](int, knncolle_py::Index start, knncolle_py::Index length) {
-        auto searcher = prebuilt->initialize();
-        std::vector<knncolle_py::Index> tmp_i;
-        std::vector<knncolle_py::MatrixValue> tmp_d;
+    const auto filter = prepare_filter(shared_mask, allowed_offsets, allowed_ids, excluded_offsets, excluded_ids, nobs, nquery);
+    std::atomic<bool> insufficient(false);
 
-        for (knncolle_py::Index o = start, end = start + length; o < end; ++o) {
-            const auto query_offset = sanisizer::product_unsafe<std::size_t>(o, ndim);
-            searcher->search(
-                query_ptr + query_offset,
-                (is_k_variable ? variable_k[o] : const_k),
-                (report_index ? &tmp_i : NULL),
-                (report_distance ? &tmp_d : NULL)
-            );
+    // Processing queries in order of spatial locality, if requested.
+    std::vector<knncolle_py::Index> task_order;
+    const knncolle_py::Index* order_ptr = NULL;
+    if (reorder) {
+        task_order = knncolle_py::locality_order(query_ptr, nquery, ndim);
+        order_ptr = task_order.data();
+    }
 
-            if (report_index) {
-                if (is_k_variable) {
-                    var_i[o].swap(tmp_i);
+    {
+        pybind11::gil_scoped_release release;
+        knncolle_py::parallel_search(prebuilt, num_threads, pool, nquery, chunk_size, [&](knncolle_py::Searcher& searcher, knncolle_py::Index start, knncolle_py::Index length) -> void {
+            knncolle_py::SquaredScope squared_scope(squared_by_metric);
+            knncolle_py::RefineScope refine_scope(refine_factor);
+            std::vector<knncolle_py::Index> tmp_i;
+            std::vector<knncolle_py::MatrixValue> tmp_d;
+
+            for (knncolle_py::Index p = start, end = start + length; p < end; ++p) {
+                const auto o = (order_ptr != NULL ? order_ptr[p] : p);
+                const auto query_offset = sanisizer::product_unsafe<std::size_t>(o, ndim);
+                const auto k = (is_k_variable ? variable_k[o] : const_k);
+                if (filter.active()) {
+                    knncolle_py::filtered_search(
+                        [&](knncolle_py::Index candidates) -> void { searcher.search(query_ptr + query_offset, candidates, &tmp_i, &tmp_d); },
+                        [&](knncolle_py::Index x) -> bool { return filter.keep(o, x); },
+                        k,
+                        nobs,
+                        filter.max_valid(o, nobs),
+                        tmp_i,
+                        tmp_d
+                    );
+                    if (!is_k_variable && tmp_i.size() < k) {
+                        insufficient = true;
+                        continue;
+                    }
                 } else {
-                    const auto out_offset = sanisizer::product_unsafe<std::size_t>(o, const_k);
-                    std::copy_n(tmp_i.begin(), const_k, out_i_ptr + out_offset); 
+                    searcher.search(
+                        query_ptr + query_offset,
+                        k,
+                        (report_index ? &tmp_i : NULL),
+                        (report_distance ? &tmp_d : NULL)
+                    );
                 }
-            }
 
-            if (report_distance) {
-                if (last_distance_only) {
-                    out_d_ptr[o] = (tmp_d.empty() ? 0 : tmp_d.back());
-                } else if (is_k_variable) {
-                    var_d[o].swap(tmp_d);
-                } else {
-                    const auto out_offset = sanisizer::product_unsafe<std::size_t>(o, const_k);
-                    std::copy_n(tmp_d.begin(), const_k, out_d_ptr + out_offset); 
+                if (report_index) {
+                    if (is_k_variable) {
+                        var_i[o].swap(tmp_i);
+                    } else {
+                        const auto out_offset = sanisizer::product_unsafe<std::size_t>(o, const_k);
+                        std::copy_n(tmp_i.begin(), const_k, out_i_ptr + out_offset); 
+                    }
+                }
+
+                if (report_distance) {
+                    if (square_after) {
+                        square_distances(tmp_d);
+                    }
+                    if (last_distance_only) {
+                        out_d_ptr[o] = (tmp_d.empty() ? 0 : tmp_d.back());
+                    } else if (is_k_variable) {
+                        store_variable(var_d[o], tmp_d);
+                    } else {
+                        const auto out_offset = sanisizer::product_unsafe<std::size_t>(o, const_k);
+                        std::copy_n(tmp_d.begin(), const_k, out_d_ptr + out_offset); 
+                    }
                 }
             }
-        }
-    });
+        });
+    }
+
+    if (insufficient) {
+        throw std::runtime_error("not enough neighbors remaining after filtering, use a sequence for 'num_neighbors' to report fewer neighbors");
+    }
 
     if (last_distance_only) {
         return last_d;
@@ -389,15 +783,61 @@ pybind11::object generic_query_knn(
 
 typedef pybind11::array_t<knncolle_py::MatrixValue, pybind11::array::f_style | pybind11::array::forcecast> ThresholdVector;
 
-pybind11::object generic_find_all(
+/*
+ * Find the closest 'max_neighbors' neighbors within 'threshold' with a
+ * k-nearest neighbor search, so that the memory usage is bounded regardless
+ * of the total number of neighbors within the threshold. We search for one
+ * extra neighbor to determine whether the cap was reached. If 'similarity' is
+ * true, neighbors are reported in decreasing order of similarity and the
+ * threshold is a lower bound on the similarity.
+ */
+template<class Search_>
+knncolle_py::Index capped_search(
+    Search_ search,
+    const knncolle_py::Index max_neighbors,
+    const knncolle_py::Index max_k,
+    const knncolle_py::Distance threshold,
+    const bool similarity,
+    std::vector<knncolle_py::Index>& indices,
+    std::vector<knncolle_py::Distance>& distances,
+    bool& capped)
+{
+    search(max_neighbors < max_k ? max_neighbors + 1 : max_k);
+
+    knncolle_py::Index count = 0;
+    const knncolle_py::Index num_found = distances.size();
+    while (count < num_found && (similarity ? distances[count] >= threshold : distances[count] <= threshold)) {
+        ++count;
+    }
+
+    capped = (count > max_neighbors);
+    if (capped) {
+        count = max_neighbors;
+    }
+    indices.resize(count);
+    distances.resize(count);
+    return count;
+}
+
+template<typename Output_>
+pybind11::object find_all_internal(
     std::uintptr_t prebuilt_ptr, 
     std::optional<ChosenVector> chosen,
     const ThresholdVector& thresholds,
     const int num_threads,
+    const std::optional<std::uintptr_t> pool,
+    const knncolle_py::Index chunk_size,
+    const std::optional<ChosenVector>& locality,
+    const bool squared,
+    const std::optional<knncolle_py::Index> max_neighbors,
+    const bool similarity,
+    const bool dual_tree,
     const bool report_index,
     const bool report_distance
 ) {
     const auto& prebuilt = knncolle_py::cast_prebuilt(prebuilt_ptr)->ptr;
+    const bool squared_by_metric = squared && is_squarable(*prebuilt);
+    const bool square_after = squared && !squared_by_metric;
     const auto nobs = prebuilt->num_observations();
 
     auto num_output = nobs;
@@ -416,7 +856,7 @@ pybind11::object generic_find_all(
         subset_ptr = static_cast<const knncolle_py::Index*>(subset.request().ptr);
     }
 
-    std::vector<std::vector<knncolle_py::MatrixValue> > out_d(report_distance ? num_output : 0);
+    std::vector<std::vector<Output_> > out_d(report_distance ? num_output : 0);
     std::vector<std::vector<knncolle_py::Index> > out_i(report_index ? num_output : 0);
 
     const bool store_count = !report_distance && !report_index;
@@ -430,38 +870,125 @@ pybind11::object generic_find_all(
     }
     const auto threshold_ptr = static_cast<const knncolle_py::MatrixValue*>(thresholds.request().ptr);
 
-    bool no_support = false;
-    knncolle::parallelize(num_threads, num_output, [&](int tid, knncolle_py::Index start, knncolle_py::Index length) {
-        auto searcher = prebuilt->initialize();
+    pybind11::array_t<bool> capped(max_neighbors.has_value() ? num_output : 0);
+    const auto capped_ptr = static_cast<bool*>(capped.request().ptr);
 
-        if (!searcher->can_search_all()) {
-            if (tid == 0) {
-                no_support = true;
-            }
-            return;
+    if (dual_tree) {
+        // Finding the neighbors of all requested observations in a single pass, which are written directly into the outputs.
+        // If the number of neighbors is capped, we only need the same number of nearest neighbors as capped_search().
+        if (store_count) {
+            std::fill_n(counts_ptr, num_output, 0);
+        }
+        if (max_neighbors.has_value()) {
+            std::fill_n(capped_ptr, num_output, false);
         }
 
-        for (knncolle_py::Index o = start, end = start + length; o < end; ++o) {
-            auto count = searcher->search_all(
-                (subset_ptr != NULL ? subset_ptr[o] : o),
-                threshold_ptr[multiple_thresholds ? o : 0],
-                (report_index ? &out_i[o] : NULL),
-                (report_distance ? &out_d[o] : NULL)
-            ); 
-            if (store_count) {
-                counts_ptr[o] = count;
+        pybind11::gil_scoped_release release;
+        dual_tree_search(
+            *prebuilt,
+            subset_ptr,
+            num_output,
+            [&](const knncolle_py::DualTreeSearchable& tree, const unsigned char* requested, const knncolle_py::DualTreeSearchable::Report& report) -> void {
+                if (max_neighbors.has_value()) {
+                    const knncolle_py::Index max_k = (nobs > 0 ? nobs - 1 : 0);
+                    const auto dual_k = (*max_neighbors < max_k ? *max_neighbors + 1 : max_k);
+                    if (dual_k > 0) {
+                        tree.dual_tree_knn(dual_k, requested, num_threads, pool, report);
+                    }
+                } else {
+                    knncolle_py::Distance max_threshold = -std::numeric_limits<knncolle_py::Distance>::infinity();
+                    for (I<decltype(nthresholds)> t = 0; t < nthresholds; ++t) {
+                        max_threshold = std::max(max_threshold, convert_threshold(threshold_ptr[t], square_after));
+                    }
+                    if (max_threshold >= 0) { // negative thresholds should yield no neighbors.
+                        tree.dual_tree_all(max_threshold, requested, num_threads, pool, report);
+                    }
+                }
+            },
+            [&](knncolle_py::Index o, const std::vector<knncolle_py::Index>& indices, const std::vector<knncolle_py::Distance>& distances) -> void {
+                const auto threshold = convert_threshold(threshold_ptr[multiple_thresholds ? o : 0], square_after);
+                knncolle_py::Index count = std::upper_bound(distances.begin(), distances.end(), threshold) - distances.begin();
+                if (max_neighbors.has_value()) {
+                    capped_ptr[o] = (count > *max_neighbors);
+                    count = std::min(count, *max_neighbors);
+                }
+
+                if (report_index) {
+                    out_i[o].assign(indices.begin(), indices.begin() + count);
+                }
+                if (report_distance) {
+                    out_d[o].resize(count);
+                    std::transform(distances.begin(), distances.begin() + count, out_d[o].begin(), [&](knncolle_py::Distance d) -> Output_ { return (square_after ? d * d : d); });
+                }
+                if (store_count) {
+                    counts_ptr[o] = count;
+                }
             }
+        );
+
+    } else {
+        if (!max_neighbors.has_value() && !prebuilt->initialize()->can_search_all()) {
+            throw std::runtime_error("algorithm does not support search by distance");
         }
-    });
 
-    if (no_support) {
-        throw std::runtime_error("algorithm does not support search by distance");
+        // Processing observations in order of spatial locality, if requested.
+        std::vector<knncolle_py::Index> task_order;
+        const knncolle_py::Index* order_ptr = NULL;
+        if (locality.has_value()) {
+            task_order = locality_task_order(*locality, nobs, subset_ptr, num_output);
+            order_ptr = task_order.data();
+        }
+
+        pybind11::gil_scoped_release release;
+        knncolle_py::parallel_search(prebuilt, num_threads, pool, num_output, chunk_size, [&](knncolle_py::Searcher& searcher, knncolle_py::Index start, knncolle_py::Index length) -> void {
+            knncolle_py::SquaredScope squared_scope(squared_by_metric);
+            std::vector<knncolle_py::Index> tmp_i;
+            std::vector<knncolle_py::Distance> tmp_d;
+
+            for (knncolle_py::Index p = start, end = start + length; p < end; ++p) {
+                const auto o = (order_ptr != NULL ? order_ptr[p] : p);
+                const auto current = (subset_ptr != NULL ? subset_ptr[o] : o);
+                const auto threshold = convert_threshold(threshold_ptr[multiple_thresholds ? o : 0], square_after);
+                knncolle_py::Index count;
+                if (max_neighbors.has_value()) {
+                    count = capped_search(
+                        [&](knncolle_py::Index k) -> void { searcher.search(current, k, &tmp_i, &tmp_d); },
+                        *max_neighbors,
+                        (nobs > 0 ? nobs - 1 : 0),
+                        threshold,
+                        similarity,
+                        tmp_i,
+                        tmp_d,
+                        capped_ptr[o]
+                    );
+                    if (report_index) {
+                        out_i[o].swap(tmp_i);
+                    }
+                } else {
+                    count = searcher.search_all(
+                        current,
+                        threshold,
+                        (report_index ? &out_i[o] : NULL),
+                        (report_distance ? &tmp_d : NULL)
+                    ); 
+                }
+                if (report_distance) {
+                    if (square_after) {
+                        square_distances(tmp_d);
+                    }
+                    store_variable(out_d[o], tmp_d);
+                }
+                if (store_count) {
+                    counts_ptr[o] = count;
+                }
+            }
+        });
     }
 
     if (store_count) {
         return counts;
     } else {
-        pybind11::tuple output(2);
+        pybind11::tuple output(3);
         if (report_index) {
             output[0] = format_range_output(out_i);
         } else {
@@ -472,19 +999,34 @@ pybind11::object generic_find_all(
         } else {
             output[1] = pybind11::none();
         }
+        if (max_neighbors.has_value()) {
+            output[2] = capped;
+        } else {
+            output[2] = pybind11::none();
+        }
         return output;
     }
 } 
 
-pybind11::object generic_query_all(
+template<typename Output_>
+pybind11::object query_all_internal(
     std::uintptr_t prebuilt_ptr, 
     const DataMatrix& query,
     const ThresholdVector& thresholds,
     const int num_threads,
+    const std::optional<std::uintptr_t> pool,
+    const knncolle_py::Index chunk_size,
+    const bool reorder,
+    const bool squared,
+    const std::optional<knncolle_py::Index> max_neighbors,
+    const bool similarity,
     const bool report_index,
     const bool report_distance
 ) {
     const auto& prebuilt = knncolle_py::cast_prebuilt(prebuilt_ptr)->ptr;
+    const bool squared_by_metric = squared && is_squarable(*prebuilt);
+    const bool square_after = squared && !squared_by_metric;
+    const auto nobs = prebuilt->num_observations();
     const auto ndim = prebuilt->num_dimensions();
 
     // Remember, all input NumPy matrices are row-major layouts with observations in rows.
@@ -495,7 +1037,7 @@ pybind11::object generic_query_all(
         throw std::runtime_error("mismatch in dimensionality between index and 'query'");
     }
 
-    std::vector<std::vector<knncolle_py::MatrixValue> > out_d(report_distance ? nquery : 0);
+    std::vector<std::vector<Output_> > out_d(report_distance ? nquery : 0);
     std::vector<std::vector<knncolle_py::Index> > out_i(report_index ? nquery : 0);
 
     const bool store_count = !report_distance && !report_index;
@@ -509,39 +1051,72 @@ pybind11::object generic_query_all(
     }
     const auto threshold_ptr = static_cast<const knncolle_py::MatrixValue*>(thresholds.request().ptr);
 
-    bool no_support = false;
-    knncolle::parallelize(num_threads, nquery, [&](int tid, knncolle_py::Index start, knncolle_py::Index length) {
-        auto searcher = prebuilt->initialize();
+    if (!max_neighbors.has_value() && !prebuilt->initialize()->can_search_all()) {
+        throw std::runtime_error("algorithm does not support search by distance");
+    }
 
-        if (!searcher->can_search_all()) {
-            if (tid == 0) {
-                no_support = true;
-            }
-            return;
-        }
+    pybind11::array_t<bool> capped(max_neighbors.has_value() ? nquery : 0);
+    const auto capped_ptr = static_cast<bool*>(capped.request().ptr);
 
-        for (knncolle_py::Index o = start, end = start + length; o < end; ++o) {
-            const auto current_ptr = query_ptr + sanisizer::product_unsafe<std::size_t>(o, ndim);
-            auto count = searcher->search_all(
-                current_ptr,
-                threshold_ptr[multiple_thresholds ? o : 0],
-                (report_index ? &out_i[o] : NULL),
-                (report_distance ? &out_d[o] : NULL)
-            ); 
-            if (store_count) {
-                counts_ptr[o] = count;
-            }
-        }
-    });
+    // Processing queries in order of spatial locality, if requested.
+    std::vector<knncolle_py::Index> task_order;
+    const knncolle_py::Index* order_ptr = NULL;
+    if (reorder) {
+        task_order = knncolle_py::locality_order(query_ptr, nquery, ndim);
+        order_ptr = task_order.data();
+    }
 
-    if (no_support) {
-        throw std::runtime_error("algorithm does not support search by distance");
+    {
+        pybind11::gil_scoped_release release;
+        knncolle_py::parallel_search(prebuilt, num_threads, pool, nquery, chunk_size, [&](knncolle_py::Searcher& searcher, knncolle_py::Index start, knncolle_py::Index length) -> void {
+            knncolle_py::SquaredScope squared_scope(squared_by_metric);
+            std::vector<knncolle_py::Index> tmp_i;
+            std::vector<knncolle_py::Distance> tmp_d;
+
+            for (knncolle_py::Index p = start, end = start + length; p < end; ++p) {
+                const auto o = (order_ptr != NULL ? order_ptr[p] : p);
+                const auto current_ptr = query_ptr + sanisizer::product_unsafe<std::size_t>(o, ndim);
+                const auto threshold = convert_threshold(threshold_ptr[multiple_thresholds ? o : 0], square_after);
+                knncolle_py::Index count;
+                if (max_neighbors.has_value()) {
+                    count = capped_search(
+                        [&](knncolle_py::Index k) -> void { searcher.search(current_ptr, k, &tmp_i, &tmp_d); },
+                        *max_neighbors,
+                        nobs,
+                        threshold,
+                        similarity,
+                        tmp_i,
+                        tmp_d,
+                        capped_ptr[o]
+                    );
+                    if (report_index) {
+                        out_i[o].swap(tmp_i);
+                    }
+                } else {
+                    count = searcher.search_all(
+                        current_ptr,
+                        threshold,
+                        (report_index ? &out_i[o] : NULL),
+                        (report_distance ? &tmp_d : NULL)
+                    ); 
+                }
+                if (report_distance) {
+                    if (square_after) {
+                        square_distances(tmp_d);
+                    }
+                    store_variable(out_d[o], tmp_d);
+                }
+                if (store_count) {
+                    counts_ptr[o] = count;
+                }
+            }
+        });
     }
 
     if (store_count) {
         return counts;
     } else {
-        pybind11::tuple output(2);
+        pybind11::tuple output(3);
         if (report_index) {
             output[0] = format_range_output(out_i);
         } else {
@@ -552,10 +1127,123 @@ pybind11::object generic_query_all(
         } else {
             output[1] = pybind11::none();
         }
+        if (max_neighbors.has_value()) {
+            output[2] = capped;
+        } else {
+            output[2] = pybind11::none();
+        }
         return output;
     }
 } 
 
+/*********************************
+ ******* Output precision ********
+ *********************************/
+
+// Distances are written directly into single-precision outputs if requested, without an intermediate double-precision buffer.
+
+pybind11::object generic_find_knn(
+    std::uintptr_t prebuilt_ptr,
+    const NeighborVector& num_neighbors,
+    const bool force_variable_neighbors,
+    std::optional<ChosenVector> chosen,
+    const int num_threads,
+    const std::optional<std::uintptr_t> pool,
+    const knncolle_py::Index chunk_size,
+    const std::optional<ChosenVector>& locality,
+    const std::optional<MaskVector>& shared_mask,
+    const std::optional<OffsetVector>& allowed_offsets,
+    const std::optional<ChosenVector>& allowed_ids,
+    const std::optional<OffsetVector>& excluded_offsets,
+    const std::optional<ChosenVector>& excluded_ids,
+    const knncolle_py::Index refine_factor,
+    const bool squared,
+    const bool dual_tree,
+    const bool single_precision,
+    const bool last_distance_only,
+    bool report_index,
+    bool report_distance
+) {
+    if (single_precision) {
+        return find_knn_internal<float>(prebuilt_ptr, num_neighbors, force_variable_neighbors, std::move(chosen), num_threads, pool, chunk_size, locality, shared_mask, allowed_offsets, allowed_ids, excluded_offsets, excluded_ids, refine_factor, squared, dual_tree, last_distance_only, report_index, report_distance);
+    } else {
+        return find_knn_internal<double>(prebuilt_ptr, num_neighbors, force_variable_neighbors, std::move(chosen), num_threads, pool, chunk_size, locality, shared_mask, allowed_offsets, allowed_ids, excluded_offsets, excluded_ids, refine_factor, squared, dual_tree, last_distance_only, report_index, report_distance);
+    }
+}
+
+pybind11::object generic_query_knn(
+    std::uintptr_t prebuilt_ptr,
+    const DataMatrix& query,
+    const NeighborVector& num_neighbors,
+    const bool force_variable_neighbors,
+    const int num_threads,
+    const std::optional<std::uintptr_t> pool,
+    const knncolle_py::Index chunk_size,
+    const bool reorder,
+    const std::optional<MaskVector>& shared_mask,
+    const std::optional<OffsetVector>& allowed_offsets,
+    const std::optional<ChosenVector>& allowed_ids,
+    const std::optional<OffsetVector>& excluded_offsets,
+    const std::optional<ChosenVector>& excluded_ids,
+    const knncolle_py::Index refine_factor,
+    const bool squared,
+    const bool single_precision,
+    const bool last_distance_only,
+    bool report_index,
+    bool report_distance
+) {
+    if (single_precision) {
+        return query_knn_internal<float>(prebuilt_ptr, query, num_neighbors, force_variable_neighbors, num_threads, pool, chunk_size, reorder, shared_mask, allowed_offsets, allowed_ids, excluded_offsets, excluded_ids, refine_factor, squared, last_distance_only, report_index, report_distance);
+    } else {
+        return query_knn_internal<double>(prebuilt_ptr, query, num_neighbors, force_variable_neighbors, num_threads, pool, chunk_size, reorder, shared_mask, allowed_offsets, allowed_ids, excluded_offsets, excluded_ids, refine_factor, squared, last_distance_only, report_index, report_distance);
+    }
+}
+
+pybind11::object generic_find_all(
+    std::uintptr_t prebuilt_ptr, 
+    std::optional<ChosenVector> chosen,
+    const ThresholdVector& thresholds,
+    const int num_threads,
+    const std::optional<std::uintptr_t> pool,
+    const knncolle_py::Index chunk_size,
+    const std::optional<ChosenVector>& locality,
+    const bool squared,
+    const std::optional<knncolle_py::Index> max_neighbors,
+    const bool similarity,
+    const bool dual_tree,
+    const bool single_precision,
+    const bool report_index,
+    const bool report_distance
+) {
+    if (single_precision) {
+        return find_all_internal<float>(prebuilt_ptr, std::move(chosen), thresholds, num_threads, pool, chunk_size, locality, squared, max_neighbors, similarity, dual_tree, report_index, report_distance);
+    } else {
+        return find_all_internal<double>(prebuilt_ptr, std::move(chosen), thresholds, num_threads, pool, chunk_size, locality, squared, max_neighbors, similarity, dual_tree, report_index, report_distance);
+    }
+}
+
+pybind11::object generic_query_all(
+    std::uintptr_t prebuilt_ptr, 
+    const DataMatrix& query,
+    const ThresholdVector& thresholds,
+    const int num_threads,
+    const std::optional<std::uintptr_t> pool,
+    const knncolle_py::Index chunk_size,
+    const bool reorder,
+    const bool squared,
+    const std::optional<knncolle_py::Index> max_neighbors,
+    const bool similarity,
+    const bool single_precision,
+    const bool report_index,
+    const bool report_distance
+) {
+    if (single_precision) {
+        return query_all_internal<float>(prebuilt_ptr, query, thresholds, num_threads, pool, chunk_size, reorder, squared, max_neighbors, similarity, report_index, report_distance);
+    } else {
+        return query_all_internal<double>(prebuilt_ptr, query, thresholds, num_threads, pool, chunk_size, reorder, squared, max_neighbors, similarity, report_index, report_distance);
+    }
+}
+
 /*********************************
  ********* Init function *********
  *********************************/
@@ -563,6 +1251,7 @@ pybind11::object generic_query_all(
 void init_generics(pybind11::module& m) {
     m.def("free_builder", &free_builder);
     m.def("generic_build", &generic_build);
+    m.def("generic_locality_order", &generic_locality_order);
     m.def("free_prebuilt", &free_prebuilt);
     m.def("generic_num_obs", &generic_num_obs);
     m.def("generic_num_dims", &generic_num_dims);
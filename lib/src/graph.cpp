@@ -0,0 +1,430 @@
+#include "knncolle_py.h"
+#include "parallel.hpp"
+
+#include "pybind11/pybind11.h"
+#include "pybind11/numpy.h"
+#include "pybind11/stl.h"
+
+#include "sanisizer/sanisizer.hpp"
+
+#include <algorithm>
+#include <cstddef>
+#include <cstdint>
+#include <limits>
+#include <memory>
+#include <numeric>
+#include <optional>
+#include <stdexcept>
+#include <string>
+#include <utility>
+#include <vector>
+
+/*
+ * Compressed sparse row representation of the k-nearest neighbor graph. We
+ * use std::size_t for the offsets during construction and only convert to
+ * the narrowest index type that SciPy accepts when creating the NumPy arrays.
+ */
+struct SparseGraph {
+    std::vector<std::size_t> offsets;
+    std::vector<knncolle_py::Index> indices;
+    std::vector<knncolle_py::Distance> distances;
+};
+
+static void sort_rows_by_index(SparseGraph& graph, const int num_threads, const std::optional<std::uintptr_t>& pool, const knncolle_py::Index nobs) {
+    knncolle_py::parallel_tasks(num_threads, pool, nobs, [&](knncolle_py::Index start, knncolle_py::Index length) -> void {
+        std::vector<std::pair<knncolle_py::Index, knncolle_py::Distance> > buffer;
+        for (knncolle_py::Index r = start, end = start + length; r < end; ++r) {
+            const auto first = graph.offsets[r], last = graph.offsets[r + 1];
+            buffer.clear();
+            for (auto x = first; x < last; ++x) {
+                buffer.emplace_back(graph.indices[x], graph.distances[x]);
+            }
+            std::sort(buffer.begin(), buffer.end());
+            for (auto x = first; x < last; ++x) {
+                graph.indices[x] = buffer[x - first].first;
+                graph.distances[x] = buffer[x - first].second;
+            }
+        }
+    });
+}
+
+static SparseGraph transpose(const SparseGraph& graph, const knncolle_py::Index nobs) {
+    SparseGraph output;
+    output.offsets.resize(sanisizer::sum<std::size_t>(nobs, 1));
+    for (auto i : graph.indices) {
+        ++output.offsets[i + 1];
+    }
+    std::partial_sum(output.offsets.begin(), output.offsets.end(), output.offsets.begin());
+
+    // Iterating over rows in order ensures that each row of the transposed graph is sorted by index.
+    const auto nnz = graph.indices.size();
+    output.indices.resize(nnz);
+    output.distances.resize(nnz);
+    auto position = output.offsets;
+    for (knncolle_py::Index r = 0; r < nobs; ++r) {
+        for (auto x = graph.offsets[r], last = graph.offsets[r + 1]; x < last; ++x) {
+            auto& target = position[graph.indices[x]];
+            output.indices[target] = r;
+            output.distances[target] = graph.distances[x];
+            ++target;
+        }
+    }
+
+    return output;
+}
+
+/*
+ * Merge the sorted rows of the graph and its transpose. For the union, each
+ * edge is reported if it is present in either graph; for the intersection,
+ * it must be present in both. Weights are taken from the original graph
+ * where possible, though the distance between two observations should be the
+ * same regardless of the direction of the search.
+ */
+template<bool union_, class Store_>
+void merge_rows(const SparseGraph& left, const SparseGraph& right, const knncolle_py::Index r, Store_ store) {
+    auto lx = left.offsets[r], lend = left.offsets[r + 1];
+    auto rx = right.offsets[r], rend = right.offsets[r + 1];
+    while (lx < lend && rx < rend) {
+        const auto li = left.indices[lx], ri = right.indices[rx];
+        if (li == ri) {
+            store(li, left.distances[lx]);
+            ++lx;
+            ++rx;
+        } else if (li < ri) {
+            if constexpr(union_) {
+                store(li, left.distances[lx]);
+            }
+            ++lx;
+        } else {
+            if constexpr(union_) {
+                store(ri, right.distances[rx]);
+            }
+            ++rx;
+        }
+    }
+
+    if constexpr(union_) {
+        for (; lx < lend; ++lx) {
+            store(left.indices[lx], left.distances[lx]);
+        }
+        for (; rx < rend; ++rx) {
+            store(right.indices[rx], right.distances[rx]);
+        }
+    }
+}
+
+template<bool union_>
+SparseGraph symmetrize(const SparseGraph& graph, const int num_threads, const std::optional<std::uintptr_t>& pool, const knncolle_py::Index nobs) {
+    const auto reversed = transpose(graph, nobs);
+
+    SparseGraph output;
+    output.offsets.resize(sanisizer::sum<std::size_t>(nobs, 1));
+    knncolle_py::parallel_tasks(num_threads, pool, nobs, [&](knncolle_py::Index start, knncolle_py::Index length) -> void {
+        for (knncolle_py::Index r = start, end = start + length; r < end; ++r) {
+            std::size_t count = 0;
+            merge_rows<union_>(graph, reversed, r, [&](knncolle_py::Index, knncolle_py::Distance) -> void { ++count; });
+            output.offsets[r + 1] = count;
+        }
+    });
+    std::partial_sum(output.offsets.begin(), output.offsets.end(), output.offsets.begin());
+
+    const auto nnz = output.offsets.back();
+    output.indices.resize(nnz);
+    output.distances.resize(nnz);
+    knncolle_py::parallel_tasks(num_threads, pool, nobs, [&](knncolle_py::Index start, knncolle_py::Index length) -> void {
+        for (knncolle_py::Index r = start, end = start + length; r < end; ++r) {
+            auto position = output.offsets[r];
+            merge_rows<union_>(graph, reversed, r, [&](knncolle_py::Index i, knncolle_py::Distance d) -> void {
+                output.indices[position] = i;
+                output.distances[position] = d;
+                ++position;
+            });
+        }
+    });
+
+    return output;
+}
+
+template<typename Pointer_>
+pybind11::tuple format_graph(const SparseGraph& graph, const bool weighted) {
+    const auto nnz = graph.indices.size();
+    pybind11::array_t<Pointer_> indptr(graph.offsets.size());
+    std::copy(graph.offsets.begin(), graph.offsets.end(), static_cast<Pointer_*>(indptr.request().ptr));
+    pybind11::array_t<Pointer_> indices(nnz);
+    std::copy(graph.indices.begin(), graph.indices.end(), static_cast<Pointer_*>(indices.request().ptr));
+
+    pybind11::array_t<knncolle_py::Distance> data(nnz);
+    auto data_ptr = static_cast<knncolle_py::Distance*>(data.request().ptr);
+    if (weighted) {
+        std::copy(graph.distances.begin(), graph.distances.end(), data_ptr);
+    } else {
+        std::fill_n(data_ptr, nnz, 1);
+    }
+
+    return pybind11::make_tuple(indptr, indices, data);
+}
+
+static knncolle_py::Index cap_neighbors(const knncolle_py::Index num_neighbors, const knncolle_py::Index nobs) {
+    if (nobs == 0) {
+        return 0;
+    } else {
+        return std::min(num_neighbors, static_cast<knncolle_py::Index>(nobs - 1));
+    }
+}
+
+/*
+ * Find the nearest neighbors of each observation, storing them in a graph
+ * where each row is sorted by increasing distance. This should be called
+ * after releasing the GIL.
+ */
+static SparseGraph search_graph(
+    const std::shared_ptr<knncolle_py::Prebuilt>& prebuilt,
+    const knncolle_py::Index num_neighbors,
+    const int num_threads,
+    const std::optional<std::uintptr_t>& pool,
+    const knncolle_py::Index chunk_size)
+{
+    const auto nobs = prebuilt->num_observations();
+    SparseGraph graph;
+
+    // Each observation is allocated 'num_neighbors' slots in the first pass,
+    // which are compacted afterwards if fewer neighbors are reported by an approximate search.
+    const auto capacity = sanisizer::product<std::size_t>(nobs, num_neighbors);
+    graph.indices.resize(capacity);
+    graph.distances.resize(capacity);
+    std::vector<knncolle_py::Index> counts(nobs);
+
+    knncolle_py::parallel_search(prebuilt, num_threads, pool, nobs, chunk_size, [&](knncolle_py::Searcher& searcher, knncolle_py::Index start, knncolle_py::Index length) -> void {
+        std::vector<knncolle_py::Index> tmp_i;
+        std::vector<knncolle_py::Distance> tmp_d;
+        for (knncolle_py::Index o = start, end = start + length; o < end; ++o) {
+            searcher.search(o, num_neighbors, &tmp_i, &tmp_d);
+            const auto offset = static_cast<std::size_t>(o) * static_cast<std::size_t>(num_neighbors);
+            counts[o] = tmp_i.size();
+            std::copy(tmp_i.begin(), tmp_i.end(), graph.indices.begin() + offset);
+            std::copy(tmp_d.begin(), tmp_d.end(), graph.distances.begin() + offset);
+        }
+    });
+
+    graph.offsets.resize(sanisizer::sum<std::size_t>(nobs, 1));
+    std::size_t position = 0;
+    for (knncolle_py::Index o = 0; o < nobs; ++o) {
+        const auto offset = static_cast<std::size_t>(o) * static_cast<std::size_t>(num_neighbors);
+        if (position != offset) {
+            std::copy_n(graph.indices.begin() + offset, counts[o], graph.indices.begin() + position);
+            std::copy_n(graph.distances.begin() + offset, counts[o], graph.distances.begin() + position);
+        }
+        position += counts[o];
+        graph.offsets[o + 1] = position;
+    }
+    graph.indices.resize(position);
+    graph.distances.resize(position);
+
+    return graph;
+}
+
+static pybind11::tuple format_graph(const SparseGraph& graph, const bool weighted, const knncolle_py::Index nobs) {
+    // Using 32-bit indices where possible, as these are preferred by SciPy.
+    constexpr std::size_t limit = std::numeric_limits<std::int32_t>::max();
+    if (graph.indices.size() <= limit && static_cast<std::size_t>(nobs) <= limit) {
+        return format_graph<std::int32_t>(graph, weighted);
+    } else {
+        return format_graph<std::int64_t>(graph, weighted);
+    }
+}
+
+pybind11::tuple generic_find_knn_graph(
+    std::uintptr_t prebuilt_ptr,
+    const knncolle_py::Index num_neighbors,
+    const int num_threads,
+    const std::optional<std::uintptr_t> pool,
+    const knncolle_py::Index chunk_size,
+    const bool weighted,
+    const std::string& mode
+) {
+    const auto& prebuilt = knncolle_py::cast_prebuilt(prebuilt_ptr)->ptr;
+    const auto nobs = prebuilt->num_observations();
+    if (mode != "none" && mode != "union" && mode != "intersection") {
+        throw std::runtime_error("unknown symmetrization mode '" + mode + "'");
+    }
+
+    SparseGraph graph;
+    {
+        pybind11::gil_scoped_release release;
+        graph = search_graph(prebuilt, cap_neighbors(num_neighbors, nobs), num_threads, pool, chunk_size);
+        if (mode != "none") {
+            sort_rows_by_index(graph, num_threads, pool, nobs);
+            if (mode == "union") {
+                graph = symmetrize<true>(graph, num_threads, pool, nobs);
+            } else {
+                graph = symmetrize<false>(graph, num_threads, pool, nobs);
+            }
+        }
+    }
+
+    return format_graph(graph, weighted, nobs);
+}
+
+/*
+ * Shared nearest neighbor graph, where the weight of the edge between two
+ * observations is defined from the neighbors that they have in common. Each
+ * observation is considered to be its own nearest neighbor with a rank of
+ * zero. For each observation 'i', we find all observations 'j < i' that share
+ * at least one neighbor with 'i' by looking up the observations that contain
+ * each neighbor of 'i' in their own neighbor lists.
+ *
+ * - "rank": 'k - r / 2', where 'r' is the smallest sum of the ranks of any
+ *   shared neighbor in the neighbor lists of 'i' and 'j'. This is floored at
+ *   a small positive value to ensure that the edge is retained.
+ * - "number": the number of shared neighbors.
+ * - "jaccard": the Jaccard index of the neighbor lists of 'i' and 'j'.
+ */
+static SparseGraph shared_neighbor_graph(
+    const SparseGraph& knn,
+    const knncolle_py::Index num_neighbors,
+    const std::string& weighting,
+    const int num_threads,
+    const std::optional<std::uintptr_t>& pool,
+    const knncolle_py::Index nobs)
+{
+    // For each observation, listing the observations that contain it in their neighbor lists, along with its rank.
+    std::vector<std::size_t> host_offsets(sanisizer::sum<std::size_t>(nobs, 1));
+    for (auto i : knn.indices) {
+        ++host_offsets[i + 1];
+    }
+    for (knncolle_py::Index o = 0; o < nobs; ++o) {
+        host_offsets[o + 1] += host_offsets[o] + 1;
+    }
+    std::vector<std::pair<knncolle_py::Index, knncolle_py::Index> > hosts(host_offsets.back());
+    {
+        auto position = host_offsets;
+        for (knncolle_py::Index o = 0; o < nobs; ++o) {
+            hosts[position[o]++] = std::make_pair(o, 0);
+            for (auto x = knn.offsets[o], last = knn.offsets[o + 1]; x < last; ++x) {
+                hosts[position[knn.indices[x]]++] = std::make_pair(o, static_cast<knncolle_py::Index>(x - knn.offsets[o] + 1));
+            }
+        }
+    }
+
+    const bool use_rank = (weighting == "rank");
+    const bool use_jaccard = (weighting == "jaccard");
+    std::vector<std::vector<knncolle_py::Index> > edge_indices(nobs);
+    std::vector<std::vector<knncolle_py::Distance> > edge_weights(nobs);
+
+    knncolle_py::parallel_tasks(num_threads, pool, nobs, [&](knncolle_py::Index start, knncolle_py::Index length) -> void {
+        std::vector<knncolle_py::Index> scores(nobs); // ranks are offset by one so that zero indicates an unvisited observation.
+        std::vector<knncolle_py::Index> touched;
+
+        for (knncolle_py::Index i = start, end = start + length; i < end; ++i) {
+            const auto num_i = knn.offsets[i + 1] - knn.offsets[i];
+            for (std::size_t r_i = 0; r_i <= num_i; ++r_i) {
+                const auto neighbor = (r_i == 0 ? i : knn.indices[knn.offsets[i] + r_i - 1]);
+                for (auto h = host_offsets[neighbor], last = host_offsets[neighbor + 1]; h < last; ++h) {
+                    const auto& host = hosts[h];
+                    const auto j = host.first;
+                    if (j >= i) {
+                        continue;
+                    }
+
+                    auto& current = scores[j];
+                    if (current == 0) {
+                        touched.push_back(j);
+                    }
+                    if (use_rank) {
+                        const knncolle_py::Index combined = r_i + host.second + 1;
+                        if (current == 0 || combined < current) {
+                            current = combined;
+                        }
+                    } else {
+                        ++current;
+                    }
+                }
+            }
+
+            std::sort(touched.begin(), touched.end());
+            auto& out_i = edge_indices[i];
+            auto& out_w = edge_weights[i];
+            out_i.reserve(touched.size());
+            out_w.reserve(touched.size());
+            for (auto j : touched) {
+                const auto score = scores[j];
+                knncolle_py::Distance weight;
+                if (use_rank) {
+                    weight = std::max(static_cast<knncolle_py::Distance>(num_neighbors) - 0.5 * static_cast<knncolle_py::Distance>(score - 1), 1e-6);
+                } else if (use_jaccard) {
+                    const auto num_j = knn.offsets[j + 1] - knn.offsets[j];
+                    weight = static_cast<knncolle_py::Distance>(score) / static_cast<knncolle_py::Distance>(num_i + num_j + 2 - score);
+                } else {
+                    weight = score;
+                }
+                out_i.push_back(j);
+                out_w.push_back(weight);
+                scores[j] = 0;
+            }
+            touched.clear();
+        }
+    });
+
+    SparseGraph output;
+    output.offsets.resize(sanisizer::sum<std::size_t>(nobs, 1));
+    for (knncolle_py::Index o = 0; o < nobs; ++o) {
+        output.offsets[o + 1] = output.offsets[o] + edge_indices[o].size();
+    }
+    output.indices.reserve(output.offsets.back());
+    output.distances.reserve(output.offsets.back());
+    for (knncolle_py::Index o = 0; o < nobs; ++o) {
+        output.indices.insert(output.indices.end(), edge_indices[o].begin(), edge_indices[o].end());
+        output.distances.insert(output.distances.end(), edge_weights[o].begin(), edge_weights[o].end());
+        std::vector<knncolle_py::Index>().swap(edge_indices[o]);
+        std::vector<knncolle_py::Distance>().swap(edge_weights[o]);
+    }
+
+    return output;
+}
+
+pybind11::tuple generic_build_snn_graph(
+    std::uintptr_t prebuilt_ptr,
+    const knncolle_py::Index num_neighbors,
+    const std::string& weighting,
+    const int num_threads,
+    const std::optional<std::uintptr_t> pool,
+    const knncolle_py::Index chunk_size,
+    const bool as_edges
+) {
+    const auto& prebuilt = knncolle_py::cast_prebuilt(prebuilt_ptr)->ptr;
+    const auto nobs = prebuilt->num_observations();
+    if (weighting != "rank" && weighting != "number" && weighting != "jaccard") {
+        throw std::runtime_error("unknown weighting scheme '" + weighting + "'");
+    }
+
+    SparseGraph graph;
+    {
+        pybind11::gil_scoped_release release;
+        const auto capped = cap_neighbors(num_neighbors, nobs);
+        graph = shared_neighbor_graph(search_graph(prebuilt, capped, num_threads, pool, chunk_size), capped, weighting, num_threads, pool, nobs);
+        if (!as_edges) {
+            graph = symmetrize<true>(graph, num_threads, pool, nobs);
+        }
+    }
+
+    if (!as_edges) {
+        return format_graph(graph, true, nobs);
+    }
+
+    // Each edge is reported once, from the observation with the larger index.
+    const auto nnz = graph.indices.size();
+    pybind11::array_t<knncolle_py::Index> first(nnz), second(nnz);
+    auto first_ptr = static_cast<knncolle_py::Index*>(first.request().ptr);
+    for (knncolle_py::Index o = 0; o < nobs; ++o) {
+        std::fill(first_ptr + graph.offsets[o], first_ptr + graph.offsets[o + 1], o);
+    }
+    std::copy(graph.indices.begin(), graph.indices.end(), static_cast<knncolle_py::Index*>(second.request().ptr));
+    pybind11::array_t<knncolle_py::Distance> weight(nnz);
+    std::copy(graph.distances.begin(), graph.distances.end(), static_cast<knncolle_py::Distance*>(weight.request().ptr));
+    return pybind11::make_tuple(first, second, weight);
+}
+
+void init_graph(pybind11::module& m) {
+    m.def("generic_find_knn_graph", &generic_find_knn_graph);
+    m.def("generic_build_snn_graph", &generic_build_snn_graph);
+}
@@ -0,0 +1,55 @@
+#ifndef KNNCOLLE_PY_HAMMING_HPP
+#define KNNCOLLE_PY_HAMMING_HPP
+
+#include "knncolle_py.h"
+
+#include <cstddef>
+#include <cstdint>
+#include <cstring>
+
+namespace knncolle_py {
+
+inline int popcount(std::uint64_t x) {
+#if defined(__GNUC__) || defined(__clang__)
+    return __builtin_popcountll(x);
+#else
+    x = x - ((x >> 1) & 0x5555555555555555ULL);
+    x = (x & 0x3333333333333333ULL) + ((x >> 2) & 0x3333333333333333ULL);
+    x = (x + (x >> 4)) & 0x0F0F0F0F0F0F0F0FULL;
+    return static_cast<int>((x * 0x0101010101010101ULL) >> 56);
+#endif
+}
+
+/*
+ * Hamming distance between bit-packed binary codes. Each "dimension" is a
+ * 64-bit word of the code whose bits have been reinterpreted as a double, so
+ * that the codes can be stored in the same matrices as the other distances.
+ * The values are never used in floating-point arithmetic, only copied, so the
+ * bit patterns are preserved even if they happen to correspond to NaNs.
+ */
+class HammingDistance final : public knncolle::DistanceMetric<MatrixValue, Distance> {
+public:
+    Distance raw(std::size_t num_dimensions, const MatrixValue* x, const MatrixValue* y) const {
+        static_assert(sizeof(MatrixValue) == sizeof(std::uint64_t));
+        std::uint64_t output = 0;
+        for (std::size_t d = 0; d < num_dimensions; ++d) {
+            std::uint64_t left, right;
+            std::memcpy(&left, x + d, sizeof(left));
+            std::memcpy(&right, y + d, sizeof(right));
+            output += popcount(left ^ right);
+        }
+        return output;
+    }
+
+    Distance normalize(Distance raw) const {
+        return raw;
+    }
+
+    Distance denormalize(Distance norm) const {
+        return norm;
+    }
+};
+
+}
+
+#endif
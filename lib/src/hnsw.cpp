@@ -1,44 +1,68 @@
 #include "knncolle_py.h"
+#include "cosine.hpp"
+#include "inner_product.hpp"
+#include "approximate_range.hpp"
+#include "permuted.hpp"
+#include "parallel.hpp"
+#include "hnsw.hpp"
+
 #include "pybind11/pybind11.h"
+#include "pybind11/numpy.h"
+#include "pybind11/stl.h"
+
+#include "sanisizer/sanisizer.hpp"
 
 #include <string>
 #include <cstdint>
 #include <memory>
+#include <optional>
+#include <stdexcept>
+#include <utility>
+#include <vector>
 
-#include "knncolle_hnsw/knncolle_hnsw.hpp"
+// Wrapping the HNSW builder to support approximate searches by distance,
+// and to refine the search results with exact distances if 'metric' is supplied.
+// The local HNSW implementation is only used if the base graph is requested.
+std::shared_ptr<knncolle_py::ApproximateRangeBuilder> make_hnsw_builder(
+    const knncolle_hnsw::DistanceConfig<float>& config,
+    const knncolle_hnsw::HnswOptions& opt,
+    const bool base_graph,
+    std::shared_ptr<const knncolle_py::Metric> metric)
+{
+    std::shared_ptr<knncolle::Builder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance> > inner;
+    if (base_graph) {
+        inner = std::make_shared<knncolle_py::HnswBuilder>(config, opt);
+    } else {
+        inner = std::make_shared<knncolle_hnsw::HnswBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance> >(config, opt);
+    }
+    return std::make_shared<knncolle_py::ApproximateRangeBuilder>(std::move(inner), std::move(metric));
+}
 
-std::uintptr_t create_hnsw_builder(int nlinks, int ef_construct, int ef_search, std::string distance) {
+std::uintptr_t create_hnsw_builder(int nlinks, int ef_construct, int ef_search, std::string distance, bool keep_data, bool base_graph) {
     knncolle_hnsw::HnswOptions opt;
     opt.num_links = nlinks;
     opt.ef_construction = ef_construct;
     opt.ef_search = ef_search;
     auto tmp = std::make_unique<knncolle_py::WrappedBuilder>();
 
+    std::shared_ptr<const knncolle_py::Metric> euclidean, manhattan;
+    if (keep_data) {
+        euclidean = std::make_shared<knncolle::EuclideanDistance<knncolle_py::MatrixValue, knncolle_py::Distance> >();
+        manhattan = std::make_shared<knncolle::ManhattanDistance<knncolle_py::MatrixValue, knncolle_py::Distance> >();
+    }
+
     if (distance == "Manhattan") {
-        tmp->ptr.reset(
-            new knncolle_hnsw::HnswBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance>(
-                knncolle_hnsw::makeManhattanDistanceConfig(),
-                opt
-            )
-        );
+        tmp->ptr = make_hnsw_builder(knncolle_hnsw::makeManhattanDistanceConfig(), opt, base_graph, manhattan);
 
     } else if (distance == "Euclidean") {
-        tmp->ptr.reset(
-            new knncolle_hnsw::HnswBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance>(
-                knncolle_hnsw::makeEuclideanDistanceConfig(),
-                opt
-            )
-        );
+        tmp->ptr = make_hnsw_builder(knncolle_hnsw::makeEuclideanDistanceConfig(), opt, base_graph, euclidean);
 
     } else if (distance == "Cosine") {
-        tmp->ptr.reset(
-            new knncolle::L2NormalizedBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance, knncolle_py::MatrixValue>(
-                std::make_shared<knncolle_hnsw::HnswBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance> >(
-                    knncolle_hnsw::makeEuclideanDistanceConfig(),
-                    opt
-                )
-            )
-        );
+        tmp->ptr.reset(new knncolle_py::CosineBuilder(make_hnsw_builder(knncolle_hnsw::makeEuclideanDistanceConfig(), opt, base_graph, euclidean)));
+
+    } else if (distance == "InnerProduct") {
+        // No copy of the data is needed for refinement, as the candidates are re-ranked by their exact inner products.
+        tmp->ptr.reset(new knncolle_py::InnerProductBuilder(make_hnsw_builder(knncolle_hnsw::makeEuclideanDistanceConfig(), opt, base_graph, NULL)));
 
     } else {
         throw std::runtime_error("unknown distance type '" + distance + "'");
@@ -47,6 +71,71 @@ std::uintptr_t create_hnsw_builder(int nlinks, int ef_construct, int ef_search,
     return reinterpret_cast<uintptr_t>(static_cast<void*>(tmp.release()));
 }
 
+pybind11::tuple generic_hnsw_base_graph(std::uintptr_t prebuilt_ptr, knncolle_py::Index num_neighbors, const bool refine, const int num_threads, const std::optional<std::uintptr_t> pool) {
+    const auto& prebuilt = knncolle_py::cast_prebuilt(prebuilt_ptr)->ptr;
+
+    // Unwrapping the HNSW index from any wrappers for the index layout or the distance.
+    const knncolle_py::Prebuilt* current = prebuilt.get();
+    const std::vector<knncolle_py::Index>* old_ids = NULL;
+    if (auto permuted = dynamic_cast<const knncolle_py::PermutedPrebuilt*>(current)) {
+        old_ids = &(permuted->old_ids());
+        current = &(permuted->inner());
+    }
+    if (auto cosine = dynamic_cast<const knncolle_py::CosinePrebuilt*>(current)) {
+        current = cosine->inner().get();
+    }
+    if (auto approx = dynamic_cast<const knncolle_py::ApproximateRangePrebuilt*>(current)) {
+        current = &(approx->inner());
+    }
+    auto hnsw = dynamic_cast<const knncolle_py::HnswPrebuilt*>(current);
+    if (hnsw == NULL) {
+        throw std::runtime_error("base graph is not available for HNSW indices built without 'base_graph=True'");
+    }
+
+    const auto nobs = hnsw->num_observations();
+    num_neighbors = (nobs > 0 ? std::min(num_neighbors, static_cast<knncolle_py::Index>(nobs - 1)) : 0);
+    pybind11::array_t<knncolle_py::Index, pybind11::array::c_style> out_i({ nobs, num_neighbors });
+    pybind11::array_t<knncolle_py::Distance, pybind11::array::c_style> out_d({ nobs, num_neighbors });
+    auto out_i_ptr = static_cast<knncolle_py::Index*>(out_i.request().ptr);
+    auto out_d_ptr = static_cast<knncolle_py::Distance*>(out_d.request().ptr);
+
+    {
+        pybind11::gil_scoped_release release;
+        knncolle_py::parallel_tasks(num_threads, pool, nobs, [&](knncolle_py::Index start, knncolle_py::Index length) -> void {
+            std::vector<std::pair<knncolle_py::Distance, knncolle_py::Index> > candidates;
+            std::vector<knncolle_py::Index> tmp_i;
+            std::vector<knncolle_py::Distance> tmp_d;
+            std::unique_ptr<knncolle_py::Searcher> searcher;
+
+            for (knncolle_py::Index p = start, end = start + length; p < end; ++p) {
+                hnsw->base_neighbors(p, num_neighbors, refine, candidates, tmp_i, tmp_d);
+
+                // Falling back to a search if there are not enough candidates in the graph, e.g., for small datasets.
+                if (tmp_i.size() < num_neighbors) {
+                    if (!searcher) {
+                        searcher = hnsw->initialize();
+                    }
+                    searcher->search(p, num_neighbors, &tmp_i, &tmp_d);
+                }
+
+                auto row = p;
+                if (old_ids) {
+                    row = (*old_ids)[p];
+                    for (auto& x : tmp_i) {
+                        x = (*old_ids)[x];
+                    }
+                }
+                const auto offset = sanisizer::product_unsafe<std::size_t>(row, num_neighbors);
+                std::copy_n(tmp_i.begin(), num_neighbors, out_i_ptr + offset);
+                std::copy_n(tmp_d.begin(), num_neighbors, out_d_ptr + offset);
+            }
+        });
+    }
+
+    return pybind11::make_tuple(out_i, out_d);
+}
+
 void init_hnsw(pybind11::module& m) {
     m.def("create_hnsw_builder", &create_hnsw_builder);
+    m.def("generic_hnsw_base_graph", &generic_hnsw_base_graph);
 }
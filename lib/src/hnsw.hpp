@@ -0,0 +1,273 @@
+#ifndef KNNCOLLE_PY_HNSW_HPP
+#define KNNCOLLE_PY_HNSW_HPP
+
+#include "knncolle_py.h"
+
+#include "sanisizer/sanisizer.hpp"
+
+#include <algorithm>
+#include <cstddef>
+#include <functional>
+#include <memory>
+#include <queue>
+#include <utility>
+#include <vector>
+
+#include "hnswlib/hnswalg.h"
+#include "knncolle_hnsw/knncolle_hnsw.hpp"
+
+/*
+ * Re-implementation of the HNSW classes from knncolle_hnsw, which keep the
+ * hnswlib index private without any accessor. The search logic mirrors
+ * upstream (including the removal of 'self' from the results), but we also
+ * need read-only access to the level-0 graph to report it as an approximate
+ * k-nearest neighbor graph without searching for each observation. This is
+ * only used for indices built with 'base_graph=True', and can be dropped once
+ * knncolle_hnsw exposes the base layer.
+ */
+
+namespace knncolle_py {
+
+typedef float HnswData;
+
+class HnswPrebuilt;
+
+class HnswSearcher final : public knncolle::Searcher<Index, MatrixValue, Distance> {
+public:
+    HnswSearcher(const HnswPrebuilt& parent);
+
+private:
+    const HnswPrebuilt& my_parent;
+    std::priority_queue<std::pair<HnswData, hnswlib::labeltype> > my_queue;
+    std::vector<HnswData> my_buffer;
+
+    void report(Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances);
+
+public:
+    void search(Index i, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances);
+
+    void search(const MatrixValue* query, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances);
+};
+
+class HnswPrebuilt final : public knncolle::Prebuilt<Index, MatrixValue, Distance> {
+public:
+    HnswPrebuilt(const Matrix& data, const knncolle_hnsw::DistanceConfig<HnswData>& config, const knncolle_hnsw::HnswOptions& options) :
+        my_dim(data.num_dimensions()),
+        my_obs(data.num_observations()),
+        my_space(config.create(my_dim)),
+        my_normalize(config.normalize),
+        my_index(my_space.get(), my_obs, options.num_links, options.ef_construction)
+    {
+        auto work = data.new_extractor();
+        std::vector<HnswData> incoming(my_dim);
+        for (Index i = 0; i < my_obs; ++i) {
+            auto ptr = work->next();
+            std::copy_n(ptr, my_dim, incoming.begin());
+            my_index.addPoint(incoming.data(), i);
+        }
+        my_index.setEf(options.ef_search);
+    }
+
+private:
+    std::size_t my_dim;
+    Index my_obs;
+
+    // The following must be a pointer for polymorphism, but also so that
+    // references to the object in my_index are still valid after copying.
+    std::shared_ptr<hnswlib::SpaceInterface<HnswData> > my_space;
+
+    std::function<HnswData(HnswData)> my_normalize;
+    hnswlib::HierarchicalNSW<HnswData> my_index;
+
+    friend class HnswSearcher;
+
+public:
+    std::size_t num_dimensions() const {
+        return my_dim;
+    }
+
+    Index num_observations() const {
+        return my_obs;
+    }
+
+    std::unique_ptr<knncolle::Searcher<Index, MatrixValue, Distance> > initialize() const {
+        return std::make_unique<HnswSearcher>(*this);
+    }
+
+public:
+    /*
+     * Report the 'k' nearest neighbors of observation 'i' from its level-0
+     * links in the HNSW graph, sorted by increasing distance. If 'refine' is
+     * true, or if there are fewer than 'k' links, the links of each linked
+     * observation are also considered as candidates. The number of reported
+     * neighbors may be less than 'k' if there are not enough candidates.
+     * 'candidates' is a workspace that can be re-used across calls.
+     */
+    void base_neighbors(
+        Index i,
+        Index k,
+        bool refine,
+        std::vector<std::pair<Distance, Index> >& candidates,
+        std::vector<Index>& output_indices,
+        std::vector<Distance>& output_distances) const
+    {
+        const auto self = my_index.label_lookup_.at(i);
+        const auto self_data = my_index.getDataByInternalId(self);
+        candidates.clear();
+
+        auto add_links = [&](hnswlib::tableint current) -> void {
+            const auto links = my_index.get_linklist0(current);
+            const auto num_links = my_index.getListCount(links);
+            const auto ids = reinterpret_cast<const hnswlib::tableint*>(links + 1);
+            for (std::size_t l = 0; l < num_links; ++l) {
+                if (ids[l] != self) {
+                    candidates.emplace_back(0, ids[l]);
+                }
+            }
+        };
+
+        add_links(self);
+        if (refine || candidates.size() < k) {
+            const auto num_direct = candidates.size();
+            for (std::size_t c = 0; c < num_direct; ++c) {
+                add_links(candidates[c].second);
+            }
+            std::sort(candidates.begin(), candidates.end(), [](const auto& left, const auto& right) -> bool { return left.second < right.second; });
+            candidates.erase(
+                std::unique(candidates.begin(), candidates.end(), [](const auto& left, const auto& right) -> bool { return left.second == right.second; }),
+                candidates.end()
+            );
+        }
+
+        for (auto& cand : candidates) {
+            HnswData dist = my_index.fstdistfunc_(self_data, my_index.getDataByInternalId(cand.second), my_index.dist_func_param_);
+            if (my_normalize) {
+                dist = my_normalize(dist);
+            }
+            cand.first = dist;
+            cand.second = my_index.getExternalLabel(cand.second);
+        }
+
+        const auto num_kept = std::min(static_cast<std::size_t>(k), candidates.size());
+        std::partial_sort(candidates.begin(), candidates.begin() + num_kept, candidates.end());
+        output_indices.clear();
+        output_distances.clear();
+        for (std::size_t n = 0; n < num_kept; ++n) {
+            output_indices.push_back(candidates[n].second);
+            output_distances.push_back(candidates[n].first);
+        }
+    }
+};
+
+inline HnswSearcher::HnswSearcher(const HnswPrebuilt& parent) : my_parent(parent), my_buffer(parent.my_dim) {}
+
+inline void HnswSearcher::report(Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+    if (output_indices) {
+        output_indices->resize(k);
+    }
+    if (output_distances) {
+        output_distances->resize(k);
+    }
+
+    auto position = k;
+    while (!my_queue.empty()) {
+        const auto& top = my_queue.top();
+        --position;
+        if (output_indices) {
+            (*output_indices)[position] = top.second;
+        }
+        if (output_distances) {
+            (*output_distances)[position] = top.first;
+        }
+        my_queue.pop();
+    }
+
+    if (output_distances && my_parent.my_normalize) {
+        for (auto& d : *output_distances) {
+            d = my_parent.my_normalize(d);
+        }
+    }
+}
+
+inline void HnswSearcher::search(Index i, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+    my_buffer = my_parent.my_index.template getDataByLabel<HnswData>(i);
+    const Index kp1 = std::min(k + 1, my_parent.my_obs); // +1, as hnswlib does not discard 'self'.
+    my_queue = my_parent.my_index.searchKnn(my_buffer.data(), kp1);
+
+    if (output_indices) {
+        output_indices->clear();
+        output_indices->reserve(kp1);
+    }
+    if (output_distances) {
+        output_distances->clear();
+        output_distances->reserve(kp1);
+    }
+
+    // Labels are always available from the queue, so 'self' is identified by
+    // its label even if only the distances are requested.
+    bool self_found = false;
+    const hnswlib::labeltype icopy = i;
+    while (!my_queue.empty()) {
+        const auto& top = my_queue.top();
+        if (!self_found && top.second == icopy) {
+            self_found = true;
+        } else {
+            if (output_indices) {
+                output_indices->push_back(top.second);
+            }
+            if (output_distances) {
+                output_distances->push_back(top.first);
+            }
+        }
+        my_queue.pop();
+    }
+
+    if (output_indices) {
+        std::reverse(output_indices->begin(), output_indices->end());
+    }
+    if (output_distances) {
+        std::reverse(output_distances->begin(), output_distances->end());
+    }
+
+    // If 'self' is not present, e.g., due to ties at duplicate points, we
+    // remove the furthest neighbor instead.
+    if (!self_found) {
+        if (output_indices && output_indices->size() > k) {
+            output_indices->pop_back();
+        }
+        if (output_distances && output_distances->size() > k) {
+            output_distances->pop_back();
+        }
+    }
+
+    if (output_distances && my_parent.my_normalize) {
+        for (auto& d : *output_distances) {
+            d = my_parent.my_normalize(d);
+        }
+    }
+}
+
+inline void HnswSearcher::search(const MatrixValue* query, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+    k = std::min(k, my_parent.my_obs);
+    std::copy_n(query, my_parent.my_dim, my_buffer.begin());
+    my_queue = my_parent.my_index.searchKnn(my_buffer.data(), k);
+    report(my_queue.size(), output_indices, output_distances);
+}
+
+class HnswBuilder final : public knncolle::Builder<Index, MatrixValue, Distance> {
+public:
+    HnswBuilder(knncolle_hnsw::DistanceConfig<HnswData> config, knncolle_hnsw::HnswOptions options) : my_config(std::move(config)), my_options(std::move(options)) {}
+
+private:
+    knncolle_hnsw::DistanceConfig<HnswData> my_config;
+    knncolle_hnsw::HnswOptions my_options;
+
+public:
+    knncolle::Prebuilt<Index, MatrixValue, Distance>* build_raw(const Matrix& data) const {
+        return new HnswPrebuilt(data, my_config, my_options);
+    }
+};
+
+}
+
+#endif
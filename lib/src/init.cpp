@@ -5,15 +5,29 @@
 void init_annoy(pybind11::module&);
 void init_exhaustive(pybind11::module&);
 void init_generics(pybind11::module&);
+void init_graph(pybind11::module&);
 void init_hnsw(pybind11::module&);
+void init_kdtree(pybind11::module&);
 void init_kmknn(pybind11::module&);
+void init_many(pybind11::module&);
+void init_mnn(pybind11::module&);
+void init_nndescent(pybind11::module&);
+void init_permuted(pybind11::module&);
+void init_thread_pool(pybind11::module&);
 void init_vptree(pybind11::module&);
 
 PYBIND11_MODULE(_lib_knncolle, m) {
     init_annoy(m);
     init_exhaustive(m);
     init_generics(m);
+    init_graph(m);
     init_hnsw(m);
+    init_kdtree(m);
     init_kmknn(m);
+    init_many(m);
+    init_mnn(m);
+    init_nndescent(m);
+    init_permuted(m);
+    init_thread_pool(m);
     init_vptree(m);
 }
@@ -0,0 +1,274 @@
+#ifndef KNNCOLLE_PY_INNER_PRODUCT_HPP
+#define KNNCOLLE_PY_INNER_PRODUCT_HPP
+
+#include "knncolle_py.h"
+#include "approximate_range.hpp"
+#include "borrowed.hpp"
+
+#include "sanisizer/sanisizer.hpp"
+
+#include <algorithm>
+#include <cmath>
+#include <cstddef>
+#include <limits>
+#include <memory>
+#include <utility>
+#include <vector>
+
+/*
+ * Maximum inner product search (MIPS) via reduction to a nearest-neighbor
+ * search in Euclidean space. Each observation 'x' is augmented with an extra
+ * dimension 'sqrt(M^2 - |x|^2)', where 'M' is the largest norm of all
+ * observations, while each query 'q' is augmented with a zero. The squared
+ * distance between the augmented vectors is then 'M^2 + |q|^2 - 2 q.x', so
+ * the nearest neighbors of the query are those with the largest inner
+ * products. This allows any algorithm for Euclidean distances to be used.
+ *
+ * The "distances" reported by these classes are the inner products, sorted
+ * in decreasing order. These are computed exactly from the stored data so
+ * that they are not affected by any loss of precision in the augmented space.
+ * This also means that the inner search does not need its own copy of the
+ * data for refinement; we just retrieve 'k * refine_factor' candidates and
+ * keep the 'k' with the largest inner products.
+ */
+
+namespace knncolle_py {
+
+inline void clear_outputs(std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+    if (output_indices) {
+        output_indices->clear();
+    }
+    if (output_distances) {
+        output_distances->clear();
+    }
+}
+
+class InnerProductPrebuilt;
+
+class InnerProductSearcher final : public knncolle::Searcher<Index, MatrixValue, Distance> {
+public:
+    InnerProductSearcher(std::unique_ptr<knncolle::Searcher<Index, MatrixValue, Distance> > inner, const InnerProductPrebuilt& parent);
+
+private:
+    std::unique_ptr<knncolle::Searcher<Index, MatrixValue, Distance> > my_inner;
+    const InnerProductPrebuilt& my_parent;
+    std::vector<MatrixValue> my_buffer;
+    std::vector<Index> my_indices;
+    std::vector<std::pair<Distance, Index> > my_scores;
+
+private:
+    const MatrixValue* augment(const MatrixValue* query);
+
+    void remove_self(Index i);
+
+    // Number of candidates to retrieve from the inner search for 'k' neighbors, given the refinement factor for the current thread.
+    static Index num_candidates(Index k, Index max_k) {
+        return (max_k / refine_factor < k ? max_k : k * refine_factor);
+    }
+
+    // Computes the exact inner products for 'my_indices' and reports them in decreasing order,
+    // ignoring any neighbors with inner products below 'min_score' and keeping at most 'limit' neighbors.
+    Index report(
+        const MatrixValue* query,
+        std::vector<Index>* output_indices,
+        std::vector<Distance>* output_distances,
+        Distance min_score = -std::numeric_limits<Distance>::infinity(),
+        Index limit = std::numeric_limits<Index>::max());
+
+    // Squared radius in the augmented space that corresponds to a minimum inner product of 'threshold'.
+    Distance radius(const MatrixValue* query, Distance threshold) const;
+
+public:
+    void search(Index i, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances);
+
+    void search(const MatrixValue* query, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances);
+
+    bool can_search_all() const {
+        return my_inner->can_search_all();
+    }
+
+    Index search_all(Index i, Distance threshold, std::vector<Index>* output_indices, std::vector<Distance>* output_distances);
+
+    Index search_all(const MatrixValue* query, Distance threshold, std::vector<Index>* output_indices, std::vector<Distance>* output_distances);
+};
+
+class InnerProductPrebuilt final : public knncolle::Prebuilt<Index, MatrixValue, Distance> {
+public:
+    InnerProductPrebuilt(std::size_t num_dim, Index num_obs, std::vector<MatrixValue> augmented, Distance max_norm2) :
+        my_dim(num_dim), my_obs(num_obs), my_augmented(std::move(augmented)), my_max_norm2(max_norm2) {}
+
+private:
+    std::size_t my_dim;
+    Index my_obs;
+    std::vector<MatrixValue> my_augmented; // row-major, with 'my_dim + 1' values per observation.
+    Distance my_max_norm2;
+    std::unique_ptr<knncolle::Prebuilt<Index, MatrixValue, Distance> > my_inner;
+
+    friend class InnerProductSearcher;
+    friend class InnerProductBuilder;
+
+public:
+    Index num_observations() const {
+        return my_obs;
+    }
+
+    std::size_t num_dimensions() const {
+        return my_dim;
+    }
+
+    std::unique_ptr<knncolle::Searcher<Index, MatrixValue, Distance> > initialize() const {
+        return std::make_unique<InnerProductSearcher>(my_inner->initialize(), *this);
+    }
+
+private:
+    const MatrixValue* observation(Index i) const {
+        return my_augmented.data() + sanisizer::product_unsafe<std::size_t>(i, my_dim + 1);
+    }
+};
+
+/*
+ * Builder for the inner product, which wraps a 'inner' builder for the
+ * Euclidean distance.
+ */
+class InnerProductBuilder final : public knncolle::Builder<Index, MatrixValue, Distance> {
+public:
+    InnerProductBuilder(std::shared_ptr<const knncolle::Builder<Index, MatrixValue, Distance> > inner) : my_inner(std::move(inner)) {}
+
+private:
+    std::shared_ptr<const knncolle::Builder<Index, MatrixValue, Distance> > my_inner;
+
+public:
+    knncolle::Prebuilt<Index, MatrixValue, Distance>* build_raw(const Matrix& data) const {
+        const auto ndim = data.num_dimensions();
+        const auto nobs = data.num_observations();
+        const auto stride = sanisizer::sum<std::size_t>(ndim, 1);
+        std::vector<MatrixValue> augmented(sanisizer::product<std::size_t>(nobs, stride));
+
+        Distance max_norm2 = 0;
+        auto extractor = data.new_extractor();
+        for (Index i = 0; i < nobs; ++i) {
+            auto src = extractor->next();
+            auto dest = augmented.data() + sanisizer::product_unsafe<std::size_t>(i, stride);
+            Distance norm2 = 0;
+            for (std::size_t d = 0; d < ndim; ++d) {
+                dest[d] = src[d];
+                norm2 += static_cast<Distance>(src[d]) * static_cast<Distance>(src[d]);
+            }
+            dest[ndim] = norm2; // temporarily storing the squared norm.
+            max_norm2 = std::max(max_norm2, norm2);
+        }
+
+        for (Index i = 0; i < nobs; ++i) {
+            auto& extra = augmented[sanisizer::product_unsafe<std::size_t>(i, stride) + ndim];
+            extra = std::sqrt(std::max(static_cast<Distance>(0), max_norm2 - extra));
+        }
+
+        auto output = std::make_unique<InnerProductPrebuilt>(ndim, nobs, std::move(augmented), max_norm2);
+        if (dynamic_cast<const Borrowable*>(my_inner.get()) != NULL) {
+            // The inner index can reference the augmented data directly, instead of storing a second copy.
+            output->my_inner = build_borrowed_inner(*my_inner, stride, nobs, output->my_augmented.data());
+        } else {
+            output->my_inner.reset(my_inner->build_raw(knncolle::SimpleMatrix<Index, MatrixValue>(stride, nobs, output->my_augmented.data())));
+        }
+        return output.release();
+    }
+};
+
+inline InnerProductSearcher::InnerProductSearcher(std::unique_ptr<knncolle::Searcher<Index, MatrixValue, Distance> > inner, const InnerProductPrebuilt& parent) :
+    my_inner(std::move(inner)), my_parent(parent), my_buffer(sanisizer::sum<std::size_t>(parent.my_dim, 1)) {}
+
+inline const MatrixValue* InnerProductSearcher::augment(const MatrixValue* query) {
+    const auto ndim = my_parent.my_dim;
+    std::copy_n(query, ndim, my_buffer.begin());
+    my_buffer[ndim] = 0;
+    return my_buffer.data();
+}
+
+inline void InnerProductSearcher::remove_self(Index i) {
+    auto it = std::find(my_indices.begin(), my_indices.end(), i);
+    if (it != my_indices.end()) {
+        my_indices.erase(it);
+    }
+}
+
+inline Index InnerProductSearcher::report(const MatrixValue* query, std::vector<Index>* output_indices, std::vector<Distance>* output_distances, Distance min_score, Index limit) {
+    const auto ndim = my_parent.my_dim;
+    my_scores.clear();
+    for (auto x : my_indices) {
+        const auto obs = my_parent.observation(x);
+        Distance score = 0;
+        for (std::size_t d = 0; d < ndim; ++d) {
+            score += static_cast<Distance>(query[d]) * static_cast<Distance>(obs[d]);
+        }
+        if (score >= min_score) {
+            my_scores.emplace_back(score, x);
+        }
+    }
+    std::stable_sort(my_scores.begin(), my_scores.end(), [](const auto& l, const auto& r) -> bool { return l.first > r.first; });
+    if (my_scores.size() > limit) {
+        my_scores.resize(limit);
+    }
+
+    if (output_indices) {
+        output_indices->clear();
+        for (const auto& s : my_scores) {
+            output_indices->push_back(s.second);
+        }
+    }
+    if (output_distances) {
+        output_distances->clear();
+        for (const auto& s : my_scores) {
+            output_distances->push_back(s.first);
+        }
+    }
+    return my_scores.size();
+}
+
+inline Distance InnerProductSearcher::radius(const MatrixValue* query, Distance threshold) const {
+    const auto ndim = my_parent.my_dim;
+    Distance norm2 = 0;
+    for (std::size_t d = 0; d < ndim; ++d) {
+        norm2 += static_cast<Distance>(query[d]) * static_cast<Distance>(query[d]);
+    }
+    return norm2 + my_parent.my_max_norm2 - 2 * threshold;
+}
+
+inline void InnerProductSearcher::search(Index i, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+    // Searching for an extra neighbor as 'i' is not guaranteed to be its own nearest neighbor in the augmented space.
+    const auto query = my_parent.observation(i);
+    const Index extra = num_candidates(k, my_parent.my_obs - 1) + 1;
+    my_inner->search(augment(query), extra, &my_indices, NULL);
+    remove_self(i);
+    report(query, output_indices, output_distances, -std::numeric_limits<Distance>::infinity(), k);
+}
+
+inline void InnerProductSearcher::search(const MatrixValue* query, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+    my_inner->search(augment(query), num_candidates(k, my_parent.my_obs), &my_indices, NULL);
+    report(query, output_indices, output_distances, -std::numeric_limits<Distance>::infinity(), k);
+}
+
+inline Index InnerProductSearcher::search_all(Index i, Distance threshold, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+    const auto query = my_parent.observation(i);
+    const auto r2 = radius(query, threshold);
+    if (r2 < 0) {
+        clear_outputs(output_indices, output_distances);
+        return 0;
+    }
+    my_inner->search_all(augment(query), std::sqrt(r2), &my_indices, NULL);
+    remove_self(i);
+    return report(query, output_indices, output_distances, threshold);
+}
+
+inline Index InnerProductSearcher::search_all(const MatrixValue* query, Distance threshold, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+    const auto r2 = radius(query, threshold);
+    if (r2 < 0) {
+        clear_outputs(output_indices, output_distances);
+        return 0;
+    }
+    my_inner->search_all(augment(query), std::sqrt(r2), &my_indices, NULL);
+    return report(query, output_indices, output_distances, threshold);
+}
+
+}
+
+#endif
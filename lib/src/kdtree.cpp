@@ -0,0 +1,682 @@
+#include "knncolle_py.h"
+#include "parallel.hpp"
+#include "dual_tree.hpp"
+#include "cosine.hpp"
+#include "inner_product.hpp"
+#include "pybind11/pybind11.h"
+
+#include "sanisizer/sanisizer.hpp"
+
+#include <algorithm>
+#include <cmath>
+#include <cstddef>
+#include <cstdint>
+#include <limits>
+#include <memory>
+#include <optional>
+#include <stdexcept>
+#include <string>
+#include <utility>
+#include <vector>
+
+/*
+ * k-d tree for exact searches in low-dimensional data. Each internal node
+ * splits its observations at the median of the dimension with the largest
+ * spread, and each leaf contains up to 'leaf_size' observations. The data is
+ * stored in tree order so that each leaf is contiguous in memory.
+ *
+ * The search uses the incremental distance calculation of Arya and Mount
+ * (1993), where the lower bound on the distance from the query to a cell is
+ * updated from that of its parent by replacing the contribution of the split
+ * dimension. This requires distances that are sums of per-dimension terms,
+ * which is true for the raw Euclidean (i.e., squared) and Manhattan distances.
+ *
+ * Neighbors of all observations in the index can also be found with a
+ * dual-tree traversal (Gray and Moore, 2001; Curtin et al., 2013), where the
+ * tree is used to partition both the queries and the reference observations.
+ * Pairs of query and reference nodes are pruned if the distance between their
+ * bounding boxes exceeds the largest k-th neighbor distance of the queries,
+ * so the pruning work is shared across all queries in the same node.
+ */
+
+namespace knncolle_py {
+
+struct KdtreeEuclidean {
+    static Distance term(Distance diff) {
+        return diff * diff;
+    }
+
+    static Distance normalize(Distance raw) {
+        return std::sqrt(raw);
+    }
+
+    static Distance denormalize(Distance norm) {
+        return norm * norm;
+    }
+};
+
+struct KdtreeManhattan {
+    static Distance term(Distance diff) {
+        return std::abs(diff);
+    }
+
+    static Distance normalize(Distance raw) {
+        return raw;
+    }
+
+    static Distance denormalize(Distance norm) {
+        return norm;
+    }
+};
+
+template<class Metric_>
+class KdtreePrebuilt;
+
+template<class Metric_>
+class KdtreeSearcher final : public knncolle::Searcher<Index, MatrixValue, Distance> {
+public:
+    KdtreeSearcher(const KdtreePrebuilt<Metric_>& parent) : my_parent(parent), my_offsets(parent.my_dim) {}
+
+private:
+    const KdtreePrebuilt<Metric_>& my_parent;
+    std::vector<Distance> my_offsets;
+    knncolle::NeighborQueue<Index, Distance> my_nearest;
+    std::vector<std::pair<Distance, Index> > my_all_neighbors;
+
+    void normalize(std::vector<Distance>* output_distances) const {
+        if (output_distances) {
+            for (auto& d : *output_distances) {
+                d = Metric_::normalize(d);
+            }
+        }
+    }
+
+    void search_nn(const MatrixValue* query) {
+        std::fill(my_offsets.begin(), my_offsets.end(), 0);
+        Distance max_raw = std::numeric_limits<Distance>::infinity();
+        my_parent.search_nn(0, query, 0, my_offsets, max_raw, my_nearest);
+    }
+
+    template<bool count_only_, typename Output_>
+    void search_all(const MatrixValue* query, Distance threshold, Output_& all_neighbors) {
+        std::fill(my_offsets.begin(), my_offsets.end(), 0);
+        my_parent.template search_all<count_only_>(0, query, 0, my_offsets, Metric_::denormalize(threshold), all_neighbors);
+    }
+
+public:
+    void search(Index i, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+        my_nearest.reset(k + 1);
+        search_nn(my_parent.observation(i));
+        my_nearest.report(output_indices, output_distances, i);
+        normalize(output_distances);
+    }
+
+    void search(const MatrixValue* query, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+        if (k == 0 || my_parent.my_nodes.empty()) { // protect the NeighborQueue from k = 0.
+            if (output_indices) {
+                output_indices->clear();
+            }
+            if (output_distances) {
+                output_distances->clear();
+            }
+            return;
+        }
+        my_nearest.reset(k);
+        search_nn(query);
+        my_nearest.report(output_indices, output_distances);
+        normalize(output_distances);
+    }
+
+    bool can_search_all() const {
+        return true;
+    }
+
+    Index search_all(Index i, Distance d, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+        auto iptr = my_parent.observation(i);
+        if (!output_indices && !output_distances) {
+            Index count = 0;
+            search_all<true>(iptr, d, count);
+            return knncolle::count_all_neighbors_without_self(count);
+        }
+
+        my_all_neighbors.clear();
+        search_all<false>(iptr, d, my_all_neighbors);
+        knncolle::report_all_neighbors(my_all_neighbors, output_indices, output_distances, i);
+        normalize(output_distances);
+        return knncolle::count_all_neighbors_without_self(my_all_neighbors.size());
+    }
+
+    Index search_all(const MatrixValue* query, Distance d, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+        my_all_neighbors.clear();
+        if (my_parent.my_nodes.empty()) {
+            knncolle::report_all_neighbors(my_all_neighbors, output_indices, output_distances);
+            return 0;
+        }
+
+        if (!output_indices && !output_distances) {
+            Index count = 0;
+            search_all<true>(query, d, count);
+            return count;
+        }
+
+        search_all<false>(query, d, my_all_neighbors);
+        knncolle::report_all_neighbors(my_all_neighbors, output_indices, output_distances);
+        normalize(output_distances);
+        return my_all_neighbors.size();
+    }
+};
+
+template<class Metric_>
+class KdtreePrebuilt final : public knncolle::Prebuilt<Index, MatrixValue, Distance>, public DualTreeSearchable {
+public:
+    KdtreePrebuilt(const Matrix& data, Index leaf_size) : my_dim(data.num_dimensions()), my_obs(data.num_observations()), my_leaf_size(std::max(leaf_size, static_cast<Index>(1))) {
+        if (my_obs == 0) {
+            return;
+        }
+
+        std::vector<MatrixValue> original(sanisizer::product<std::size_t>(my_obs, my_dim));
+        auto work = data.new_extractor();
+        for (Index o = 0; o < my_obs; ++o) {
+            std::copy_n(work->next(), my_dim, original.data() + static_cast<std::size_t>(o) * my_dim);
+        }
+
+        my_ids.resize(my_obs);
+        for (Index o = 0; o < my_obs; ++o) {
+            my_ids[o] = o;
+        }
+        build(0, my_obs, original);
+
+        // Storing the data in tree order.
+        my_data.resize(original.size());
+        my_positions.resize(my_obs);
+        for (Index p = 0; p < my_obs; ++p) {
+            const auto o = my_ids[p];
+            std::copy_n(original.data() + static_cast<std::size_t>(o) * my_dim, my_dim, my_data.data() + static_cast<std::size_t>(p) * my_dim);
+            my_positions[o] = p;
+        }
+    }
+
+private:
+    std::size_t my_dim;
+    Index my_obs;
+    Index my_leaf_size;
+
+    std::vector<MatrixValue> my_data; // row-major, in tree order.
+    std::vector<Index> my_ids; // original index of each observation in tree order.
+    std::vector<Index> my_positions; // position of each original observation in tree order.
+
+    static constexpr Index LEAF = 0;
+
+    struct Node {
+        std::size_t split_dim = 0;
+        MatrixValue split_value = 0;
+        Index left = LEAF;
+        Index right = LEAF;
+        Index start = 0;
+        Index end = 0;
+    };
+    std::vector<Node> my_nodes;
+
+    friend class KdtreeSearcher<Metric_>;
+
+    const MatrixValue* observation(Index i) const {
+        return my_data.data() + static_cast<std::size_t>(my_positions[i]) * my_dim; // cast to avoid overflow.
+    }
+
+    Index build(Index start, Index end, const std::vector<MatrixValue>& original) {
+        const Index pos = my_nodes.size();
+        my_nodes.emplace_back();
+        my_nodes[pos].start = start;
+        my_nodes[pos].end = end;
+        if (end - start <= my_leaf_size) {
+            return pos;
+        }
+
+        // Splitting on the dimension with the largest spread.
+        std::size_t best_dim = 0;
+        MatrixValue best_spread = -1;
+        for (std::size_t d = 0; d < my_dim; ++d) {
+            auto lower = std::numeric_limits<MatrixValue>::infinity(), upper = -lower;
+            for (Index s = start; s < end; ++s) {
+                const auto val = original[static_cast<std::size_t>(my_ids[s]) * my_dim + d];
+                lower = std::min(lower, val);
+                upper = std::max(upper, val);
+            }
+            if (upper - lower > best_spread) {
+                best_spread = upper - lower;
+                best_dim = d;
+            }
+        }
+
+        const Index median = start + (end - start) / 2;
+        auto value_of = [&](Index o) -> MatrixValue { return original[static_cast<std::size_t>(o) * my_dim + best_dim]; };
+        std::nth_element(my_ids.begin() + start, my_ids.begin() + median, my_ids.begin() + end, [&](Index left, Index right) -> bool {
+            return value_of(left) < value_of(right);
+        });
+
+        // Don't hold a reference to the node, as recursion may reallocate 'my_nodes'.
+        my_nodes[pos].split_dim = best_dim;
+        my_nodes[pos].split_value = value_of(my_ids[median]);
+        const auto left = build(start, median, original);
+        my_nodes[pos].left = left;
+        const auto right = build(median, end, original);
+        my_nodes[pos].right = right;
+        return pos;
+    }
+
+    Distance raw_distance(const MatrixValue* query, Index p) const {
+        auto ptr = my_data.data() + static_cast<std::size_t>(p) * my_dim;
+        Distance output = 0;
+        for (std::size_t d = 0; d < my_dim; ++d) {
+            output += Metric_::term(static_cast<Distance>(query[d]) - ptr[d]);
+        }
+        return output;
+    }
+
+    void search_nn(Index curnode_index, const MatrixValue* query, Distance bound, std::vector<Distance>& offsets, Distance& max_raw, knncolle::NeighborQueue<Index, Distance>& nearest) const {
+        const auto& curnode = my_nodes[curnode_index];
+        if (curnode.left == LEAF) {
+            for (Index p = curnode.start; p < curnode.end; ++p) {
+                const auto dist = raw_distance(query, p);
+                if (dist <= max_raw) {
+                    nearest.add(my_ids[p], dist);
+                    if (nearest.is_full()) {
+                        max_raw = nearest.limit();
+                    }
+                }
+            }
+            return;
+        }
+
+        const auto d = curnode.split_dim;
+        const Distance diff = static_cast<Distance>(query[d]) - curnode.split_value;
+        const auto near = (diff < 0 ? curnode.left : curnode.right);
+        const auto far = (diff < 0 ? curnode.right : curnode.left);
+        search_nn(near, query, bound, offsets, max_raw, nearest);
+
+        const auto old_offset = offsets[d];
+        const Distance far_bound = bound - Metric_::term(old_offset) + Metric_::term(diff);
+        if (far_bound <= max_raw) {
+            offsets[d] = diff;
+            search_nn(far, query, far_bound, offsets, max_raw, nearest);
+            offsets[d] = old_offset;
+        }
+    }
+
+    template<bool count_only_, typename Output_>
+    void search_all(Index curnode_index, const MatrixValue* query, Distance bound, std::vector<Distance>& offsets, Distance threshold_raw, Output_& all_neighbors) const {
+        const auto& curnode = my_nodes[curnode_index];
+        if (curnode.left == LEAF) {
+            for (Index p = curnode.start; p < curnode.end; ++p) {
+                const auto dist = raw_distance(query, p);
+                if (dist <= threshold_raw) {
+                    if constexpr(count_only_) {
+                        ++all_neighbors;
+                    } else {
+                        all_neighbors.emplace_back(dist, my_ids[p]);
+                    }
+                }
+            }
+            return;
+        }
+
+        const auto d = curnode.split_dim;
+        const Distance diff = static_cast<Distance>(query[d]) - curnode.split_value;
+        const auto near = (diff < 0 ? curnode.left : curnode.right);
+        const auto far = (diff < 0 ? curnode.right : curnode.left);
+        search_all<count_only_>(near, query, bound, offsets, threshold_raw, all_neighbors);
+
+        const auto old_offset = offsets[d];
+        const Distance far_bound = bound - Metric_::term(old_offset) + Metric_::term(diff);
+        if (far_bound <= threshold_raw) {
+            offsets[d] = diff;
+            search_all<count_only_>(far, query, far_bound, offsets, threshold_raw, all_neighbors);
+            offsets[d] = old_offset;
+        }
+    }
+
+    /*****************************
+     ******** Dual-tree **********
+     *****************************/
+
+    // Bounding boxes for all nodes, as 'my_dim' lower bounds followed by 'my_dim' upper bounds.
+    std::vector<MatrixValue> compute_boxes() const {
+        const auto stride = sanisizer::product<std::size_t>(my_dim, 2);
+        std::vector<MatrixValue> boxes(sanisizer::product<std::size_t>(my_nodes.size(), stride));
+
+        // Children always come after their parents in 'my_nodes', so we can fill the boxes in reverse order.
+        for (Index n = my_nodes.size(); n > 0; --n) {
+            const auto& curnode = my_nodes[n - 1];
+            auto lower = boxes.data() + static_cast<std::size_t>(n - 1) * stride;
+            auto upper = lower + my_dim;
+
+            if (curnode.left == LEAF) {
+                std::fill_n(lower, my_dim, std::numeric_limits<MatrixValue>::infinity());
+                std::fill_n(upper, my_dim, -std::numeric_limits<MatrixValue>::infinity());
+                for (Index p = curnode.start; p < curnode.end; ++p) {
+                    auto ptr = my_data.data() + static_cast<std::size_t>(p) * my_dim;
+                    for (std::size_t d = 0; d < my_dim; ++d) {
+                        lower[d] = std::min(lower[d], ptr[d]);
+                        upper[d] = std::max(upper[d], ptr[d]);
+                    }
+                }
+            } else {
+                auto left_lower = boxes.data() + static_cast<std::size_t>(curnode.left) * stride;
+                auto right_lower = boxes.data() + static_cast<std::size_t>(curnode.right) * stride;
+                for (std::size_t d = 0; d < my_dim; ++d) {
+                    lower[d] = std::min(left_lower[d], right_lower[d]);
+                    upper[d] = std::max(left_lower[d + my_dim], right_lower[d + my_dim]);
+                }
+            }
+        }
+
+        return boxes;
+    }
+
+    Distance box_distance(const std::vector<MatrixValue>& boxes, Index left, Index right) const {
+        const auto stride = my_dim * 2;
+        auto left_lower = boxes.data() + static_cast<std::size_t>(left) * stride;
+        auto right_lower = boxes.data() + static_cast<std::size_t>(right) * stride;
+        Distance output = 0;
+        for (std::size_t d = 0; d < my_dim; ++d) {
+            const Distance gap = std::max<Distance>({ 0, left_lower[d] - right_lower[d + my_dim], right_lower[d] - left_lower[d + my_dim] });
+            output += Metric_::term(gap);
+        }
+        return output;
+    }
+
+    Distance point_box_distance(const std::vector<MatrixValue>& boxes, Index p, Index node) const {
+        auto ptr = my_data.data() + static_cast<std::size_t>(p) * my_dim;
+        auto lower = boxes.data() + static_cast<std::size_t>(node) * my_dim * 2;
+        auto upper = lower + my_dim;
+        Distance output = 0;
+        for (std::size_t d = 0; d < my_dim; ++d) {
+            const Distance gap = std::max<Distance>({ 0, lower[d] - ptr[d], ptr[d] - upper[d] });
+            output += Metric_::term(gap);
+        }
+        return output;
+    }
+
+    /*
+     * Process all pairs of observations between the 'query' and 'reference'
+     * nodes, given the (raw) distance between their bounding boxes. Pairs are
+     * pruned if this exceeds the bound for the query node, i.e., the largest
+     * distance at which a neighbor could still be found for any of its
+     * observations. 'leaf(query, reference)' processes a pair of leaf nodes
+     * and returns the new bound for the query node.
+     */
+    template<class Leaf_>
+    void dual_traverse(Index query, Index reference, Distance box_dist, const std::vector<MatrixValue>& boxes, std::vector<Distance>& bounds, Leaf_& leaf) const {
+        if (box_dist > bounds[query]) {
+            return;
+        }
+
+        const auto& qnode = my_nodes[query];
+        const auto& rnode = my_nodes[reference];
+        const bool query_leaf = (qnode.left == LEAF);
+        const bool reference_leaf = (rnode.left == LEAF);
+        if (query_leaf && reference_leaf) {
+            bounds[query] = leaf(query, reference);
+            return;
+        }
+
+        // Splitting the larger node, and visiting the closer reference child first for faster tightening of the bounds.
+        if (query_leaf || (!reference_leaf && rnode.end - rnode.start > qnode.end - qnode.start)) {
+            const auto left_dist = box_distance(boxes, query, rnode.left);
+            const auto right_dist = box_distance(boxes, query, rnode.right);
+            if (left_dist <= right_dist) {
+                dual_traverse(query, rnode.left, left_dist, boxes, bounds, leaf);
+                dual_traverse(query, rnode.right, right_dist, boxes, bounds, leaf);
+            } else {
+                dual_traverse(query, rnode.right, right_dist, boxes, bounds, leaf);
+                dual_traverse(query, rnode.left, left_dist, boxes, bounds, leaf);
+            }
+        } else {
+            dual_traverse(qnode.left, reference, box_distance(boxes, qnode.left, reference), boxes, bounds, leaf);
+            dual_traverse(qnode.right, reference, box_distance(boxes, qnode.right, reference), boxes, bounds, leaf);
+            bounds[query] = std::max(bounds[qnode.left], bounds[qnode.right]);
+        }
+    }
+
+    /*
+     * Assign a workspace slot to each requested observation, indexed by its
+     * position in tree order, so that workspaces are only allocated for the
+     * requested observations. Unrequested positions are assigned 'my_obs'.
+     * Returns the number of requested observations.
+     */
+    Index assign_slots(const unsigned char* requested, std::vector<Index>& slots) const {
+        slots.resize(my_obs);
+        Index num_requested = 0;
+        for (Index p = 0; p < my_obs; ++p) {
+            if (requested == NULL || requested[my_ids[p]]) {
+                slots[p] = num_requested;
+                ++num_requested;
+            } else {
+                slots[p] = my_obs;
+            }
+        }
+        return num_requested;
+    }
+
+    /*
+     * Run the dual-tree traversal for each query subtree in parallel, where
+     * 'create_leaf()' creates a thread-specific leaf processing function and
+     * 'finish(start, end)' reports the results for the observations in a
+     * range of positions after its subtree has been traversed. Query nodes
+     * without any requested observations (as defined by 'slots') start with a
+     * bound of -Inf so that they are immediately pruned.
+     */
+    template<class CreateLeaf_, class Finish_>
+    void dual_run(Distance initial_bound, const std::vector<Index>& slots, int num_threads, const std::optional<std::uintptr_t>& pool, CreateLeaf_ create_leaf, Finish_ finish) const {
+        if (my_nodes.empty()) {
+            return;
+        }
+
+        const auto boxes = compute_boxes();
+        std::vector<Distance> bounds(my_nodes.size());
+        std::vector<unsigned char> active(my_nodes.size());
+        for (Index n = my_nodes.size(); n > 0; --n) {
+            const auto& curnode = my_nodes[n - 1];
+            if (curnode.left == LEAF) {
+                active[n - 1] = std::any_of(slots.begin() + curnode.start, slots.begin() + curnode.end, [&](Index s) -> bool { return s != my_obs; });
+            } else {
+                active[n - 1] = (active[curnode.left] || active[curnode.right]);
+            }
+            bounds[n - 1] = (active[n - 1] ? initial_bound : -std::numeric_limits<Distance>::infinity());
+        }
+
+        // Splitting the tree into enough subtrees of queries to keep all threads busy.
+        // Each thread only modifies the bounds for nodes in its own subtrees, so no synchronization is required.
+        const auto num_workers = (pool.has_value() ? static_cast<int>(cast_thread_pool(*pool)->size()) : num_threads);
+        std::vector<Index> tasks{ 0 };
+        while (num_workers > 1 && tasks.size() < static_cast<std::size_t>(num_workers) * 4) {
+            std::vector<Index> next;
+            for (auto t : tasks) {
+                const auto& curnode = my_nodes[t];
+                if (curnode.left == LEAF) {
+                    next.push_back(t);
+                } else {
+                    next.push_back(curnode.left);
+                    next.push_back(curnode.right);
+                }
+            }
+            if (next.size() == tasks.size()) {
+                break;
+            }
+            tasks.swap(next);
+        }
+
+        parallel_tasks(num_threads, pool, tasks.size(), [&](Index start, Index length) -> void {
+            auto leaf = create_leaf(boxes);
+            for (Index t = start, end = start + length; t < end; ++t) {
+                const auto query = tasks[t];
+                dual_traverse(query, 0, box_distance(boxes, query, 0), boxes, bounds, leaf);
+                finish(my_nodes[query].start, my_nodes[query].end);
+            }
+        });
+    }
+
+    void normalize(std::vector<Distance>& distances) const {
+        for (auto& d : distances) {
+            d = Metric_::normalize(d);
+        }
+    }
+
+public:
+    void dual_tree_knn(Index k, const unsigned char* requested, int num_threads, const std::optional<std::uintptr_t>& pool, const Report& report) const {
+        std::vector<Index> slots;
+        const auto num_requested = assign_slots(requested, slots);
+
+        // Searching for an extra neighbor as each observation will also find itself.
+        std::vector<knncolle::NeighborQueue<Index, Distance> > nearest(num_requested);
+        for (auto& current : nearest) {
+            current.reset(k + 1);
+        }
+
+        auto create_leaf = [&](const std::vector<MatrixValue>& boxes) {
+            return [&](Index query, Index reference) -> Distance {
+                const auto& qnode = my_nodes[query];
+                const auto& rnode = my_nodes[reference];
+                Distance bound = -std::numeric_limits<Distance>::infinity();
+                for (Index p = qnode.start; p < qnode.end; ++p) {
+                    if (slots[p] == my_obs) {
+                        continue;
+                    }
+                    auto& current = nearest[slots[p]];
+                    auto max_raw = (current.is_full() ? current.limit() : std::numeric_limits<Distance>::infinity());
+                    if (point_box_distance(boxes, p, reference) <= max_raw) {
+                        const auto ptr = my_data.data() + static_cast<std::size_t>(p) * my_dim;
+                        for (Index r = rnode.start; r < rnode.end; ++r) {
+                            const auto dist = raw_distance(ptr, r);
+                            if (dist <= max_raw) {
+                                current.add(my_ids[r], dist);
+                                if (current.is_full()) {
+                                    max_raw = current.limit();
+                                }
+                            }
+                        }
+                    }
+                    bound = std::max(bound, max_raw);
+                }
+                return bound;
+            };
+        };
+
+        auto finish = [&](Index start, Index end) -> void {
+            std::vector<Index> tmp_i;
+            std::vector<Distance> tmp_d;
+            for (Index p = start; p < end; ++p) {
+                if (slots[p] == my_obs) {
+                    continue;
+                }
+                nearest[slots[p]].report(&tmp_i, &tmp_d, my_ids[p]);
+                normalize(tmp_d);
+                report(my_ids[p], tmp_i, tmp_d);
+            }
+        };
+
+        dual_run(std::numeric_limits<Distance>::infinity(), slots, num_threads, pool, create_leaf, finish);
+    }
+
+    void dual_tree_all(Distance threshold, const unsigned char* requested, int num_threads, const std::optional<std::uintptr_t>& pool, const Report& report) const {
+        const auto threshold_raw = Metric_::denormalize(threshold);
+        std::vector<Index> slots;
+        const auto num_requested = assign_slots(requested, slots);
+        std::vector<std::vector<std::pair<Distance, Index> > > all_neighbors(num_requested);
+
+        auto create_leaf = [&](const std::vector<MatrixValue>& boxes) {
+            return [&](Index query, Index reference) -> Distance {
+                const auto& qnode = my_nodes[query];
+                const auto& rnode = my_nodes[reference];
+                for (Index p = qnode.start; p < qnode.end; ++p) {
+                    if (slots[p] == my_obs) {
+                        continue;
+                    }
+                    if (point_box_distance(boxes, p, reference) <= threshold_raw) {
+                        auto& current = all_neighbors[slots[p]];
+                        const auto ptr = my_data.data() + static_cast<std::size_t>(p) * my_dim;
+                        for (Index r = rnode.start; r < rnode.end; ++r) {
+                            const auto dist = raw_distance(ptr, r);
+                            if (dist <= threshold_raw) {
+                                current.emplace_back(dist, my_ids[r]);
+                            }
+                        }
+                    }
+                }
+                return threshold_raw;
+            };
+        };
+
+        auto finish = [&](Index start, Index end) -> void {
+            std::vector<Index> tmp_i;
+            std::vector<Distance> tmp_d;
+            for (Index p = start; p < end; ++p) {
+                if (slots[p] == my_obs) {
+                    continue;
+                }
+                auto& current = all_neighbors[slots[p]];
+                knncolle::report_all_neighbors(current, &tmp_i, &tmp_d, my_ids[p]);
+                normalize(tmp_d);
+                report(my_ids[p], tmp_i, tmp_d);
+                current = std::vector<std::pair<Distance, Index> >(); // release memory as we go.
+            }
+        };
+
+        dual_run(threshold_raw, slots, num_threads, pool, create_leaf, finish);
+    }
+
+public:
+    Index num_observations() const {
+        return my_obs;
+    }
+
+    std::size_t num_dimensions() const {
+        return my_dim;
+    }
+
+    std::unique_ptr<knncolle::Searcher<Index, MatrixValue, Distance> > initialize() const {
+        return std::make_unique<KdtreeSearcher<Metric_> >(*this);
+    }
+};
+
+template<class Metric_>
+class KdtreeBuilder final : public knncolle::Builder<Index, MatrixValue, Distance> {
+public:
+    KdtreeBuilder(Index leaf_size) : my_leaf_size(leaf_size) {}
+
+private:
+    Index my_leaf_size;
+
+public:
+    knncolle::Prebuilt<Index, MatrixValue, Distance>* build_raw(const Matrix& data) const {
+        return new KdtreePrebuilt<Metric_>(data, my_leaf_size);
+    }
+};
+
+}
+
+std::uintptr_t create_kdtree_builder(knncolle_py::Index leaf_size, std::string distance) {
+    auto tmp = std::make_unique<knncolle_py::WrappedBuilder>();
+
+    if (distance == "Manhattan") {
+        tmp->ptr.reset(new knncolle_py::KdtreeBuilder<knncolle_py::KdtreeManhattan>(leaf_size));
+
+    } else if (distance == "Euclidean") {
+        tmp->ptr.reset(new knncolle_py::KdtreeBuilder<knncolle_py::KdtreeEuclidean>(leaf_size));
+
+    } else if (distance == "Cosine") {
+        tmp->ptr.reset(new knncolle_py::CosineBuilder(std::make_shared<knncolle_py::KdtreeBuilder<knncolle_py::KdtreeEuclidean> >(leaf_size)));
+
+    } else if (distance == "InnerProduct") {
+        tmp->ptr.reset(new knncolle_py::InnerProductBuilder(std::make_shared<knncolle_py::KdtreeBuilder<knncolle_py::KdtreeEuclidean> >(leaf_size)));
+
+    } else {
+        throw std::runtime_error("unknown distance type '" + distance + "'");
+    }
+
+    return reinterpret_cast<std::uintptr_t>(static_cast<void*>(tmp.release()));
+}
+
+void init_kdtree(pybind11::module& m) {
+    m.def("create_kdtree_builder", &create_kdtree_builder);
+}
@@ -1,4 +1,6 @@
 #include "knncolle_py.h"
+#include "cosine.hpp"
+#include "inner_product.hpp"
 #include "pybind11/pybind11.h"
 
 #include <string>
@@ -27,8 +29,17 @@ std::uintptr_t create_kmknn_builder(std::string distance) {
 
     } else if (distance == "Cosine") {
         tmp->ptr.reset(
-            new knncolle::L2NormalizedBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance, knncolle_py::MatrixValue>(
-                std::make_shared<knncolle_kmknn::KmknnBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance> >(
+            new knncolle_py::CosineBuilder(
+                std::make_shared<knncolle_kmknn::KmknnBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance>>(
+                    std::make_shared<knncolle::EuclideanDistance<knncolle_py::MatrixValue, knncolle_py::Distance> >()
+                )
+            )
+        );
+
+    } else if (distance == "InnerProduct") {
+        tmp->ptr.reset(
+            new knncolle_py::InnerProductBuilder(
+                std::make_shared<knncolle_kmknn::KmknnBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance>>(
                     std::make_shared<knncolle::EuclideanDistance<knncolle_py::MatrixValue, knncolle_py::Distance> >()
                 )
             )
@@ -0,0 +1,103 @@
+#ifndef KNNCOLLE_PY_LOCALITY_HPP
+#define KNNCOLLE_PY_LOCALITY_HPP
+
+#include "knncolle_py.h"
+
+#include "sanisizer/sanisizer.hpp"
+
+#include <algorithm>
+#include <cstddef>
+#include <cstdint>
+#include <numeric>
+#include <utility>
+#include <vector>
+
+namespace knncolle_py {
+
+/*
+ * Order observations along a Z-order (Morton) curve so that consecutive
+ * observations are spatially close. Only the dimensions with the largest
+ * variances are used to compute the Morton key, as interleaving the bits of
+ * all dimensions would leave too few bits per dimension in high-dimensional
+ * data. 'data' should be a row-major matrix with observations in the rows.
+ */
+inline std::vector<Index> locality_order(const MatrixValue* data, const Index nobs, const std::size_t ndim) {
+    std::vector<Index> order(nobs);
+    std::iota(order.begin(), order.end(), static_cast<Index>(0));
+    if (nobs <= 1 || ndim == 0) {
+        return order;
+    }
+
+    std::vector<double> mean(ndim), var(ndim);
+    std::vector<MatrixValue> mins(data, data + ndim), maxs(data, data + ndim);
+    for (Index i = 0; i < nobs; ++i) {
+        const auto current = data + sanisizer::product_unsafe<std::size_t>(i, ndim);
+        for (std::size_t d = 0; d < ndim; ++d) {
+            const double delta = current[d] - mean[d];
+            mean[d] += delta / (i + 1);
+            var[d] += delta * (current[d] - mean[d]);
+            mins[d] = std::min(mins[d], current[d]);
+            maxs[d] = std::max(maxs[d], current[d]);
+        }
+    }
+
+    constexpr std::size_t max_dims = 8;
+    const std::size_t num_chosen = std::min(ndim, max_dims);
+    std::vector<std::size_t> chosen(ndim);
+    std::iota(chosen.begin(), chosen.end(), static_cast<std::size_t>(0));
+    std::partial_sort(chosen.begin(), chosen.begin() + num_chosen, chosen.end(), [&](std::size_t l, std::size_t r) -> bool { return var[l] > var[r]; });
+    chosen.resize(num_chosen);
+
+    const int num_bits = std::min(32, static_cast<int>(64 / num_chosen));
+    const double max_level = static_cast<double>((static_cast<std::uint64_t>(1) << num_bits) - 1);
+    std::vector<double> scale(num_chosen);
+    for (std::size_t c = 0; c < num_chosen; ++c) {
+        const double range = maxs[chosen[c]] - mins[chosen[c]];
+        scale[c] = (range > 0 ? max_level / range : 0);
+    }
+
+    std::vector<std::pair<std::uint64_t, Index> > keys;
+    keys.reserve(nobs);
+    std::vector<std::uint64_t> levels(num_chosen);
+    for (Index i = 0; i < nobs; ++i) {
+        const auto current = data + sanisizer::product_unsafe<std::size_t>(i, ndim);
+        for (std::size_t c = 0; c < num_chosen; ++c) {
+            const double level = (current[chosen[c]] - mins[chosen[c]]) * scale[c];
+            levels[c] = (level >= 0 ? static_cast<std::uint64_t>(std::min(level, max_level)) : 0); // also handles NaNs.
+        }
+
+        std::uint64_t key = 0;
+        for (int b = num_bits - 1; b >= 0; --b) {
+            for (std::size_t c = 0; c < num_chosen; ++c) {
+                key = (key << 1) | ((levels[c] >> b) & 1);
+            }
+        }
+        keys.emplace_back(key, i);
+    }
+
+    std::sort(keys.begin(), keys.end());
+    for (Index i = 0; i < nobs; ++i) {
+        order[i] = keys[i].second;
+    }
+    return order;
+}
+
+/*
+ * Reorder the positions of 'subset' so that the corresponding observations
+ * follow the 'locality' order of all observations in the index.
+ */
+inline std::vector<Index> subset_locality_order(const Index* locality, const Index nobs, const Index* subset, const Index num_subset) {
+    std::vector<Index> rank(nobs);
+    for (Index i = 0; i < nobs; ++i) {
+        rank[locality[i]] = i;
+    }
+
+    std::vector<Index> order(num_subset);
+    std::iota(order.begin(), order.end(), static_cast<Index>(0));
+    std::sort(order.begin(), order.end(), [&](Index l, Index r) -> bool { return rank[subset[l]] < rank[subset[r]]; });
+    return order;
+}
+
+}
+
+#endif
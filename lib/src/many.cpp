@@ -0,0 +1,166 @@
+#include "knncolle_py.h"
+#include "parallel.hpp"
+
+#include "pybind11/pybind11.h"
+#include "pybind11/numpy.h"
+#include "pybind11/stl.h"
+
+#include "sanisizer/sanisizer.hpp"
+
+#include <algorithm>
+#include <cstddef>
+#include <cstdint>
+#include <limits>
+#include <memory>
+#include <optional>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+typedef pybind11::array_t<knncolle_py::MatrixValue, pybind11::array::c_style | pybind11::array::forcecast> DataMatrix;
+
+/*
+ * All queries across all indices are concatenated into a single sequence of
+ * tasks that is split into contiguous ranges across threads. Each range may
+ * span multiple indices, in which case a searcher is created for each index
+ * when the range first reaches its queries, or the searcher cached by the
+ * thread pool's worker is reused if a pool is supplied. This balances the load across
+ * threads regardless of the number of queries for each index.
+ */
+struct QueryGroup {
+    std::shared_ptr<knncolle_py::Prebuilt> prebuilt;
+    const knncolle_py::MatrixValue* query;
+    knncolle_py::Index num_queries;
+    std::size_t num_dimensions;
+    knncolle_py::Index num_neighbors;
+    knncolle_py::Index* out_i;
+    knncolle_py::Distance* out_d;
+};
+
+pybind11::list generic_query_knn_many(
+    const std::vector<std::uintptr_t>& prebuilt_ptrs,
+    const std::vector<DataMatrix>& queries,
+    const std::vector<knncolle_py::Index>& num_neighbors,
+    const int num_threads,
+    const std::optional<std::uintptr_t> pool,
+    const bool report_index,
+    const bool report_distance
+) {
+    const auto num_groups = prebuilt_ptrs.size();
+    if (queries.size() != num_groups || num_neighbors.size() != num_groups) {
+        throw std::runtime_error("'queries' and 'num_neighbors' should have the same length as 'indices'");
+    }
+
+    std::vector<QueryGroup> groups(num_groups);
+    std::vector<std::size_t> offsets(sanisizer::sum<std::size_t>(num_groups, 1));
+    auto output = sanisizer::create<pybind11::list>(num_groups);
+
+    for (std::size_t g = 0; g < num_groups; ++g) {
+        auto& current = groups[g];
+        current.prebuilt = knncolle_py::cast_prebuilt(prebuilt_ptrs[g])->ptr;
+        current.num_dimensions = current.prebuilt->num_dimensions();
+
+        // Remember, all input NumPy matrices are row-major layouts with observations in rows.
+        auto buf_info = queries[g].request();
+        if (!sanisizer::is_equal(buf_info.shape[1], current.num_dimensions)) {
+            throw std::runtime_error("mismatch in dimensionality between index and query " + std::to_string(g));
+        }
+        current.num_queries = sanisizer::cast<knncolle_py::Index>(buf_info.shape[0]);
+        current.query = static_cast<const knncolle_py::MatrixValue*>(buf_info.ptr);
+        current.num_neighbors = std::min(num_neighbors[g], current.prebuilt->num_observations());
+        offsets[g + 1] = offsets[g] + current.num_queries;
+
+        pybind11::tuple results(2);
+        if (report_index) {
+            pybind11::array_t<knncolle_py::Index, pybind11::array::c_style> out_i({ current.num_queries, current.num_neighbors });
+            current.out_i = static_cast<knncolle_py::Index*>(out_i.request().ptr);
+            results[0] = out_i;
+        } else {
+            current.out_i = NULL;
+            results[0] = pybind11::none();
+        }
+        if (report_distance) {
+            pybind11::array_t<knncolle_py::Distance, pybind11::array::c_style> out_d({ current.num_queries, current.num_neighbors });
+            current.out_d = static_cast<knncolle_py::Distance*>(out_d.request().ptr);
+            results[1] = out_d;
+        } else {
+            current.out_d = NULL;
+            results[1] = pybind11::none();
+        }
+        output[g] = results;
+    }
+
+    const auto total = offsets.back();
+    if (total > static_cast<std::size_t>(std::numeric_limits<knncolle_py::Index>::max())) {
+        throw std::runtime_error("total number of queries should fit in a 32-bit unsigned integer");
+    }
+
+    {
+        pybind11::gil_scoped_release release;
+        auto search_range = [&](knncolle_py::ThreadPool* thread_pool, int w, knncolle_py::Index start, knncolle_py::Index length) -> void {
+            std::vector<knncolle_py::Index> tmp_i;
+            std::vector<knncolle_py::Distance> tmp_d;
+            std::size_t position = start;
+            const std::size_t end = static_cast<std::size_t>(start) + length;
+            auto g = std::upper_bound(offsets.begin(), offsets.end(), position) - offsets.begin() - 1;
+
+            while (position < end) {
+                const auto& current = groups[g];
+                const auto group_end = std::min(end, offsets[g + 1]);
+                if (position < group_end) {
+                    // Reusing the searchers cached in the thread pool's workers, if available.
+                    std::unique_ptr<knncolle_py::Searcher> owned;
+                    knncolle_py::Searcher* searcher;
+                    if (thread_pool) {
+                        searcher = &(thread_pool->searcher(w, current.prebuilt));
+                    } else {
+                        owned = current.prebuilt->initialize();
+                        searcher = owned.get();
+                    }
+
+                    for (; position < group_end; ++position) {
+                        const auto q = position - offsets[g];
+                        searcher->search(
+                            current.query + q * current.num_dimensions,
+                            current.num_neighbors,
+                            (report_index ? &tmp_i : NULL),
+                            (report_distance ? &tmp_d : NULL)
+                        );
+                        const auto out_offset = q * current.num_neighbors;
+                        if (report_index) {
+                            std::copy_n(tmp_i.begin(), current.num_neighbors, current.out_i + out_offset);
+                        }
+                        if (report_distance) {
+                            std::copy_n(tmp_d.begin(), current.num_neighbors, current.out_d + out_offset);
+                        }
+                    }
+                }
+                ++g;
+            }
+        };
+
+        if (!pool.has_value()) {
+            knncolle::parallelize(num_threads, static_cast<knncolle_py::Index>(total), [&](int w, knncolle_py::Index start, knncolle_py::Index length) -> void {
+                search_range(NULL, w, start, length);
+            });
+        } else {
+            auto thread_pool = knncolle_py::cast_thread_pool(*pool);
+            const std::size_t num_workers = thread_pool->size();
+            const std::size_t per_worker = total / num_workers + (total % num_workers > 0);
+            thread_pool->run([&](int w) -> void {
+                const auto start = per_worker * static_cast<std::size_t>(w);
+                if (start >= total) {
+                    return;
+                }
+                const auto length = std::min(per_worker, total - start);
+                search_range(thread_pool, w, static_cast<knncolle_py::Index>(start), static_cast<knncolle_py::Index>(length));
+            });
+        }
+    }
+
+    return output;
+}
+
+void init_many(pybind11::module& m) {
+    m.def("generic_query_knn_many", &generic_query_knn_many);
+}
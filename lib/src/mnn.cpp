@@ -0,0 +1,117 @@
+#include "knncolle_py.h"
+#include "parallel.hpp"
+
+#include "pybind11/pybind11.h"
+#include "pybind11/numpy.h"
+#include "pybind11/stl.h"
+
+#include "sanisizer/sanisizer.hpp"
+
+#include <algorithm>
+#include <cstddef>
+#include <cstdint>
+#include <memory>
+#include <optional>
+#include <stdexcept>
+#include <vector>
+
+typedef pybind11::array_t<knncolle_py::MatrixValue, pybind11::array::c_style | pybind11::array::forcecast> DataMatrix;
+
+/*
+ * Mutual nearest neighbors between two datasets A and B. We first find the
+ * neighbors in A for each observation in B, sorting each neighbor list by
+ * index for binary searches. We then find the neighbors in B for each
+ * observation in A, and retain each pair if the observation in A is also
+ * present in the neighbor list of the observation in B. This avoids storing
+ * the neighbors from the second search.
+ */
+pybind11::tuple generic_find_mutual_nn(
+    std::uintptr_t prebuilt_a_ptr,
+    std::uintptr_t prebuilt_b_ptr,
+    const DataMatrix& data_a,
+    const DataMatrix& data_b,
+    const knncolle_py::Index num_neighbors_a,
+    const knncolle_py::Index num_neighbors_b,
+    const int num_threads,
+    const std::optional<std::uintptr_t> pool,
+    const knncolle_py::Index chunk_size
+) {
+    const auto& prebuilt_a = knncolle_py::cast_prebuilt(prebuilt_a_ptr)->ptr;
+    const auto& prebuilt_b = knncolle_py::cast_prebuilt(prebuilt_b_ptr)->ptr;
+    const auto nobs_a = prebuilt_a->num_observations();
+    const auto nobs_b = prebuilt_b->num_observations();
+    const auto ndim = prebuilt_a->num_dimensions();
+    if (ndim != prebuilt_b->num_dimensions()) {
+        throw std::runtime_error("mismatch in dimensionality between the two indices");
+    }
+
+    // Remember, all input NumPy matrices are row-major layouts with observations in rows.
+    auto buf_a = data_a.request();
+    auto buf_b = data_b.request();
+    if (!sanisizer::is_equal(buf_a.shape[0], nobs_a) || !sanisizer::is_equal(buf_a.shape[1], ndim)) {
+        throw std::runtime_error("dimensions of 'data_a' should be consistent with the first index");
+    }
+    if (!sanisizer::is_equal(buf_b.shape[0], nobs_b) || !sanisizer::is_equal(buf_b.shape[1], ndim)) {
+        throw std::runtime_error("dimensions of 'data_b' should be consistent with the second index");
+    }
+
+    auto ptr_a = static_cast<const knncolle_py::MatrixValue*>(buf_a.ptr);
+    auto ptr_b = static_cast<const knncolle_py::MatrixValue*>(buf_b.ptr);
+
+    const knncolle_py::Index k_a = std::min(num_neighbors_a, nobs_a);
+    const knncolle_py::Index k_b = std::min(num_neighbors_b, nobs_b);
+    std::vector<std::vector<knncolle_py::Index> > found(nobs_a);
+
+    {
+        pybind11::gil_scoped_release release;
+
+        std::vector<knncolle_py::Index> neighbors_of_b(sanisizer::product<std::size_t>(nobs_b, k_a));
+        std::vector<knncolle_py::Index> counts_of_b(nobs_b);
+        knncolle_py::parallel_search(prebuilt_a, num_threads, pool, nobs_b, chunk_size, [&](knncolle_py::Searcher& searcher, knncolle_py::Index start, knncolle_py::Index length) -> void {
+            std::vector<knncolle_py::Index> tmp_i;
+            for (knncolle_py::Index b = start, end = start + length; b < end; ++b) {
+                searcher.search(ptr_b + sanisizer::product_unsafe<std::size_t>(b, ndim), k_a, &tmp_i, NULL);
+                std::sort(tmp_i.begin(), tmp_i.end());
+                std::copy(tmp_i.begin(), tmp_i.end(), neighbors_of_b.begin() + sanisizer::product_unsafe<std::size_t>(b, k_a));
+                counts_of_b[b] = tmp_i.size();
+            }
+        });
+
+        knncolle_py::parallel_search(prebuilt_b, num_threads, pool, nobs_a, chunk_size, [&](knncolle_py::Searcher& searcher, knncolle_py::Index start, knncolle_py::Index length) -> void {
+            std::vector<knncolle_py::Index> tmp_i;
+            for (knncolle_py::Index a = start, end = start + length; a < end; ++a) {
+                searcher.search(ptr_a + sanisizer::product_unsafe<std::size_t>(a, ndim), k_b, &tmp_i, NULL);
+                std::sort(tmp_i.begin(), tmp_i.end());
+                auto& current = found[a];
+                for (auto b : tmp_i) {
+                    auto first = neighbors_of_b.begin() + sanisizer::product_unsafe<std::size_t>(b, k_a);
+                    if (std::binary_search(first, first + counts_of_b[b], a)) {
+                        current.push_back(b);
+                    }
+                }
+            }
+        });
+    }
+
+    std::size_t total = 0;
+    for (const auto& current : found) {
+        total += current.size();
+    }
+
+    pybind11::array_t<knncolle_py::Index> first(total), second(total);
+    auto first_ptr = static_cast<knncolle_py::Index*>(first.request().ptr);
+    auto second_ptr = static_cast<knncolle_py::Index*>(second.request().ptr);
+    for (knncolle_py::Index a = 0; a < nobs_a; ++a) {
+        const auto& current = found[a];
+        std::fill_n(first_ptr, current.size(), a);
+        std::copy(current.begin(), current.end(), second_ptr);
+        first_ptr += current.size();
+        second_ptr += current.size();
+    }
+
+    return pybind11::make_tuple(first, second);
+}
+
+void init_mnn(pybind11::module& m) {
+    m.def("generic_find_mutual_nn", &generic_find_mutual_nn);
+}
@@ -0,0 +1,562 @@
+#include "knncolle_py.h"
+#include "cosine.hpp"
+#include "inner_product.hpp"
+#include "approximate_range.hpp"
+#include "parallel.hpp"
+#include "pybind11/pybind11.h"
+
+#include "sanisizer/sanisizer.hpp"
+
+#include <algorithm>
+#include <cstddef>
+#include <cstdint>
+#include <functional>
+#include <memory>
+#include <mutex>
+#include <optional>
+#include <queue>
+#include <random>
+#include <stdexcept>
+#include <string>
+#include <utility>
+#include <vector>
+
+/*
+ * NN-descent (Dong et al., 2011) builds an approximate k-nearest neighbor
+ * graph by starting from random neighbors and iteratively checking whether
+ * the neighbors of an observation's neighbors are closer than its current
+ * neighbors. In each iteration, every observation joins its sampled forward
+ * and reverse neighbors in pairs, and each pair is used to update the
+ * neighbor lists of both members. Only pairs involving at least one "new"
+ * neighbor (i.e., added since the last iteration) are considered, and the
+ * algorithm terminates when the number of updates falls below 'delta * N * k'.
+ *
+ * The graph itself is used to report neighbors for observations in the
+ * index, so find_knn() does not need to perform any search. Queries (and
+ * requests for more neighbors than are stored in the graph) are handled by a
+ * best-first search of the graph, using both forward and reverse edges for
+ * better connectivity.
+ */
+
+namespace knncolle_py {
+
+struct NndescentOptions {
+    Index num_neighbors = 30;
+    double sample_rate = 1;
+    int max_iterations = 10;
+    double delta = 0.001;
+    Index ef_search = 50;
+    std::uint64_t seed = 42;
+    int num_threads = 1;
+};
+
+class NndescentPrebuilt;
+
+class NndescentSearcher final : public knncolle::Searcher<Index, MatrixValue, Distance> {
+public:
+    NndescentSearcher(const NndescentPrebuilt& parent);
+
+private:
+    const NndescentPrebuilt& my_parent;
+    std::vector<Index> my_visited;
+    Index my_generation = 0;
+
+    typedef std::pair<Distance, Index> Candidate;
+    std::priority_queue<Candidate, std::vector<Candidate>, std::greater<Candidate> > my_candidates;
+    std::priority_queue<Candidate> my_results;
+
+    void search_graph(const MatrixValue* query, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances);
+
+public:
+    void search(Index i, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances);
+
+    void search(const MatrixValue* query, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+        search_graph(query, k, output_indices, output_distances);
+    }
+};
+
+class NndescentPrebuilt final : public knncolle::Prebuilt<Index, MatrixValue, Distance> {
+public:
+    NndescentPrebuilt(const Matrix& data, std::shared_ptr<const Metric> metric, const NndescentOptions& options) :
+        my_dim(data.num_dimensions()),
+        my_obs(data.num_observations()),
+        my_metric(std::move(metric)),
+        my_ef(options.ef_search),
+        my_k(my_obs > 0 ? std::min(options.num_neighbors, static_cast<Index>(my_obs - 1)) : 0)
+    {
+        my_data.resize(sanisizer::product<std::size_t>(my_obs, my_dim));
+        auto work = data.new_extractor();
+        for (Index o = 0; o < my_obs; ++o) {
+            std::copy_n(work->next(), my_dim, my_data.data() + static_cast<std::size_t>(o) * my_dim);
+        }
+
+        build(options);
+        define_search_graph();
+
+        // Fixed entry points for the graph search, so that results are reproducible.
+        std::vector<Index> order(my_obs);
+        for (Index o = 0; o < my_obs; ++o) {
+            order[o] = o;
+        }
+        std::mt19937_64 rng(options.seed);
+        std::shuffle(order.begin(), order.end(), rng);
+        order.resize(std::min(my_obs, std::max(my_ef, static_cast<Index>(1))));
+        my_entry_points.swap(order);
+    }
+
+private:
+    std::size_t my_dim;
+    Index my_obs;
+    std::vector<MatrixValue> my_data;
+    std::shared_ptr<const Metric> my_metric;
+    Index my_ef;
+
+    // Row-major (N x k) graph, sorted by increasing distance in each row.
+    // Distances are stored in their raw form, e.g., squared for Euclidean.
+    Index my_k;
+    std::vector<Index> my_neighbors;
+    std::vector<Distance> my_distances;
+
+    // Undirected graph (i.e., forward and reverse edges) for the search.
+    std::vector<std::size_t> my_search_offsets;
+    std::vector<Index> my_search_neighbors;
+    std::vector<Index> my_entry_points;
+
+    friend class NndescentSearcher;
+
+    const MatrixValue* observation(Index i) const {
+        return my_data.data() + static_cast<std::size_t>(i) * my_dim;
+    }
+
+    Distance raw_distance(Index i, Index j) const {
+        return my_metric->raw(my_dim, observation(i), observation(j));
+    }
+
+private:
+    /*
+     * Each neighbor list is a max-heap of length 'my_k' on the distances,
+     * stored contiguously in 'my_neighbors' and 'my_distances'. 'is_new'
+     * marks the neighbors that have not yet been used in a local join.
+     */
+    void sift_down(std::size_t offset, std::vector<char>& is_new, Index position) {
+        auto ids = my_neighbors.data() + offset;
+        auto dists = my_distances.data() + offset;
+        auto flags = is_new.data() + offset;
+        while (true) {
+            Index largest = position;
+            const Index left = 2 * position + 1, right = left + 1;
+            if (left < my_k && dists[left] > dists[largest]) {
+                largest = left;
+            }
+            if (right < my_k && dists[right] > dists[largest]) {
+                largest = right;
+            }
+            if (largest == position) {
+                break;
+            }
+            std::swap(ids[position], ids[largest]);
+            std::swap(dists[position], dists[largest]);
+            std::swap(flags[position], flags[largest]);
+            position = largest;
+        }
+    }
+
+    bool push(Index i, Index candidate, Distance dist, std::vector<char>& is_new) {
+        const auto offset = static_cast<std::size_t>(i) * my_k;
+        if (dist >= my_distances[offset]) {
+            return false;
+        }
+        auto ids = my_neighbors.data() + offset;
+        if (std::find(ids, ids + my_k, candidate) != ids + my_k) {
+            return false;
+        }
+        ids[0] = candidate;
+        my_distances[offset] = dist;
+        is_new[offset] = 1;
+        sift_down(offset, is_new, 0);
+        return true;
+    }
+
+    static std::mt19937_64 create_rng(std::uint64_t seed, std::uint64_t iteration, Index i) {
+        std::seed_seq seq{ seed, iteration, static_cast<std::uint64_t>(i) };
+        return std::mt19937_64(seq);
+    }
+
+    void build(const NndescentOptions& options) {
+        const auto total = sanisizer::product<std::size_t>(my_obs, my_k);
+        my_neighbors.resize(total);
+        my_distances.resize(total);
+        if (my_k == 0) {
+            return;
+        }
+
+        // Initializing each neighbor list with random observations.
+        std::vector<char> is_new(total, 1);
+        parallel_tasks(options.num_threads, std::nullopt, my_obs, [&](Index start, Index length) -> void {
+            for (Index i = start, end = start + length; i < end; ++i) {
+                auto rng = create_rng(options.seed, 0, i);
+                const auto offset = static_cast<std::size_t>(i) * my_k;
+                auto ids = my_neighbors.data() + offset;
+                std::uniform_int_distribution<Index> dist(0, my_obs - 2);
+                for (Index n = 0; n < my_k; ++n) {
+                    Index chosen;
+                    do {
+                        chosen = dist(rng);
+                        chosen += (chosen >= i); // skipping 'i' itself.
+                    } while (std::find(ids, ids + n, chosen) != ids + n);
+                    ids[n] = chosen;
+                    my_distances[offset + n] = raw_distance(i, chosen);
+                }
+                for (Index n = my_k; n > 0; --n) {
+                    sift_down(offset, is_new, n - 1);
+                }
+            }
+        });
+
+        const Index num_samples = std::max(static_cast<Index>(1), static_cast<Index>(options.sample_rate * my_k));
+        std::vector<std::vector<Index> > new_candidates(my_obs), old_candidates(my_obs);
+        std::vector<std::vector<Index> > new_reverse(my_obs), old_reverse(my_obs);
+        std::vector<std::mutex> locks(my_obs);
+
+        for (int iter = 1; iter <= options.max_iterations; ++iter) {
+            // Sampling the new neighbors of each observation and marking them as old.
+            parallel_tasks(options.num_threads, std::nullopt, my_obs, [&](Index start, Index length) -> void {
+                for (Index i = start, end = start + length; i < end; ++i) {
+                    auto rng = create_rng(options.seed, iter, i);
+                    const auto offset = static_cast<std::size_t>(i) * my_k;
+                    auto& current_new = new_candidates[i];
+                    auto& current_old = old_candidates[i];
+                    current_new.clear();
+                    current_old.clear();
+
+                    for (Index n = 0; n < my_k; ++n) {
+                        if (is_new[offset + n]) {
+                            current_new.push_back(n);
+                        } else {
+                            current_old.push_back(my_neighbors[offset + n]);
+                        }
+                    }
+                    std::shuffle(current_new.begin(), current_new.end(), rng);
+                    if (current_new.size() > static_cast<std::size_t>(num_samples)) {
+                        current_new.resize(num_samples);
+                    }
+                    for (auto& n : current_new) {
+                        is_new[offset + n] = 0;
+                        n = my_neighbors[offset + n];
+                    }
+                }
+            });
+
+            for (Index i = 0; i < my_obs; ++i) {
+                new_reverse[i].clear();
+                old_reverse[i].clear();
+            }
+            for (Index i = 0; i < my_obs; ++i) {
+                for (auto x : new_candidates[i]) {
+                    new_reverse[x].push_back(i);
+                }
+                for (auto x : old_candidates[i]) {
+                    old_reverse[x].push_back(i);
+                }
+            }
+
+            // Adding a sample of the reverse neighbors to the candidates for each observation.
+            parallel_tasks(options.num_threads, std::nullopt, my_obs, [&](Index start, Index length) -> void {
+                for (Index i = start, end = start + length; i < end; ++i) {
+                    auto rng = create_rng(options.seed, iter, my_obs + i);
+                    auto add_reverse = [&](std::vector<Index>& reverse, std::vector<Index>& candidates) -> void {
+                        std::shuffle(reverse.begin(), reverse.end(), rng);
+                        const auto num_kept = std::min(reverse.size(), static_cast<std::size_t>(num_samples));
+                        candidates.insert(candidates.end(), reverse.begin(), reverse.begin() + num_kept);
+                        std::sort(candidates.begin(), candidates.end());
+                        candidates.erase(std::unique(candidates.begin(), candidates.end()), candidates.end());
+                    };
+                    add_reverse(new_reverse[i], new_candidates[i]);
+                    add_reverse(old_reverse[i], old_candidates[i]);
+                }
+            });
+
+            // Local join between pairs of new candidates, and between new and old candidates.
+            std::vector<std::size_t> updates(my_obs);
+            parallel_tasks(options.num_threads, std::nullopt, my_obs, [&](Index start, Index length) -> void {
+                for (Index i = start, end = start + length; i < end; ++i) {
+                    std::size_t count = 0;
+                    auto join = [&](Index a, Index b) -> void {
+                        const auto dist = raw_distance(a, b);
+                        {
+                            std::lock_guard<std::mutex> lck(locks[a]);
+                            count += push(a, b, dist, is_new);
+                        }
+                        {
+                            std::lock_guard<std::mutex> lck(locks[b]);
+                            count += push(b, a, dist, is_new);
+                        }
+                    };
+
+                    const auto& current_new = new_candidates[i];
+                    const auto& current_old = old_candidates[i];
+                    const auto num_new = current_new.size();
+                    for (std::size_t x = 0; x < num_new; ++x) {
+                        const auto a = current_new[x];
+                        for (std::size_t y = x + 1; y < num_new; ++y) {
+                            join(a, current_new[y]);
+                        }
+                        for (auto b : current_old) {
+                            if (a != b) {
+                                join(a, b);
+                            }
+                        }
+                    }
+                    updates[i] = count;
+                }
+            });
+
+            std::size_t total_updates = 0;
+            for (auto u : updates) {
+                total_updates += u;
+            }
+            if (static_cast<double>(total_updates) <= options.delta * static_cast<double>(total)) {
+                break;
+            }
+        }
+
+        // Sorting each neighbor list by increasing distance.
+        parallel_tasks(options.num_threads, std::nullopt, my_obs, [&](Index start, Index length) -> void {
+            std::vector<std::pair<Distance, Index> > sorted(my_k);
+            for (Index i = start, end = start + length; i < end; ++i) {
+                const auto offset = static_cast<std::size_t>(i) * my_k;
+                for (Index n = 0; n < my_k; ++n) {
+                    sorted[n].first = my_distances[offset + n];
+                    sorted[n].second = my_neighbors[offset + n];
+                }
+                std::sort(sorted.begin(), sorted.end());
+                for (Index n = 0; n < my_k; ++n) {
+                    my_distances[offset + n] = sorted[n].first;
+                    my_neighbors[offset + n] = sorted[n].second;
+                }
+            }
+        });
+    }
+
+    void define_search_graph() {
+        my_search_offsets.resize(sanisizer::sum<std::size_t>(my_obs, 1));
+        for (Index i = 0; i < my_obs; ++i) {
+            const auto offset = static_cast<std::size_t>(i) * my_k;
+            my_search_offsets[i + 1] += my_k;
+            for (Index n = 0; n < my_k; ++n) {
+                my_search_offsets[my_neighbors[offset + n] + 1] += 1;
+            }
+        }
+        for (Index i = 0; i < my_obs; ++i) {
+            my_search_offsets[i + 1] += my_search_offsets[i];
+        }
+
+        my_search_neighbors.resize(my_search_offsets.back());
+        auto fill = my_search_offsets;
+        for (Index i = 0; i < my_obs; ++i) {
+            const auto offset = static_cast<std::size_t>(i) * my_k;
+            for (Index n = 0; n < my_k; ++n) {
+                const auto x = my_neighbors[offset + n];
+                my_search_neighbors[fill[i]++] = x;
+                my_search_neighbors[fill[x]++] = i;
+            }
+        }
+
+        // Removing duplicate edges, i.e., when two observations are in each other's neighbor lists.
+        std::size_t position = 0;
+        for (Index i = 0; i < my_obs; ++i) {
+            auto first = my_search_neighbors.begin() + my_search_offsets[i];
+            auto last = my_search_neighbors.begin() + my_search_offsets[i + 1];
+            std::sort(first, last);
+            auto kept = std::unique(first, last);
+            my_search_offsets[i] = position;
+            position = std::copy(first, kept, my_search_neighbors.begin() + position) - my_search_neighbors.begin();
+        }
+        my_search_offsets[my_obs] = position;
+        my_search_neighbors.resize(position);
+        my_search_neighbors.shrink_to_fit();
+    }
+
+public:
+    std::size_t num_dimensions() const {
+        return my_dim;
+    }
+
+    Index num_observations() const {
+        return my_obs;
+    }
+
+    std::unique_ptr<knncolle::Searcher<Index, MatrixValue, Distance> > initialize() const {
+        return std::make_unique<NndescentSearcher>(*this);
+    }
+};
+
+inline NndescentSearcher::NndescentSearcher(const NndescentPrebuilt& parent) : my_parent(parent), my_visited(parent.my_obs) {}
+
+inline void NndescentSearcher::search(Index i, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+    const auto& parent = my_parent;
+    if (k <= parent.my_k) {
+        const auto offset = static_cast<std::size_t>(i) * parent.my_k;
+        if (output_indices) {
+            output_indices->resize(k);
+            std::copy_n(parent.my_neighbors.begin() + offset, k, output_indices->begin());
+        }
+        if (output_distances) {
+            output_distances->resize(k);
+            for (Index n = 0; n < k; ++n) {
+                (*output_distances)[n] = parent.my_metric->normalize(parent.my_distances[offset + n]);
+            }
+        }
+        return;
+    }
+
+    // Searching for one more neighbor than requested, as 'i' itself should be the closest.
+    k = std::min(k, static_cast<Index>(parent.my_obs - 1));
+    std::vector<Index> indices;
+    search_graph(parent.observation(i), k + 1, &indices, output_distances);
+    auto it = std::find(indices.begin(), indices.end(), i);
+    if (it != indices.end()) {
+        const auto offset = it - indices.begin();
+        indices.erase(it);
+        if (output_distances) {
+            output_distances->erase(output_distances->begin() + offset);
+        }
+    } else if (indices.size() > k) {
+        indices.pop_back();
+        if (output_distances) {
+            output_distances->pop_back();
+        }
+    }
+    if (output_indices) {
+        output_indices->swap(indices);
+    }
+}
+
+inline void NndescentSearcher::search_graph(const MatrixValue* query, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+    const auto& parent = my_parent;
+    k = std::min(k, parent.my_obs);
+    const Index ef = std::max(k, parent.my_ef);
+
+    ++my_generation;
+    if (my_generation == 0) { // wrapped around, so we need to reset the visited markers.
+        std::fill(my_visited.begin(), my_visited.end(), 0);
+        my_generation = 1;
+    }
+
+    auto consider = [&](Index x) -> void {
+        my_visited[x] = my_generation;
+        const auto dist = parent.my_metric->raw(parent.my_dim, query, parent.observation(x));
+        if (my_results.size() < ef || dist < my_results.top().first) {
+            my_candidates.emplace(dist, x);
+            my_results.emplace(dist, x);
+            if (my_results.size() > ef) {
+                my_results.pop();
+            }
+        }
+    };
+
+    for (auto e : parent.my_entry_points) {
+        consider(e);
+    }
+
+    while (!my_candidates.empty()) {
+        const auto current = my_candidates.top();
+        if (my_results.size() >= ef && current.first > my_results.top().first) {
+            break;
+        }
+        my_candidates.pop();
+        for (auto s = parent.my_search_offsets[current.second], end = parent.my_search_offsets[current.second + 1]; s < end; ++s) {
+            const auto x = parent.my_search_neighbors[s];
+            if (my_visited[x] != my_generation) {
+                consider(x);
+            }
+        }
+    }
+    my_candidates = decltype(my_candidates)();
+
+    while (my_results.size() > k) {
+        my_results.pop();
+    }
+    const auto num_found = my_results.size();
+    if (output_indices) {
+        output_indices->resize(num_found);
+    }
+    if (output_distances) {
+        output_distances->resize(num_found);
+    }
+    for (auto position = num_found; position > 0; --position) {
+        const auto& top = my_results.top();
+        if (output_indices) {
+            (*output_indices)[position - 1] = top.second;
+        }
+        if (output_distances) {
+            (*output_distances)[position - 1] = parent.my_metric->normalize(top.first);
+        }
+        my_results.pop();
+    }
+}
+
+class NndescentBuilder final : public knncolle::Builder<Index, MatrixValue, Distance> {
+public:
+    NndescentBuilder(std::shared_ptr<const Metric> metric, NndescentOptions options) : my_metric(std::move(metric)), my_options(std::move(options)) {}
+
+private:
+    std::shared_ptr<const Metric> my_metric;
+    NndescentOptions my_options;
+
+public:
+    knncolle::Prebuilt<Index, MatrixValue, Distance>* build_raw(const Matrix& data) const {
+        return new NndescentPrebuilt(data, my_metric, my_options);
+    }
+};
+
+}
+
+// Wrapping the NN-descent builder to support approximate searches by distance.
+std::shared_ptr<knncolle_py::ApproximateRangeBuilder> make_nndescent_builder(std::shared_ptr<const knncolle_py::Metric> metric, const knncolle_py::NndescentOptions& opt) {
+    return std::make_shared<knncolle_py::ApproximateRangeBuilder>(std::make_shared<knncolle_py::NndescentBuilder>(std::move(metric), opt));
+}
+
+std::uintptr_t create_nndescent_builder(
+    knncolle_py::Index num_neighbors,
+    double sample_rate,
+    int max_iterations,
+    double delta,
+    knncolle_py::Index ef_search,
+    std::string distance,
+    std::uint64_t seed,
+    int num_threads
+) {
+    knncolle_py::NndescentOptions opt;
+    opt.num_neighbors = num_neighbors;
+    opt.sample_rate = sample_rate;
+    opt.max_iterations = max_iterations;
+    opt.delta = delta;
+    opt.ef_search = ef_search;
+    opt.seed = seed;
+    opt.num_threads = num_threads;
+    auto tmp = std::make_unique<knncolle_py::WrappedBuilder>();
+
+    auto euclidean = std::make_shared<knncolle::EuclideanDistance<knncolle_py::MatrixValue, knncolle_py::Distance> >();
+    if (distance == "Manhattan") {
+        tmp->ptr = make_nndescent_builder(std::make_shared<knncolle::ManhattanDistance<knncolle_py::MatrixValue, knncolle_py::Distance> >(), opt);
+
+    } else if (distance == "Euclidean") {
+        tmp->ptr = make_nndescent_builder(std::move(euclidean), opt);
+
+    } else if (distance == "Cosine") {
+        tmp->ptr.reset(new knncolle_py::CosineBuilder(make_nndescent_builder(std::move(euclidean), opt)));
+
+    } else if (distance == "InnerProduct") {
+        tmp->ptr.reset(new knncolle_py::InnerProductBuilder(make_nndescent_builder(std::move(euclidean), opt)));
+
+    } else {
+        throw std::runtime_error("unknown distance type '" + distance + "'");
+    }
+
+    return reinterpret_cast<std::uintptr_t>(static_cast<void*>(tmp.release()));
+}
+
+void init_nndescent(pybind11::module& m) {
+    m.def("create_nndescent_builder", &create_nndescent_builder);
+}
@@ -0,0 +1,273 @@
+#ifndef KNNCOLLE_PY_PARALLEL_HPP
+#define KNNCOLLE_PY_PARALLEL_HPP
+
+#include "knncolle_py.h"
+
+#include <algorithm>
+#include <atomic>
+#include <condition_variable>
+#include <cstddef>
+#include <cstdint>
+#include <exception>
+#include <functional>
+#include <memory>
+#include <mutex>
+#include <optional>
+#include <thread>
+#include <vector>
+
+namespace knncolle_py {
+
+typedef knncolle::Prebuilt<Index, MatrixValue, Distance> Prebuilt;
+
+typedef knncolle::Searcher<Index, MatrixValue, Distance> Searcher;
+
+/*
+ * Persistent pool of worker threads. This avoids the cost of spawning new
+ * threads in each call to a search function, and also allows each worker to
+ * cache its searchers across calls that use the same prebuilt index.
+ */
+class ThreadPool {
+public:
+    ThreadPool(int num_threads) : my_cache(std::max(num_threads, 1)), my_errors(my_cache.size()) {
+        const int num_workers = my_cache.size();
+        my_workers.reserve(num_workers);
+        for (int w = 0; w < num_workers; ++w) {
+            my_workers.emplace_back([this,w]() -> void { loop(w); });
+        }
+    }
+
+    ~ThreadPool() {
+        {
+            std::lock_guard<std::mutex> lck(my_lock);
+            my_shutdown = true;
+        }
+        my_start_cv.notify_all();
+        for (auto& worker : my_workers) {
+            worker.join();
+        }
+    }
+
+    ThreadPool(const ThreadPool&) = delete;
+    ThreadPool& operator=(const ThreadPool&) = delete;
+
+public:
+    int size() const {
+        return my_workers.size();
+    }
+
+    /*
+     * Run 'fun(w)' on each worker 'w' and wait for all workers to finish.
+     * The first exception thrown by any worker is rethrown in the caller.
+     */
+    void run(const std::function<void(int)>& fun) {
+        // Protecting against concurrent calls from different Python threads.
+        std::lock_guard<std::mutex> submission(my_submit_lock);
+
+        {
+            std::lock_guard<std::mutex> lck(my_lock);
+            my_job = &fun;
+            my_remaining = my_workers.size();
+            ++my_generation;
+        }
+        my_start_cv.notify_all();
+
+        {
+            std::unique_lock<std::mutex> lck(my_lock);
+            my_done_cv.wait(lck, [&]() -> bool { return my_remaining == 0; });
+            my_job = NULL;
+        }
+
+        for (auto& err : my_errors) {
+            if (err) {
+                auto copy = err;
+                std::fill(my_errors.begin(), my_errors.end(), nullptr);
+                std::rethrow_exception(copy);
+            }
+        }
+    }
+
+    /*
+     * Get a searcher for 'prebuilt' that is cached in worker 'w'. This should
+     * only be called from worker 'w' inside run().
+     */
+    Searcher& searcher(int w, const std::shared_ptr<Prebuilt>& prebuilt) {
+        auto& cache = my_cache[w];
+
+        // Discarding searchers for indices that have since been freed.
+        cache.erase(
+            std::remove_if(cache.begin(), cache.end(), [](const CachedSearcher& x) -> bool { return x.owner.expired(); }),
+            cache.end()
+        );
+
+        for (auto& entry : cache) {
+            if (entry.owner.lock() == prebuilt) {
+                return *(entry.searcher);
+            }
+        }
+
+        cache.emplace_back();
+        auto& latest = cache.back();
+        latest.owner = prebuilt;
+        latest.searcher = prebuilt->initialize();
+        return *(latest.searcher);
+    }
+
+private:
+    void loop(int w) {
+        std::uint64_t last_generation = 0;
+        while (true) {
+            const std::function<void(int)>* job;
+            {
+                std::unique_lock<std::mutex> lck(my_lock);
+                my_start_cv.wait(lck, [&]() -> bool { return my_shutdown || my_generation != last_generation; });
+                if (my_shutdown) {
+                    return;
+                }
+                last_generation = my_generation;
+                job = my_job;
+            }
+
+            try {
+                (*job)(w);
+            } catch (...) {
+                my_errors[w] = std::current_exception();
+            }
+
+            {
+                std::lock_guard<std::mutex> lck(my_lock);
+                --my_remaining;
+            }
+            my_done_cv.notify_one();
+        }
+    }
+
+private:
+    struct CachedSearcher {
+        std::weak_ptr<Prebuilt> owner;
+        std::unique_ptr<Searcher> searcher;
+    };
+
+    std::vector<std::vector<CachedSearcher> > my_cache;
+    std::vector<std::exception_ptr> my_errors;
+    std::vector<std::thread> my_workers;
+
+    std::mutex my_submit_lock;
+    std::mutex my_lock;
+    std::condition_variable my_start_cv, my_done_cv;
+    const std::function<void(int)>* my_job = NULL;
+    std::uint64_t my_generation = 0;
+    int my_remaining = 0;
+    bool my_shutdown = false;
+};
+
+inline ThreadPool* cast_thread_pool(std::uintptr_t ptr) {
+    return static_cast<ThreadPool*>(reinterpret_cast<void*>(ptr));
+}
+
+/*
+ * Run 'fun(searcher, start, length)' for contiguous ranges of 'num_tasks'
+ * tasks in parallel, using either the persistent 'pool' (if supplied) or
+ * 'num_threads' newly spawned threads. If 'chunk_size' is zero, each thread
+ * processes a single range of equal size; otherwise, each thread repeatedly
+ * claims the next chunk of 'chunk_size' tasks until all tasks are processed.
+ * The latter balances the load when the cost of each task is highly variable.
+ */
+template<class Function_>
+void parallel_search(
+    const std::shared_ptr<Prebuilt>& prebuilt,
+    const int num_threads,
+    const std::optional<std::uintptr_t>& pool_ptr,
+    const Index num_tasks,
+    const Index chunk_size,
+    Function_ fun)
+{
+    if (chunk_size == 0) {
+        if (!pool_ptr.has_value()) {
+            knncolle::parallelize(num_threads, num_tasks, [&](int, Index start, Index length) -> void {
+                auto searcher = prebuilt->initialize();
+                fun(*searcher, start, length);
+            });
+            return;
+        }
+
+        auto pool = cast_thread_pool(*pool_ptr);
+        const Index num_workers = pool->size();
+        const Index per_worker = num_tasks / num_workers + (num_tasks % num_workers > 0);
+        pool->run([&](int w) -> void {
+            const auto start = static_cast<std::size_t>(per_worker) * static_cast<std::size_t>(w); // cast to avoid overflow.
+            if (start >= num_tasks) {
+                return;
+            }
+            const Index length = std::min(static_cast<std::size_t>(per_worker), num_tasks - start);
+            fun(pool->searcher(w, prebuilt), static_cast<Index>(start), length);
+        });
+        return;
+    }
+
+    // Using a wider type for the counter so that it doesn't wrap around when threads overshoot the end.
+    std::atomic<std::size_t> next(0);
+    auto claim = [&](Searcher& searcher) -> void {
+        while (true) {
+            const auto start = next.fetch_add(chunk_size, std::memory_order_relaxed);
+            if (start >= num_tasks) {
+                return;
+            }
+            const Index length = std::min(static_cast<std::size_t>(chunk_size), num_tasks - start);
+            fun(searcher, static_cast<Index>(start), length);
+        }
+    };
+
+    if (!pool_ptr.has_value()) {
+        const Index num_chunks = num_tasks / chunk_size + (num_tasks % chunk_size > 0);
+        const int num_workers = std::max(1, static_cast<int>(std::min(static_cast<Index>(num_threads), num_chunks)));
+        knncolle::parallelize(num_workers, num_workers, [&](int, Index, Index) -> void {
+            auto searcher = prebuilt->initialize();
+            claim(*searcher);
+        });
+        return;
+    }
+
+    auto pool = cast_thread_pool(*pool_ptr);
+    pool->run([&](int w) -> void {
+        if (next.load(std::memory_order_relaxed) < num_tasks) {
+            claim(pool->searcher(w, prebuilt));
+        }
+    });
+}
+
+/*
+ * Run 'fun(start, length)' for contiguous ranges of 'num_tasks' tasks in
+ * parallel, for work that does not require a searcher. This uses the same
+ * threads as parallel_search() with a zero 'chunk_size'.
+ */
+template<class Function_>
+void parallel_tasks(
+    const int num_threads,
+    const std::optional<std::uintptr_t>& pool_ptr,
+    const Index num_tasks,
+    Function_ fun)
+{
+    if (!pool_ptr.has_value()) {
+        knncolle::parallelize(num_threads, num_tasks, [&](int, Index start, Index length) -> void {
+            fun(start, length);
+        });
+        return;
+    }
+
+    auto pool = cast_thread_pool(*pool_ptr);
+    const Index num_workers = pool->size();
+    const Index per_worker = num_tasks / num_workers + (num_tasks % num_workers > 0);
+    pool->run([&](int w) -> void {
+        const auto start = static_cast<std::size_t>(per_worker) * static_cast<std::size_t>(w); // cast to avoid overflow.
+        if (start >= num_tasks) {
+            return;
+        }
+        const Index length = std::min(static_cast<std::size_t>(per_worker), num_tasks - start);
+        fun(static_cast<Index>(start), length);
+    });
+}
+
+}
+
+#endif
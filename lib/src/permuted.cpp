@@ -0,0 +1,58 @@
+#include "knncolle_py.h"
+#include "permuted.hpp"
+
+#include "pybind11/pybind11.h"
+#include "pybind11/numpy.h"
+
+#include "sanisizer/sanisizer.hpp"
+
+#include <algorithm>
+#include <cstdint>
+#include <memory>
+#include <stdexcept>
+#include <vector>
+
+typedef pybind11::array_t<knncolle_py::MatrixValue, pybind11::array::c_style | pybind11::array::forcecast> DataMatrix;
+
+typedef pybind11::array_t<knncolle_py::Index, pybind11::array::c_style | pybind11::array::forcecast> OrderVector;
+
+std::uintptr_t generic_build_permuted(std::uintptr_t builder_ptr, const DataMatrix& data, const OrderVector& order) {
+    auto buffer = data.request();
+    const auto nobs = sanisizer::cast<knncolle_py::Index>(buffer.shape[0]);
+    const auto ndim = sanisizer::cast<knncolle_py::Index>(buffer.shape[1]);
+    const auto data_ptr = static_cast<const knncolle_py::MatrixValue*>(buffer.ptr);
+
+    if (!sanisizer::is_equal(order.size(), nobs)) {
+        throw std::runtime_error("length of 'order' should be equal to the number of observations");
+    }
+    const auto order_ptr = static_cast<const knncolle_py::Index*>(order.request().ptr);
+    std::vector<knncolle_py::Index> old_ids(order_ptr, order_ptr + nobs);
+    std::vector<unsigned char> seen(nobs);
+    for (auto o : old_ids) {
+        if (o >= nobs || seen[o]) {
+            throw std::runtime_error("'order' should be a permutation of the observation indices");
+        }
+        seen[o] = 1;
+    }
+
+    auto builder = knncolle_py::cast_builder(builder_ptr);
+    auto tmp = std::make_unique<knncolle_py::WrappedPrebuilt>();
+    {
+        pybind11::gil_scoped_release release;
+
+        std::vector<knncolle_py::MatrixValue> permuted(sanisizer::product<std::size_t>(nobs, ndim));
+        for (knncolle_py::Index p = 0; p < nobs; ++p) {
+            auto src = data_ptr + sanisizer::product_unsafe<std::size_t>(old_ids[p], ndim);
+            std::copy_n(src, ndim, permuted.data() + sanisizer::product_unsafe<std::size_t>(p, ndim));
+        }
+
+        std::unique_ptr<knncolle_py::Prebuilt> inner(builder->ptr->build_raw(knncolle::SimpleMatrix(ndim, nobs, static_cast<const knncolle_py::MatrixValue*>(permuted.data()))));
+        tmp->ptr.reset(new knncolle_py::PermutedPrebuilt(std::move(inner), std::move(old_ids)));
+    }
+
+    return reinterpret_cast<std::uintptr_t>(static_cast<void*>(tmp.release()));
+}
+
+void init_permuted(pybind11::module& m) {
+    m.def("generic_build_permuted", &generic_build_permuted);
+}
@@ -0,0 +1,102 @@
+#ifndef KNNCOLLE_PY_PERMUTED_HPP
+#define KNNCOLLE_PY_PERMUTED_HPP
+
+#include "knncolle_py.h"
+#include "parallel.hpp"
+
+#include <memory>
+#include <utility>
+#include <vector>
+
+namespace knncolle_py {
+
+/*
+ * Wrapper around a prebuilt index that was constructed from a permuted copy
+ * of the data. All observation indices are translated between the original
+ * and permuted spaces, so that the permutation is invisible to the caller.
+ */
+class PermutedSearcher final : public Searcher {
+public:
+    PermutedSearcher(std::unique_ptr<Searcher> inner, const std::vector<Index>& old_ids, const std::vector<Index>& new_ids) :
+        my_inner(std::move(inner)), my_old_ids(old_ids), my_new_ids(new_ids) {}
+
+private:
+    std::unique_ptr<Searcher> my_inner;
+    const std::vector<Index>& my_old_ids;
+    const std::vector<Index>& my_new_ids;
+
+    void restore(std::vector<Index>* output_indices) const {
+        if (output_indices) {
+            for (auto& x : *output_indices) {
+                x = my_old_ids[x];
+            }
+        }
+    }
+
+public:
+    void search(Index i, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+        my_inner->search(my_new_ids[i], k, output_indices, output_distances);
+        restore(output_indices);
+    }
+
+    void search(const MatrixValue* query, Index k, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+        my_inner->search(query, k, output_indices, output_distances);
+        restore(output_indices);
+    }
+
+    bool can_search_all() const {
+        return my_inner->can_search_all();
+    }
+
+    Index search_all(Index i, Distance d, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+        auto count = my_inner->search_all(my_new_ids[i], d, output_indices, output_distances);
+        restore(output_indices);
+        return count;
+    }
+
+    Index search_all(const MatrixValue* query, Distance d, std::vector<Index>* output_indices, std::vector<Distance>* output_distances) {
+        auto count = my_inner->search_all(query, d, output_indices, output_distances);
+        restore(output_indices);
+        return count;
+    }
+};
+
+class PermutedPrebuilt final : public Prebuilt {
+public:
+    PermutedPrebuilt(std::unique_ptr<Prebuilt> inner, std::vector<Index> old_ids) : my_inner(std::move(inner)), my_old_ids(std::move(old_ids)) {
+        my_new_ids.resize(my_old_ids.size());
+        for (Index p = 0, end = my_old_ids.size(); p < end; ++p) {
+            my_new_ids[my_old_ids[p]] = p;
+        }
+    }
+
+private:
+    std::unique_ptr<Prebuilt> my_inner;
+    std::vector<Index> my_old_ids; // original index of the observation at each permuted position.
+    std::vector<Index> my_new_ids; // permuted position of each original observation.
+
+public:
+    Index num_observations() const {
+        return my_inner->num_observations();
+    }
+
+    std::size_t num_dimensions() const {
+        return my_inner->num_dimensions();
+    }
+
+    std::unique_ptr<Searcher> initialize() const {
+        return std::make_unique<PermutedSearcher>(my_inner->initialize(), my_old_ids, my_new_ids);
+    }
+
+    const Prebuilt& inner() const {
+        return *my_inner;
+    }
+
+    const std::vector<Index>& old_ids() const {
+        return my_old_ids;
+    }
+};
+
+}
+
+#endif
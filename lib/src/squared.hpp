@@ -0,0 +1,106 @@
+#ifndef KNNCOLLE_PY_SQUARED_HPP
+#define KNNCOLLE_PY_SQUARED_HPP
+
+#include "knncolle_py.h"
+#include "borrowed.hpp"
+
+#include <cmath>
+#include <cstddef>
+#include <memory>
+#include <utility>
+
+/*
+ * Support for reporting squared Euclidean distances without computing the
+ * square root and squaring it again. The metric switches to the squared
+ * Euclidean distance (i.e., its normalization is the identity) for the
+ * current thread when SquaredScope is active. This is done in the same manner
+ * as RefineScope, as the metric is shared by all searchers of an index.
+ *
+ * Only the exhaustive index uses this metric, as the KMKNN and VP-tree indices
+ * rely on the triangle inequality of the normalized distances for pruning.
+ * Other indices still compute the usual distances, which are then squared.
+ */
+
+namespace knncolle_py {
+
+inline thread_local bool report_squared = false;
+
+class SquaredScope {
+public:
+    SquaredScope(bool squared) {
+        report_squared = squared;
+    }
+
+    ~SquaredScope() {
+        report_squared = false;
+    }
+
+    SquaredScope(const SquaredScope&) = delete;
+    SquaredScope& operator=(const SquaredScope&) = delete;
+};
+
+class SquarableEuclideanDistance final : public knncolle::DistanceMetric<MatrixValue, Distance> {
+public:
+    Distance raw(std::size_t num_dimensions, const MatrixValue* x, const MatrixValue* y) const {
+        Distance output = 0;
+        for (std::size_t d = 0; d < num_dimensions; ++d) {
+            auto delta = static_cast<Distance>(x[d]) - static_cast<Distance>(y[d]);
+            output += delta * delta;
+        }
+        return output;
+    }
+
+    Distance normalize(Distance raw) const {
+        return (report_squared ? raw : std::sqrt(raw));
+    }
+
+    Distance denormalize(Distance norm) const {
+        return (report_squared ? norm : norm * norm);
+    }
+};
+
+/*
+ * Marks a prebuilt index whose metric is a SquarableEuclideanDistance, so that
+ * the search functions know that SquaredScope can be used for this index.
+ */
+class SquarablePrebuilt final : public knncolle::Prebuilt<Index, MatrixValue, Distance> {
+public:
+    SquarablePrebuilt(std::unique_ptr<knncolle::Prebuilt<Index, MatrixValue, Distance> > inner) : my_inner(std::move(inner)) {}
+
+private:
+    std::unique_ptr<knncolle::Prebuilt<Index, MatrixValue, Distance> > my_inner;
+
+public:
+    Index num_observations() const {
+        return my_inner->num_observations();
+    }
+
+    std::size_t num_dimensions() const {
+        return my_inner->num_dimensions();
+    }
+
+    std::unique_ptr<knncolle::Searcher<Index, MatrixValue, Distance> > initialize() const {
+        return my_inner->initialize();
+    }
+};
+
+class SquarableBuilder final : public knncolle::Builder<Index, MatrixValue, Distance>, public Borrowable {
+public:
+    SquarableBuilder(std::shared_ptr<const knncolle::Builder<Index, MatrixValue, Distance> > inner) : my_inner(std::move(inner)) {}
+
+private:
+    std::shared_ptr<const knncolle::Builder<Index, MatrixValue, Distance> > my_inner;
+
+public:
+    knncolle::Prebuilt<Index, MatrixValue, Distance>* build_raw(const Matrix& data) const {
+        return new SquarablePrebuilt(my_inner->build_unique(data));
+    }
+
+    knncolle::Prebuilt<Index, MatrixValue, Distance>* build_borrowed(std::size_t ndim, Index nobs, const MatrixValue* data) const {
+        return new SquarablePrebuilt(build_borrowed_inner(*my_inner, ndim, nobs, data));
+    }
+};
+
+}
+
+#endif
@@ -0,0 +1,24 @@
+#include "parallel.hpp"
+
+#include "pybind11/pybind11.h"
+
+#include <cstdint>
+
+std::uintptr_t create_thread_pool(int num_threads) {
+    auto tmp = new knncolle_py::ThreadPool(num_threads);
+    return reinterpret_cast<std::uintptr_t>(static_cast<void*>(tmp));
+}
+
+void free_thread_pool(std::uintptr_t pool_ptr) {
+    delete knncolle_py::cast_thread_pool(pool_ptr);
+}
+
+int thread_pool_size(std::uintptr_t pool_ptr) {
+    return knncolle_py::cast_thread_pool(pool_ptr)->size();
+}
+
+void init_thread_pool(pybind11::module& m) {
+    m.def("create_thread_pool", &create_thread_pool);
+    m.def("free_thread_pool", &free_thread_pool);
+    m.def("thread_pool_size", &thread_pool_size);
+}
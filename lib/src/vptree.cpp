@@ -1,4 +1,7 @@
 #include "knncolle_py.h"
+#include "cosine.hpp"
+#include "inner_product.hpp"
+#include "hamming.hpp"
 #include "pybind11/pybind11.h"
 
 #include <memory>
@@ -23,9 +26,25 @@ std::uintptr_t create_vptree_builder(std::string distance) {
             )
         );
 
+    } else if (distance == "Hamming") {
+        tmp->ptr.reset(
+            new knncolle::VptreeBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance>(
+                std::make_shared<knncolle_py::HammingDistance>()
+            )
+        );
+
     } else if (distance == "Cosine") {
         tmp->ptr.reset(
-            new knncolle::L2NormalizedBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance, knncolle_py::MatrixValue>(
+            new knncolle_py::CosineBuilder(
+                std::make_shared<knncolle::VptreeBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance> >(
+                    std::make_shared<knncolle::EuclideanDistance<knncolle_py::MatrixValue, knncolle_py::Distance> >()
+                )
+            )
+        );
+
+    } else if (distance == "InnerProduct") {
+        tmp->ptr.reset(
+            new knncolle_py::InnerProductBuilder(
                 std::make_shared<knncolle::VptreeBuilder<knncolle_py::Index, knncolle_py::MatrixValue, knncolle_py::Distance> >(
                     std::make_shared<knncolle::EuclideanDistance<knncolle_py::MatrixValue, knncolle_py::Distance> >()
                 )
@@ -17,17 +17,26 @@ finally:
 
 from ._classes import Parameters, Index, Builder, GenericIndex
 from ._annoy import AnnoyParameters, AnnoyIndex
+from ._async_searcher import AsyncSearcher
 from ._build_index import build_index
+from ._build_snn_graph import build_snn_graph, BuildSnnGraphResults
 from ._define_builder import define_builder
+from ._estimate_memory_usage import estimate_memory_usage
 from ._exhaustive import ExhaustiveParameters, ExhaustiveIndex
 from ._find_distance import find_distance
 from ._find_knn import find_knn, FindKnnResults
+from ._find_knn_graph import find_knn_graph
+from ._find_mutual_nn import find_mutual_nn, FindMutualNnResults
 from ._find_neighbors import find_neighbors, FindNeighborsResults
 from ._hnsw import HnswParameters, HnswIndex
+from ._kdtree import KdtreeParameters, KdtreeIndex
 from ._kmknn import KmknnParameters, KmknnIndex
+from ._nndescent import NndescentParameters, NndescentIndex
 from ._query_distance import query_distance
 from ._query_knn import query_knn, QueryKnnResults
+from ._query_knn_many import query_knn_many
 from ._query_neighbors import query_neighbors, QueryNeighborsResults
+from ._thread_pool import ThreadPool
 from ._vptree import VptreeParameters, VptreeIndex
 
 
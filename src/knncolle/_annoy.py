@@ -1,7 +1,9 @@
-from typing import Literal, Optional, Tuple
+from typing import Dict, Literal, Optional, Tuple
+import math
 
 from . import _lib_knncolle as lib
 from ._define_builder import define_builder
+from ._estimate_memory_usage import estimate_memory_usage
 from ._classes import Index, Builder, GenericIndex, Parameters
 
 
@@ -21,7 +23,8 @@ class AnnoyParameters(Parameters):
         self,
         num_trees: int = 50, 
         search_mult: Optional[float] = None,
-        distance: Literal["Euclidean", "Manhattan", "Cosine"] = "Euclidean",
+        distance: Literal["Euclidean", "Manhattan", "Cosine", "InnerProduct"] = "Euclidean",
+        keep_data: bool = False,
     ):
         """
         Args:
@@ -36,10 +39,19 @@ class AnnoyParameters(Parameters):
 
             distance:
                 Distance metric for index construction and search.
+                For ``InnerProduct``, the search returns the observations with the largest inner products,
+                and the reported "distances" are the inner products in decreasing order.
+
+            keep_data:
+                Whether to store a double-precision copy of the data in the index.
+                This enables the ``refine_factor`` option in :py:func:`~knncolle.find_knn` and :py:func:`~knncolle.query_knn`,
+                which re-ranks the approximate neighbors by their exact distances.
+                For ``distance="InnerProduct"``, no extra copy is stored as the exact inner products are always computed from the transformed data.
         """
         self.num_trees = num_trees
         self.search_mult = search_mult
         self.distance = distance
+        self.keep_data = keep_data
 
     @property
     def distance(self) -> str:
@@ -53,7 +65,7 @@ class AnnoyParameters(Parameters):
             distance:
                 Distance metric, see :meth:`~__init__()`.
         """
-        if distance not in ["Euclidean", "Manhattan", "Cosine"]:
+        if distance not in ["Euclidean", "Manhattan", "Cosine", "InnerProduct"]:
             raise ValueError("unsupported 'distance'")
         self._distance = distance
 
@@ -91,6 +103,20 @@ class AnnoyParameters(Parameters):
             raise ValueError("'search_mult' should be greater than 1")
         self._search_mult = search_mult
 
+    @property
+    def keep_data(self) -> bool:
+        """Whether to store a copy of the data, see :meth:`~__init__()`."""
+        return self._keep_data
+
+    @keep_data.setter
+    def keep_data(self, keep_data: bool):
+        """
+        Args:
+            keep_data:
+                Whether to store a copy of the data, see :meth:`~__init__()`.
+        """
+        self._keep_data = keep_data
+
 
 class AnnoyIndex(GenericIndex):
     """
@@ -118,4 +144,33 @@ class AnnoyIndex(GenericIndex):
 
 @define_builder.register
 def _define_builder_annoy(x: AnnoyParameters) -> Tuple:
-    return (Builder(lib.create_annoy_builder(x.num_trees, x.search_mult, x.distance)), AnnoyIndex)
+    return (Builder(lib.create_annoy_builder(x.num_trees, x.search_mult, x.distance, x.keep_data)), AnnoyIndex)
+
+
+@estimate_memory_usage.register
+def _estimate_memory_usage_annoy(x: AnnoyParameters, num_observations: int, num_dimensions: int) -> Dict[str, int]:
+    augmented = 0
+    if x.distance == "InnerProduct":
+        # Extra dimension for the transformation of inner products into Euclidean distances,
+        # plus a double-precision copy of the transformed data to compute the exact inner products.
+        num_dimensions += 1
+        augmented = num_observations * num_dimensions * 8
+
+    # Each node contains a 32-bit descendant count, a single-precision offset, two 32-bit children and a single-precision vector.
+    node_size = 16 + 4 * num_dimensions
+
+    # Leaf nodes can hold up to 'max_leaf' observation indices in the space used by the children and vector;
+    # assuming leaves are half-full on average, each tree has about '2 * N / (max_leaf / 2)' leaf and split nodes.
+    max_leaf = num_dimensions + 2
+    per_tree = max(1, math.ceil(4 * num_observations / max_leaf)) + 1 # +1 for the copy of the root.
+
+    output = {
+        "data": num_observations * node_size,
+        "trees": x.num_trees * per_tree * node_size,
+    }
+    if augmented:
+        output["augmented"] = augmented
+    if x.keep_data and not augmented:
+        # The exact inner products are already computed from the augmented copy, so no extra copy is needed.
+        output["exact"] = num_observations * num_dimensions * 8
+    return output
@@ -0,0 +1,182 @@
+from typing import Optional, Sequence, Union
+from concurrent.futures import Executor
+import asyncio
+import functools
+import numpy
+
+from ._classes import GenericIndex
+from ._query_knn import query_knn, QueryKnnResults
+from ._thread_pool import ThreadPool
+from ._utils import is_hamming, process_binary_codes
+
+
+class AsyncSearcher:
+    """
+    Asynchronous front-end to :py:func:`~knncolle.query_knn` for use in **asyncio** applications.
+    Concurrent calls to :py:meth:`~query` are coalesced into a single multi-threaded search that runs in an executor, i.e., without blocking the event loop.
+    The results are then scattered back to each caller.
+    This avoids paying the overhead of a separate :py:func:`~knncolle.query_knn` call for each small request.
+
+    Examples:
+        >>> import knncolle
+        >>> import numpy
+        >>> y = numpy.random.rand(200, 10)
+        >>> idx = knncolle.build_index(knncolle.VptreeParameters(), y)
+        >>> searcher = knncolle.AsyncSearcher(idx, max_batch=100, max_delay_ms=1)
+        >>> import asyncio
+        >>> res = asyncio.run(searcher.query(numpy.random.rand(10), 5))
+        >>> res.index
+        >>> res.distance
+    """
+
+    def __init__(
+        self,
+        index: GenericIndex,
+        max_batch: int = 1000,
+        max_delay_ms: float = 1,
+        num_threads: Union[int, ThreadPool] = 1,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        Args:
+            index:
+                A prebuilt search index.
+
+            max_batch:
+                Maximum number of query observations in each batch.
+                Once this number is reached, the batch is searched immediately.
+
+            max_delay_ms:
+                Maximum time to wait for more requests after the first request of a batch, in milliseconds.
+                Larger values increase the size of each batch at the cost of increased latency.
+
+            num_threads:
+                Number of threads to use for searching each batch.
+                Alternatively, a :py:class:`~knncolle.ThreadPool` of persistent worker threads.
+
+            executor:
+                Executor in which to run each search.
+                If None, the default executor of the event loop is used.
+        """
+        if max_batch < 1:
+            raise ValueError("'max_batch' should be a positive integer")
+        if max_delay_ms < 0:
+            raise ValueError("'max_delay_ms' should be non-negative")
+
+        self._index = index
+        self._num_dimensions = index.num_dimensions()
+        self._max_batch = max_batch
+        self._max_delay_ms = max_delay_ms
+        self._num_threads = num_threads
+        self._executor = executor
+
+        self._pending = []
+        self._pending_rows = 0
+        self._timer = None
+        self._tasks = set()
+
+    async def query(self, query: Union[numpy.ndarray, Sequence], num_neighbors: int) -> QueryKnnResults:
+        """
+        Find the k-nearest neighbors in the search index for one or more query observations.
+
+        Args:
+            query:
+                Coordinates of a single query observation, as a sequence of length equal to the number of dimensions in the index.
+
+                Alternatively, a row-major matrix of coordinates for multiple query observations, where the rows are observations and the columns are dimensions.
+
+                For indices built with the ``Hamming`` distance, this should instead contain bit-packed codes, see :py:func:`~knncolle.build_index`.
+
+            num_neighbors:
+                Number of nearest neighbors to identify for each query observation.
+                This is automatically capped at the total number of observations in the index.
+
+        Returns:
+            Results of the nearest-neighbor search, as described in :py:class:`~knncolle.QueryKnnResults` for an integer ``num_neighbors``.
+            If ``query`` is a single observation, ``index`` and ``distance`` are one-dimensional arrays instead of matrices.
+        """
+        if isinstance(num_neighbors, numpy.integer):
+            num_neighbors = int(num_neighbors)
+        elif not isinstance(num_neighbors, int):
+            raise ValueError("'num_neighbors' should be an integer")
+
+        if is_hamming(self._index):
+            # Keeping the bit-packed codes as 64-bit words, which can be concatenated across requests.
+            query = numpy.asarray(query)
+            single = (query.ndim == 1)
+            if single:
+                query = query.reshape(1, query.shape[0])
+            query = process_binary_codes(query).view(numpy.uint64)
+        else:
+            query = numpy.asarray(query, dtype=numpy.float64)
+            single = (query.ndim == 1)
+            if single:
+                query = query.reshape(1, query.shape[0])
+        if query.ndim != 2 or query.shape[1] != self._num_dimensions:
+            raise ValueError("mismatch in dimensionality between index and 'query'")
+
+        loop = asyncio.get_running_loop()
+        if query.shape[0] == 0:
+            return await loop.run_in_executor(self._executor, self._partial_search(query, num_neighbors))
+
+        future = loop.create_future()
+        self._pending.append((query, num_neighbors, future))
+        self._pending_rows += query.shape[0]
+
+        if self._pending_rows >= self._max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_delay_ms / 1000, self._flush)
+
+        res = await future
+        if single:
+            return QueryKnnResults(index=res.index[0], distance=res.distance[0])
+        return res
+
+    def _partial_search(self, query: numpy.ndarray, num_neighbors: Union[int, numpy.ndarray]):
+        return functools.partial(query_knn, self._index, query, num_neighbors, num_threads=self._num_threads)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch = self._pending
+        self._pending = []
+        self._pending_rows = 0
+        if len(batch) == 0:
+            return
+
+        # Holding a reference to avoid garbage collection of the task before completion.
+        task = asyncio.get_running_loop().create_task(self._search(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _search(self, batch: list):
+        queries = numpy.concatenate([b[0] for b in batch])
+        all_k = [b[1] for b in batch]
+        constant_k = all(k == all_k[0] for k in all_k)
+        if constant_k:
+            num_neighbors = all_k[0]
+        else:
+            num_neighbors = numpy.concatenate([numpy.full(b[0].shape[0], b[1], dtype=numpy.uint32) for b in batch])
+
+        loop = asyncio.get_running_loop()
+        try:
+            res = await loop.run_in_executor(self._executor, self._partial_search(queries, num_neighbors))
+        except Exception as e:
+            for b in batch:
+                if not b[2].done():
+                    b[2].set_exception(e)
+            return
+
+        start = 0
+        for b in batch:
+            end = start + b[0].shape[0]
+            if constant_k:
+                current = QueryKnnResults(index=res.index[start:end,:], distance=res.distance[start:end,:])
+            else:
+                current = QueryKnnResults(index=numpy.vstack(res.index[start:end]), distance=numpy.vstack(res.distance[start:end]))
+            if not b[2].done(): # in case the caller was cancelled.
+                b[2].set_result(current)
+            start = end
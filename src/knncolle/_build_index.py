@@ -4,10 +4,11 @@ import numpy
 from ._classes import Parameters, Index
 from ._define_builder import define_builder
 from . import _lib_knncolle as lib
+from ._utils import process_binary_codes
 
 
 @singledispatch
-def build_index(param: Parameters, x: numpy.ndarray, **kwargs) -> Index:
+def build_index(param: Parameters, x: numpy.ndarray, reorder: bool = False, prenormalized: bool = False, copy: bool = True, **kwargs) -> Index:
     """
     Build a search index for a given nearest neighbor search algorithm.
     The default method calls :py:func:`~knncolle.define_builder` to obtain an algorithm-specific factory that builds the index from ``x``.
@@ -20,6 +21,30 @@ def build_index(param: Parameters, x: numpy.ndarray, **kwargs) -> Index:
             Matrix of coordinates for the observations to be searched.
             This should be a double-precision row-major NumPy matrix where the rows are observations and columns are dimensions.
 
+            For the ``Hamming`` distance, this should instead be a matrix of binary codes where each row contains the bit-packed code for an observation,
+            either as a ``numpy.uint8`` matrix (e.g., from ``numpy.packbits``) or a ``numpy.uint64`` matrix.
+            Codes are zero-padded to a multiple of 64 bits and stored in packed form.
+
+        reorder:
+            Whether to store the observations in order of their spatial locality, see :py:attr:`~knncolle.GenericIndex.locality`.
+            This improves cache efficiency for graph- or hash-based algorithms like HNSW and Annoy, where the stored layout otherwise follows the input order.
+            (The VP-tree and KMKNN algorithms already store the observations in tree or cluster order, respectively.)
+            Indices in the search results always refer to the rows of ``x``.
+            The ordering is also stored in the index, allowing functions like :py:func:`~knncolle.find_knn` to process observations in order of their locality.
+            Ignored for the Hamming distance, where there is no meaningful spatial ordering of the bit-packed codes.
+
+        prenormalized:
+            Whether each row of ``x`` is already L2-normalized, in which case the normalization step is skipped.
+            Only used for the cosine distance.
+
+        copy:
+            Whether to store a copy of ``x`` in the index.
+            If False, the index references the contents of ``x`` directly, which avoids doubling the memory usage during and after the build.
+            In this case, ``x`` should be a C-contiguous double-precision NumPy matrix (or ``numpy.memmap``) that is not modified for the lifetime of the index,
+            and the index holds a reference to ``x`` to keep it alive.
+            This is currently only supported for the exhaustive algorithm, and requires ``prenormalized=True`` for the cosine distance.
+            It cannot be combined with ``reorder=True``.
+
         kwargs:
             Additional arguments to be passed to individual methods.
 
@@ -34,6 +59,38 @@ def build_index(param: Parameters, x: numpy.ndarray, **kwargs) -> Index:
         >>> idx = knncolle.build_index(params, y)
         >>> type(idx)
     """
+    hamming = getattr(param, "distance", None) == "Hamming"
+    if hamming:
+        x = process_binary_codes(x)
+
+    is_cosine = getattr(param, "distance", None) == "Cosine"
+    if prenormalized and not is_cosine:
+        raise ValueError("'prenormalized=True' is only supported for the cosine distance")
+
+    if not copy:
+        if reorder:
+            raise ValueError("'reorder=True' requires a copy of 'x'")
+        if is_cosine and not prenormalized:
+            raise ValueError("'copy=False' requires 'prenormalized=True' for the cosine distance")
+        if not isinstance(x, numpy.ndarray) or x.ndim != 2 or x.dtype != numpy.float64 or not x.flags.c_contiguous:
+            raise ValueError("'x' should be a C-contiguous double-precision matrix if 'copy=False'")
+
     builder, cls = define_builder(param)
-    prebuilt = lib.generic_build(builder.ptr, x)
-    return cls(prebuilt)
+    # The order of bit-packed codes along a space-filling curve is meaningless, so no reordering is performed for Hamming indices.
+    reorder = reorder and not hamming
+    # VP trees built for dual-tree searches also need the locality to determine the search order, see VptreeParameters.dual_tree.
+    locality = None
+    if reorder or getattr(param, "dual_tree", False):
+        locality = lib.generic_locality_order(x)
+    if reorder:
+        prebuilt = lib.generic_build_permuted(builder.ptr, x, locality)
+    else:
+        prebuilt = lib.generic_build(builder.ptr, x, prenormalized, copy)
+
+    output = cls(prebuilt)
+    output._parameters = param
+    output._locality = locality
+    output._layout = "locality" if reorder else "input"
+    if not copy:
+        output._data = x
+    return output
@@ -0,0 +1,126 @@
+from functools import singledispatch
+from typing import Optional, Union, Literal
+from dataclasses import dataclass
+import numpy
+
+from ._classes import Index, GenericIndex
+from ._thread_pool import ThreadPool
+from . import _lib_knncolle as lib
+from ._utils import process_num_threads, process_chunk_size
+
+
+@dataclass
+class BuildSnnGraphResults:
+    """
+    Edges of a shared nearest neighbor graph from :py:func:`~knncolle.build_snn_graph` with ``as_edges = True``.
+    Each edge is reported once, i.e., the graph is undirected.
+
+    ``first`` and ``second`` are integer arrays containing the indices of the observations connected by each edge,
+    where each entry of ``first`` is always greater than the corresponding entry of ``second``.
+    ``weight`` is a double-precision array containing the weight of each edge.
+    """
+    first: numpy.ndarray
+    second: numpy.ndarray
+    weight: numpy.ndarray
+
+
+@singledispatch
+def build_snn_graph(
+    X: Index,
+    num_neighbors: int,
+    weighting: Literal["rank", "number", "jaccard"] = "rank",
+    num_threads: Union[int, ThreadPool] = 1,
+    as_edges: bool = False,
+    chunk_size: Optional[int] = None,
+    **kwargs
+):
+    """
+    Build a shared nearest neighbor (SNN) graph, where observations are connected if they share any of their nearest neighbors.
+    Each observation is considered to be its own nearest neighbor for this purpose.
+    This is commonly used for graph-based clustering.
+
+    Args:
+        X:
+            A prebuilt search index.
+
+        num_neighbors:
+            Number of nearest neighbors to identify for each observation in ``X``.
+            This is automatically capped at the number of observations minus 1.
+
+        weighting:
+            How to compute the weight of the edge between two observations.
+
+            - ``"rank"``: ``k - r/2``, where ``k`` is ``num_neighbors`` and ``r`` is the smallest sum of ranks for any shared neighbor,
+              with each observation having a rank of zero in its own neighbor list.
+              Weights are floored at a small positive value so that all pairs with shared neighbors are connected.
+            - ``"number"``: the number of shared neighbors.
+            - ``"jaccard"``: the Jaccard index of the two neighbor lists.
+
+        num_threads:
+            Number of threads to use for the search and the weight calculations.
+            Alternatively, a :py:class:`~knncolle.ThreadPool` of persistent worker threads.
+
+        as_edges:
+            Whether to return the edges in flat arrays.
+
+        chunk_size:
+            Number of observations in each chunk for dynamic scheduling across threads during the search,
+            see :py:func:`~knncolle.find_knn` for details.
+
+        kwargs:
+            Additional arguments to pass to specific methods.
+
+    Returns:
+        If ``as_edges = False``, a symmetric ``scipy.sparse.csr_matrix`` where the number of rows and columns is equal to the number of observations.
+        Each non-zero entry contains the weight of the edge between two observations.
+        This requires the **scipy** package.
+
+        If ``as_edges = True``, a :py:class:`~knncolle.BuildSnnGraphResults` containing the edges of the graph.
+
+    Raises:
+        NotImplementedError: if no method was implemented for this particular :py:class:`~knncolle.Index` subclass.
+
+    Examples:
+        >>> import knncolle
+        >>> import numpy
+        >>> y = numpy.random.rand(100, 5)
+        >>> idx = knncolle.build_index(knncolle.KmknnParameters(), y)
+        >>> graph = knncolle.build_snn_graph(idx, 10)
+        >>> edges = knncolle.build_snn_graph(idx, 10, weighting="jaccard", as_edges=True)
+        >>> edges.weight[:10]
+    """
+    raise NotImplementedError("no available method for '" + str(type(X)) + "'")
+
+
+@build_snn_graph.register
+def _build_snn_graph_generic(
+    X: GenericIndex,
+    num_neighbors: int,
+    weighting: Literal["rank", "number", "jaccard"] = "rank",
+    num_threads: Union[int, ThreadPool] = 1,
+    as_edges: bool = False,
+    chunk_size: Optional[int] = None,
+    **kwargs
+):
+    if weighting not in ("rank", "number", "jaccard"):
+        raise ValueError("'weighting' should be one of 'rank', 'number' or 'jaccard'")
+
+    num_threads, pool = process_num_threads(num_threads)
+    output = lib.generic_build_snn_graph(
+        X.ptr,
+        num_neighbors,
+        weighting,
+        num_threads,
+        pool,
+        process_chunk_size(chunk_size),
+        as_edges
+    )
+
+    if as_edges:
+        first, second, weight = output
+        return BuildSnnGraphResults(first = first, second = second, weight = weight)
+
+    import scipy.sparse
+    indptr, indices, data = output
+    nobs = X.num_observations()
+    return scipy.sparse.csr_matrix((data, indices, indptr), shape=(nobs, nobs))
@@ -1,4 +1,7 @@
 from abc import ABC
+from typing import Dict, Optional
+import numpy
+
 from . import _lib_knncolle as lib
 
 
@@ -49,7 +52,17 @@ class Index(ABC):
     This is typically created by :py:class:`~knncolle.build_index` and can be used in functions like :py:func:`~knncolle.find_knn`.
     Each search algorithm should implement its own subclass.
     """
-    pass
+
+    def estimate_memory_usage(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dictionary containing the estimated number of bytes used by each component of the index,
+            see :py:func:`~knncolle.estimate_memory_usage` for details.
+
+        Raises:
+            NotImplementedError: if no method was implemented for this particular :py:class:`~knncolle.Index` subclass.
+        """
+        raise NotImplementedError("no available method for '" + str(type(self)) + "'")
 
 
 class GenericIndex(Index):
@@ -66,6 +79,7 @@ class GenericIndex(Index):
         >>> idx.ptr # pass this into C++ code as a std::uintptr_t.
         >>> idx.num_observations()
         >>> idx.num_dimensions()
+        >>> idx.estimate_memory_usage()
     """
 
     def __init__(self, ptr: int):
@@ -75,6 +89,10 @@ class GenericIndex(Index):
                 Address of a ``knncolle_py::WrappedPrebuilt``.
         """
         self._ptr = ptr
+        self._parameters = None
+        self._locality = None
+        self._layout = "input"
+        self._data = None
 
     @property
     def ptr(self) -> int:
@@ -98,3 +116,53 @@ class GenericIndex(Index):
             Number of dimensions in this index.
         """
         return lib.generic_num_dims(self._ptr)
+
+    @property
+    def parameters(self) -> Optional[Parameters]:
+        """Parameters used to build this index in :py:func:`~knncolle.build_index`, or None if they are not known."""
+        return self._parameters
+
+    @property
+    def locality(self) -> Optional[numpy.ndarray]:
+        """
+        Ordering of the observations in this index along a space-filling curve, so that consecutive observations are spatially close.
+        This is computed in :py:func:`~knncolle.build_index` with ``reorder=True`` or for a :py:class:`~knncolle.VptreeParameters` with ``dual_tree=True``,
+        and used to improve cache efficiency in functions like :py:func:`~knncolle.find_knn` with ``reorder=True`` or ``dual_tree=True``.
+        If None, the ordering is not known.
+        """
+        return self._locality
+
+    @property
+    def layout(self) -> str:
+        """
+        Layout of the stored observations in the index.
+        This is ``"locality"`` if the observations were permuted by their spatial locality in :py:func:`~knncolle.build_index` with ``reorder=True``,
+        otherwise it is ``"input"``, i.e., the layout is determined by the algorithm from the input order.
+        """
+        return self._layout
+
+    def estimate_memory_usage(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dictionary containing the estimated number of bytes used by each component of the index,
+            see :py:func:`~knncolle.estimate_memory_usage` for details.
+            This is computed from :py:attr:`~parameters` and the number of observations and dimensions in the index,
+            so it does not account for any variation in the sizes of randomized data structures or the workspaces allocated during a search.
+            If :py:attr:`~layout` is ``"locality"``, an additional ``permutation`` entry reports the size of the mappings between the original and stored orders.
+            If :py:attr:`~locality` is available, an additional ``locality`` entry reports the size of the ordering.
+            If the index was built with ``copy=False``, the ``data`` entry is zero as the data is owned by the caller.
+
+        Raises:
+            ValueError: if the parameters used to build the index are not known.
+        """
+        if self._parameters is None:
+            raise ValueError("parameters used to build the index are not known")
+        from ._estimate_memory_usage import estimate_memory_usage
+        output = estimate_memory_usage(self._parameters, self.num_observations(), self.num_dimensions())
+        if self._layout == "locality":
+            output["permutation"] = 2 * 4 * self.num_observations()
+        if self._locality is not None:
+            output["locality"] = self._locality.nbytes
+        if self._data is not None:
+            output["data"] = 0
+        return output
@@ -0,0 +1,36 @@
+from functools import singledispatch
+from typing import Dict
+
+from ._classes import Parameters
+
+
+@singledispatch
+def estimate_memory_usage(param: Parameters, num_observations: int, num_dimensions: int) -> Dict[str, int]:
+    """
+    Estimate the memory usage of a search index for a given nearest neighbor search algorithm.
+    This can be used to check whether an index will fit into memory before calling :py:func:`~knncolle.build_index`.
+
+    Args:
+        param:
+            Parameters for a particular search algorithm.
+
+        num_observations:
+            Number of observations in the dataset.
+
+        num_dimensions:
+            Number of dimensions in the dataset.
+
+    Returns:
+        Dictionary where each key is a component of the index (e.g., ``"data"`` for the stored copy of the observations, ``"tree"`` for the nodes of a tree)
+        and each value is the number of bytes used by that component.
+        The sum of all values is the total size of the index.
+        Values are computed from the sizes of the algorithm's data structures and may be approximate for randomized algorithms like Annoy and HNSW.
+
+    Raises:
+        NotImplementedError: if no method was implemented for the specified algorithm.
+
+    Examples:
+        >>> import knncolle
+        >>> knncolle.estimate_memory_usage(knncolle.VptreeParameters(), 10000, 50)
+    """
+    raise NotImplementedError("no available method for '" + str(type(param)) + "'")
@@ -1,8 +1,9 @@
-from typing import Literal, Tuple
+from typing import Dict, Literal, Tuple
 
 from . import _lib_knncolle as lib
 from ._classes import Parameters, GenericIndex, Builder
 from ._define_builder import define_builder
+from ._estimate_memory_usage import estimate_memory_usage
 
 
 class ExhaustiveParameters(Parameters):
@@ -18,12 +19,16 @@ class ExhaustiveParameters(Parameters):
 
     def __init__(
         self,
-        distance: Literal["Euclidean", "Manhattan", "Cosine"] = "Euclidean",
+        distance: Literal["Euclidean", "Manhattan", "Cosine", "InnerProduct", "Hamming"] = "Euclidean",
     ):
         """
         Args:
             distance:
                 Distance metric for index construction and search.
+                For ``InnerProduct``, the search returns the observations with the largest inner products,
+                and the reported "distances" are the inner products in decreasing order.
+                For ``Hamming``, the observations should be bit-packed binary codes, see :py:func:`~knncolle.build_index`,
+                and the number of dimensions is the number of 64-bit words in each code.
         """
         self.distance = distance
 
@@ -39,7 +44,7 @@ class ExhaustiveParameters(Parameters):
             distance:
                 Distance metric, see :meth:`~__init__()`.
         """
-        if distance not in ["Euclidean", "Manhattan", "Cosine"]:
+        if distance not in ["Euclidean", "Manhattan", "Cosine", "InnerProduct", "Hamming"]:
             raise ValueError("unsupported 'distance'")
         self._distance = distance
 
@@ -71,3 +76,13 @@ class ExhaustiveIndex(GenericIndex):
 @define_builder.register
 def _define_builder_exhaustive(x: ExhaustiveParameters) -> Tuple:
     return (Builder(lib.create_exhaustive_builder(x.distance)), ExhaustiveIndex)
+
+
+@estimate_memory_usage.register
+def _estimate_memory_usage_exhaustive(x: ExhaustiveParameters, num_observations: int, num_dimensions: int) -> Dict[str, int]:
+    if x.distance == "InnerProduct":
+        # Extra dimension for the transformation of inner products into Euclidean distances.
+        # The exhaustive search references this transformed copy directly, so there is no separate copy of the data.
+        return { "data": 0, "augmented": num_observations * (num_dimensions + 1) * 8 }
+    # Double-precision copy of the data.
+    return { "data": num_observations * num_dimensions * 8 }
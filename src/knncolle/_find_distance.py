@@ -3,16 +3,22 @@ from typing import Sequence, Optional, Union
 import numpy
 
 from ._classes import Index, GenericIndex
+from ._thread_pool import ThreadPool
 from . import _lib_knncolle as lib
-from ._utils import process_num_neighbors, process_subset
+from ._utils import process_num_neighbors, process_subset, process_num_threads, process_chunk_size, process_dual_tree, process_squared, process_distance_dtype
 
 
 @singledispatch
 def find_distance(
     X: Index,
     num_neighbors: Union[int, Sequence],
-    num_threads: int = 1,
+    num_threads: Union[int, ThreadPool] = 1,
     subset: Optional[Sequence] = None, 
+    chunk_size: Optional[int] = None,
+    reorder: bool = False,
+    squared: bool = False,
+    distance_dtype: numpy.dtype = numpy.float64,
+    dual_tree: bool = False,
     **kwargs
 ) -> numpy.ndarray:
     """
@@ -34,11 +40,37 @@ def find_distance(
 
         num_threads:
             Number of threads to use for the search.
+            Alternatively, a :py:class:`~knncolle.ThreadPool` of persistent worker threads to use for the search.
 
         subset:
             Sequence of integers containing the indices of the observations for which to compute the distances.
             All indices should be non-negative and less than the total number of observations.
 
+        chunk_size:
+            Number of observations in each chunk for dynamic scheduling across threads.
+            If None, the observations are split into equally-sized contiguous ranges, one per thread.
+            Otherwise, each thread repeatedly claims the next chunk of observations until all of them are processed.
+            This improves the load balance when the search cost is highly variable between observations.
+
+        reorder:
+            Whether to process the observations in order of their spatial locality, as defined by :py:attr:`~knncolle.GenericIndex.locality`.
+            This improves cache efficiency for large numbers of observations.
+            The output is always reported in the original order of the observations.
+            This requires ``X`` to be built with ``reorder=True`` so that the locality of its observations is known.
+
+        squared:
+            Whether to report squared distances, for indices built with the Euclidean or cosine distances.
+            This avoids a pass over the output to square the distances for downstream computations like Gaussian kernels.
+
+        distance_dtype:
+            NumPy floating-point type of the reported distances, either ``numpy.float64`` or ``numpy.float32``.
+            Single-precision distances are written directly into the output arrays, halving the memory usage of the results.
+
+        dual_tree:
+            Whether to find the neighbors of all observations in a single pass over the tree,
+            for indices built with :py:class:`~knncolle.KdtreeParameters` or :py:class:`~knncolle.VptreeParameters` with ``dual_tree=True``.
+            See :py:func:`~knncolle.find_knn` for details.
+
         kwargs:
             Additional arguments to pass to specific methods.
 
@@ -63,17 +95,36 @@ def find_distance(
 def _find_distance_generic(
     X: GenericIndex,
     num_neighbors: Union[int, Sequence],
-    num_threads: int = 1,
+    num_threads: Union[int, ThreadPool] = 1,
     subset: Optional[Sequence] = None,
+    chunk_size: Optional[int] = None,
+    reorder: bool = False,
+    squared: bool = False,
+    distance_dtype: numpy.dtype = numpy.float64,
+    dual_tree: bool = False,
     **kwargs
 ) -> numpy.ndarray:
+    num_threads, pool = process_num_threads(num_threads)
+    locality, use_dual_tree = process_dual_tree(X, dual_tree, reorder)
     num_neighbors, force_variable = process_num_neighbors(num_neighbors)
     return lib.generic_find_knn(
         X.ptr, 
         num_neighbors,
         force_variable,
         process_subset(subset), 
-        num_threads, 
+        num_threads,
+        pool,
+        process_chunk_size(chunk_size),
+        locality,
+        None,
+        None,
+        None,
+        None,
+        None,
+        1,
+        process_squared(X, squared),
+        use_dual_tree,
+        process_distance_dtype(distance_dtype),
         True,
         False,
         False
@@ -4,8 +4,9 @@ from dataclasses import dataclass
 import numpy
 
 from ._classes import Index, GenericIndex
+from ._thread_pool import ThreadPool
 from . import _lib_knncolle as lib
-from ._utils import process_num_neighbors, process_subset
+from ._utils import process_num_neighbors, process_subset, process_num_threads, process_chunk_size, process_dual_tree, process_squared, process_distance_dtype, process_filter, process_refine_factor
 
 
 @dataclass
@@ -26,6 +27,9 @@ class FindKnnResults:
     For each observation, the neighbors are guaranteed to be sorted in order of increasing distance.
     Each element of ``index`` is guaranteed to not contain the index of the corresponding observation.
 
+    For indices built with the ``InnerProduct`` distance, ``distance`` instead contains the inner products with the neighbors,
+    which are sorted in order of decreasing inner product.
+
     If ``get_index = False``, ``index`` is set to None.
 
     If ``get_distance = False``, ``distance`` is set to None.
@@ -41,10 +45,18 @@ class FindKnnResults:
 def find_knn(
     X: Index,
     num_neighbors: Union[int, Sequence],
-    num_threads: int = 1,
+    num_threads: Union[int, ThreadPool] = 1,
     subset: Optional[Sequence] = None, 
     get_index: bool = True,
     get_distance: bool = True,
+    chunk_size: Optional[int] = None,
+    reorder: bool = False,
+    squared: bool = False,
+    distance_dtype: numpy.dtype = numpy.float64,
+    allowed: Optional[Sequence] = None,
+    excluded: Optional[Sequence] = None,
+    refine_factor: Optional[int] = None,
+    dual_tree: bool = False,
     **kwargs
 ) -> FindKnnResults:
     """
@@ -66,6 +78,7 @@ def find_knn(
 
         num_threads:
             Number of threads to use for the search.
+            Alternatively, a :py:class:`~knncolle.ThreadPool` of persistent worker threads to use for the search.
 
         subset:
             Sequence of integers containing the indices of the observations for which to identify neighbors.
@@ -77,6 +90,54 @@ def find_knn(
         get_distance:
             Whether to report the distances to each nearest neighbor.
 
+        chunk_size:
+            Number of observations in each chunk for dynamic scheduling across threads.
+            If None, the observations are split into equally-sized contiguous ranges, one per thread.
+            Otherwise, each thread repeatedly claims the next chunk of observations until all of them are processed.
+            This improves the load balance when the search cost is highly variable between observations.
+
+        reorder:
+            Whether to process the observations in order of their spatial locality, as defined by :py:attr:`~knncolle.GenericIndex.locality`.
+            This improves cache efficiency for large numbers of observations.
+            The output is always reported in the original order of the observations.
+            This requires ``X`` to be built with ``reorder=True`` so that the locality of its observations is known.
+
+        squared:
+            Whether to report squared distances, for indices built with the Euclidean or cosine distances.
+            This avoids a pass over the output to square the distances for downstream computations like Gaussian kernels.
+
+        distance_dtype:
+            NumPy floating-point type of the reported distances, either ``numpy.float64`` or ``numpy.float32``.
+            Single-precision distances are written directly into the output arrays, halving the memory usage of the results.
+
+        allowed:
+            Observations in ``X`` that may be reported as neighbors.
+            This may be a boolean array of length equal to the number of observations in ``X``, or an integer array of observation indices.
+            Alternatively, this may be a sequence of such arrays of length equal to the number of observations (or the length of ``subset``, if supplied), where each element specifies the allowed neighbors for the corresponding observation.
+            Filtering is performed within the search so that the nearest valid neighbors are found in a single call.
+
+        excluded:
+            Observations in ``X`` that may not be reported as neighbors.
+            This has the same format as ``allowed``, and is applied in addition to ``allowed`` if both are supplied.
+
+        refine_factor:
+            For approximate indices built with ``keep_data=True``, the number of candidates to retrieve per requested neighbor.
+            Candidates are re-ranked by their exact distances to the query, and the closest ``num_neighbors`` are reported.
+            This improves the accuracy of the search at a lower cost than increasing the search effort of the underlying algorithm.
+            If None, no refinement is performed.
+
+        dual_tree:
+            Whether to find the neighbors of all observations in a single pass over the tree,
+            for indices built with :py:class:`~knncolle.KdtreeParameters` or :py:class:`~knncolle.VptreeParameters` with ``dual_tree=True``.
+            For k-d trees, this uses a dual-tree traversal that prunes pairs of nodes based on their bounding boxes,
+            sharing the pruning work across nearby observations.
+            For VP trees, observations are searched in order of their spatial locality so that consecutive searches visit similar nodes,
+            see :py:attr:`~knncolle.VptreeParameters.dual_tree` for details.
+            In both cases, the results are identical to those of the default search.
+            If ``subset`` is supplied, only the neighbors of the observations in ``subset`` are computed.
+            This is most effective for large numbers of low-dimensional observations.
+            Not supported with ``allowed`` or ``excluded``.
+
         kwargs:
             Additional arguments to pass to specific methods.
 
@@ -107,19 +168,42 @@ def find_knn(
 def _find_knn_generic(
     X: GenericIndex,
     num_neighbors: Union[int, Sequence],
-    num_threads: int = 1,
+    num_threads: Union[int, ThreadPool] = 1,
     subset: Optional[Sequence] = None,
     get_index: bool = True,
     get_distance: bool = True,
+    chunk_size: Optional[int] = None,
+    reorder: bool = False,
+    squared: bool = False,
+    distance_dtype: numpy.dtype = numpy.float64,
+    allowed: Optional[Sequence] = None,
+    excluded: Optional[Sequence] = None,
+    refine_factor: Optional[int] = None,
+    dual_tree: bool = False,
     **kwargs
 ) -> FindKnnResults:
+    num_threads, pool = process_num_threads(num_threads)
+    locality, use_dual_tree = process_dual_tree(X, dual_tree, reorder)
     num_neighbors, force_variable = process_num_neighbors(num_neighbors)
+    subset = process_subset(subset)
+    num_obs = X.num_observations()
+    if dual_tree and (allowed is not None or excluded is not None):
+        raise ValueError("'dual_tree=True' does not support 'allowed' or 'excluded'")
+    filters = process_filter(allowed, excluded, num_obs, num_obs if subset is None else len(subset))
     idx, dist = lib.generic_find_knn(
         X.ptr, 
         num_neighbors,
         force_variable,
-        process_subset(subset), 
-        num_threads, 
+        subset,
+        num_threads,
+        pool,
+        process_chunk_size(chunk_size),
+        locality,
+        *filters,
+        process_refine_factor(X, refine_factor),
+        process_squared(X, squared),
+        use_dual_tree,
+        process_distance_dtype(distance_dtype),
         False,
         get_index,
         get_distance
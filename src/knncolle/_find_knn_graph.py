@@ -0,0 +1,105 @@
+from functools import singledispatch
+from typing import Optional, Union, Literal
+
+from ._classes import Index, GenericIndex
+from ._thread_pool import ThreadPool
+from . import _lib_knncolle as lib
+from ._utils import process_num_threads, process_chunk_size
+
+
+@singledispatch
+def find_knn_graph(
+    X: Index,
+    num_neighbors: int,
+    num_threads: Union[int, ThreadPool] = 1,
+    weighted: bool = True,
+    symmetrize: Optional[Literal["union", "intersection"]] = None,
+    chunk_size: Optional[int] = None,
+    **kwargs
+):
+    """
+    Construct a k-nearest neighbor graph as a sparse adjacency matrix.
+    This is equivalent to calling :py:func:`~knncolle.find_knn` and converting the results into a sparse matrix,
+    but avoids the creation of intermediate dense arrays by assembling the graph directly from the search results.
+    Requires the **scipy** package.
+
+    Args:
+        X:
+            A prebuilt search index.
+
+        num_neighbors:
+            Number of nearest neighbors to identify for each observation in ``X``.
+            This is automatically capped at the number of observations minus 1.
+
+        num_threads:
+            Number of threads to use for the search and symmetrization.
+            Alternatively, a :py:class:`~knncolle.ThreadPool` of persistent worker threads.
+
+        weighted:
+            Whether to store the distance to each neighbor as the value of the corresponding edge.
+            If False, all edges have a value of 1.
+            For indices built with the ``InnerProduct`` distance, the inner product is stored instead.
+
+        symmetrize:
+            How to symmetrize the graph.
+            If None, the graph is not symmetrized, so an edge from observation ``i`` to ``j`` is present if ``j`` is one of the neighbors of ``i``.
+            If ``"union"``, an edge between ``i`` and ``j`` is present if either is a neighbor of the other.
+            If ``"intersection"``, an edge is only present if each is a neighbor of the other.
+
+        chunk_size:
+            Number of observations in each chunk for dynamic scheduling across threads during the search,
+            see :py:func:`~knncolle.find_knn` for details.
+
+        kwargs:
+            Additional arguments to pass to specific methods.
+
+    Returns:
+        A ``scipy.sparse.csr_matrix`` with number of rows and columns equal to the number of observations in ``X``.
+        Each row corresponds to an observation and contains an entry for each of its neighbors.
+        If ``symmetrize = None``, neighbors in each row are sorted by increasing distance (or decreasing inner product).
+        Otherwise, the matrix is symmetric and the column indices in each row are sorted.
+
+    Raises:
+        NotImplementedError: if no method was implemented for this particular :py:class:`~knncolle.Index` subclass.
+
+    Examples:
+        >>> import knncolle
+        >>> import numpy
+        >>> y = numpy.random.rand(100, 5)
+        >>> idx = knncolle.build_index(knncolle.KmknnParameters(), y)
+        >>> graph = knncolle.find_knn_graph(idx, 10, symmetrize="union")
+        >>> graph.nnz
+    """
+    raise NotImplementedError("no available method for '" + str(type(X)) + "'")
+
+
+@find_knn_graph.register
+def _find_knn_graph_generic(
+    X: GenericIndex,
+    num_neighbors: int,
+    num_threads: Union[int, ThreadPool] = 1,
+    weighted: bool = True,
+    symmetrize: Optional[Literal["union", "intersection"]] = None,
+    chunk_size: Optional[int] = None,
+    **kwargs
+):
+    import scipy.sparse
+
+    if symmetrize is None:
+        symmetrize = "none"
+    elif symmetrize not in ("union", "intersection"):
+        raise ValueError("'symmetrize' should be None, 'union' or 'intersection'")
+
+    num_threads, pool = process_num_threads(num_threads)
+    indptr, indices, data = lib.generic_find_knn_graph(
+        X.ptr,
+        num_neighbors,
+        num_threads,
+        pool,
+        process_chunk_size(chunk_size),
+        weighted,
+        symmetrize
+    )
+
+    nobs = X.num_observations()
+    return scipy.sparse.csr_matrix((data, indices, indptr), shape=(nobs, nobs))
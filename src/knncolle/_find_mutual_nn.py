@@ -0,0 +1,120 @@
+from functools import singledispatch
+from typing import Optional, Union
+from dataclasses import dataclass
+import numpy
+
+from ._classes import Index, GenericIndex
+from ._thread_pool import ThreadPool
+from . import _lib_knncolle as lib
+from ._utils import process_num_threads, process_chunk_size, process_query
+
+
+@dataclass
+class FindMutualNnResults:
+    """
+    Results of :py:func:`~knncolle.find_mutual_nn`.
+
+    ``first`` and ``second`` are integer arrays of the same length, where each pair of entries defines a pair of mutual nearest neighbors.
+    ``first`` contains the index of an observation in the first dataset and ``second`` contains the index of its partner in the second dataset.
+    Pairs are sorted by ``first`` and then by ``second``.
+    """
+    first: numpy.ndarray
+    second: numpy.ndarray
+
+
+@singledispatch
+def find_mutual_nn(
+    X_a: Index,
+    X_b: Index,
+    data_a: numpy.ndarray,
+    data_b: numpy.ndarray,
+    num_neighbors_a: int,
+    num_neighbors_b: int,
+    num_threads: Union[int, ThreadPool] = 1,
+    chunk_size: Optional[int] = None,
+    **kwargs
+) -> FindMutualNnResults:
+    """
+    Find mutual nearest neighbors (MNNs) between two datasets.
+    An observation in the first dataset and an observation in the second dataset are MNNs if each is among the nearest neighbors of the other.
+    This is commonly used to identify matching observations for batch correction.
+
+    Args:
+        X_a:
+            A prebuilt search index for the first dataset.
+
+        X_b:
+            A prebuilt search index for the second dataset, built with the same algorithm and distance as ``X_a``.
+
+        data_a:
+            Matrix used to build ``X_a``, where rows are observations and columns are dimensions.
+            Each row is used to query ``X_b``.
+
+        data_b:
+            Matrix used to build ``X_b``, with the same number of columns as ``data_a``.
+            Each row is used to query ``X_a``.
+
+        num_neighbors_a:
+            Number of nearest neighbors in the first dataset to identify for each observation in the second dataset.
+            This is automatically capped at the number of observations in ``X_a``.
+
+        num_neighbors_b:
+            Number of nearest neighbors in the second dataset to identify for each observation in the first dataset.
+            This is automatically capped at the number of observations in ``X_b``.
+
+        num_threads:
+            Number of threads to use for the searches.
+            Alternatively, a :py:class:`~knncolle.ThreadPool` of persistent worker threads.
+
+        chunk_size:
+            Number of observations in each chunk for dynamic scheduling across threads,
+            see :py:func:`~knncolle.find_knn` for details.
+
+        kwargs:
+            Additional arguments to pass to specific methods.
+
+    Returns:
+        Pairs of mutual nearest neighbors.
+
+    Raises:
+        NotImplementedError: if no method was implemented for this particular :py:class:`~knncolle.Index` subclass.
+
+    Examples:
+        >>> import knncolle
+        >>> import numpy
+        >>> a = numpy.random.rand(100, 5)
+        >>> b = numpy.random.rand(200, 5)
+        >>> idx_a = knncolle.build_index(knncolle.VptreeParameters(), a)
+        >>> idx_b = knncolle.build_index(knncolle.VptreeParameters(), b)
+        >>> res = knncolle.find_mutual_nn(idx_a, idx_b, a, b, 10, 10)
+        >>> res.first[:10]
+        >>> res.second[:10]
+    """
+    raise NotImplementedError("no available method for '" + str(type(X_a)) + "'")
+
+
+@find_mutual_nn.register
+def _find_mutual_nn_generic(
+    X_a: GenericIndex,
+    X_b: GenericIndex,
+    data_a: numpy.ndarray,
+    data_b: numpy.ndarray,
+    num_neighbors_a: int,
+    num_neighbors_b: int,
+    num_threads: Union[int, ThreadPool] = 1,
+    chunk_size: Optional[int] = None,
+    **kwargs
+) -> FindMutualNnResults:
+    num_threads, pool = process_num_threads(num_threads)
+    first, second = lib.generic_find_mutual_nn(
+        X_a.ptr,
+        X_b.ptr,
+        process_query(X_b, data_a),
+        process_query(X_a, data_b),
+        num_neighbors_a,
+        num_neighbors_b,
+        num_threads,
+        pool,
+        process_chunk_size(chunk_size)
+    )
+    return FindMutualNnResults(first = first, second = second)
@@ -4,8 +4,9 @@ from dataclasses import dataclass
 import numpy
 
 from ._classes import Index, GenericIndex
+from ._thread_pool import ThreadPool
 from . import _lib_knncolle as lib
-from ._utils import process_threshold, process_subset
+from ._utils import process_threshold, process_subset, process_num_threads, process_chunk_size, process_dual_tree, process_squared, process_distance_dtype, process_max_neighbors, is_similarity
 
 
 @dataclass
@@ -24,32 +25,49 @@ class FindNeighborsResults:
 
     If ``get_distance = False``, ``distance`` is set to None.
 
+    If ``max_neighbors`` is provided, ``capped`` is a boolean NumPy array specifying whether each observation had more than ``max_neighbors`` neighbors within the threshold,
+    in which case only the closest ``max_neighbors`` are reported.
+    Otherwise, ``capped`` is set to None.
+
     If ``subset`` is provided, the length of ``index`` and ``distance`` is instead equal to the length of the subset.
     Each row or list entry corresponds to one of the observations in the subset.
     """
     index: Optional[list]
     distance: Optional[list]
+    capped: Optional[numpy.ndarray] = None
 
 
 @singledispatch
 def find_neighbors(
     X: Index,
     threshold: Union[float, Sequence],
-    num_threads: int = 1,
+    num_threads: Union[int, ThreadPool] = 1,
     subset: Optional[Sequence] = None, 
     get_index: bool = True,
     get_distance: bool = True,
+    chunk_size: Optional[int] = None,
+    reorder: bool = False,
+    squared: bool = False,
+    distance_dtype: numpy.dtype = numpy.float64,
+    max_neighbors: Optional[int] = None,
+    dual_tree: bool = False,
     **kwargs
 ) -> FindNeighborsResults:
     """
     Find all neighbors within a certain distance for each observation.
 
+    For approximate algorithms like HNSW and Annoy, the neighbors are found by k-nearest neighbor searches with increasing k,
+    until the furthest neighbor lies beyond the threshold.
+    Some neighbors may be missed, depending on the accuracy of each search; this can be improved with the algorithm's search-effort parameters,
+    e.g., :py:attr:`~knncolle.HnswParameters.ef_search` or :py:attr:`~knncolle.AnnoyParameters.search_mult`.
+
     Args:
         X:
             A prebuilt search index.
 
         threshold:
             Distance threshold at which to identify neighbors for each observation in ``X``. 
+            For indices built with the ``InnerProduct`` distance, this is instead the minimum inner product of each neighbor.
 
             Alternatively, this may be a sequence of non-negative floats of length equal to the number of observations in ``X``.
             Each element should specify the distance threshold to search for each observation.
@@ -59,6 +77,7 @@ def find_neighbors(
 
         num_threads:
             Number of threads to use for the search.
+            Alternatively, a :py:class:`~knncolle.ThreadPool` of persistent worker threads to use for the search.
 
         subset:
             Sequence of integers containing the indices of the observations for which to identify neighbors.
@@ -70,6 +89,36 @@ def find_neighbors(
         get_distance:
             Whether to report the distances to each nearest neighbor.
 
+        chunk_size:
+            Number of observations in each chunk for dynamic scheduling across threads.
+            If None, the observations are split into equally-sized contiguous ranges, one per thread.
+            Otherwise, each thread repeatedly claims the next chunk of observations until all of them are processed.
+            This improves the load balance when the search cost is highly variable between observations.
+
+        reorder:
+            Whether to process the observations in order of their spatial locality, as defined by :py:attr:`~knncolle.GenericIndex.locality`.
+            This improves cache efficiency for large numbers of observations.
+            The output is always reported in the original order of the observations.
+            This requires ``X`` to be built with ``reorder=True`` so that the locality of its observations is known.
+
+        squared:
+            Whether to report squared distances, for indices built with the Euclidean or cosine distances.
+            If True, ``threshold`` is also interpreted as a squared distance.
+
+        distance_dtype:
+            NumPy floating-point type of the reported distances, either ``numpy.float64`` or ``numpy.float32``.
+            Single-precision distances are written directly into the output arrays, halving the memory usage of the results.
+
+        max_neighbors:
+            Maximum number of neighbors to report for each observation.
+            If provided, only the closest ``max_neighbors`` neighbors within the threshold are reported,
+            and the memory usage of the search is bounded by ``max_neighbors`` rather than the total number of neighbors within the threshold.
+
+        dual_tree:
+            Whether to find the neighbors of all observations in a single pass over the tree,
+            for indices built with :py:class:`~knncolle.KdtreeParameters` or :py:class:`~knncolle.VptreeParameters` with ``dual_tree=True``.
+            See :py:func:`~knncolle.find_knn` for details.
+
         kwargs:
             Additional arguments to pass to specific methods.
 
@@ -95,18 +144,34 @@ def find_neighbors(
 def _find_neighbors_generic(
     X: GenericIndex,
     threshold: Union[int, Sequence],
-    num_threads: int = 1,
+    num_threads: Union[int, ThreadPool] = 1,
     subset: Optional[Sequence] = None,
     get_index: bool = True,
     get_distance: bool = True,
+    chunk_size: Optional[int] = None,
+    reorder: bool = False,
+    squared: bool = False,
+    distance_dtype: numpy.dtype = numpy.float64,
+    max_neighbors: Optional[int] = None,
+    dual_tree: bool = False,
     **kwargs
 ) -> FindNeighborsResults:
-    idx, dist = lib.generic_find_all(
+    num_threads, pool = process_num_threads(num_threads)
+    locality, use_dual_tree = process_dual_tree(X, dual_tree, reorder)
+    idx, dist, capped = lib.generic_find_all(
         X.ptr, 
         process_subset(subset), 
         process_threshold(threshold),
-        num_threads, 
+        num_threads,
+        pool,
+        process_chunk_size(chunk_size),
+        locality,
+        process_squared(X, squared),
+        process_max_neighbors(max_neighbors),
+        is_similarity(X),
+        use_dual_tree,
+        process_distance_dtype(distance_dtype),
         get_index,
         get_distance
     )
-    return FindNeighborsResults(index = idx, distance = dist)
+    return FindNeighborsResults(index = idx, distance = dist, capped = capped)
@@ -1,8 +1,12 @@
-from typing import Literal, Optional, Tuple
+from typing import Dict, Literal, Tuple, Union
 
 from . import _lib_knncolle as lib
 from ._classes import Parameters, GenericIndex, Builder
+from ._find_knn import FindKnnResults
+from ._thread_pool import ThreadPool
+from ._utils import process_num_threads
 from ._define_builder import define_builder
+from ._estimate_memory_usage import estimate_memory_usage
 
 
 class HnswParameters(Parameters):
@@ -22,7 +26,9 @@ class HnswParameters(Parameters):
         num_links: int = 16, 
         ef_construction: int = 200,
         ef_search: int = 10,
-        distance: Literal["Euclidean", "Manhattan", "Cosine"] = "Euclidean",
+        distance: Literal["Euclidean", "Manhattan", "Cosine", "InnerProduct"] = "Euclidean",
+        keep_data: bool = False,
+        base_graph: bool = False,
     ):
         """
         Args:
@@ -40,11 +46,27 @@ class HnswParameters(Parameters):
 
             distance:
                 Distance metric for index construction and search.
+                For ``InnerProduct``, the search returns the observations with the largest inner products,
+                and the reported "distances" are the inner products in decreasing order.
+
+            keep_data:
+                Whether to store a double-precision copy of the data in the index.
+                This enables the ``refine_factor`` option in :py:func:`~knncolle.find_knn` and :py:func:`~knncolle.query_knn`,
+                which re-ranks the approximate neighbors by their exact distances.
+                For ``distance="InnerProduct"``, no extra copy is stored as the exact inner products are always computed from the transformed data.
+
+            base_graph:
+                Whether to build an index that supports :py:meth:`~knncolle.HnswIndex.base_graph`.
+                This uses a local implementation of the HNSW index that exposes its base layer, which is otherwise private in **knncolle_hnsw**.
+                Searches are the same as those of the default implementation.
+                Not supported with ``InnerProduct``.
         """
         self.num_links = num_links
         self.ef_construction = ef_construction
         self.ef_search = ef_search
         self.distance = distance
+        self.keep_data = keep_data
+        self.base_graph = base_graph
 
     @property
     def distance(self) -> str:
@@ -58,8 +80,10 @@ class HnswParameters(Parameters):
             distance:
                 Distance metric, see :meth:`~__init__()`.
         """
-        if distance not in ["Euclidean", "Manhattan", "Cosine"]:
+        if distance not in ["Euclidean", "Manhattan", "Cosine", "InnerProduct"]:
             raise ValueError("unsupported 'distance'")
+        if distance == "InnerProduct" and getattr(self, "_base_graph", False):
+            raise ValueError("'base_graph=True' is not supported for the 'InnerProduct' distance")
         self._distance = distance 
 
     @property
@@ -110,6 +134,36 @@ class HnswParameters(Parameters):
             raise ValueError("'ef_search' should be a positive integer")
         self._ef_search = ef_search
 
+    @property
+    def keep_data(self) -> bool:
+        """Whether to store a copy of the data, see :meth:`~__init__()`."""
+        return self._keep_data
+
+    @keep_data.setter
+    def keep_data(self, keep_data: bool):
+        """
+        Args:
+            keep_data:
+                Whether to store a copy of the data, see :meth:`~__init__()`.
+        """
+        self._keep_data = keep_data
+
+    @property
+    def base_graph(self) -> bool:
+        """Whether to support :py:meth:`~knncolle.HnswIndex.base_graph`, see :meth:`~__init__()`."""
+        return self._base_graph
+
+    @base_graph.setter
+    def base_graph(self, base_graph: bool):
+        """
+        Args:
+            base_graph:
+                Whether to support :py:meth:`~knncolle.HnswIndex.base_graph`, see :meth:`~__init__()`.
+        """
+        if base_graph and self._distance == "InnerProduct":
+            raise ValueError("'base_graph=True' is not supported for the 'InnerProduct' distance")
+        self._base_graph = base_graph
+
 
 class HnswIndex(GenericIndex):
     """
@@ -134,7 +188,85 @@ class HnswIndex(GenericIndex):
         """
         super().__init__(ptr)
 
+    def base_graph(self, num_neighbors: int, num_threads: Union[int, ThreadPool] = 1, refine: bool = False) -> FindKnnResults:
+        """
+        Approximate k-nearest neighbor graph from the base layer of the HNSW index.
+        The neighbors of each observation are taken from its links in the base layer, which were already identified during index construction.
+        This is much faster than :py:func:`~knncolle.find_knn` as no search is performed,
+        at the cost of lower accuracy as the links are pruned for navigability rather than proximity.
+
+        Args:
+            num_neighbors:
+                Number of nearest neighbors to report for each observation.
+                This is automatically capped at the number of observations minus 1.
+                If an observation has fewer links than ``num_neighbors``, its neighbors are identified by a search instead.
+
+            num_threads:
+                Number of threads to use.
+                Alternatively, a :py:class:`~knncolle.ThreadPool` of persistent worker threads.
+
+            refine:
+                Whether to refine the graph with one pass of local search,
+                i.e., considering the links of each linked observation as candidate neighbors.
+                This improves accuracy at the cost of more distance calculations.
+
+        Returns:
+            Results of the search, formatted as described for :py:func:`~knncolle.find_knn` with an integer ``num_neighbors``.
+            Distances are computed exactly from the (single-precision) data in the index.
+
+        Raises:
+            ValueError: if the index was not built with ``base_graph=True`` in its :py:class:`~knncolle.HnswParameters`.
+
+        Examples:
+            >>> import knncolle
+            >>> import numpy
+            >>> y = numpy.random.rand(200, 10)
+            >>> idx = knncolle.build_index(knncolle.HnswParameters(base_graph=True), y)
+            >>> res = idx.base_graph(10)
+            >>> res.index[:5,:]
+        """
+        if self.parameters is None or not self.parameters.base_graph:
+            raise ValueError("'base_graph()' requires an index built with 'base_graph=True'")
+        num_threads, pool = process_num_threads(num_threads)
+        idx, dist = lib.generic_hnsw_base_graph(self.ptr, num_neighbors, refine, num_threads, pool)
+        return FindKnnResults(index = idx, distance = dist)
+
 
 @define_builder.register
 def _define_builder_hnsw(x: HnswParameters) -> Tuple:
-    return (Builder(lib.create_hnsw_builder(x.num_links, x.ef_construction, x.ef_search, x.distance)), HnswIndex)
+    return (Builder(lib.create_hnsw_builder(x.num_links, x.ef_construction, x.ef_search, x.distance, x.keep_data, x.base_graph)), HnswIndex)
+
+
+@estimate_memory_usage.register
+def _estimate_memory_usage_hnsw(x: HnswParameters, num_observations: int, num_dimensions: int) -> Dict[str, int]:
+    augmented = 0
+    if x.distance == "InnerProduct":
+        # Extra dimension for the transformation of inner products into Euclidean distances,
+        # plus a double-precision copy of the transformed data to compute the exact inner products.
+        num_dimensions += 1
+        augmented = num_observations * num_dimensions * 8
+
+    num_links = x.num_links
+
+    # Each observation has a level-0 list of up to '2 * num_links' 32-bit links, plus a 32-bit count.
+    # Observations are assigned to higher levels with probability 'num_links^-level',
+    # and each higher level has a list of up to 'num_links' links and a count.
+    graph = num_observations * ((2 * num_links) * 4 + 4)
+    if num_links > 1:
+        graph += int(num_observations / (num_links - 1) * (num_links * 4 + 4))
+    graph += num_observations * (8 + 4) # pointers to the higher-level lists and the level of each observation.
+
+    output = {
+        # Single-precision copy of the data, plus a 64-bit label for each observation.
+        "data": num_observations * (num_dimensions * 4 + 8),
+        "graph": graph,
+        # A mutex (assumed to be 40 bytes) and a label lookup entry (assumed to be 48 bytes, including the hash table buckets) per observation,
+        # 65536 label locks, and a 16-bit visited list per observation.
+        "overhead": num_observations * (40 + 48 + 2) + 65536 * 40,
+    }
+    if augmented:
+        output["augmented"] = augmented
+    if x.keep_data and not augmented:
+        # The exact inner products are already computed from the augmented copy, so no extra copy is needed.
+        output["exact"] = num_observations * num_dimensions * 8
+    return output
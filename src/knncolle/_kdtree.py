@@ -0,0 +1,126 @@
+from typing import Dict, Literal, Tuple
+import math
+
+from . import _lib_knncolle as lib
+from ._classes import Parameters, GenericIndex, Builder
+from ._define_builder import define_builder
+from ._estimate_memory_usage import estimate_memory_usage
+
+
+class KdtreeParameters(Parameters):
+    """
+    Parameters for the k-d tree algorithm.
+    This performs an exact search and is usually the fastest choice for low-dimensional data, e.g., 2- or 3-dimensional spatial coordinates.
+    Its performance degrades rapidly with increasing dimensionality, in which case :py:class:`~knncolle.VptreeParameters` or :py:class:`~knncolle.KmknnParameters` should be used instead.
+    This can be used in :py:func:`~knncolle.build_index` or :py:func:`~knncolle.define_builder`.
+
+    Examples:
+        >>> import knncolle
+        >>> params = knncolle.KdtreeParameters()
+        >>> params.distance
+        >>> params.leaf_size
+    """
+
+    def __init__(
+        self,
+        leaf_size: int = 10,
+        distance: Literal["Euclidean", "Manhattan", "Cosine", "InnerProduct"] = "Euclidean",
+    ):
+        """
+        Args:
+            leaf_size:
+                Maximum number of observations in each leaf node of the tree.
+                Smaller values result in deeper trees with more pruning but more overhead from traversal.
+
+            distance:
+                Distance metric for index construction and search.
+                For ``InnerProduct``, the search returns the observations with the largest inner products,
+                and the reported "distances" are the inner products in decreasing order.
+        """
+        self.leaf_size = leaf_size
+        self.distance = distance
+
+    @property
+    def distance(self) -> str:
+        """Distance metric, see :meth:`~__init__()`."""
+        return self._distance
+
+    @distance.setter
+    def distance(self, distance: str):
+        """
+        Args:
+            distance:
+                Distance metric, see :meth:`~__init__()`.
+        """
+        if distance not in ["Euclidean", "Manhattan", "Cosine", "InnerProduct"]:
+            raise ValueError("unsupported 'distance'")
+        self._distance = distance
+
+    @property
+    def leaf_size(self) -> int:
+        """Maximum number of observations in each leaf, see :meth:`~__init__()`."""
+        return self._leaf_size
+
+    @leaf_size.setter
+    def leaf_size(self, leaf_size: int):
+        """
+        Args:
+            leaf_size:
+                Maximum number of observations in each leaf, see :meth:`~__init__()`.
+        """
+        if leaf_size < 1:
+            raise ValueError("'leaf_size' should be a positive integer")
+        self._leaf_size = leaf_size
+
+
+class KdtreeIndex(GenericIndex):
+    """
+    Prebuilt index for the k-d tree algorithm.
+    This is typically created by :py:func:`~knncolle.build_index` with an :py:class:`~KdtreeParameters` object,
+    and can be used in functions like :py:func:`~knncolle.find_knn`.
+
+    Examples:
+        >>> import knncolle
+        >>> params = knncolle.KdtreeParameters()
+        >>> import numpy
+        >>> y = numpy.random.rand(200, 2)
+        >>> idx = knncolle.build_index(params, y)
+        >>> type(idx)
+    """
+
+    def __init__(self, ptr: int):
+        """
+        Args:
+            ptr:
+                Address of a ``knncolle_py::WrappedPrebuilt`` containing a k-d tree search index, allocated in C++.
+        """
+        super().__init__(ptr)
+
+
+@define_builder.register
+def _define_builder_kdtree(x: KdtreeParameters) -> Tuple:
+    return (Builder(lib.create_kdtree_builder(x.leaf_size, x.distance)), KdtreeIndex)
+
+
+@estimate_memory_usage.register
+def _estimate_memory_usage_kdtree(x: KdtreeParameters, num_observations: int, num_dimensions: int) -> Dict[str, int]:
+    augmented = 0
+    if x.distance == "InnerProduct":
+        # Extra dimension for the transformation of inner products into Euclidean distances,
+        # plus a double-precision copy of the transformed data to compute the exact inner products.
+        num_dimensions += 1
+        augmented = num_observations * num_dimensions * 8
+
+    # Median splits yield leaves that are between half-full and full,
+    # so there are at most '2 * N / leaf_size' leaves and one fewer internal nodes.
+    num_leaves = max(1, math.ceil(2 * num_observations / x.leaf_size))
+    output = {
+        # Double-precision copy of the data in tree order.
+        "data": num_observations * num_dimensions * 8,
+        # Each node contains a 64-bit split dimension, a double-precision split value and four 32-bit indices,
+        # plus two 32-bit indices per observation to map between the original and tree order.
+        "tree": (2 * num_leaves - 1) * 32 + num_observations * 8,
+    }
+    if augmented:
+        output["augmented"] = augmented
+    return output
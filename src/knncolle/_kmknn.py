@@ -1,8 +1,10 @@
-from typing import Literal, Tuple
+from typing import Dict, Literal, Tuple
+import math
 
 from . import _lib_knncolle as lib
 from ._classes import Parameters, GenericIndex, Builder
 from ._define_builder import define_builder
+from ._estimate_memory_usage import estimate_memory_usage
 
 
 class KmknnParameters(Parameters):
@@ -18,12 +20,14 @@ class KmknnParameters(Parameters):
 
     def __init__(
         self,
-        distance: Literal["Euclidean", "Manhattan", "Cosine"] = "Euclidean",
+        distance: Literal["Euclidean", "Manhattan", "Cosine", "InnerProduct"] = "Euclidean",
     ):
         """
         Args:
             distance:
                 Distance metric for index construction and search.
+                For ``InnerProduct``, the search returns the observations with the largest inner products,
+                and the reported "distances" are the inner products in decreasing order.
         """
         self.distance = distance
 
@@ -39,7 +43,7 @@ class KmknnParameters(Parameters):
             distance:
                 Distance metric, see :meth:`~__init__()`.
         """
-        if distance not in ["Euclidean", "Manhattan", "Cosine"]:
+        if distance not in ["Euclidean", "Manhattan", "Cosine", "InnerProduct"]:
             raise ValueError("unsupported 'distance'")
         self._distance = distance 
 
@@ -71,3 +75,26 @@ class KmknnIndex(GenericIndex):
 @define_builder.register
 def _define_builder_kmknn(x: KmknnParameters) -> Tuple:
     return (Builder(lib.create_kmknn_builder(x.distance)), KmknnIndex)
+
+
+@estimate_memory_usage.register
+def _estimate_memory_usage_kmknn(x: KmknnParameters, num_observations: int, num_dimensions: int) -> Dict[str, int]:
+    augmented = 0
+    if x.distance == "InnerProduct":
+        # Extra dimension for the transformation of inner products into Euclidean distances,
+        # plus a double-precision copy of the transformed data to compute the exact inner products.
+        num_dimensions += 1
+        augmented = num_observations * num_dimensions * 8
+    # Upper bound, as empty clusters are discarded.
+    num_centers = math.ceil(math.sqrt(num_observations))
+    output = {
+        # Double-precision copy of the data.
+        "data": num_observations * num_dimensions * 8,
+        # Double-precision cluster centers, plus 32-bit sizes and offsets for each cluster.
+        "centers": num_centers * (num_dimensions * 8 + 4 + 4),
+        # Two 32-bit indices (observation ID and new location) and a double-precision distance to the centroid for each observation.
+        "clusters": num_observations * (4 + 4 + 8),
+    }
+    if augmented:
+        output["augmented"] = augmented
+    return output
@@ -0,0 +1,271 @@
+from typing import Dict, Literal, Tuple
+
+from . import _lib_knncolle as lib
+from ._classes import Parameters, GenericIndex, Builder
+from ._define_builder import define_builder
+from ._estimate_memory_usage import estimate_memory_usage
+
+
+class NndescentParameters(Parameters):
+    """
+    Parameters for the nearest neighbor descent (NN-descent) algorithm, see `Dong et al. (2011) <https://doi.org/10.1145/1963405.1963487>`_ for details.
+    This builds an approximate k-nearest neighbor graph of all observations by iteratively comparing the neighbors of each observation's neighbors.
+    The graph is used directly by :py:func:`~knncolle.find_knn`, which is much faster than searching for the neighbors of each observation.
+    Queries in :py:func:`~knncolle.query_knn` are handled by a best-first search of the graph.
+    This can be used in :py:func:`~knncolle.build_index` or :py:func:`~knncolle.define_builder`.
+
+    Examples:
+        >>> import knncolle
+        >>> params = knncolle.NndescentParameters()
+        >>> params.distance
+        >>> params.num_neighbors
+    """
+
+    def __init__(
+        self,
+        num_neighbors: int = 30,
+        sample_rate: float = 1.0,
+        max_iterations: int = 10,
+        delta: float = 0.001,
+        ef_search: int = 50,
+        distance: Literal["Euclidean", "Manhattan", "Cosine", "InnerProduct"] = "Euclidean",
+        seed: int = 42,
+        num_threads: int = 1,
+    ):
+        """
+        Args:
+            num_neighbors:
+                Number of neighbors to store for each observation in the graph.
+                :py:func:`~knncolle.find_knn` reports neighbors directly from the graph if its ``num_neighbors`` is no greater than this value,
+                otherwise it falls back to a (slower) search of the graph.
+                Larger values improve accuracy at the expense of time and memory usage.
+
+            sample_rate:
+                Proportion of ``num_neighbors`` to sample from the new neighbors of each observation in each iteration.
+                Larger values improve accuracy at the expense of time.
+
+            max_iterations:
+                Maximum number of iterations.
+
+            delta:
+                Convergence threshold.
+                The algorithm terminates early if the number of updates in an iteration is no greater than ``delta`` times the number of observations times ``num_neighbors``.
+
+            ef_search:
+                Size of the dynamic list for searching the graph.
+                Larger values improve accuracy at the expense of a slower search.
+
+            distance:
+                Distance metric for index construction and search.
+                For ``InnerProduct``, the search returns the observations with the largest inner products,
+                and the reported "distances" are the inner products in decreasing order.
+
+            seed:
+                Seed for the random number generator.
+                The graph is reproducible for a given seed when ``num_threads = 1``.
+
+            num_threads:
+                Number of threads to use for building the graph.
+        """
+        self.num_neighbors = num_neighbors
+        self.sample_rate = sample_rate
+        self.max_iterations = max_iterations
+        self.delta = delta
+        self.ef_search = ef_search
+        self.distance = distance
+        self.seed = seed
+        self.num_threads = num_threads
+
+    @property
+    def distance(self) -> str:
+        """Distance metric, see :meth:`~__init__()`."""
+        return self._distance
+
+    @distance.setter
+    def distance(self, distance: str):
+        """
+        Args:
+            distance:
+                Distance metric, see :meth:`~__init__()`.
+        """
+        if distance not in ["Euclidean", "Manhattan", "Cosine", "InnerProduct"]:
+            raise ValueError("unsupported 'distance'")
+        self._distance = distance
+
+    @property
+    def num_neighbors(self) -> int:
+        """Number of neighbors in the graph, see :meth:`~__init__()`."""
+        return self._num_neighbors
+
+    @num_neighbors.setter
+    def num_neighbors(self, num_neighbors: int):
+        """
+        Args:
+            num_neighbors:
+                Number of neighbors in the graph, see :meth:`~__init__()`.
+        """
+        if num_neighbors < 1:
+            raise ValueError("'num_neighbors' should be a positive integer")
+        self._num_neighbors = num_neighbors
+
+    @property
+    def sample_rate(self) -> float:
+        """Sampling rate, see :meth:`~__init__()`."""
+        return self._sample_rate
+
+    @sample_rate.setter
+    def sample_rate(self, sample_rate: float):
+        """
+        Args:
+            sample_rate:
+                Sampling rate, see :meth:`~__init__()`.
+        """
+        if sample_rate <= 0 or sample_rate > 1:
+            raise ValueError("'sample_rate' should lie in (0, 1]")
+        self._sample_rate = sample_rate
+
+    @property
+    def max_iterations(self) -> int:
+        """Maximum number of iterations, see :meth:`~__init__()`."""
+        return self._max_iterations
+
+    @max_iterations.setter
+    def max_iterations(self, max_iterations: int):
+        """
+        Args:
+            max_iterations:
+                Maximum number of iterations, see :meth:`~__init__()`.
+        """
+        if max_iterations < 0:
+            raise ValueError("'max_iterations' should be a non-negative integer")
+        self._max_iterations = max_iterations
+
+    @property
+    def delta(self) -> float:
+        """Convergence threshold, see :meth:`~__init__()`."""
+        return self._delta
+
+    @delta.setter
+    def delta(self, delta: float):
+        """
+        Args:
+            delta:
+                Convergence threshold, see :meth:`~__init__()`.
+        """
+        if delta < 0:
+            raise ValueError("'delta' should be non-negative")
+        self._delta = delta
+
+    @property
+    def ef_search(self) -> int:
+        """Size of the dynamic list during search, see :meth:`~__init__()`."""
+        return self._ef_search
+
+    @ef_search.setter
+    def ef_search(self, ef_search: int):
+        """
+        Args:
+            ef_search:
+                Size of the dynamic list during search, see :meth:`~__init__()`.
+        """
+        if ef_search < 1:
+            raise ValueError("'ef_search' should be a positive integer")
+        self._ef_search = ef_search
+
+    @property
+    def seed(self) -> int:
+        """Random seed, see :meth:`~__init__()`."""
+        return self._seed
+
+    @seed.setter
+    def seed(self, seed: int):
+        """
+        Args:
+            seed:
+                Random seed, see :meth:`~__init__()`.
+        """
+        if seed < 0:
+            raise ValueError("'seed' should be a non-negative integer")
+        self._seed = seed
+
+    @property
+    def num_threads(self) -> int:
+        """Number of threads for building the graph, see :meth:`~__init__()`."""
+        return self._num_threads
+
+    @num_threads.setter
+    def num_threads(self, num_threads: int):
+        """
+        Args:
+            num_threads:
+                Number of threads for building the graph, see :meth:`~__init__()`.
+        """
+        if num_threads < 1:
+            raise ValueError("'num_threads' should be a positive integer")
+        self._num_threads = num_threads
+
+
+class NndescentIndex(GenericIndex):
+    """
+    Prebuilt index for the NN-descent algorithm.
+    This is typically created by :py:func:`~knncolle.build_index` with an :py:class:`~NndescentParameters` object,
+    and can be used in functions like :py:func:`~knncolle.find_knn`.
+
+    Examples:
+        >>> import knncolle
+        >>> params = knncolle.NndescentParameters()
+        >>> import numpy
+        >>> y = numpy.random.rand(200, 10)
+        >>> idx = knncolle.build_index(params, y)
+        >>> type(idx)
+    """
+
+    def __init__(self, ptr: int):
+        """
+        Args:
+            ptr:
+                Address of a ``knncolle_py::WrappedPrebuilt`` containing a NN-descent search index, allocated in C++.
+        """
+        super().__init__(ptr)
+
+
+@define_builder.register
+def _define_builder_nndescent(x: NndescentParameters) -> Tuple:
+    return (
+        Builder(
+            lib.create_nndescent_builder(
+                x.num_neighbors,
+                x.sample_rate,
+                x.max_iterations,
+                x.delta,
+                x.ef_search,
+                x.distance,
+                x.seed,
+                x.num_threads
+            )
+        ),
+        NndescentIndex
+    )
+
+
+@estimate_memory_usage.register
+def _estimate_memory_usage_nndescent(x: NndescentParameters, num_observations: int, num_dimensions: int) -> Dict[str, int]:
+    augmented = 0
+    if x.distance == "InnerProduct":
+        # Extra dimension for the transformation of inner products into Euclidean distances,
+        # plus a double-precision copy of the transformed data to compute the exact inner products.
+        num_dimensions += 1
+        augmented = num_observations * num_dimensions * 8
+
+    num_neighbors = min(x.num_neighbors, max(num_observations - 1, 0))
+    output = {
+        # Double-precision copy of the data.
+        "data": num_observations * num_dimensions * 8,
+        # 32-bit index and double-precision distance for each neighbor of each observation.
+        "graph": num_observations * num_neighbors * (4 + 8),
+        # Up to two 32-bit links per neighbor for the forward and reverse edges, plus a 64-bit offset per observation.
+        "search": num_observations * (num_neighbors * 2 * 4 + 8),
+    }
+    if augmented:
+        output["augmented"] = augmented
+    return output
@@ -3,8 +3,9 @@ from typing import Sequence, Optional, Union
 import numpy
 
 from ._classes import Index, GenericIndex
+from ._thread_pool import ThreadPool
 from . import _lib_knncolle as lib
-from ._utils import process_num_neighbors, process_subset
+from ._utils import process_num_neighbors, process_subset, process_num_threads, process_chunk_size, process_reorder, process_query, process_squared, process_distance_dtype
 
 
 @singledispatch
@@ -12,7 +13,11 @@ def query_distance(
     X: Index,
     query: numpy.ndarray,
     num_neighbors: Union[int, Sequence],
-    num_threads: int = 1,
+    num_threads: Union[int, ThreadPool] = 1,
+    chunk_size: Optional[int] = None,
+    reorder: bool = False,
+    squared: bool = False,
+    distance_dtype: numpy.dtype = numpy.float64,
     **kwargs
 ) -> numpy.ndarray:
     """
@@ -26,6 +31,7 @@ def query_distance(
             Matrix of coordinates for the query observations.
             This should be a double-precision row-major NumPy matrix where the rows are dimensions and columns are observations.
             The number of dimensions should be consistent with that in ``X``.
+            For indices built with the ``Hamming`` distance, this should instead be a matrix of bit-packed codes, see :py:func:`~knncolle.build_index`.
 
         num_neighbors:
             Number of nearest neighbors in ``X`` at which to compute the distance from each observation in ``query``, i.e., k.
@@ -36,6 +42,27 @@ def query_distance(
 
         num_threads:
             Number of threads to use for the search.
+            Alternatively, a :py:class:`~knncolle.ThreadPool` of persistent worker threads to use for the search.
+
+        chunk_size:
+            Number of query observations in each chunk for dynamic scheduling across threads.
+            If None, the query observations are split into equally-sized contiguous ranges, one per thread.
+            Otherwise, each thread repeatedly claims the next chunk of query observations until all of them are processed.
+            This improves the load balance when the search cost is highly variable between query observations.
+
+        reorder:
+            Whether to process the query observations in order of their spatial locality, i.e., along a space-filling curve.
+            This improves cache efficiency for large query sets in random order.
+            The output is always reported in the original order of the query observations.
+            Ignored for indices built with the Hamming distance.
+
+        squared:
+            Whether to report squared distances, for indices built with the Euclidean or cosine distances.
+            This avoids a pass over the output to square the distances for downstream computations like Gaussian kernels.
+
+        distance_dtype:
+            NumPy floating-point type of the reported distances, either ``numpy.float64`` or ``numpy.float32``.
+            Single-precision distances are written directly into the output arrays, halving the memory usage of the results.
 
         kwargs:
             Additional arguments to pass to specific methods.
@@ -62,16 +89,32 @@ def _query_distance_generic(
     X: GenericIndex,
     query: numpy.ndarray,
     num_neighbors: Union[int, Sequence],
-    num_threads: int = 1,
+    num_threads: Union[int, ThreadPool] = 1,
+    chunk_size: Optional[int] = None,
+    reorder: bool = False,
+    squared: bool = False,
+    distance_dtype: numpy.dtype = numpy.float64,
     **kwargs
 ) -> numpy.ndarray:
+    num_threads, pool = process_num_threads(num_threads)
     num_neighbors, force_variable = process_num_neighbors(num_neighbors)
     return lib.generic_query_knn(
         X.ptr, 
-        query,
+        process_query(X, query),
         num_neighbors,
         force_variable,
-        num_threads, 
+        num_threads,
+        pool,
+        process_chunk_size(chunk_size),
+        process_reorder(X, reorder),
+        None,
+        None,
+        None,
+        None,
+        None,
+        1,
+        process_squared(X, squared),
+        process_distance_dtype(distance_dtype),
         True,
         False,
         False
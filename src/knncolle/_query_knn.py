@@ -4,8 +4,9 @@ from dataclasses import dataclass
 import numpy
 
 from ._classes import Index, GenericIndex
+from ._thread_pool import ThreadPool
 from . import _lib_knncolle as lib
-from ._utils import process_num_neighbors, process_subset
+from ._utils import process_num_neighbors, process_subset, process_num_threads, process_chunk_size, process_reorder, process_query, process_squared, process_distance_dtype, process_filter, process_refine_factor
 
 
 @dataclass
@@ -24,6 +25,9 @@ class QueryKnnResults:
     ``index`` contains the indices of the nearest neighbors while ``distance`` contains the distance to those neighbors.
     For each observation, the neighbors are guaranteed to be sorted in order of increasing distance. 
 
+    For indices built with the ``InnerProduct`` distance, ``distance`` instead contains the inner products with the neighbors,
+    which are sorted in order of decreasing inner product.
+
     If ``get_index = False``, ``index`` is set to None.
 
     If ``get_distance = False``, ``distance`` is set to None.
@@ -37,9 +41,16 @@ def query_knn(
     X: Index,
     query: numpy.ndarray,
     num_neighbors: Union[int, Sequence],
-    num_threads: int = 1,
+    num_threads: Union[int, ThreadPool] = 1,
     get_index: bool = True,
     get_distance: bool = True,
+    chunk_size: Optional[int] = None,
+    reorder: bool = False,
+    squared: bool = False,
+    distance_dtype: numpy.dtype = numpy.float64,
+    allowed: Optional[Sequence] = None,
+    excluded: Optional[Sequence] = None,
+    refine_factor: Optional[int] = None,
     **kwargs
 ) -> QueryKnnResults:
     """
@@ -53,6 +64,7 @@ def query_knn(
             Matrix of coordinates for the query observations.
             This should be a double-precision row-major NumPy matrix where the rows are dimensions and columns are observations.
             The number of dimensions should be consistent with that in ``X``.
+            For indices built with the ``Hamming`` distance, this should instead be a matrix of bit-packed codes, see :py:func:`~knncolle.build_index`.
 
         num_neighbors:
             Number of nearest neighbors in ``X`` to identify for each observation in ``query``, i.e., k.
@@ -63,6 +75,7 @@ def query_knn(
 
         num_threads:
             Number of threads to use for the search.
+            Alternatively, a :py:class:`~knncolle.ThreadPool` of persistent worker threads to use for the search.
 
         get_index:
             Whether to report the indices of each nearest neighbor.
@@ -70,6 +83,42 @@ def query_knn(
         get_distance:
             Whether to report the distances to each nearest neighbor.
 
+        chunk_size:
+            Number of query observations in each chunk for dynamic scheduling across threads.
+            If None, the query observations are split into equally-sized contiguous ranges, one per thread.
+            Otherwise, each thread repeatedly claims the next chunk of query observations until all of them are processed.
+            This improves the load balance when the search cost is highly variable between query observations.
+
+        reorder:
+            Whether to process the query observations in order of their spatial locality, i.e., along a space-filling curve.
+            This improves cache efficiency for large query sets in random order.
+            The output is always reported in the original order of the query observations.
+            Ignored for indices built with the Hamming distance.
+
+        squared:
+            Whether to report squared distances, for indices built with the Euclidean or cosine distances.
+            This avoids a pass over the output to square the distances for downstream computations like Gaussian kernels.
+
+        distance_dtype:
+            NumPy floating-point type of the reported distances, either ``numpy.float64`` or ``numpy.float32``.
+            Single-precision distances are written directly into the output arrays, halving the memory usage of the results.
+
+        allowed:
+            Observations in ``X`` that may be reported as neighbors.
+            This may be a boolean array of length equal to the number of observations in ``X``, or an integer array of observation indices.
+            Alternatively, this may be a sequence of such arrays of length equal to the number of rows in ``query``, where each element specifies the allowed neighbors for the corresponding query.
+            Filtering is performed within the search so that the nearest valid neighbors are found in a single call.
+
+        excluded:
+            Observations in ``X`` that may not be reported as neighbors.
+            This has the same format as ``allowed``, and is applied in addition to ``allowed`` if both are supplied.
+
+        refine_factor:
+            For approximate indices built with ``keep_data=True``, the number of candidates to retrieve per requested neighbor.
+            Candidates are re-ranked by their exact distances to the query, and the closest ``num_neighbors`` are reported.
+            This improves the accuracy of the search at a lower cost than increasing the search effort of the underlying algorithm.
+            If None, no refinement is performed.
+
         kwargs:
             Additional arguments to pass to specific methods.
 
@@ -103,18 +152,35 @@ def _query_knn_generic(
     X: GenericIndex,
     query: numpy.ndarray,
     num_neighbors: Union[int, Sequence],
-    num_threads: int = 1,
+    num_threads: Union[int, ThreadPool] = 1,
     get_index: bool = True,
     get_distance: bool = True,
+    chunk_size: Optional[int] = None,
+    reorder: bool = False,
+    squared: bool = False,
+    distance_dtype: numpy.dtype = numpy.float64,
+    allowed: Optional[Sequence] = None,
+    excluded: Optional[Sequence] = None,
+    refine_factor: Optional[int] = None,
     **kwargs
 ) -> QueryKnnResults:
+    num_threads, pool = process_num_threads(num_threads)
     num_neighbors, force_variable = process_num_neighbors(num_neighbors)
+    query = process_query(X, query)
+    filters = process_filter(allowed, excluded, X.num_observations(), query.shape[0])
     idx, dist = lib.generic_query_knn(
         X.ptr, 
         query,
         num_neighbors,
         force_variable,
-        num_threads, 
+        num_threads,
+        pool,
+        process_chunk_size(chunk_size),
+        process_reorder(X, reorder),
+        *filters,
+        process_refine_factor(X, refine_factor),
+        process_squared(X, squared),
+        process_distance_dtype(distance_dtype),
         False,
         get_index,
         get_distance
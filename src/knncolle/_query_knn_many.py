@@ -0,0 +1,104 @@
+from functools import singledispatch
+import numbers
+from typing import Sequence, Union, List
+
+import numpy
+
+from ._classes import Index, GenericIndex
+from ._query_knn import QueryKnnResults
+from ._thread_pool import ThreadPool
+from . import _lib_knncolle as lib
+from ._utils import process_num_threads, process_query
+
+
+@singledispatch
+def query_knn_many(
+    X: Sequence[Index],
+    queries: Sequence[numpy.ndarray],
+    num_neighbors: Union[int, Sequence[int]],
+    num_threads: Union[int, ThreadPool] = 1,
+    get_index: bool = True,
+    get_distance: bool = True
+) -> List[QueryKnnResults]:
+    """
+    Find the k-nearest neighbors for multiple query matrices, each of which is searched against its own index.
+    This is equivalent to calling :py:func:`~knncolle.query_knn` on each index and query matrix,
+    but all queries are scheduled across the same threads in a single call.
+    This improves thread utilization when there are many small indices.
+
+    Methods are dispatched on the class of the first index in ``X``, and all indices in ``X`` should be of the same class.
+
+    Args:
+        X:
+            Sequence of prebuilt search indices.
+
+        queries:
+            Sequence of query matrices of the same length as ``X``.
+            Each matrix should contain observations in the rows and dimensions in the columns,
+            and is used to query the corresponding index in ``X``.
+
+        num_neighbors:
+            Number of nearest neighbors to identify for each query.
+            Alternatively, a sequence of integers of length equal to ``X``,
+            specifying the number of neighbors to identify for the queries of each index.
+            This is automatically capped at the number of observations in each index.
+
+        num_threads:
+            Number of threads to use for the search.
+            Alternatively, a :py:class:`~knncolle.ThreadPool` of persistent worker threads to use for the search.
+
+        get_index:
+           Whether to report the indices of each nearest neighbor.
+
+        get_distance:
+            Whether to report the distances to each nearest neighbor.
+
+    Returns:
+        List of length equal to ``X``, where each entry contains the results of the search for the corresponding index.
+        Each entry is equivalent to the output of :py:func:`~knncolle.query_knn` with an integer ``num_neighbors``.
+
+    Examples:
+        >>> import knncolle
+        >>> import numpy
+        >>> indices = [knncolle.build_index(knncolle.VptreeParameters(), numpy.random.rand(50, 5)) for _ in range(10)]
+        >>> queries = [numpy.random.rand(20, 5) for _ in range(10)]
+        >>> res = knncolle.query_knn_many(indices, queries, 5)
+        >>> res[0].index
+    """
+    if len(queries) != len(X):
+        raise ValueError("'queries' should have the same length as 'X'")
+    if len(X) == 0:
+        return []
+
+    # Dispatching on the indices in 'X', as the sequence itself carries no information about the search algorithm.
+    method = query_knn_many.dispatch(type(X[0]))
+    if method is query_knn_many.dispatch(object):
+        raise NotImplementedError("no available method for '" + str(type(X[0])) + "'")
+    return method(X, queries, num_neighbors, num_threads=num_threads, get_index=get_index, get_distance=get_distance)
+
+
+@query_knn_many.register(GenericIndex)
+def _query_knn_many_generic(
+    X: Sequence[GenericIndex],
+    queries: Sequence[numpy.ndarray],
+    num_neighbors: Union[int, Sequence[int]],
+    num_threads: Union[int, ThreadPool] = 1,
+    get_index: bool = True,
+    get_distance: bool = True
+) -> List[QueryKnnResults]:
+    if isinstance(num_neighbors, numbers.Integral):
+        num_neighbors = [num_neighbors] * len(X)
+    elif len(num_neighbors) != len(X):
+        raise ValueError("'num_neighbors' should have the same length as 'X'")
+
+    num_threads, pool = process_num_threads(num_threads)
+    output = lib.generic_query_knn_many(
+        [y.ptr for y in X],
+        [process_query(y, q) for y, q in zip(X, queries)],
+        list(num_neighbors),
+        num_threads,
+        pool,
+        get_index,
+        get_distance
+    )
+    return [QueryKnnResults(index = idx, distance = dist) for idx, dist in output]
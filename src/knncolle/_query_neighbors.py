@@ -4,8 +4,9 @@ from dataclasses import dataclass
 import numpy
 
 from ._classes import Index, GenericIndex
+from ._thread_pool import ThreadPool
 from . import _lib_knncolle as lib
-from ._utils import process_threshold, process_subset
+from ._utils import process_threshold, process_subset, process_num_threads, process_chunk_size, process_reorder, process_query, process_squared, process_distance_dtype, process_max_neighbors, is_similarity
 
 
 @dataclass
@@ -22,24 +23,39 @@ class QueryNeighborsResults:
     If ``get_index = False``, ``index`` is set to None.
 
     If ``get_distance = False``, ``distance`` is set to None.
+
+    If ``max_neighbors`` is provided, ``capped`` is a boolean NumPy array specifying whether each query observation had more than ``max_neighbors`` neighbors within the threshold,
+    in which case only the closest ``max_neighbors`` are reported.
+    Otherwise, ``capped`` is set to None.
     """
     index: Optional[list]
     distance: Optional[list]
+    capped: Optional[numpy.ndarray] = None
 
 
 @singledispatch
 def query_neighbors(
     X: Index,
     threshold: Union[float, Sequence],
-    num_threads: int = 1,
+    num_threads: Union[int, ThreadPool] = 1,
     subset: Optional[Sequence] = None, 
     get_index: bool = True,
     get_distance: bool = True,
+    chunk_size: Optional[int] = None,
+    reorder: bool = False,
+    squared: bool = False,
+    distance_dtype: numpy.dtype = numpy.float64,
+    max_neighbors: Optional[int] = None,
     **kwargs
 ) -> QueryNeighborsResults:
     """
     Find all observations in the search index that lie within a threshold distance of each observation in the query dataset.
 
+    For approximate algorithms like HNSW and Annoy, the neighbors are found by k-nearest neighbor searches with increasing k,
+    until the furthest neighbor lies beyond the threshold.
+    Some neighbors may be missed, depending on the accuracy of each search; this can be improved with the algorithm's search-effort parameters,
+    e.g., :py:attr:`~knncolle.HnswParameters.ef_search` or :py:attr:`~knncolle.AnnoyParameters.search_mult`.
+
     Args:
         X:
             A prebuilt search index.
@@ -48,15 +64,18 @@ def query_neighbors(
             Matrix of coordinates for the query observations.
             This should be a double-precision row-major NumPy matrix where the rows are dimensions and columns are observations.
             The number of dimensions should be consistent with that in ``X``.
+            For indices built with the ``Hamming`` distance, this should instead be a matrix of bit-packed codes, see :py:func:`~knncolle.build_index`.
 
         threshold:
             Distance threshold at which to identify neighbors for each observation in ``X``. 
+            For indices built with the ``InnerProduct`` distance, this is instead the minimum inner product of each neighbor.
 
             Alternatively, this may be a sequence of non-negative floats of length equal to the number of observations in ``X``,
             specifying the distance threshold to search for each observation.
 
         num_threads:
             Number of threads to use for the search.
+            Alternatively, a :py:class:`~knncolle.ThreadPool` of persistent worker threads to use for the search.
 
         get_index:
             Whether to report the indices of each nearest neighbor.
@@ -64,6 +83,31 @@ def query_neighbors(
         get_distance:
             Whether to report the distances to each nearest neighbor.
 
+        chunk_size:
+            Number of query observations in each chunk for dynamic scheduling across threads.
+            If None, the query observations are split into equally-sized contiguous ranges, one per thread.
+            Otherwise, each thread repeatedly claims the next chunk of query observations until all of them are processed.
+            This improves the load balance when the search cost is highly variable between query observations.
+
+        reorder:
+            Whether to process the query observations in order of their spatial locality, i.e., along a space-filling curve.
+            This improves cache efficiency for large query sets in random order.
+            The output is always reported in the original order of the query observations.
+            Ignored for indices built with the Hamming distance.
+
+        squared:
+            Whether to report squared distances, for indices built with the Euclidean or cosine distances.
+            If True, ``threshold`` is also interpreted as a squared distance.
+
+        distance_dtype:
+            NumPy floating-point type of the reported distances, either ``numpy.float64`` or ``numpy.float32``.
+            Single-precision distances are written directly into the output arrays, halving the memory usage of the results.
+
+        max_neighbors:
+            Maximum number of neighbors to report for each observation.
+            If provided, only the closest ``max_neighbors`` neighbors within the threshold are reported,
+            and the memory usage of the search is bounded by ``max_neighbors`` rather than the total number of neighbors within the threshold.
+
         kwargs:
             Additional arguments to pass to specific methods.
 
@@ -92,17 +136,30 @@ def _query_neighbors_generic(
     X: GenericIndex,
     query: numpy.ndarray,
     threshold: Union[float, Sequence],
-    num_threads: int = 1,
+    num_threads: Union[int, ThreadPool] = 1,
     get_index: bool = True,
     get_distance: bool = True,
+    chunk_size: Optional[int] = None,
+    reorder: bool = False,
+    squared: bool = False,
+    distance_dtype: numpy.dtype = numpy.float64,
+    max_neighbors: Optional[int] = None,
     **kwargs
 ) -> QueryNeighborsResults:
-    idx, dist = lib.generic_query_all(
+    num_threads, pool = process_num_threads(num_threads)
+    idx, dist, capped = lib.generic_query_all(
         X.ptr, 
-        query,
+        process_query(X, query),
         process_threshold(threshold),
-        num_threads, 
+        num_threads,
+        pool,
+        process_chunk_size(chunk_size),
+        process_reorder(X, reorder),
+        process_squared(X, squared),
+        process_max_neighbors(max_neighbors),
+        is_similarity(X),
+        process_distance_dtype(distance_dtype),
         get_index,
         get_distance
     )
-    return QueryNeighborsResults(index = idx, distance = dist)
+    return QueryNeighborsResults(index = idx, distance = dist, capped = capped)
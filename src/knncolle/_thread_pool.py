@@ -0,0 +1,48 @@
+from . import _lib_knncolle as lib
+
+
+class ThreadPool:
+    """
+    Persistent pool of worker threads for nearest-neighbor searches.
+    This can be passed as ``num_threads=`` in functions like :py:func:`~knncolle.find_knn` or :py:func:`~knncolle.query_knn`,
+    in which case the search is parallelized across the existing workers instead of spawning new threads in each call.
+    Each worker also caches its searcher for each index across calls, which avoids repeated initialization.
+    This is most useful for frequent calls with small numbers of observations, where the thread creation overhead would otherwise dominate.
+    The associated threads are automatically joined upon garbage collection.
+
+    Calls from different Python threads that share the same pool are serialized.
+
+    Examples:
+        >>> import knncolle
+        >>> import numpy
+        >>> y = numpy.random.rand(200, 10)
+        >>> idx = knncolle.build_index(knncolle.VptreeParameters(), y)
+        >>> pool = knncolle.ThreadPool(4)
+        >>> res = knncolle.query_knn(idx, numpy.random.rand(5, 10), 3, num_threads=pool)
+        >>> res.index
+    """
+
+    def __init__(self, num_threads: int):
+        """
+        Args:
+            num_threads:
+                Number of worker threads in the pool.
+        """
+        if num_threads < 1:
+            raise ValueError("'num_threads' should be a positive integer")
+        self._ptr = lib.create_thread_pool(num_threads)
+
+    def __del__(self):
+        """Joins the worker threads and frees the pool in C++."""
+        if hasattr(self, "_ptr"):
+            lib.free_thread_pool(self._ptr)
+
+    @property
+    def ptr(self) -> int:
+        """Address of a ``knncolle_py::ThreadPool``, to be passed into C++ as a ``std::uintptr_t``."""
+        return self._ptr
+
+    @property
+    def num_threads(self) -> int:
+        """Number of worker threads in the pool."""
+        return lib.thread_pool_size(self._ptr)
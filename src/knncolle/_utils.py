@@ -1,9 +1,11 @@
 from typing import Tuple, Union, Sequence, Optional
 import numpy
 
+from ._thread_pool import ThreadPool
+
 
 def process_num_neighbors(num_neighbors: Union[int, Sequence]) -> Tuple[numpy.ndarray, bool]:
-    if isinstance(num_neighbors, int):
+    if isinstance(num_neighbors, (int, numpy.integer)):
         return numpy.array([num_neighbors], dtype=numpy.uint32), False
     if not isinstance(num_neighbors, numpy.ndarray):
         num_neighbors = numpy.array(num_neighbors, dtype=numpy.uint32)
@@ -24,3 +26,143 @@ def process_threshold(threshold: Union[float, Sequence]) -> numpy.ndarray:
     if not isinstance(threshold, numpy.ndarray):
         threshold = numpy.array(threshold, dtype=numpy.float64)
     return threshold
+
+
+def process_num_threads(num_threads: Union[int, ThreadPool]) -> Tuple[int, Optional[int]]:
+    if isinstance(num_threads, ThreadPool):
+        return num_threads.num_threads, num_threads.ptr
+    return num_threads, None
+
+
+def process_chunk_size(chunk_size: Optional[int]) -> int:
+    if chunk_size is None:
+        return 0
+    if chunk_size < 1:
+        raise ValueError("'chunk_size' should be a positive integer")
+    return chunk_size
+
+
+def process_binary_codes(x: numpy.ndarray) -> numpy.ndarray:
+    if not isinstance(x, numpy.ndarray) or x.ndim != 2 or x.dtype not in (numpy.uint8, numpy.uint64):
+        raise ValueError("expected a matrix of bit-packed uint8 or uint64 codes for the Hamming distance")
+    if x.dtype == numpy.uint8 and x.shape[1] % 8 != 0:
+        padded = numpy.zeros((x.shape[0], x.shape[1] + 8 - x.shape[1] % 8), dtype=numpy.uint8)
+        padded[:,:x.shape[1]] = x
+        x = padded
+    # Each 64-bit word is reinterpreted as a double so that it can be stored in the index like any other coordinate.
+    return numpy.ascontiguousarray(x).view(numpy.float64)
+
+
+def is_hamming(X) -> bool:
+    return getattr(X.parameters, "distance", None) == "Hamming"
+
+
+def process_query(X, query: numpy.ndarray) -> numpy.ndarray:
+    if is_hamming(X):
+        return process_binary_codes(query)
+    return query
+
+
+def process_reorder(X, reorder: bool) -> bool:
+    # Bit-packed codes have no meaningful ordering along a space-filling curve.
+    return reorder and not is_hamming(X)
+
+
+def process_locality(X, reorder: bool) -> Optional[numpy.ndarray]:
+    if not reorder:
+        return None
+    if X.locality is None:
+        raise ValueError("'reorder=True' requires an index built with 'reorder=True' so that the locality of the observations is known")
+    return X.locality
+
+
+def process_dual_tree(X, dual_tree: bool, reorder: bool) -> Tuple[Optional[numpy.ndarray], bool]:
+    locality = process_locality(X, reorder)
+    # VP trees do not have a dual-tree traversal, so their observations are searched in the locality order recorded by build_index().
+    if dual_tree and hasattr(X.parameters, "dual_tree"):
+        if not X.parameters.dual_tree:
+            raise ValueError("'dual_tree=True' requires an index built with 'dual_tree=True'")
+        return X.locality, False
+    return locality, dual_tree
+
+
+def process_squared(X, squared: bool) -> bool:
+    if squared and getattr(X.parameters, "distance", "Euclidean") not in ("Euclidean", "Cosine"):
+        raise ValueError("'squared=True' is only supported for the Euclidean and cosine distances")
+    return squared
+
+
+def process_distance_dtype(distance_dtype: numpy.dtype) -> bool:
+    distance_dtype = numpy.dtype(distance_dtype)
+    if distance_dtype == numpy.float32:
+        return True
+    if distance_dtype != numpy.float64:
+        raise ValueError("'distance_dtype' should be either float32 or float64")
+    return False
+
+
+def process_refine_factor(X, refine_factor: Optional[int]) -> int:
+    if refine_factor is None:
+        return 1
+    if refine_factor < 1:
+        raise ValueError("'refine_factor' should be a positive integer")
+    if refine_factor > 1 and not getattr(X.parameters, "keep_data", False):
+        raise ValueError("'refine_factor' requires an approximate index built with 'keep_data=True'")
+    return refine_factor
+
+
+def process_max_neighbors(max_neighbors: Optional[int]) -> Optional[int]:
+    if max_neighbors is not None and max_neighbors < 0:
+        raise ValueError("'max_neighbors' should be a non-negative integer")
+    return max_neighbors
+
+
+def is_similarity(X) -> bool:
+    return getattr(X.parameters, "distance", None) == "InnerProduct"
+
+
+def _process_filter_ids(ids: Sequence, num_obs: int, name: str) -> numpy.ndarray:
+    ids = numpy.asarray(ids)
+    if ids.dtype == numpy.bool_:
+        if ids.shape[0] != num_obs:
+            raise ValueError("boolean '" + name + "' should have length equal to the number of observations")
+        return numpy.flatnonzero(ids).astype(numpy.uint32)
+    ids = ids.astype(numpy.int64, copy=False)
+    if len(ids) and (ids.min() < 0 or ids.max() >= num_obs):
+        raise ValueError("indices in '" + name + "' should be non-negative and less than the number of observations")
+    return numpy.unique(ids).astype(numpy.uint32)
+
+
+def _is_shared_filter(filter: Sequence) -> bool:
+    if isinstance(filter, numpy.ndarray):
+        return filter.ndim == 1 and filter.dtype != numpy.object_
+    return all(numpy.isscalar(y) for y in filter)
+
+
+def process_filter(allowed: Optional[Sequence], excluded: Optional[Sequence], num_obs: int, num_queries: int) -> Tuple:
+    shared = None
+    lists = { "allowed": (None, None), "excluded": (None, None) }
+
+    for name, filter in (("allowed", allowed), ("excluded", excluded)):
+        if filter is None:
+            continue
+
+        if _is_shared_filter(filter):
+            mask = numpy.zeros(num_obs, dtype=numpy.bool_)
+            mask[_process_filter_ids(filter, num_obs, name)] = True
+            if name == "excluded":
+                mask = numpy.logical_not(mask)
+            shared = mask if shared is None else numpy.logical_and(shared, mask)
+            continue
+
+        if len(filter) != num_queries:
+            raise ValueError("length of '" + name + "' should be equal to the number of observations or queries")
+        collected = [_process_filter_ids(y, num_obs, name) for y in filter]
+        offsets = numpy.zeros(num_queries + 1, dtype=numpy.uint64)
+        numpy.cumsum([len(y) for y in collected], out=offsets[1:])
+        ids = numpy.concatenate(collected) if len(collected) else numpy.zeros(0, dtype=numpy.uint32)
+        lists[name] = (offsets, ids)
+
+    if shared is not None:
+        shared = shared.astype(numpy.uint8)
+    return (shared, *lists["allowed"], *lists["excluded"])
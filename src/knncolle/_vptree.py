@@ -1,8 +1,9 @@
-from typing import Literal, Tuple
+from typing import Dict, Literal, Tuple
 
 from . import _lib_knncolle as lib
 from ._classes import Parameters, GenericIndex, Builder
 from ._define_builder import define_builder
+from ._estimate_memory_usage import estimate_memory_usage
 
 
 class VptreeParameters(Parameters):
@@ -14,18 +15,33 @@ class VptreeParameters(Parameters):
         >>> import knncolle
         >>> params = knncolle.VptreeParameters()
         >>> params.distance
+        >>> params.dual_tree
     """
 
     def __init__(
         self,
-        distance: Literal["Euclidean", "Manhattan", "Cosine"] = "Euclidean",
+        distance: Literal["Euclidean", "Manhattan", "Cosine", "InnerProduct", "Hamming"] = "Euclidean",
+        dual_tree: bool = False,
     ):
         """
         Args:
             distance:
                 Distance metric for index construction and search.
+                For ``InnerProduct``, the search returns the observations with the largest inner products,
+                and the reported "distances" are the inner products in decreasing order.
+                For ``Hamming``, the observations should be bit-packed binary codes, see :py:func:`~knncolle.build_index`,
+                and the number of dimensions is the number of 64-bit words in each code.
+
+            dual_tree:
+                Whether to build an index that supports the ``dual_tree=True`` option in
+                :py:func:`~knncolle.find_knn`, :py:func:`~knncolle.find_distance` and :py:func:`~knncolle.find_neighbors`.
+                The subtrees of a VP tree are shells around their vantage points, which are too loose to prune pairs of nodes in a dual-tree traversal.
+                Instead, :py:func:`~knncolle.build_index` records the :py:attr:`~knncolle.GenericIndex.locality` of the observations,
+                and the observations are searched in this order so that consecutive searches visit the same nodes.
+                Not supported with ``InnerProduct`` or ``Hamming``.
         """
         self.distance = distance
+        self.dual_tree = dual_tree
 
     @property
     def distance(self) -> str:
@@ -39,10 +55,28 @@ class VptreeParameters(Parameters):
             distance:
                 Distance metric, see :meth:`~__init__()`.
         """
-        if distance not in ["Euclidean", "Manhattan", "Cosine"]:
+        if distance not in ["Euclidean", "Manhattan", "Cosine", "InnerProduct", "Hamming"]:
             raise ValueError("unsupported 'distance'")
+        if distance in ["InnerProduct", "Hamming"] and getattr(self, "_dual_tree", False):
+            raise ValueError("'dual_tree=True' is not supported for the '" + distance + "' distance")
         self._distance = distance
 
+    @property
+    def dual_tree(self) -> bool:
+        """Whether to support dual-tree searches, see :meth:`~__init__()`."""
+        return self._dual_tree
+
+    @dual_tree.setter
+    def dual_tree(self, dual_tree: bool):
+        """
+        Args:
+            dual_tree:
+                Whether to support dual-tree searches, see :meth:`~__init__()`.
+        """
+        if dual_tree and self._distance in ["InnerProduct", "Hamming"]:
+            raise ValueError("'dual_tree=True' is not supported for the '" + self._distance + "' distance")
+        self._dual_tree = dual_tree
+
 
 class VptreeIndex(GenericIndex):
     """
@@ -71,3 +105,26 @@ class VptreeIndex(GenericIndex):
 @define_builder.register
 def _define_builder_vptree(x: VptreeParameters) -> Tuple:
     return (Builder(lib.create_vptree_builder(x.distance)), VptreeIndex)
+
+
+@estimate_memory_usage.register
+def _estimate_memory_usage_vptree(x: VptreeParameters, num_observations: int, num_dimensions: int) -> Dict[str, int]:
+    augmented = 0
+    if x.distance == "InnerProduct":
+        # Extra dimension for the transformation of inner products into Euclidean distances,
+        # plus a double-precision copy of the transformed data to compute the exact inner products.
+        num_dimensions += 1
+        augmented = num_observations * num_dimensions * 8
+    output = {
+        # Double-precision copy of the data.
+        "data": num_observations * num_dimensions * 8,
+        # One node per observation (double-precision radius + 3 32-bit indices, padded to 24 bytes),
+        # plus a 32-bit index per observation for the location of each observation in the tree.
+        "tree": num_observations * (24 + 4),
+    }
+    if augmented:
+        output["augmented"] = augmented
+    if x.dual_tree:
+        # 32-bit index per observation for the locality order.
+        output["locality"] = num_observations * 4
+    return output
@@ -52,3 +52,30 @@ def test_annoy_distances(helpers):
     res_ce = knncolle.find_knn(idx_ce, 10)
     assert (res_c.index == res_ce.index).all()
     assert numpy.isclose(res_c.distance, res_ce.distance).all()
+
+
+def test_annoy_neighbors():
+    x = numpy.random.rand(1000, 5)
+    q = numpy.random.rand(50, 5)
+    idx = knncolle.build_index(knncolle.AnnoyParameters(), x)
+    ref = knncolle.build_index(knncolle.ExhaustiveParameters(), x)
+
+    # Approximate search by distance should recover most of the true neighbors.
+    res = knncolle.find_neighbors(idx, 0.2)
+    exp = knncolle.find_neighbors(ref, 0.2)
+    found = sum(len(set(a) & set(b)) for a, b in zip(res.index, exp.index))
+    assert found / sum(len(b) for b in exp.index) > 0.95
+    for i in range(1000):
+        assert (res.distance[i] <= 0.2).all()
+        assert i not in res.index[i]
+
+    # Large thresholds need multiple rounds of expansion.
+    res = knncolle.query_neighbors(idx, q, 0.5)
+    exp = knncolle.query_neighbors(ref, q, 0.5)
+    found = sum(len(set(a) & set(b)) for a, b in zip(res.index, exp.index))
+    assert found / sum(len(b) for b in exp.index) > 0.95
+    for i in range(50):
+        assert numpy.allclose(res.distance[i], numpy.sqrt(((x[res.index[i]] - q[i])**2).sum(axis=1)))
+
+    res = knncolle.query_neighbors(idx, q, 10.0, get_distance=False)
+    assert all(len(y) == 1000 for y in res.index)
@@ -0,0 +1,119 @@
+import asyncio
+import knncolle
+import numpy
+import pytest
+
+
+def test_async_searcher_basic():
+    Y = numpy.random.rand(500, 20)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    queries = [numpy.random.rand(n, 20) for n in [1, 5, 10, 3, 7]]
+    searcher = knncolle.AsyncSearcher(idx, max_batch=1000, max_delay_ms=5)
+
+    async def run():
+        return await asyncio.gather(*[searcher.query(q, 8) for q in queries])
+
+    results = asyncio.run(run())
+    for i, q in enumerate(queries):
+        ref = knncolle.query_knn(idx, q, 8)
+        assert (ref.index == results[i].index).all()
+        assert (ref.distance == results[i].distance).all()
+
+
+def test_async_searcher_batching():
+    Y = numpy.random.rand(500, 20)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    queries = [numpy.random.rand(4, 20) for i in range(20)]
+
+    # Forcing multiple batches with a small 'max_batch', and using a large
+    # delay to check that the batch is flushed once it is full.
+    searcher = knncolle.AsyncSearcher(idx, max_batch=10, max_delay_ms=10000, num_threads=2)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(*[searcher.query(q, 5) for q in queries[:-2]]), timeout=5)
+
+    results = asyncio.run(run())
+    for i, res in enumerate(results):
+        ref = knncolle.query_knn(idx, queries[i], 5)
+        assert (ref.index == res.index).all()
+        assert (ref.distance == res.distance).all()
+
+
+def test_async_searcher_variable_k():
+    Y = numpy.random.rand(500, 20)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    queries = [numpy.random.rand(n, 20) for n in [2, 5, 1]]
+    ks = [3, 10, 1000]
+    searcher = knncolle.AsyncSearcher(idx)
+
+    async def run():
+        return await asyncio.gather(*[searcher.query(q, k) for q, k in zip(queries, ks)])
+
+    results = asyncio.run(run())
+    for i, res in enumerate(results):
+        ref = knncolle.query_knn(idx, queries[i], ks[i])
+        assert res.index.shape == ref.index.shape
+        assert (ref.index == res.index).all()
+        assert (ref.distance == res.distance).all()
+
+
+def test_async_searcher_single():
+    Y = numpy.random.rand(500, 20)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    q = numpy.random.rand(20)
+    searcher = knncolle.AsyncSearcher(idx)
+
+    res = asyncio.run(searcher.query(q, 5))
+    ref = knncolle.query_knn(idx, q.reshape(1, 20), 5)
+    assert res.index.shape == (5,)
+    assert (ref.index[0,:] == res.index).all()
+    assert (ref.distance[0,:] == res.distance).all()
+
+    res = asyncio.run(searcher.query(numpy.zeros((0, 20)), 5))
+    assert res.index.shape == (0, 5)
+
+
+def test_async_searcher_errors():
+    Y = numpy.random.rand(500, 20)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    searcher = knncolle.AsyncSearcher(idx)
+
+    with pytest.raises(ValueError, match="mismatch"):
+        asyncio.run(searcher.query(numpy.random.rand(5, 10), 5))
+
+    with pytest.raises(ValueError, match="max_batch"):
+        knncolle.AsyncSearcher(idx, max_batch=0)
+
+
+def test_async_searcher_numpy_integer():
+    Y = numpy.random.rand(500, 20)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    q = numpy.random.rand(3, 20)
+    searcher = knncolle.AsyncSearcher(idx)
+
+    res = asyncio.run(searcher.query(q, numpy.int64(5)))
+    ref = knncolle.query_knn(idx, q, 5)
+    assert (ref.index == res.index).all()
+
+    with pytest.raises(ValueError, match="integer"):
+        asyncio.run(searcher.query(q, 5.0))
+
+
+def test_async_searcher_hamming():
+    codes = numpy.random.randint(0, 256, size=(300, 16)).astype(numpy.uint8)
+    idx = knncolle.build_index(knncolle.VptreeParameters(distance="Hamming"), codes)
+    queries = [numpy.random.randint(0, 256, size=(n, 16)).astype(numpy.uint8) for n in [1, 4, 2]]
+    queries.append(queries[0].view(numpy.uint64))
+    searcher = knncolle.AsyncSearcher(idx)
+
+    async def run():
+        return await asyncio.gather(*[searcher.query(q, 5) for q in queries])
+
+    results = asyncio.run(run())
+    for i, res in enumerate(results):
+        ref = knncolle.query_knn(idx, queries[i], 5)
+        assert (ref.index == res.index).all()
+        assert (ref.distance == res.distance).all()
+
+    with pytest.raises(ValueError, match="bit-packed"):
+        asyncio.run(searcher.query(numpy.random.rand(2, 2), 5))
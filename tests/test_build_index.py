@@ -0,0 +1,109 @@
+import knncolle
+import numpy
+import pytest
+
+
+@pytest.mark.parametrize("cls", [knncolle.VptreeParameters, knncolle.HnswParameters, knncolle.AnnoyParameters])
+def test_build_index_prenormalized(cls):
+    Y = numpy.random.rand(300, 10)
+    normalized = Y / numpy.sqrt((Y**2).sum(axis=1))[:,None]
+    q = numpy.random.rand(50, 10)
+
+    ref = knncolle.build_index(cls(distance="Cosine"), Y)
+    idx = knncolle.build_index(cls(distance="Cosine"), normalized, prenormalized=True)
+    expected = knncolle.query_knn(ref, q, 5)
+    observed = knncolle.query_knn(idx, q, 5)
+    assert (expected.index == observed.index).mean() > 0.95
+    assert numpy.allclose(expected.distance, observed.distance)
+
+    # Query normalization is the same regardless of the number of threads or the ordering.
+    again = knncolle.query_knn(idx, q, 5, num_threads=3, reorder=True)
+    assert (again.index == observed.index).all()
+
+
+def test_build_index_prenormalized_errors():
+    Y = numpy.random.rand(100, 5)
+    with pytest.raises(ValueError, match="only supported for the cosine"):
+        knncolle.build_index(knncolle.VptreeParameters(), Y, prenormalized=True)
+
+
+@pytest.mark.parametrize("distance", ["Euclidean", "Manhattan", "Cosine"])
+def test_build_index_no_copy(distance):
+    Y = numpy.random.rand(300, 10)
+    if distance == "Cosine":
+        Y /= numpy.sqrt((Y**2).sum(axis=1))[:,None]
+    q = numpy.random.rand(50, 10)
+
+    prenormalized = distance == "Cosine"
+    ref = knncolle.build_index(knncolle.ExhaustiveParameters(distance=distance), Y, prenormalized=prenormalized)
+    idx = knncolle.build_index(knncolle.ExhaustiveParameters(distance=distance), Y, prenormalized=prenormalized, copy=False)
+    assert idx.estimate_memory_usage()["data"] == 0
+
+    expected = knncolle.find_knn(ref, 5)
+    observed = knncolle.find_knn(idx, 5)
+    assert (expected.index == observed.index).all()
+    assert (expected.distance == observed.distance).all()
+
+    expected = knncolle.query_knn(ref, q, 5)
+    observed = knncolle.query_knn(idx, q, 5)
+    assert (expected.index == observed.index).all()
+    assert (expected.distance == observed.distance).all()
+
+    threshold = numpy.median(expected.distance[:,2])
+    expected = knncolle.query_neighbors(ref, q, threshold)
+    observed = knncolle.query_neighbors(idx, q, threshold)
+    for i in range(50):
+        assert (expected.index[i] == observed.index[i]).all()
+    expected = knncolle.find_neighbors(ref, threshold)
+    observed = knncolle.find_neighbors(idx, threshold)
+    for i in range(300):
+        assert (expected.index[i] == observed.index[i]).all()
+        assert (expected.distance[i] == observed.distance[i]).all()
+
+
+def test_build_index_no_copy_reference():
+    Y = numpy.random.rand(200, 5)
+    q = numpy.random.rand(10, 5)
+    idx = knncolle.build_index(knncolle.ExhaustiveParameters(), Y, copy=False)
+
+    # The index references the caller's array, so modifications are visible to the search.
+    Y[17,:] = q[3,:]
+    res = knncolle.query_knn(idx, q[3:4,:], 1)
+    assert res.index[0,0] == 17
+    assert res.distance[0,0] == 0
+
+    # The index keeps the array alive.
+    del Y
+    import gc
+    gc.collect()
+    again = knncolle.query_knn(idx, q[3:4,:], 1)
+    assert again.index[0,0] == 17
+
+
+def test_build_index_no_copy_memmap(tmp_path):
+    Y = numpy.random.rand(200, 5)
+    path = str(tmp_path / "data.bin")
+    mapped = numpy.memmap(path, dtype=numpy.float64, mode="w+", shape=Y.shape)
+    mapped[:] = Y
+    mapped.flush()
+
+    mapped = numpy.memmap(path, dtype=numpy.float64, mode="r", shape=Y.shape)
+    idx = knncolle.build_index(knncolle.ExhaustiveParameters(), mapped, copy=False)
+    ref = knncolle.build_index(knncolle.ExhaustiveParameters(), Y)
+    assert (knncolle.find_knn(idx, 5).index == knncolle.find_knn(ref, 5).index).all()
+
+
+def test_build_index_no_copy_errors():
+    Y = numpy.random.rand(100, 5)
+    with pytest.raises(ValueError, match="C-contiguous"):
+        knncolle.build_index(knncolle.ExhaustiveParameters(), numpy.asfortranarray(Y), copy=False)
+    with pytest.raises(ValueError, match="C-contiguous"):
+        knncolle.build_index(knncolle.ExhaustiveParameters(), Y.astype(numpy.float32), copy=False)
+    with pytest.raises(ValueError, match="requires a copy"):
+        knncolle.build_index(knncolle.ExhaustiveParameters(), Y, copy=False, reorder=True)
+    with pytest.raises(ValueError, match="prenormalized"):
+        knncolle.build_index(knncolle.ExhaustiveParameters(distance="Cosine"), Y, copy=False)
+    with pytest.raises(Exception, match="without copying"):
+        knncolle.build_index(knncolle.VptreeParameters(), Y, copy=False)
+    with pytest.raises(Exception, match="without copying"):
+        knncolle.build_index(knncolle.ExhaustiveParameters(distance="InnerProduct"), Y, copy=False)
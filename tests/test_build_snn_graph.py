@@ -0,0 +1,51 @@
+import knncolle
+import numpy
+import pytest
+
+
+def _ref_snn(index, k, weighting):
+    nobs = index.shape[0]
+    neighbors = [[i] + list(index[i]) for i in range(nobs)]
+    expected = numpy.zeros((nobs, nobs))
+    for i in range(nobs):
+        for j in range(i):
+            shared = set(neighbors[i]) & set(neighbors[j])
+            if not shared:
+                continue
+            if weighting == "rank":
+                best = min(neighbors[i].index(s) + neighbors[j].index(s) for s in shared)
+                w = max(k - best / 2, 1e-6)
+            elif weighting == "number":
+                w = len(shared)
+            else:
+                w = len(shared) / len(set(neighbors[i]) | set(neighbors[j]))
+            expected[i,j] = w
+            expected[j,i] = w
+    return expected
+
+
+@pytest.mark.parametrize("weighting", ["rank", "number", "jaccard"])
+def test_build_snn_graph(weighting):
+    Y = numpy.random.rand(200, 5)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    ref = _ref_snn(knncolle.find_knn(idx, 6).index, 6, weighting)
+
+    graph = knncolle.build_snn_graph(idx, 6, weighting=weighting)
+    assert graph.shape == (200, 200)
+    assert graph.has_sorted_indices
+    assert numpy.allclose(graph.toarray(), ref)
+
+    edges = knncolle.build_snn_graph(idx, 6, weighting=weighting, as_edges=True)
+    assert (edges.first > edges.second).all()
+    assert numpy.allclose(ref[edges.first, edges.second], edges.weight)
+    assert len(edges.weight) == (ref > 0).sum() // 2
+
+    pool = knncolle.ThreadPool(3)
+    obs = knncolle.build_snn_graph(idx, 6, weighting=weighting, num_threads=pool)
+    assert (obs != graph).nnz == 0
+
+
+def test_build_snn_graph_errors():
+    idx = knncolle.build_index(knncolle.VptreeParameters(), numpy.random.rand(20, 5))
+    with pytest.raises(ValueError, match="weighting"):
+        knncolle.build_snn_graph(idx, 5, weighting="foo")
@@ -0,0 +1,65 @@
+import knncolle
+import numpy
+import pytest
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+@pytest.mark.parametrize("use_pool", [False, True])
+def test_chunk_size_knn(chunk_size, use_pool):
+    Y = numpy.random.rand(500, 10)
+    q = numpy.random.rand(101, 10)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    nthreads = knncolle.ThreadPool(3) if use_pool else 3
+
+    ref = knncolle.find_knn(idx, 10)
+    out = knncolle.find_knn(idx, 10, num_threads=nthreads, chunk_size=chunk_size)
+    assert (ref.index == out.index).all()
+    assert (ref.distance == out.distance).all()
+
+    k = numpy.random.randint(0, 20, size=500)
+    ref = knncolle.find_knn(idx, k)
+    out = knncolle.find_knn(idx, k, num_threads=nthreads, chunk_size=chunk_size)
+    for i in range(len(k)):
+        assert (ref.index[i] == out.index[i]).all()
+
+    ref = knncolle.find_distance(idx, 5, subset=[1, 10, 100])
+    out = knncolle.find_distance(idx, 5, subset=[1, 10, 100], num_threads=nthreads, chunk_size=chunk_size)
+    assert (ref == out).all()
+
+    ref = knncolle.query_knn(idx, q, 7)
+    out = knncolle.query_knn(idx, q, 7, num_threads=nthreads, chunk_size=chunk_size)
+    assert (ref.index == out.index).all()
+    assert (ref.distance == out.distance).all()
+
+    ref = knncolle.query_distance(idx, q, 7)
+    out = knncolle.query_distance(idx, q, 7, num_threads=nthreads, chunk_size=chunk_size)
+    assert (ref == out).all()
+
+    empty = knncolle.query_knn(idx, q[:0,:], 7, num_threads=nthreads, chunk_size=chunk_size)
+    assert empty.index.shape == (0, 7)
+
+
+@pytest.mark.parametrize("use_pool", [False, True])
+def test_chunk_size_neighbors(helpers, use_pool):
+    Y = numpy.random.rand(500, 10)
+    q = numpy.random.rand(50, 10)
+    idx = knncolle.build_index(knncolle.KmknnParameters(), Y)
+    nthreads = knncolle.ThreadPool(4) if use_pool else 4
+    threshold = numpy.random.exponential(0.3, size=500)
+
+    ref = knncolle.find_neighbors(idx, threshold)
+    out = knncolle.find_neighbors(idx, threshold, num_threads=nthreads, chunk_size=16)
+    helpers.compare_lists(ref.index, out.index)
+    helpers.compare_lists(ref.distance, out.distance)
+
+    ref = knncolle.query_neighbors(idx, q, 0.5)
+    out = knncolle.query_neighbors(idx, q, 0.5, num_threads=nthreads, chunk_size=3)
+    helpers.compare_lists(ref.index, out.index)
+    helpers.compare_lists(ref.distance, out.distance)
+
+
+def test_chunk_size_errors():
+    Y = numpy.random.rand(100, 5)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    with pytest.raises(ValueError, match="positive"):
+        knncolle.find_knn(idx, 5, chunk_size=0)
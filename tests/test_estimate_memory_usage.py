@@ -0,0 +1,53 @@
+import knncolle
+import numpy
+import pytest
+
+
+@pytest.mark.parametrize("param", [
+    knncolle.AnnoyParameters(),
+    knncolle.ExhaustiveParameters(),
+    knncolle.HnswParameters(),
+    knncolle.KdtreeParameters(),
+    knncolle.KmknnParameters(),
+    knncolle.NndescentParameters(),
+    knncolle.VptreeParameters(),
+])
+def test_estimate_memory_usage(param):
+    small = knncolle.estimate_memory_usage(param, 1000, 10)
+    assert len(small) > 0
+    assert "data" in small
+    for v in small.values():
+        assert isinstance(v, int)
+        assert v >= 0
+
+    more_obs = knncolle.estimate_memory_usage(param, 2000, 10)
+    assert sum(more_obs.values()) > sum(small.values())
+    more_dims = knncolle.estimate_memory_usage(param, 1000, 20)
+    assert more_dims["data"] > small["data"]
+
+    y = numpy.random.rand(1000, 10)
+    idx = knncolle.build_index(param, y)
+    assert idx.parameters is param
+    assert idx.estimate_memory_usage() == small
+
+
+def test_estimate_memory_usage_data():
+    # Exact for the copy of the data.
+    out = knncolle.estimate_memory_usage(knncolle.ExhaustiveParameters(), 1000, 10)
+    assert out == { "data": 80000 }
+
+    out = knncolle.estimate_memory_usage(knncolle.HnswParameters(num_links=10), 1000, 10)
+    ref = knncolle.estimate_memory_usage(knncolle.HnswParameters(num_links=20), 1000, 10)
+    assert out["graph"] < ref["graph"]
+
+
+def test_estimate_memory_usage_unknown():
+    with pytest.raises(NotImplementedError, match="no available method"):
+        knncolle.estimate_memory_usage(None, 100, 10)
+
+    y = numpy.random.rand(100, 10)
+    builder, cls = knncolle.define_builder(knncolle.VptreeParameters())
+    idx = cls(knncolle._lib_knncolle.generic_build(builder.ptr, y, False, True))
+    assert idx.parameters is None
+    with pytest.raises(ValueError, match="not known"):
+        idx.estimate_memory_usage()
@@ -1,5 +1,6 @@
 import knncolle
 import numpy
+import pytest
 
 
 def test_exhaustive_parameters():
@@ -45,3 +46,42 @@ def test_exhaustive_distances(helpers):
     res_ce = knncolle.find_knn(idx_ce, 10)
     assert (res_c.index == res_ce.index).all()
     assert numpy.isclose(res_c.distance, res_ce.distance).all()
+
+
+@pytest.mark.parametrize("distance", ["Euclidean", "Cosine"])
+@pytest.mark.parametrize("reorder", [False, True])
+def test_exhaustive_squared(distance, reorder):
+    x = numpy.random.rand(200, 10)
+    q = numpy.random.rand(30, 10)
+    idx = knncolle.build_index(knncolle.ExhaustiveParameters(distance=distance), x, reorder=reorder)
+
+    # Squared distances are computed directly by the metric.
+    ref = knncolle.find_knn(idx, 10)
+    sq = knncolle.find_knn(idx, 10, squared=True, num_threads=2)
+    assert (ref.index == sq.index).all()
+    assert numpy.allclose(ref.distance**2, sq.distance)
+
+    ref = knncolle.query_knn(idx, q, 10)
+    sq = knncolle.query_knn(idx, q, 10, squared=True)
+    assert (ref.index == sq.index).all()
+    assert numpy.allclose(ref.distance**2, sq.distance)
+
+    # Thresholds are interpreted as squared distances.
+    threshold = numpy.median(ref.distance[:,5])
+    ref = knncolle.find_neighbors(idx, threshold)
+    sq = knncolle.find_neighbors(idx, threshold**2, squared=True)
+    for i in range(200):
+        assert (numpy.sort(ref.index[i]) == numpy.sort(sq.index[i])).all()
+        assert numpy.allclose(numpy.sort(ref.distance[i])**2, numpy.sort(sq.distance[i]))
+
+    ref = knncolle.query_neighbors(idx, q, threshold)
+    sq = knncolle.query_neighbors(idx, q, threshold**2, squared=True)
+    for i in range(30):
+        assert (numpy.sort(ref.index[i]) == numpy.sort(sq.index[i])).all()
+        assert numpy.allclose(numpy.sort(ref.distance[i])**2, numpy.sort(sq.distance[i]))
+
+    # Subsequent searches are not affected.
+    again = knncolle.query_neighbors(idx, q, threshold)
+    for i in range(30):
+        assert (ref.index[i] == again.index[i]).all()
+        assert (ref.distance[i] == again.distance[i]).all()
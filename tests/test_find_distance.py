@@ -57,3 +57,20 @@ def test_find_distance_variable_k():
     keep = numpy.where(k == 10)[0]
     ref = knncolle.find_distance(idx, num_neighbors=10)
     assert (ref[keep] == out[keep]).all()
+
+
+def test_find_distance_squared():
+    Y = numpy.random.rand(500, 20)
+    idx = knncolle.build_index(knncolle.KmknnParameters(), Y)
+    dist = knncolle.find_distance(idx, num_neighbors=8)
+    sq = knncolle.find_distance(idx, num_neighbors=8, squared=True)
+    assert numpy.allclose(dist**2, sq)
+
+
+def test_find_distance_dtype():
+    Y = numpy.random.rand(500, 20)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    dist = knncolle.find_distance(idx, num_neighbors=8)
+    single = knncolle.find_distance(idx, num_neighbors=8, distance_dtype=numpy.float32)
+    assert single.dtype == numpy.float32
+    assert (dist.astype(numpy.float32) == single).all()
@@ -109,3 +109,93 @@ def test_find_knn_variable_output():
     dout = knncolle.find_knn(idx, num_neighbors=8, get_index=False)
     assert dout.index is None
     assert (dout.distance == out.distance).all()
+
+
+def test_find_knn_squared():
+    Y = numpy.random.rand(500, 20)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    ref = knncolle.find_knn(idx, num_neighbors=8)
+    sq = knncolle.find_knn(idx, num_neighbors=8, squared=True)
+    assert (ref.index == sq.index).all()
+    assert numpy.allclose(ref.distance**2, sq.distance)
+
+    sq = knncolle.find_knn(idx, num_neighbors=[8] * 500, squared=True)
+    assert numpy.allclose(ref.distance[0]**2, sq.distance[0])
+
+    idx = knncolle.build_index(knncolle.VptreeParameters(distance="Manhattan"), Y)
+    with pytest.raises(ValueError, match="squared"):
+        knncolle.find_knn(idx, num_neighbors=8, squared=True)
+
+
+def test_find_knn_distance_dtype():
+    Y = numpy.random.rand(500, 20)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    ref = knncolle.find_knn(idx, num_neighbors=8)
+    single = knncolle.find_knn(idx, num_neighbors=8, distance_dtype=numpy.float32)
+    assert single.distance.dtype == numpy.float32
+    assert (ref.index == single.index).all()
+    assert (ref.distance.astype(numpy.float32) == single.distance).all()
+
+    single = knncolle.find_knn(idx, num_neighbors=[8] * 500, distance_dtype="float32")
+    assert single.distance[0].dtype == numpy.float32
+    assert (ref.distance[0].astype(numpy.float32) == single.distance[0]).all()
+
+    with pytest.raises(ValueError, match="distance_dtype"):
+        knncolle.find_knn(idx, num_neighbors=8, distance_dtype=numpy.int32)
+
+
+def _filtered_knn(Y, keep, k):
+    dist = numpy.sqrt(((Y[:,None,:] - Y[None,:,:])**2).sum(axis=2))
+    numpy.fill_diagonal(dist, numpy.inf)
+    dist[numpy.logical_not(keep)] = numpy.inf
+    ranking = numpy.argsort(dist, axis=1, kind="stable")[:,:k]
+    return ranking, numpy.take_along_axis(dist, ranking, axis=1)
+
+
+@pytest.mark.parametrize("cls", [knncolle.ExhaustiveParameters, knncolle.VptreeParameters, knncolle.KmknnParameters, knncolle.KdtreeParameters])
+def test_find_knn_filtered(cls):
+    Y = numpy.random.rand(300, 10)
+    idx = knncolle.build_index(cls(), Y)
+
+    allowed = numpy.random.rand(300) < 0.2
+    expected_i, expected_d = _filtered_knn(Y, numpy.tile(allowed, (300, 1)), 5)
+    res = knncolle.find_knn(idx, num_neighbors=5, allowed=allowed)
+    assert (res.index == expected_i).all()
+    assert numpy.allclose(res.distance, expected_d)
+
+    # Same results for indices and for exclusion of the complement.
+    res = knncolle.find_knn(idx, num_neighbors=5, allowed=numpy.where(allowed)[0])
+    assert (res.index == expected_i).all()
+    res = knncolle.find_knn(idx, num_neighbors=5, excluded=numpy.logical_not(allowed))
+    assert (res.index == expected_i).all()
+
+    # Per-observation filters.
+    excluded = [numpy.random.choice(300, 50, replace=False) for _ in range(300)]
+    keep = numpy.ones((300, 300), dtype=numpy.bool_)
+    for i, e in enumerate(excluded):
+        keep[i,e] = False
+    expected_i, expected_d = _filtered_knn(Y, keep, 5)
+    res = knncolle.find_knn(idx, num_neighbors=5, excluded=excluded)
+    assert (res.index == expected_i).all()
+    assert numpy.allclose(res.distance, expected_d)
+
+    res = knncolle.find_knn(idx, num_neighbors=5, excluded=excluded[10:20], subset=range(10, 20))
+    assert (res.index == expected_i[10:20]).all()
+
+
+def test_find_knn_filtered_insufficient():
+    Y = numpy.random.rand(100, 5)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    allowed = [0, 1, 2]
+
+    res = knncolle.find_knn(idx, num_neighbors=[5] * 100, allowed=allowed)
+    assert [len(y) for y in res.index[:4]] == [2, 2, 2, 3]
+    assert set(res.index[3]) == set(allowed)
+
+    with pytest.raises(Exception, match="filtering"):
+        knncolle.find_knn(idx, num_neighbors=5, allowed=allowed)
+
+    with pytest.raises(ValueError, match="less than"):
+        knncolle.find_knn(idx, num_neighbors=5, allowed=[100])
+    with pytest.raises(ValueError, match="length"):
+        knncolle.find_knn(idx, num_neighbors=5, excluded=[[0], [1]])
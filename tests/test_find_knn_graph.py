@@ -0,0 +1,50 @@
+import knncolle
+import numpy
+import pytest
+import scipy.sparse
+
+
+def _dense_graph(idx, k):
+    res = knncolle.find_knn(idx, k)
+    nobs = res.index.shape[0]
+    dense = numpy.zeros((nobs, nobs))
+    numpy.put_along_axis(dense, res.index, res.distance, axis=1)
+    return dense
+
+
+@pytest.mark.parametrize("cls", [knncolle.VptreeParameters, knncolle.HnswParameters])
+def test_find_knn_graph(cls):
+    Y = numpy.random.rand(300, 10)
+    idx = knncolle.build_index(cls(), Y)
+    ref = _dense_graph(idx, 8)
+
+    graph = knncolle.find_knn_graph(idx, 8)
+    assert isinstance(graph, scipy.sparse.csr_matrix)
+    assert graph.shape == (300, 300)
+    assert (numpy.diff(graph.indptr) == 8).all()
+    assert (graph.toarray() == ref).all()
+
+    res = knncolle.find_knn(idx, 8)
+    assert (graph.indices.reshape(300, 8) == res.index).all()
+
+    unweighted = knncolle.find_knn_graph(idx, 8, weighted=False)
+    assert (unweighted.toarray() == (ref > 0)).all()
+
+    union = knncolle.find_knn_graph(idx, 8, symmetrize="union")
+    assert union.has_sorted_indices
+    assert (union.toarray() == numpy.maximum(ref, ref.T)).all()
+
+    inter = knncolle.find_knn_graph(idx, 8, symmetrize="intersection")
+    expected = numpy.where((ref > 0) & (ref.T > 0), ref, 0)
+    assert (inter.toarray() == expected).all()
+
+    pool = knncolle.ThreadPool(3)
+    obs = knncolle.find_knn_graph(idx, 8, num_threads=pool, symmetrize="union")
+    assert (obs != union).nnz == 0
+
+
+def test_find_knn_graph_errors():
+    idx = knncolle.build_index(knncolle.VptreeParameters(), numpy.random.rand(20, 5))
+    assert knncolle.find_knn_graph(idx, 50).nnz == 20 * 19
+    with pytest.raises(ValueError, match="symmetrize"):
+        knncolle.find_knn_graph(idx, 5, symmetrize="max")
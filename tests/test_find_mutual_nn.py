@@ -0,0 +1,47 @@
+import knncolle
+import numpy
+import pytest
+
+
+def _ref_mnn(a, b, k_a, k_b):
+    dist = numpy.sqrt(((a[:,None,:] - b[None,:,:])**2).sum(axis=2))
+    a_in_b = numpy.argsort(dist, axis=1)[:,:k_b]
+    b_in_a = numpy.argsort(dist, axis=0)[:k_a,:]
+    pairs = []
+    for i in range(a.shape[0]):
+        for j in sorted(a_in_b[i]):
+            if i in b_in_a[:,j]:
+                pairs.append((i, j))
+    return pairs
+
+
+@pytest.mark.parametrize("cls", [knncolle.ExhaustiveParameters, knncolle.VptreeParameters, knncolle.KmknnParameters])
+def test_find_mutual_nn(cls):
+    a = numpy.random.rand(150, 5)
+    b = numpy.random.rand(200, 5) + 0.1
+    idx_a = knncolle.build_index(cls(), a)
+    idx_b = knncolle.build_index(cls(), b)
+
+    res = knncolle.find_mutual_nn(idx_a, idx_b, a, b, 5, 8)
+    assert list(zip(res.first, res.second)) == _ref_mnn(a, b, 5, 8)
+    assert len(res.first) > 0
+
+    pool = knncolle.ThreadPool(2)
+    alt = knncolle.find_mutual_nn(idx_a, idx_b, a, b, 5, 8, num_threads=pool)
+    assert (alt.first == res.first).all()
+    assert (alt.second == res.second).all()
+
+    # Capped at the number of observations.
+    res = knncolle.find_mutual_nn(idx_a, idx_b, a, b, 1000, 1000)
+    assert len(res.first) == 150 * 200
+
+
+def test_find_mutual_nn_errors():
+    a = numpy.random.rand(50, 5)
+    b = numpy.random.rand(50, 4)
+    idx_a = knncolle.build_index(knncolle.VptreeParameters(), a)
+    idx_b = knncolle.build_index(knncolle.VptreeParameters(), b)
+    with pytest.raises(Exception, match="dimensionality"):
+        knncolle.find_mutual_nn(idx_a, idx_b, a, b, 5, 5)
+    with pytest.raises(Exception, match="data_a"):
+        knncolle.find_mutual_nn(idx_a, idx_a, a[:10], a, 5, 5)
@@ -122,3 +122,62 @@ def test_find_neighbors_variable_output(helpers):
     dout = knncolle.find_neighbors(idx, threshold=d, get_index=False)
     assert dout.index is None
     helpers.compare_lists(out.distance, dout.distance)
+
+
+def test_find_neighbors_squared():
+    Y = numpy.random.rand(500, 20)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    ref = knncolle.find_neighbors(idx, threshold=1.0)
+    sq = knncolle.find_neighbors(idx, threshold=1.0, squared=True)
+    for i in range(500):
+        assert (ref.index[i] == sq.index[i]).all()
+        assert numpy.allclose(ref.distance[i]**2, sq.distance[i])
+
+    # Thresholds are also squared.
+    half = knncolle.find_neighbors(idx, threshold=0.25, squared=True, get_distance=False)
+    ref = knncolle.find_neighbors(idx, threshold=0.5, get_distance=False)
+    for i in range(500):
+        assert (ref.index[i] == half.index[i]).all()
+
+
+def test_find_neighbors_distance_dtype():
+    Y = numpy.random.rand(500, 20)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    ref = knncolle.find_neighbors(idx, threshold=1.0)
+    single = knncolle.find_neighbors(idx, threshold=1.0, distance_dtype=numpy.float32)
+    for i in range(500):
+        assert single.distance[i].dtype == numpy.float32
+        assert (ref.index[i] == single.index[i]).all()
+        assert (ref.distance[i].astype(numpy.float32) == single.distance[i]).all()
+
+    q = numpy.random.rand(20, 20)
+    single = knncolle.query_neighbors(idx, q, threshold=1.0, distance_dtype=numpy.float32)
+    assert all(d.dtype == numpy.float32 for d in single.distance)
+
+
+def test_find_neighbors_max_neighbors():
+    Y = numpy.random.rand(500, 5)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    ref = knncolle.find_neighbors(idx, threshold=0.3)
+    assert ref.capped is None
+
+    res = knncolle.find_neighbors(idx, threshold=0.3, max_neighbors=10)
+    assert res.capped.dtype == numpy.bool_
+    for i in range(500):
+        n = len(ref.index[i])
+        assert res.capped[i] == (n > 10)
+        assert (res.index[i] == ref.index[i][:10]).all()
+        assert numpy.allclose(res.distance[i], ref.distance[i][:10])
+
+    res = knncolle.find_neighbors(idx, threshold=0.09, max_neighbors=10, subset=[1, 3, 5], squared=True, get_distance=False)
+    for i, s in enumerate([1, 3, 5]):
+        assert (res.index[i] == knncolle.find_neighbors(idx, threshold=0.09, squared=True).index[s][:10]).all()
+
+    # Works for algorithms without an exact search by distance.
+    aidx = knncolle.build_index(knncolle.AnnoyParameters(), Y)
+    res = knncolle.find_neighbors(aidx, threshold=0.3, max_neighbors=5)
+    assert all(len(x) <= 5 for x in res.index)
+    assert all((x <= 0.3).all() for x in res.distance)
+
+    with pytest.raises(ValueError, match="max_neighbors"):
+        knncolle.find_neighbors(idx, threshold=0.3, max_neighbors=-1)
@@ -0,0 +1,77 @@
+import knncolle
+import numpy
+import pytest
+
+
+def _mock_codes(nobs, nbits):
+    return numpy.random.randint(0, 2, size=(nobs, nbits)).astype(numpy.uint8)
+
+
+def _hamming(x, y):
+    return (x[:,None,:] != y[None,:,:]).sum(axis=2).astype(numpy.float64)
+
+
+@pytest.mark.parametrize("cls", [knncolle.ExhaustiveParameters, knncolle.VptreeParameters])
+def test_hamming_knn(cls):
+    bits = _mock_codes(300, 256)
+    idx = knncolle.build_index(cls(distance="Hamming"), numpy.packbits(bits, axis=1))
+    assert idx.num_observations() == 300
+    assert idx.num_dimensions() == 4
+
+    expected = _hamming(bits, bits)
+    numpy.fill_diagonal(expected, numpy.inf)
+    res = knncolle.find_knn(idx, 10)
+    assert numpy.allclose(res.distance, numpy.sort(expected, axis=1)[:,:10])
+    assert numpy.allclose(numpy.take_along_axis(expected, res.index, axis=1), res.distance)
+
+    qbits = _mock_codes(50, 256)
+    expected = _hamming(qbits, bits)
+    res = knncolle.query_knn(idx, numpy.packbits(qbits, axis=1), 10)
+    assert numpy.allclose(res.distance, numpy.sort(expected, axis=1)[:,:10])
+
+    res = knncolle.query_neighbors(idx, numpy.packbits(qbits, axis=1), 115.0)
+    for i in range(50):
+        assert sorted(res.index[i]) == list(numpy.where(expected[i] <= 115)[0])
+
+
+def test_hamming_packing():
+    # Codes that are not a multiple of 64 bits are zero-padded.
+    bits = _mock_codes(200, 100)
+    packed = numpy.packbits(bits, axis=1)
+    idx = knncolle.build_index(knncolle.ExhaustiveParameters(distance="Hamming"), packed)
+    assert idx.num_dimensions() == 2
+    expected = _hamming(bits, bits)
+    numpy.fill_diagonal(expected, numpy.inf)
+    res = knncolle.find_knn(idx, 5)
+    assert numpy.allclose(res.distance, numpy.sort(expected, axis=1)[:,:5])
+
+    # 64-bit words give the same results as the equivalent bytes.
+    words = numpy.random.randint(0, 2**63, size=(200, 3), dtype=numpy.uint64)
+    ref = knncolle.find_knn(knncolle.build_index(knncolle.VptreeParameters(distance="Hamming"), words.view(numpy.uint8)), 5)
+    obs = knncolle.find_knn(knncolle.build_index(knncolle.VptreeParameters(distance="Hamming"), words), 5)
+    assert (ref.distance == obs.distance).all()
+
+    with pytest.raises(ValueError, match="bit-packed"):
+        knncolle.build_index(knncolle.ExhaustiveParameters(distance="Hamming"), numpy.random.rand(10, 5))
+
+    with pytest.raises(ValueError, match="unsupported"):
+        knncolle.KmknnParameters(distance="Hamming")
+
+
+def test_hamming_memory_usage():
+    packed = numpy.packbits(_mock_codes(500, 256), axis=1)
+    idx = knncolle.build_index(knncolle.ExhaustiveParameters(distance="Hamming"), packed)
+    assert idx.estimate_memory_usage()["data"] == 500 * 256 // 8
+
+
+def test_hamming_reorder():
+    packed = numpy.packbits(_mock_codes(300, 128), axis=1)
+    idx = knncolle.build_index(knncolle.VptreeParameters(distance="Hamming"), packed, reorder=True)
+    assert idx.locality is None
+    assert idx.layout == "input"
+
+    q = numpy.packbits(_mock_codes(50, 128), axis=1)
+    ref = knncolle.query_knn(idx, q, 5)
+    out = knncolle.query_knn(idx, q, 5, reorder=True)
+    assert (ref.index == out.index).all()
+    assert (ref.distance == out.distance).all()
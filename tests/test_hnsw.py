@@ -1,5 +1,6 @@
 import knncolle
 import numpy
+import pytest
 
 
 def test_hnsw_parameters():
@@ -52,3 +53,143 @@ def test_hnsw_distances(helpers):
     res_ce = knncolle.find_knn(idx_ce, 10)
     assert (res_c.index == res_ce.index).all()
     assert numpy.isclose(res_c.distance, res_ce.distance).all()
+
+
+
+def test_hnsw_distance_only():
+    # Using a poorly connected graph so that 'self' is not always found,
+    # in which case a distance-only search should still drop the furthest neighbor.
+    x = numpy.random.rand(200, 50)
+    idx = knncolle.build_index(knncolle.HnswParameters(num_links=2, ef_construction=5, ef_search=1), x)
+
+    full = knncolle.find_knn(idx, 10)
+    dist = knncolle.find_knn(idx, 10, get_index=False)
+    assert dist.index is None
+    assert (full.distance == dist.distance).all()
+    assert (knncolle.find_distance(idx, 10) == full.distance[:,-1]).all()
+
+
+def test_hnsw_neighbors():
+    x = numpy.random.rand(1000, 5)
+    q = numpy.random.rand(50, 5)
+    idx = knncolle.build_index(knncolle.HnswParameters(), x)
+    ref = knncolle.build_index(knncolle.ExhaustiveParameters(), x)
+
+    # Approximate search by distance should recover most of the true neighbors.
+    res = knncolle.find_neighbors(idx, 0.2)
+    exp = knncolle.find_neighbors(ref, 0.2)
+    found = sum(len(set(a) & set(b)) for a, b in zip(res.index, exp.index))
+    assert found / sum(len(b) for b in exp.index) > 0.95
+    for i in range(1000):
+        assert (res.distance[i] <= 0.2).all()
+        assert i not in res.index[i]
+
+    # Large thresholds need multiple rounds of expansion.
+    res = knncolle.query_neighbors(idx, q, 0.5)
+    exp = knncolle.query_neighbors(ref, q, 0.5)
+    found = sum(len(set(a) & set(b)) for a, b in zip(res.index, exp.index))
+    assert found / sum(len(b) for b in exp.index) > 0.95
+    for i in range(50):
+        assert numpy.allclose(res.distance[i], numpy.sqrt(((x[res.index[i]] - q[i])**2).sum(axis=1)))
+
+    res = knncolle.query_neighbors(idx, q, 10.0, get_distance=False)
+    assert all(len(y) == 1000 for y in res.index)
+
+
+def test_hnsw_base_graph(helpers):
+    x = numpy.random.rand(1000, 5)
+    idx = knncolle.build_index(knncolle.HnswParameters(base_graph=True), x)
+    ref = knncolle.find_knn(knncolle.build_index(knncolle.ExhaustiveParameters(), x), 10)
+
+    res = idx.base_graph(10)
+    helpers.check_index_matrix(res.index, 1000, False)
+    helpers.check_distance_matrix(res.distance)
+    assert res.index.shape == (1000, 10)
+    for i in range(0, 1000, 50):
+        assert numpy.allclose(res.distance[i], numpy.sqrt(((x[res.index[i]] - x[i])**2).sum(axis=1)), rtol=1e-5)
+
+    def recall(obs):
+        return sum(len(set(a) & set(b)) for a, b in zip(obs.index, ref.index)) / ref.index.size
+
+    refined = idx.base_graph(10, refine=True)
+    helpers.check_index_matrix(refined.index, 1000, False)
+    assert recall(refined) >= recall(res)
+    assert recall(refined) > 0.9
+
+    # Same results with multiple threads.
+    par = idx.base_graph(10, refine=True, num_threads=3)
+    assert (par.index == refined.index).all()
+    assert (par.distance == refined.distance).all()
+
+    # Capped at the number of observations.
+    small = knncolle.build_index(knncolle.HnswParameters(base_graph=True), x[:10])
+    res = small.base_graph(20)
+    helpers.check_index_matrix(res.index, 10, False)
+    assert res.index.shape == (10, 9)
+
+
+def test_hnsw_base_graph_wrapped(helpers):
+    x = numpy.random.rand(500, 5)
+
+    idx = knncolle.build_index(knncolle.HnswParameters(base_graph=True), x, reorder=True)
+    res = idx.base_graph(10, refine=True)
+    helpers.check_index_matrix(res.index, 500, False)
+    for i in range(0, 500, 50):
+        assert numpy.allclose(res.distance[i], numpy.sqrt(((x[res.index[i]] - x[i])**2).sum(axis=1)), rtol=1e-5)
+
+    idx = knncolle.build_index(knncolle.HnswParameters(distance="Cosine", keep_data=True, base_graph=True), x)
+    res = idx.base_graph(10)
+    helpers.check_index_matrix(res.index, 500, False)
+    norm = (x.T / numpy.sqrt((x**2).sum(axis=1))).T
+    for i in range(0, 500, 50):
+        assert numpy.allclose(res.distance[i], numpy.sqrt(((norm[res.index[i]] - norm[i])**2).sum(axis=1)), rtol=1e-5)
+
+    with pytest.raises(ValueError, match="not supported"):
+        knncolle.HnswParameters(distance="InnerProduct", base_graph=True)
+    params = knncolle.HnswParameters(base_graph=True)
+    with pytest.raises(ValueError, match="not supported"):
+        params.distance = "InnerProduct"
+
+    # Only available for indices built with base_graph=True.
+    idx = knncolle.build_index(knncolle.HnswParameters(), x)
+    with pytest.raises(ValueError, match="base_graph=True"):
+        idx.base_graph(10)
+
+
+def test_hnsw_base_graph_search():
+    # The local implementation for base_graph=True searches in the same way as knncolle_hnsw.
+    x = numpy.random.rand(500, 5)
+    q = numpy.random.rand(50, 5)
+    ref = knncolle.build_index(knncolle.HnswParameters(), x)
+    idx = knncolle.build_index(knncolle.HnswParameters(base_graph=True), x)
+
+    expected = knncolle.find_knn(ref, 10)
+    observed = knncolle.find_knn(idx, 10)
+    assert (expected.index == observed.index).all()
+    assert (expected.distance == observed.distance).all()
+
+    expected = knncolle.query_knn(ref, q, 10)
+    observed = knncolle.query_knn(idx, q, 10)
+    assert (expected.index == observed.index).all()
+    assert (expected.distance == observed.distance).all()
+
+
+def test_hnsw_base_graph_duplicates():
+    # With duplicate points, hnswlib may not report an observation as its own neighbor among the ties,
+    # in which case the furthest neighbor is removed instead.
+    x = numpy.zeros((100, 3))
+    ref = knncolle.build_index(knncolle.HnswParameters(), x)
+    idx = knncolle.build_index(knncolle.HnswParameters(base_graph=True), x)
+
+    expected = knncolle.find_knn(ref, 5)
+    observed = knncolle.find_knn(idx, 5)
+    assert observed.index.shape == (100, 5)
+    assert (observed.distance == 0).all()
+    assert (expected.index == observed.index).all()
+    for i in range(100):
+        assert i not in observed.index[i]
+        assert len(set(observed.index[i])) == 5
+
+    # Same results when only the indices are requested.
+    only = knncolle.find_knn(idx, 5, get_distance=False)
+    assert (only.index == observed.index).all()
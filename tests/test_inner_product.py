@@ -0,0 +1,108 @@
+import knncolle
+import numpy
+import pytest
+
+
+EXACT = [knncolle.ExhaustiveParameters, knncolle.VptreeParameters, knncolle.KmknnParameters]
+
+APPROXIMATE = [knncolle.HnswParameters, knncolle.AnnoyParameters]
+
+
+def _mock_data(nobs, ndim):
+    # Varying the norms so that the inner product is different from the cosine similarity.
+    x = numpy.random.rand(nobs, ndim) - 0.5
+    return x * numpy.random.rand(nobs, 1) * 5
+
+
+def _ranked(scores, k):
+    ranking = numpy.argsort(-scores, axis=1, kind="stable")[:,:k]
+    return ranking, numpy.take_along_axis(scores, ranking, axis=1)
+
+
+@pytest.mark.parametrize("cls", EXACT)
+def test_inner_product_exact_knn(cls):
+    x = _mock_data(300, 10)
+    idx = knncolle.build_index(cls(distance="InnerProduct"), x)
+
+    scores = x @ x.T
+    numpy.fill_diagonal(scores, -numpy.inf)
+    expected_i, expected_d = _ranked(scores, 8)
+    res = knncolle.find_knn(idx, 8)
+    assert (res.index == expected_i).all()
+    assert numpy.allclose(res.distance, expected_d)
+
+    q = _mock_data(50, 10)
+    scores = q @ x.T
+    expected_i, expected_d = _ranked(scores, 8)
+    res = knncolle.query_knn(idx, q, 8)
+    assert (res.index == expected_i).all()
+    assert numpy.allclose(res.distance, expected_d)
+
+    # Scores are sorted in decreasing order.
+    assert (numpy.diff(res.distance, axis=1) <= 0).all()
+
+    res = knncolle.query_knn(idx, q, [3] * 50)
+    for i in range(50):
+        assert (res.index[i] == expected_i[i,:3]).all()
+
+
+@pytest.mark.parametrize("cls", EXACT)
+def test_inner_product_exact_neighbors(cls):
+    x = _mock_data(300, 10)
+    idx = knncolle.build_index(cls(distance="InnerProduct"), x)
+
+    scores = x @ x.T
+    numpy.fill_diagonal(scores, -numpy.inf)
+    res = knncolle.find_neighbors(idx, 1.0)
+    for i in range(300):
+        assert sorted(res.index[i]) == list(numpy.where(scores[i] >= 1.0)[0])
+        assert numpy.allclose(res.distance[i], scores[i,res.index[i]])
+        assert (numpy.diff(res.distance[i]) <= 0).all()
+
+    q = _mock_data(50, 10)
+    scores = q @ x.T
+    res = knncolle.query_neighbors(idx, q, 1.0)
+    for i in range(50):
+        assert sorted(res.index[i]) == list(numpy.where(scores[i] >= 1.0)[0])
+
+    # Thresholds above the largest attainable inner product yield no neighbors.
+    res = knncolle.query_neighbors(idx, q, 1e8)
+    assert all(len(y) == 0 for y in res.index)
+
+
+@pytest.mark.parametrize("cls", APPROXIMATE)
+def test_inner_product_approximate(cls):
+    x = _mock_data(300, 10)
+    idx = knncolle.build_index(cls(distance="InnerProduct"), x)
+
+    q = _mock_data(50, 10)
+    res = knncolle.query_knn(idx, q, 8)
+    assert numpy.allclose(res.distance, numpy.take_along_axis(q @ x.T, res.index, axis=1))
+    assert (numpy.diff(res.distance, axis=1) <= 0).all()
+
+    res = knncolle.find_knn(idx, 8)
+    assert (res.index != numpy.arange(300)[:,None]).all()
+    assert numpy.allclose(res.distance, numpy.take_along_axis(x @ x.T, res.index, axis=1))
+
+
+def test_inner_product_reorder():
+    x = _mock_data(300, 10)
+    ref = knncolle.find_knn(knncolle.build_index(knncolle.VptreeParameters(distance="InnerProduct"), x), 5)
+    obs = knncolle.find_knn(knncolle.build_index(knncolle.VptreeParameters(distance="InnerProduct"), x, reorder=True), 5)
+    assert (ref.index == obs.index).all()
+    assert numpy.allclose(ref.distance, obs.distance)
+
+
+def test_inner_product_memory_usage():
+    ref = knncolle.estimate_memory_usage(knncolle.ExhaustiveParameters(), 1000, 20)
+    obs = knncolle.estimate_memory_usage(knncolle.ExhaustiveParameters(distance="InnerProduct"), 1000, 20)
+    assert obs["data"] == 0
+    assert obs["augmented"] == 1000 * 21 * 8
+    assert "augmented" not in ref
+
+    obs = knncolle.estimate_memory_usage(knncolle.HnswParameters(distance="InnerProduct"), 1000, 20)
+    assert obs["augmented"] == 1000 * 21 * 8
+    assert "augmented" not in knncolle.estimate_memory_usage(knncolle.HnswParameters(), 1000, 20)
+
+    # No extra copy is needed for refinement.
+    assert "exact" not in knncolle.estimate_memory_usage(knncolle.HnswParameters(distance="InnerProduct", keep_data=True), 1000, 20)
@@ -0,0 +1,138 @@
+import knncolle
+import numpy
+import pytest
+
+
+def test_kdtree_parameters():
+    p = knncolle.KdtreeParameters()
+    assert p.leaf_size == 10
+    assert p.distance == "Euclidean"
+
+    p = knncolle.KdtreeParameters(leaf_size=5, distance="Manhattan")
+    assert p.leaf_size == 5
+    assert p.distance == "Manhattan"
+
+    with pytest.raises(ValueError, match="leaf_size"):
+        p.leaf_size = 0
+    with pytest.raises(ValueError, match="unsupported"):
+        p.distance = "Hamming"
+
+
+@pytest.mark.parametrize("distance", ["Euclidean", "Manhattan", "Cosine"])
+@pytest.mark.parametrize("leaf_size", [1, 10])
+def test_kdtree_exact(distance, leaf_size):
+    x = numpy.random.rand(1000, 3)
+    q = numpy.random.rand(100, 3)
+    idx = knncolle.build_index(knncolle.KdtreeParameters(leaf_size=leaf_size, distance=distance), x)
+    ref = knncolle.build_index(knncolle.ExhaustiveParameters(distance=distance), x)
+
+    res = knncolle.find_knn(idx, 10)
+    exp = knncolle.find_knn(ref, 10)
+    assert (res.index == exp.index).all()
+    assert numpy.allclose(res.distance, exp.distance)
+
+    res = knncolle.query_knn(idx, q, 10)
+    exp = knncolle.query_knn(ref, q, 10)
+    assert (res.index == exp.index).all()
+    assert numpy.allclose(res.distance, exp.distance)
+
+    threshold = 0.02 if distance == "Cosine" else 0.1
+    res = knncolle.find_neighbors(idx, threshold)
+    exp = knncolle.find_neighbors(ref, threshold)
+    for i in range(1000):
+        assert (res.index[i] == exp.index[i]).all()
+        assert numpy.allclose(res.distance[i], exp.distance[i])
+
+    res = knncolle.query_neighbors(idx, q, threshold)
+    exp = knncolle.query_neighbors(ref, q, threshold)
+    for i in range(100):
+        assert (res.index[i] == exp.index[i]).all()
+        assert numpy.allclose(res.distance[i], exp.distance[i])
+
+
+def test_kdtree_duplicates(helpers):
+    # Lots of ties along each dimension.
+    x = numpy.random.randint(0, 3, size=(500, 2)).astype(numpy.float64)
+    idx = knncolle.build_index(knncolle.KdtreeParameters(leaf_size=2), x)
+    res = knncolle.find_knn(idx, 10)
+    helpers.check_index_matrix(res.index, 500, False)
+    exp = knncolle.find_knn(knncolle.build_index(knncolle.ExhaustiveParameters(), x), 10)
+    assert numpy.allclose(res.distance, exp.distance)
+
+
+def test_kdtree_empty():
+    idx = knncolle.build_index(knncolle.KdtreeParameters(), numpy.zeros((0, 2)))
+    res = knncolle.query_knn(idx, numpy.random.rand(5, 2), 3)
+    assert res.index.shape == (5, 0)
+
+
+@pytest.mark.parametrize("distance", ["Euclidean", "Manhattan", "Cosine"])
+@pytest.mark.parametrize("num_threads", [1, 3])
+def test_kdtree_dual_tree(distance, num_threads):
+    x = numpy.random.rand(1000, 3)
+    idx = knncolle.build_index(knncolle.KdtreeParameters(leaf_size=5, distance=distance), x)
+
+    ref = knncolle.find_knn(idx, 10)
+    res = knncolle.find_knn(idx, 10, dual_tree=True, num_threads=num_threads)
+    assert (res.index == ref.index).all()
+    assert numpy.allclose(res.distance, ref.distance)
+
+    k = numpy.random.randint(0, 20, size=1000)
+    ref = knncolle.find_knn(idx, k)
+    res = knncolle.find_knn(idx, k, dual_tree=True, num_threads=num_threads)
+    for i in range(1000):
+        assert (res.index[i] == ref.index[i]).all()
+
+    assert numpy.allclose(knncolle.find_distance(idx, 5, dual_tree=True, num_threads=num_threads), knncolle.find_distance(idx, 5))
+
+    threshold = 0.02 if distance == "Cosine" else 0.1
+    ref = knncolle.find_neighbors(idx, threshold)
+    res = knncolle.find_neighbors(idx, threshold, dual_tree=True, num_threads=num_threads)
+    for i in range(1000):
+        assert (res.index[i] == ref.index[i]).all()
+        assert numpy.allclose(res.distance[i], ref.distance[i])
+
+    # Same results for tiny indices.
+    for n in [1, 2]:
+        idx = knncolle.build_index(knncolle.KdtreeParameters(distance=distance), x[:n,:])
+        ref = knncolle.find_knn(idx, 5)
+        res = knncolle.find_knn(idx, 5, dual_tree=True, num_threads=num_threads)
+        assert (res.index == ref.index).all()
+
+
+def test_kdtree_dual_tree_duplicates():
+    x = numpy.random.randint(0, 3, size=(500, 2)).astype(numpy.float64)
+    idx = knncolle.build_index(knncolle.KdtreeParameters(leaf_size=2), x, reorder=True)
+    ref = knncolle.find_knn(idx, 10)
+    res = knncolle.find_knn(idx, 10, dual_tree=True)
+    assert (res.index == ref.index).all()
+
+    ref = knncolle.find_neighbors(idx, 1, max_neighbors=5, squared=True)
+    res = knncolle.find_neighbors(idx, 1, max_neighbors=5, squared=True, dual_tree=True)
+    for i in range(500):
+        assert (res.index[i] == ref.index[i]).all()
+        assert numpy.allclose(res.distance[i], ref.distance[i])
+
+
+def test_kdtree_dual_tree_subset():
+    x = numpy.random.rand(1000, 2)
+    idx = knncolle.build_index(knncolle.KdtreeParameters(leaf_size=5), x, reorder=True)
+    sub = [10, 500, 3, 999, 500]
+
+    ref = knncolle.find_knn(idx, 8, subset=sub)
+    res = knncolle.find_knn(idx, 8, subset=sub, dual_tree=True, num_threads=2)
+    assert (res.index == ref.index).all()
+    assert numpy.allclose(res.distance, ref.distance)
+
+    k = [1, 5, 0, 10, 3]
+    ref = knncolle.find_knn(idx, k, subset=sub, get_index=False)
+    res = knncolle.find_knn(idx, k, subset=sub, get_index=False, dual_tree=True)
+    for r, e in zip(res.distance, ref.distance):
+        assert numpy.allclose(r, e)
+
+    threshold = [0.05, 0.1, 0.02, 0.03, 0.2]
+    ref = knncolle.find_neighbors(idx, threshold, subset=sub)
+    res = knncolle.find_neighbors(idx, threshold, subset=sub, dual_tree=True, num_threads=2)
+    for i in range(len(sub)):
+        assert (res.index[i] == ref.index[i]).all()
+        assert numpy.allclose(res.distance[i], ref.distance[i])
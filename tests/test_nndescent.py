@@ -0,0 +1,103 @@
+import knncolle
+import numpy
+import pytest
+
+
+def test_nndescent_parameters():
+    p = knncolle.NndescentParameters()
+    assert p.num_neighbors == 30
+    assert p.sample_rate == 1
+    assert p.ef_search == 50
+
+    p = knncolle.NndescentParameters(distance="Manhattan")
+    assert p.distance == "Manhattan"
+
+    p.num_neighbors = 20
+    assert p.num_neighbors == 20
+    p.max_iterations = 5
+    assert p.max_iterations == 5
+
+    with pytest.raises(ValueError, match="sample_rate"):
+        p.sample_rate = 2
+    with pytest.raises(ValueError, match="num_neighbors"):
+        p.num_neighbors = 0
+
+
+def _recall(obs, ref):
+    return sum(len(set(a) & set(b)) for a, b in zip(obs, ref)) / ref.size
+
+
+def test_nndescent_basic(helpers):
+    x = numpy.random.rand(1000, 5)
+    idx = knncolle.build_index(knncolle.NndescentParameters(num_neighbors=15), x)
+    ref = knncolle.build_index(knncolle.ExhaustiveParameters(), x)
+
+    # Reported directly from the graph.
+    res = knncolle.find_knn(idx, 10)
+    helpers.check_index_matrix(res.index, 1000, False)
+    helpers.check_distance_matrix(res.distance)
+    exp = knncolle.find_knn(ref, 10)
+    assert _recall(res.index, exp.index) > 0.95
+    for i in range(0, 1000, 50):
+        assert numpy.allclose(res.distance[i], numpy.sqrt(((x[res.index[i]] - x[i])**2).sum(axis=1)))
+
+    # More neighbors than are stored in the graph, requiring a search.
+    res = knncolle.find_knn(idx, 20)
+    helpers.check_index_matrix(res.index, 1000, False)
+    helpers.check_distance_matrix(res.distance)
+    exp = knncolle.find_knn(ref, 20)
+    assert _recall(res.index, exp.index) > 0.95
+
+    q = numpy.random.rand(100, 5)
+    res = knncolle.query_knn(idx, q, 10)
+    helpers.check_index_matrix(res.index, 1000, True)
+    helpers.check_distance_matrix(res.distance)
+    exp = knncolle.query_knn(ref, q, 10)
+    assert _recall(res.index, exp.index) > 0.95
+
+    res = knncolle.query_neighbors(idx, q, 0.2)
+    exp = knncolle.query_neighbors(ref, q, 0.2)
+    found = sum(len(set(a) & set(b)) for a, b in zip(res.index, exp.index))
+    assert found / sum(len(b) for b in exp.index) > 0.95
+
+
+def test_nndescent_reproducible():
+    x = numpy.random.rand(500, 5)
+    res1 = knncolle.find_knn(knncolle.build_index(knncolle.NndescentParameters(), x), 10)
+    res2 = knncolle.find_knn(knncolle.build_index(knncolle.NndescentParameters(), x), 10)
+    assert (res1.index == res2.index).all()
+
+    par = knncolle.find_knn(knncolle.build_index(knncolle.NndescentParameters(num_threads=3), x), 10)
+    exp = knncolle.find_knn(knncolle.build_index(knncolle.ExhaustiveParameters(), x), 10)
+    assert _recall(par.index, exp.index) > 0.95
+
+
+def test_nndescent_distances(helpers):
+    x = numpy.random.rand(500, 10)
+
+    idx_m = knncolle.build_index(knncolle.NndescentParameters(distance="Manhattan"), x)
+    res_m = knncolle.find_knn(idx_m, 10)
+    helpers.check_index_matrix(res_m.index, 500, False)
+    for i in range(0, 500, 50):
+        assert numpy.allclose(res_m.distance[i], numpy.abs(x[res_m.index[i]] - x[i]).sum(axis=1))
+
+    idx_c = knncolle.build_index(knncolle.NndescentParameters(distance="Cosine"), x)
+    res_c = knncolle.find_knn(idx_c, 10)
+    norm = (x.T / numpy.sqrt((x**2).sum(axis=1))).T
+    exp = knncolle.find_knn(knncolle.build_index(knncolle.ExhaustiveParameters(), norm), 10)
+    assert _recall(res_c.index, exp.index) > 0.9
+
+
+def test_nndescent_small(helpers):
+    # Fewer observations than the number of neighbors in the graph.
+    x = numpy.random.rand(10, 5)
+    idx = knncolle.build_index(knncolle.NndescentParameters(), x)
+    res = knncolle.find_knn(idx, 20)
+    helpers.check_index_matrix(res.index, 10, False)
+    assert res.index.shape == (10, 9)
+    exp = knncolle.find_knn(knncolle.build_index(knncolle.ExhaustiveParameters(), x), 20)
+    assert (res.index == exp.index).all()
+
+    idx = knncolle.build_index(knncolle.NndescentParameters(), x[:1])
+    res = knncolle.find_knn(idx, 5)
+    assert res.index.shape == (1, 0)
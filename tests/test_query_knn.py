@@ -95,3 +95,134 @@ def test_query_knn_variable_output():
     dout = knncolle.query_knn(idx, q, num_neighbors=8, get_index=False)
     assert dout.index is None
     assert (dout.distance == out.distance).all()
+
+
+def test_query_knn_squared():
+    Y = numpy.random.rand(500, 20)
+    q = numpy.random.rand(50, 20)
+    idx = knncolle.build_index(knncolle.ExhaustiveParameters(distance="Cosine"), Y)
+    ref = knncolle.query_knn(idx, q, num_neighbors=8)
+    sq = knncolle.query_knn(idx, q, num_neighbors=8, squared=True)
+    assert (ref.index == sq.index).all()
+    assert numpy.allclose(ref.distance**2, sq.distance)
+
+    dist = knncolle.query_distance(idx, q, num_neighbors=8, squared=True)
+    assert numpy.allclose(dist, sq.distance[:,7])
+
+
+def test_query_knn_distance_dtype():
+    Y = numpy.random.rand(500, 20)
+    q = numpy.random.rand(50, 20)
+    idx = knncolle.build_index(knncolle.HnswParameters(), Y)
+    ref = knncolle.query_knn(idx, q, num_neighbors=8)
+    single = knncolle.query_knn(idx, q, num_neighbors=8, distance_dtype=numpy.float32)
+    assert single.distance.dtype == numpy.float32
+    assert (ref.distance.astype(numpy.float32) == single.distance).all()
+
+    dist = knncolle.query_distance(idx, q, num_neighbors=8, distance_dtype=numpy.float32)
+    assert dist.dtype == numpy.float32
+    assert (dist == single.distance[:,7]).all()
+
+
+@pytest.mark.parametrize("cls", [knncolle.ExhaustiveParameters, knncolle.VptreeParameters, knncolle.KmknnParameters, knncolle.HnswParameters, knncolle.AnnoyParameters])
+def test_query_knn_filtered(cls):
+    Y = numpy.random.rand(500, 10)
+    q = numpy.random.rand(20, 10)
+    idx = knncolle.build_index(cls(), Y)
+
+    allowed = [numpy.random.rand(500) < 0.1 for _ in range(20)]
+    res = knncolle.query_knn(idx, q, num_neighbors=5, allowed=allowed, excluded=[0, 1, 2, 3, 4])
+    assert res.index.shape == (20, 5)
+    for i in range(20):
+        assert allowed[i][res.index[i]].all()
+        assert (res.index[i] >= 5).all()
+        assert numpy.allclose(res.distance[i], numpy.sqrt(((Y[res.index[i]] - q[i])**2).sum(axis=1)))
+
+    if cls in (knncolle.HnswParameters, knncolle.AnnoyParameters):
+        return
+
+    for i in range(20):
+        keep = numpy.where(allowed[i])[0]
+        keep = keep[keep >= 5]
+        dist = numpy.sqrt(((Y[keep] - q[i])**2).sum(axis=1))
+        assert (res.index[i] == keep[numpy.argsort(dist, kind="stable")[:5]]).all()
+
+
+@pytest.mark.parametrize("cls", [knncolle.HnswParameters, knncolle.AnnoyParameters])
+def test_query_knn_refine(cls):
+    Y = numpy.random.rand(1000, 10)
+    q = numpy.random.rand(50, 10)
+    exact = knncolle.query_knn(knncolle.build_index(knncolle.ExhaustiveParameters(), Y), q, num_neighbors=10)
+
+    # Low search effort to make sure that there's something to refine.
+    params = cls(keep_data=True)
+    if cls == knncolle.HnswParameters:
+        params.num_links = 4
+        params.ef_construction = 10
+    else:
+        params.num_trees = 2
+    idx = knncolle.build_index(params, Y)
+
+    def recall(res):
+        return numpy.mean([len(set(res.index[i]) & set(exact.index[i])) / 10 for i in range(50)])
+
+    ref = knncolle.query_knn(idx, q, num_neighbors=10)
+    refined = knncolle.query_knn(idx, q, num_neighbors=10, refine_factor=5)
+    assert recall(refined) >= recall(ref)
+    assert recall(refined) > 0.9
+    assert (numpy.diff(refined.distance, axis=1) >= 0).all()
+    assert numpy.allclose(refined.distance, numpy.sqrt(((Y[refined.index] - q[:,None,:])**2).sum(axis=2)))
+
+    # Subsequent searches without refinement are unaffected, even with cached searchers in a pool.
+    pool = knncolle.ThreadPool(2)
+    knncolle.query_knn(idx, q, num_neighbors=10, refine_factor=5, num_threads=pool)
+    again = knncolle.query_knn(idx, q, num_neighbors=10, num_threads=pool)
+    assert (again.index == ref.index).all()
+
+    found = knncolle.find_knn(idx, num_neighbors=10, refine_factor=5)
+    assert (found.index != numpy.arange(1000)[:,None]).all()
+    assert (numpy.diff(found.distance, axis=1) >= 0).all()
+
+    with pytest.raises(ValueError, match="keep_data"):
+        knncolle.query_knn(knncolle.build_index(cls(), Y), q, num_neighbors=10, refine_factor=5)
+    with pytest.raises(ValueError, match="positive"):
+        knncolle.query_knn(idx, q, num_neighbors=10, refine_factor=0)
+
+
+def test_query_knn_refine_cosine():
+    Y = numpy.random.rand(500, 10)
+    q = numpy.random.rand(20, 10)
+    exact = knncolle.query_knn(knncolle.build_index(knncolle.ExhaustiveParameters(distance="Cosine"), Y), q, num_neighbors=5)
+    idx = knncolle.build_index(knncolle.HnswParameters(distance="Cosine", keep_data=True), Y)
+    refined = knncolle.query_knn(idx, q, num_neighbors=5, refine_factor=10)
+    assert numpy.allclose(refined.distance, exact.distance)
+    assert knncolle.estimate_memory_usage(knncolle.HnswParameters(keep_data=True), 500, 10)["exact"] == 500 * 10 * 8
+
+
+@pytest.mark.parametrize("cls", [knncolle.HnswParameters, knncolle.AnnoyParameters])
+def test_query_knn_refine_inner_product(cls):
+    Y = numpy.random.rand(1000, 10)
+    q = numpy.random.rand(50, 10)
+    exact = knncolle.query_knn(knncolle.build_index(knncolle.ExhaustiveParameters(distance="InnerProduct"), Y), q, num_neighbors=10)
+
+    params = cls(distance="InnerProduct", keep_data=True)
+    if cls == knncolle.HnswParameters:
+        params.num_links = 4
+        params.ef_construction = 10
+    else:
+        params.num_trees = 2
+    idx = knncolle.build_index(params, Y)
+
+    def recall(res):
+        return numpy.mean([len(set(res.index[i]) & set(exact.index[i])) / 10 for i in range(50)])
+
+    ref = knncolle.query_knn(idx, q, num_neighbors=10)
+    refined = knncolle.query_knn(idx, q, num_neighbors=10, refine_factor=5)
+    assert recall(refined) >= recall(ref)
+    assert (numpy.diff(refined.distance, axis=1) <= 0).all()
+    assert numpy.allclose(refined.distance, (Y[refined.index] * q[:,None,:]).sum(axis=2))
+
+    found = knncolle.find_knn(idx, num_neighbors=10, refine_factor=5)
+    assert found.index.shape == (1000, 10)
+    assert (found.index != numpy.arange(1000)[:,None]).all()
+    assert (numpy.diff(found.distance, axis=1) <= 0).all()
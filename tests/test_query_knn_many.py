@@ -0,0 +1,79 @@
+import knncolle
+import numpy
+import pytest
+
+
+@pytest.mark.parametrize("cls", [knncolle.VptreeParameters, knncolle.HnswParameters])
+def test_query_knn_many(cls):
+    sizes = [50, 3, 0, 120, 20]
+    indices = [knncolle.build_index(cls(), numpy.random.rand(n, 5)) for n in sizes]
+    queries = [numpy.random.rand(n, 5) for n in [10, 30, 5, 0, 17]]
+
+    res = knncolle.query_knn_many(indices, queries, 5)
+    assert len(res) == 5
+    for i in range(5):
+        ref = knncolle.query_knn(indices[i], queries[i], 5)
+        assert (ref.index == res[i].index).all()
+        assert (ref.distance == res[i].distance).all()
+        assert res[i].index.shape == (queries[i].shape[0], min(5, sizes[i]))
+
+    ks = [1, 2, 3, 4, 5]
+    pool = knncolle.ThreadPool(3)
+    res = knncolle.query_knn_many(indices, queries, ks, num_threads=pool, get_distance=False)
+    for i in range(5):
+        ref = knncolle.query_knn(indices[i], queries[i], ks[i])
+        assert (ref.index == res[i].index).all()
+        assert res[i].distance is None
+
+    res = knncolle.query_knn_many(indices, queries, 5, num_threads=4)
+    for i in range(5):
+        ref = knncolle.query_knn(indices[i], queries[i], 5)
+        assert (ref.index == res[i].index).all()
+
+
+def test_query_knn_many_cosine():
+    indices = [knncolle.build_index(knncolle.ExhaustiveParameters(distance="Cosine"), numpy.random.rand(40, 5)) for _ in range(3)]
+    queries = [numpy.random.rand(10, 5) for _ in range(3)]
+    res = knncolle.query_knn_many(indices, queries, 4)
+    for i in range(3):
+        ref = knncolle.query_knn(indices[i], queries[i], 4)
+        assert (ref.index == res[i].index).all()
+        assert numpy.allclose(ref.distance, res[i].distance)
+
+
+def test_query_knn_many_errors():
+    indices = [knncolle.build_index(knncolle.VptreeParameters(), numpy.random.rand(40, 5))]
+    with pytest.raises(ValueError, match="same length"):
+        knncolle.query_knn_many(indices, [], 4)
+    with pytest.raises(Exception, match="dimensionality"):
+        knncolle.query_knn_many(indices, [numpy.random.rand(10, 4)], 4)
+    with pytest.raises(ValueError, match="same length"):
+        knncolle.query_knn_many(indices, [numpy.random.rand(10, 5)], [4, 5])
+
+
+def test_query_knn_many_numpy_integer():
+    indices = [knncolle.build_index(knncolle.VptreeParameters(), numpy.random.rand(n, 5)) for n in [30, 40]]
+    queries = [numpy.random.rand(10, 5) for _ in range(2)]
+    res = knncolle.query_knn_many(indices, queries, numpy.int64(4))
+    for i in range(2):
+        ref = knncolle.query_knn(indices[i], queries[i], 4)
+        assert (ref.index == res[i].index).all()
+
+    res = knncolle.query_knn_many(indices, queries, numpy.array([2, 3]))
+    for i in range(2):
+        ref = knncolle.query_knn(indices[i], queries[i], i + 2)
+        assert (ref.index == res[i].index).all()
+
+    # Repeated searches with the same pool reuse the cached searchers.
+    pool = knncolle.ThreadPool(2)
+    for _ in range(3):
+        res = knncolle.query_knn_many(indices, queries, 4, num_threads=pool)
+        for i in range(2):
+            ref = knncolle.query_knn(indices[i], queries[i], 4)
+            assert (ref.index == res[i].index).all()
+
+
+def test_query_knn_many_dispatch():
+    assert knncolle.query_knn_many([], [], 5) == []
+    with pytest.raises(NotImplementedError, match="no available method"):
+        knncolle.query_knn_many([1], [numpy.random.rand(10, 5)], 5)
@@ -107,3 +107,34 @@ def test_query_neighbors_variable_output(helpers):
     dout = knncolle.query_neighbors(idx, q, threshold=d, get_index=False)
     assert dout.index is None
     helpers.compare_lists(out.distance, dout.distance)
+
+
+def test_query_neighbors_squared():
+    Y = numpy.random.rand(500, 20)
+    q = numpy.random.rand(50, 20)
+    idx = knncolle.build_index(knncolle.KmknnParameters(), Y)
+    ref = knncolle.query_neighbors(idx, q, threshold=0.5)
+    sq = knncolle.query_neighbors(idx, q, threshold=0.25, squared=True)
+    for i in range(50):
+        assert (ref.index[i] == sq.index[i]).all()
+        assert numpy.allclose(ref.distance[i]**2, sq.distance[i])
+
+
+def test_query_neighbors_max_neighbors():
+    Y = numpy.random.rand(500, 5)
+    q = numpy.random.rand(50, 5)
+    idx = knncolle.build_index(knncolle.KmknnParameters(), Y)
+    ref = knncolle.query_neighbors(idx, q, threshold=0.3)
+    res = knncolle.query_neighbors(idx, q, threshold=0.3, max_neighbors=10)
+    for i in range(50):
+        assert res.capped[i] == (len(ref.index[i]) > 10)
+        assert (res.index[i] == ref.index[i][:10]).all()
+        assert numpy.allclose(res.distance[i], ref.distance[i][:10])
+
+    # Inner products are capped by decreasing similarity.
+    idx = knncolle.build_index(knncolle.ExhaustiveParameters(distance="InnerProduct"), Y)
+    ref = knncolle.query_neighbors(idx, q, threshold=1.0)
+    res = knncolle.query_neighbors(idx, q, threshold=1.0, max_neighbors=3)
+    for i in range(50):
+        assert res.capped[i] == (len(ref.index[i]) > 3)
+        assert numpy.allclose(res.distance[i], ref.distance[i][:3])
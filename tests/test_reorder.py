@@ -0,0 +1,158 @@
+import knncolle
+import numpy
+import pytest
+
+
+def test_locality():
+    Y = numpy.random.rand(500, 20)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    assert idx.locality is None
+
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y, reorder=True)
+    assert idx.locality.dtype == numpy.uint32
+    assert (numpy.sort(idx.locality) == numpy.arange(500)).all()
+
+    # Consecutive observations should be closer than in the original order.
+    Y = numpy.random.rand(2000, 2)
+    idx = knncolle.build_index(knncolle.ExhaustiveParameters(), Y, reorder=True)
+    reordered = Y[idx.locality,:]
+    assert numpy.abs(numpy.diff(reordered, axis=0)).sum() < numpy.abs(numpy.diff(Y, axis=0)).sum() / 5
+
+    # Handles edge cases.
+    idx = knncolle.build_index(knncolle.VptreeParameters(), numpy.zeros((10, 5)), reorder=True)
+    assert (numpy.sort(idx.locality) == numpy.arange(10)).all()
+    idx = knncolle.build_index(knncolle.VptreeParameters(), numpy.zeros((0, 5)), reorder=True)
+    assert len(idx.locality) == 0
+
+
+@pytest.mark.parametrize("use_pool", [False, True])
+def test_reorder_find(helpers, use_pool):
+    Y = numpy.random.rand(500, 10)
+    idx = knncolle.build_index(knncolle.KmknnParameters(), Y, reorder=True)
+    nthreads = knncolle.ThreadPool(3) if use_pool else 3
+
+    ref = knncolle.find_knn(idx, 10)
+    out = knncolle.find_knn(idx, 10, num_threads=nthreads, reorder=True)
+    assert (ref.index == out.index).all()
+    assert (ref.distance == out.distance).all()
+
+    sub = numpy.random.permutation(500)[:50]
+    ref = knncolle.find_knn(idx, 10, subset=sub)
+    out = knncolle.find_knn(idx, 10, subset=sub, num_threads=nthreads, reorder=True, chunk_size=4)
+    assert (ref.index == out.index).all()
+
+    ref = knncolle.find_distance(idx, 5, subset=sub)
+    out = knncolle.find_distance(idx, 5, subset=sub, reorder=True)
+    assert (ref == out).all()
+
+    threshold = numpy.random.rand(500) / 2
+    ref = knncolle.find_neighbors(idx, threshold)
+    out = knncolle.find_neighbors(idx, threshold, num_threads=nthreads, reorder=True)
+    helpers.compare_lists(ref.index, out.index)
+    helpers.compare_lists(ref.distance, out.distance)
+
+    # Fails if the locality isn't known.
+    unordered = knncolle.build_index(knncolle.KmknnParameters(), Y)
+    with pytest.raises(ValueError, match="reorder"):
+        knncolle.find_knn(unordered, 10, reorder=True)
+    with pytest.raises(ValueError, match="reorder"):
+        knncolle.find_distance(unordered, 10, reorder=True)
+    with pytest.raises(ValueError, match="reorder"):
+        knncolle.find_neighbors(unordered, threshold, reorder=True)
+
+
+@pytest.mark.parametrize("use_pool", [False, True])
+def test_reorder_query(helpers, use_pool):
+    Y = numpy.random.rand(500, 10)
+    q = numpy.random.rand(200, 10)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    nthreads = knncolle.ThreadPool(3) if use_pool else 3
+
+    ref = knncolle.query_knn(idx, q, 10)
+    out = knncolle.query_knn(idx, q, 10, num_threads=nthreads, reorder=True)
+    assert (ref.index == out.index).all()
+    assert (ref.distance == out.distance).all()
+
+    k = numpy.random.randint(0, 20, size=200)
+    ref = knncolle.query_knn(idx, q, k)
+    out = knncolle.query_knn(idx, q, k, reorder=True)
+    helpers.compare_lists(ref.index, out.index)
+
+    ref = knncolle.query_distance(idx, q, 5)
+    out = knncolle.query_distance(idx, q, 5, num_threads=nthreads, reorder=True)
+    assert (ref == out).all()
+
+    ref = knncolle.query_neighbors(idx, q, 0.5)
+    out = knncolle.query_neighbors(idx, q, 0.5, num_threads=nthreads, reorder=True)
+    helpers.compare_lists(ref.index, out.index)
+    helpers.compare_lists(ref.distance, out.distance)
+
+    empty = knncolle.query_knn(idx, q[:0,:], 5, reorder=True)
+    assert empty.index.shape == (0, 5)
+
+
+@pytest.mark.parametrize("param", [
+    knncolle.ExhaustiveParameters(),
+    knncolle.VptreeParameters(),
+    knncolle.KmknnParameters(),
+    knncolle.HnswParameters(),
+    knncolle.AnnoyParameters(),
+])
+def test_reorder_layout(helpers, param):
+    Y = numpy.random.rand(300, 8)
+    q = numpy.random.rand(50, 8)
+    ref = knncolle.build_index(param, Y)
+    assert ref.layout == "input"
+    idx = knncolle.build_index(param, Y, reorder=True)
+    assert idx.layout == "locality"
+    assert idx.num_observations() == 300
+    assert idx.num_dimensions() == 8
+
+    usage = idx.estimate_memory_usage()
+    assert usage["permutation"] == 2400
+    assert usage["locality"] == idx.locality.nbytes
+    assert "permutation" not in ref.estimate_memory_usage()
+
+    # Results are still reported in the original index space.
+    res = knncolle.find_knn(idx, 5)
+    helpers.check_index_matrix(res.index, 300, include_self=False)
+    recomputed = numpy.sqrt(((Y[res.index[:,0],:] - Y)**2).sum(axis=1))
+    assert numpy.allclose(recomputed, res.distance[:,0])
+
+    qres = knncolle.query_knn(idx, q, 5)
+    recomputed = numpy.sqrt(((Y[qres.index[:,0],:] - q)**2).sum(axis=1))
+    assert numpy.allclose(recomputed, qres.distance[:,0])
+
+    if isinstance(param, (knncolle.ExhaustiveParameters, knncolle.VptreeParameters, knncolle.KmknnParameters)):
+        expected = knncolle.find_knn(ref, 5)
+        assert (expected.index == res.index).all()
+        expected = knncolle.query_knn(ref, q, 5)
+        assert (expected.index == qres.index).all()
+
+        expected = knncolle.find_neighbors(ref, 0.3)
+        out = knncolle.find_neighbors(idx, 0.3)
+        for i in range(300):
+            assert (numpy.sort(expected.index[i]) == numpy.sort(out.index[i])).all()
+
+        expected = knncolle.query_neighbors(ref, q, 0.3)
+        out = knncolle.query_neighbors(idx, q, 0.3)
+        for i in range(50):
+            assert (numpy.sort(expected.index[i]) == numpy.sort(out.index[i])).all()
+
+
+def test_reorder_cosine():
+    Y = numpy.random.rand(300, 8)
+    q = numpy.random.rand(40, 8)
+    ref = knncolle.build_index(knncolle.VptreeParameters(distance="Cosine"), Y)
+    idx = knncolle.build_index(knncolle.VptreeParameters(distance="Cosine"), Y, reorder=True)
+
+    # Queries are normalized in the same way regardless of whether the index was reordered.
+    expected = knncolle.query_knn(ref, q, 5)
+    out = knncolle.query_knn(idx, q, 5)
+    assert (expected.index == out.index).all()
+    assert numpy.allclose(expected.distance, out.distance)
+
+    expected = knncolle.query_neighbors(ref, q, 0.05)
+    out = knncolle.query_neighbors(idx, q, 0.05)
+    for i in range(q.shape[0]):
+        assert (expected.index[i] == out.index[i]).all()
@@ -0,0 +1,121 @@
+import knncolle
+import numpy
+import pytest
+
+
+def test_thread_pool_basic():
+    pool = knncolle.ThreadPool(3)
+    assert pool.num_threads == 3
+    assert isinstance(pool.ptr, int)
+
+    with pytest.raises(ValueError, match="positive"):
+        knncolle.ThreadPool(0)
+
+
+@pytest.mark.parametrize("num_threads", [1, 3, 8])
+def test_thread_pool_knn(num_threads):
+    Y = numpy.random.rand(500, 10)
+    q = numpy.random.rand(101, 10)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    pool = knncolle.ThreadPool(num_threads)
+
+    # Repeating to check that the cached searchers are re-used correctly.
+    for it in range(3):
+        ref = knncolle.find_knn(idx, 10)
+        out = knncolle.find_knn(idx, 10, num_threads=pool)
+        assert (ref.index == out.index).all()
+        assert (ref.distance == out.distance).all()
+
+        ref = knncolle.find_distance(idx, 5, subset=[1, 10, 100])
+        out = knncolle.find_distance(idx, 5, subset=[1, 10, 100], num_threads=pool)
+        assert (ref == out).all()
+
+        ref = knncolle.query_knn(idx, q, 7)
+        out = knncolle.query_knn(idx, q, 7, num_threads=pool)
+        assert (ref.index == out.index).all()
+        assert (ref.distance == out.distance).all()
+
+        ref = knncolle.query_distance(idx, q, 7)
+        out = knncolle.query_distance(idx, q, 7, num_threads=pool)
+        assert (ref == out).all()
+
+    # Works with fewer tasks than threads.
+    ref = knncolle.query_knn(idx, q[:2,:], 7)
+    out = knncolle.query_knn(idx, q[:2,:], 7, num_threads=pool)
+    assert (ref.index == out.index).all()
+
+    empty = knncolle.query_knn(idx, q[:0,:], 7, num_threads=pool)
+    assert empty.index.shape == (0, 7)
+
+
+def test_thread_pool_neighbors(helpers):
+    Y = numpy.random.rand(500, 10)
+    q = numpy.random.rand(50, 10)
+    idx = knncolle.build_index(knncolle.KmknnParameters(), Y)
+    pool = knncolle.ThreadPool(4)
+
+    ref = knncolle.find_neighbors(idx, 0.5)
+    out = knncolle.find_neighbors(idx, 0.5, num_threads=pool)
+    helpers.compare_lists(ref.index, out.index)
+    helpers.compare_lists(ref.distance, out.distance)
+
+    ref = knncolle.query_neighbors(idx, q, 0.5)
+    out = knncolle.query_neighbors(idx, q, 0.5, num_threads=pool)
+    helpers.compare_lists(ref.index, out.index)
+    helpers.compare_lists(ref.distance, out.distance)
+
+    aidx = knncolle.build_index(knncolle.AnnoyParameters(), Y)
+    ref = knncolle.find_neighbors(aidx, 0.5)
+    out = knncolle.find_neighbors(aidx, 0.5, num_threads=pool)
+    helpers.compare_lists(ref.index, out.index)
+
+
+def test_thread_pool_multiple_indices():
+    pool = knncolle.ThreadPool(2)
+    q = numpy.random.rand(20, 5)
+
+    for it in range(5):
+        Y = numpy.random.rand(100 + it * 10, 5)
+        idx = knncolle.build_index(knncolle.ExhaustiveParameters(), Y)
+        ref = knncolle.query_knn(idx, q, 5)
+        out = knncolle.query_knn(idx, q, 5, num_threads=pool)
+        assert (ref.index == out.index).all()
+        del idx # checking that cached searchers for freed indices are handled properly.
+
+    idx1 = knncolle.build_index(knncolle.ExhaustiveParameters(), numpy.random.rand(100, 5))
+    idx2 = knncolle.build_index(knncolle.VptreeParameters(), numpy.random.rand(100, 5))
+    for idx in [idx1, idx2, idx1, idx2]:
+        ref = knncolle.query_knn(idx, q, 5)
+        out = knncolle.query_knn(idx, q, 5, num_threads=pool)
+        assert (ref.index == out.index).all()
+
+
+def test_thread_pool_errors():
+    Y = numpy.random.rand(100, 5)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    pool = knncolle.ThreadPool(2)
+
+    with pytest.raises(Exception):
+        knncolle.find_knn(idx, 5, subset=[1000], num_threads=pool)
+
+    # Pool is still usable after an error.
+    ref = knncolle.find_knn(idx, 5)
+    out = knncolle.find_knn(idx, 5, num_threads=pool)
+    assert (ref.index == out.index).all()
+
+
+def test_thread_pool_async():
+    import asyncio
+    Y = numpy.random.rand(200, 5)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), Y)
+    pool = knncolle.ThreadPool(2)
+    searcher = knncolle.AsyncSearcher(idx, num_threads=pool)
+    q = numpy.random.rand(10, 5)
+
+    async def run():
+        return await asyncio.gather(*[searcher.query(q[i,:], 3) for i in range(q.shape[0])])
+
+    res = asyncio.run(run())
+    ref = knncolle.query_knn(idx, q, 3)
+    for i, r in enumerate(res):
+        assert (r.index == ref.index[i,:]).all()
@@ -1,5 +1,6 @@
 import knncolle
 import numpy
+import pytest
 
 
 def test_vptree_parameters():
@@ -7,6 +8,17 @@ def test_vptree_parameters():
     assert p.distance == "Euclidean" 
     p.distance = "Manhattan"
     assert p.distance == "Manhattan" 
+    assert not p.dual_tree
+    p.dual_tree = True
+    assert p.dual_tree
+
+    with pytest.raises(ValueError, match="dual_tree"):
+        knncolle.VptreeParameters(distance="InnerProduct", dual_tree=True)
+    with pytest.raises(ValueError, match="dual_tree"):
+        p.distance = "Hamming"
+    p = knncolle.VptreeParameters(distance="InnerProduct")
+    with pytest.raises(ValueError, match="dual_tree"):
+        p.dual_tree = True
 
 
 def test_vptree_basic(helpers):
@@ -45,3 +57,65 @@ def test_vptree_distances(helpers):
     res_ce = knncolle.find_knn(idx_ce, 10)
     assert (res_c.index == res_ce.index).all()
     assert numpy.isclose(res_c.distance, res_ce.distance).all()
+
+
+def _check_dual_tree(idx, num_threads=1):
+    ref = knncolle.find_knn(idx, 10)
+    res = knncolle.find_knn(idx, 10, dual_tree=True, num_threads=num_threads)
+    assert (res.index == ref.index).all()
+    assert numpy.allclose(res.distance, ref.distance)
+
+    k = numpy.random.randint(0, 20, size=idx.num_observations())
+    ref = knncolle.find_knn(idx, k)
+    res = knncolle.find_knn(idx, k, dual_tree=True, num_threads=num_threads)
+    assert all((r == e).all() for r, e in zip(res.index, ref.index))
+
+    sub = [5, 1, 100, 20, 1]
+    ref = knncolle.find_knn(idx, 5, subset=sub)
+    res = knncolle.find_knn(idx, 5, subset=sub, dual_tree=True, num_threads=num_threads)
+    assert (res.index == ref.index).all()
+    assert numpy.allclose(res.distance, ref.distance)
+
+    assert numpy.allclose(knncolle.find_distance(idx, 7, dual_tree=True, num_threads=num_threads), knncolle.find_distance(idx, 7))
+
+    d = knncolle.find_distance(idx, 10).mean()
+    ref = knncolle.find_neighbors(idx, d)
+    res = knncolle.find_neighbors(idx, d, dual_tree=True, num_threads=num_threads)
+    assert all((r == e).all() for r, e in zip(res.index, ref.index))
+    assert all(numpy.allclose(r, e) for r, e in zip(res.distance, ref.distance))
+
+    ref = knncolle.find_neighbors(idx, d, max_neighbors=5)
+    res = knncolle.find_neighbors(idx, d, max_neighbors=5, dual_tree=True, num_threads=num_threads)
+    assert all((r == e).all() for r, e in zip(res.index, ref.index))
+    assert (res.capped == ref.capped).all()
+
+    ref = knncolle.find_neighbors(idx, d, subset=sub)
+    res = knncolle.find_neighbors(idx, d, subset=sub, dual_tree=True, num_threads=num_threads)
+    assert all((r == e).all() for r, e in zip(res.index, ref.index))
+
+
+def test_vptree_dual_tree():
+    x = numpy.random.rand(500, 5)
+    for distance in ["Euclidean", "Manhattan", "Cosine"]:
+        idx = knncolle.build_index(knncolle.VptreeParameters(distance=distance, dual_tree=True), x)
+        assert idx.layout == "input"
+        assert (numpy.sort(idx.locality) == numpy.arange(500)).all()
+        assert idx.estimate_memory_usage()["locality"] == 500 * 4
+        _check_dual_tree(idx)
+        _check_dual_tree(idx, num_threads=3)
+
+    idx = knncolle.build_index(knncolle.VptreeParameters(dual_tree=True), x, reorder=True)
+    _check_dual_tree(idx, num_threads=2)
+
+
+def test_vptree_dual_tree_unsupported():
+    x = numpy.random.rand(100, 5)
+    idx = knncolle.build_index(knncolle.VptreeParameters(), x)
+    with pytest.raises(ValueError, match="dual_tree"):
+        knncolle.find_knn(idx, 10, dual_tree=True)
+    with pytest.raises(ValueError, match="dual_tree"):
+        knncolle.find_neighbors(idx, 0.5, dual_tree=True)
+
+    idx = knncolle.build_index(knncolle.VptreeParameters(dual_tree=True), x)
+    with pytest.raises(ValueError, match="dual_tree"):
+        knncolle.find_knn(idx, 10, dual_tree=True, excluded=[0, 1])